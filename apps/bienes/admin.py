@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
+from apps.core.cache_utils import DataVersionCache
 from .models import BienPatrimonial, MovimientoBien, HistorialEstado
 
 
@@ -181,7 +183,13 @@ class BienPatrimonialAdmin(admin.ModelAdmin):
     
     def cambiar_estado_bueno(self, request, queryset):
         """Acción para cambiar estado a Bueno"""
-        updated = queryset.update(estado_bien='B')
+        from apps.mobile.models import RegistroCambioBien
+        
+        ids = list(queryset.values_list('id', flat=True))
+        updated = queryset.update(estado_bien='B', updated_at=timezone.now())
+        # update() no dispara señales
+        DataVersionCache.bump_version(BienPatrimonial)
+        RegistroCambioBien.registrar(ids)
         self.message_user(
             request,
             f'{updated} bienes cambiaron a estado "Bueno".'
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class BienesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.bienes'
\ No newline at end of file
+    name = 'apps.bienes'
+    
+    def ready(self):
+        import apps.bienes.signals  # noqa: F401
@@ -0,0 +1,15 @@
+"""
+Señales de la app de bienes
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.cache_utils import DataVersionCache
+from .models import BienPatrimonial
+
+
+@receiver(post_save, sender=BienPatrimonial)
+@receiver(post_delete, sender=BienPatrimonial)
+def actualizar_version_bienes(sender, **kwargs):
+    """Invalida los resultados derivados cuando cambia un bien"""
+    DataVersionCache.bump_version(BienPatrimonial)
@@ -536,95 +536,79 @@ def validar_estructura_bienes(archivo_path):
 
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.styles import Font, PatternFill
 from django.http import HttpResponse
 from datetime import datetime
+from apps.core.excel_utils import ExcelStreamWriter
 
 
 class BienPatrimonialExporter:
     """Clase para exportar bienes patrimoniales a Excel"""
     
+    # Columnas: (encabezado, campo en la base de datos)
+    COLUMNAS = [
+        ('CODIGO PATRIMONIAL', 'codigo_patrimonial'),
+        ('CODIGO INTERNO', 'codigo_interno'),
+        ('DENOMINACION BIEN', 'catalogo__denominacion'),
+        ('ESTADO BIEN', 'estado_bien'),
+        ('MARCA', 'marca'),
+        ('MODELO', 'modelo'),
+        ('COLOR', 'color'),
+        ('SERIE', 'serie'),
+        ('DIMENSION', 'dimension'),
+        ('PLACA', 'placa'),
+        ('MATRICULAS', 'matricula'),
+        ('NRO MOTOR', 'nro_motor'),
+        ('NRO CHASIS', 'nro_chasis'),
+        ('OFICINA', 'oficina__nombre'),
+        ('OBSERVACIONES', 'observaciones'),
+    ]
+    
+    TAMAÑO_LOTE = 2000
+    
     def __init__(self):
-        self.workbook = Workbook()
-        self.worksheet = self.workbook.active
-        self.worksheet.title = "Inventario Patrimonial"
-        
-        # Estilos
-        self.header_font = Font(bold=True, color="FFFFFF")
-        self.header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        self.header_alignment = Alignment(horizontal="center", vertical="center")
+        # Libro en modo write_only: las filas se escriben a medida que se leen
+        self.escritor = ExcelStreamWriter()
+        self.workbook = self.escritor.workbook
+        self.worksheet = self.escritor.create_sheet("Inventario Patrimonial")
+        self.total_registros = 0
     
     def exportar_bienes(self, queryset, incluir_qr_url=True):
         """Exporta un queryset de bienes a Excel"""
-        # Definir columnas
-        columnas = [
-            ('A', 'CODIGO PATRIMONIAL', 'codigo_patrimonial'),
-            ('B', 'CODIGO INTERNO', 'codigo_interno'),
-            ('C', 'DENOMINACION BIEN', 'catalogo__denominacion'),
-            ('D', 'ESTADO BIEN', 'get_estado_bien_display'),
-            ('E', 'MARCA', 'marca'),
-            ('F', 'MODELO', 'modelo'),
-            ('G', 'COLOR', 'color'),
-            ('H', 'SERIE', 'serie'),
-            ('I', 'DIMENSION', 'dimension'),
-            ('J', 'PLACA', 'placa'),
-            ('K', 'MATRICULAS', 'matricula'),
-            ('L', 'NRO MOTOR', 'nro_motor'),
-            ('M', 'NRO CHASIS', 'nro_chasis'),
-            ('N', 'OFICINA', 'oficina__nombre'),
-            ('O', 'OBSERVACIONES', 'observaciones'),
-        ]
-        
-        if incluir_qr_url:
-            columnas.append(('P', 'URL QR', 'url_qr'))
-        
-        # Escribir encabezados
-        for col_letter, header, _ in columnas:
-            cell = self.worksheet[f'{col_letter}1']
-            cell.value = header
-            cell.font = self.header_font
-            cell.fill = self.header_fill
-            cell.alignment = self.header_alignment
-        
-        # Escribir datos
-        for row_num, bien in enumerate(queryset, start=2):
-            for col_letter, _, field_name in columnas:
-                cell = self.worksheet[f'{col_letter}{row_num}']
-                
-                # Obtener valor del campo
-                if '__' in field_name:
-                    # Campo relacionado
-                    parts = field_name.split('__')
-                    value = bien
-                    for part in parts:
-                        if hasattr(value, part):
-                            value = getattr(value, part)
-                        else:
-                            value = ''
-                            break
-                elif hasattr(bien, field_name):
-                    value = getattr(bien, field_name)
-                    # Si es un método, llamarlo
-                    if callable(value):
-                        value = value()
-                else:
-                    value = ''
-                
-                cell.value = str(value) if value else ''
-        
-        # Ajustar ancho de columnas
-        for col_letter, _, _ in columnas:
-            self.worksheet.column_dimensions[col_letter].width = 15
-        
-        # Columnas más anchas para ciertos campos
-        self.worksheet.column_dimensions['C'].width = 40  # DENOMINACION
-        self.worksheet.column_dimensions['N'].width = 25  # OFICINA
-        self.worksheet.column_dimensions['O'].width = 30  # OBSERVACIONES
+        columnas = list(self.COLUMNAS)
         if incluir_qr_url:
-            self.worksheet.column_dimensions['P'].width = 50  # URL QR
+            columnas.append(('URL QR', 'url_qr'))
+        
+        self.total_registros = self.escritor.write_table(
+            self.worksheet,
+            [encabezado for encabezado, _ in columnas],
+            self._iterar_filas(queryset, [campo for _, campo in columnas]),
+            striped=False,
+            freeze_header=False
+        )
         
         return self.workbook
     
+    def _iterar_filas(self, queryset, campos):
+        """
+        Genera las filas del inventario leyendo solo las columnas necesarias.
+        
+        Args:
+            queryset: QuerySet de bienes
+            campos: Lista de campos a leer
+            
+        Yields:
+            list: Valores de la fila como texto
+        """
+        estados = dict(BienPatrimonial.ESTADOS_BIEN)
+        indice_estado = campos.index('estado_bien')
+        
+        filas = queryset.values_list(*campos).iterator(chunk_size=self.TAMAÑO_LOTE)
+        for fila in filas:
+            fila = list(fila)
+            fila[indice_estado] = estados.get(fila[indice_estado], '')
+            yield [str(valor) if valor else '' for valor in fila]
+    
     def generar_respuesta_http(self, filename=None):
         """Genera una respuesta HTTP con el archivo Excel"""
         if not filename:
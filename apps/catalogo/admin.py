@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
+from apps.core.cache_utils import DataVersionCache
 from .models import Catalogo, ImportObservation
 
 
@@ -92,7 +93,9 @@ class CatalogoAdmin(admin.ModelAdmin):
     
     def activar_bienes(self, request, queryset):
         """Acción para activar bienes seleccionados"""
-        updated = queryset.update(estado='ACTIVO')
+        updated = queryset.update(estado='ACTIVO', updated_at=timezone.now())
+        # update() no dispara señales
+        DataVersionCache.bump_version(Catalogo)
         self.message_user(
             request,
             f'{updated} bienes fueron activados exitosamente.'
@@ -101,7 +104,9 @@ class CatalogoAdmin(admin.ModelAdmin):
     
     def excluir_bienes(self, request, queryset):
         """Acción para excluir bienes seleccionados"""
-        updated = queryset.update(estado='EXCLUIDO')
+        updated = queryset.update(estado='EXCLUIDO', updated_at=timezone.now())
+        # update() no dispara señales
+        DataVersionCache.bump_version(Catalogo)
         self.message_user(
             request,
             f'{updated} bienes fueron excluidos exitosamente.'
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class CatalogoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.catalogo'
\ No newline at end of file
+    name = 'apps.catalogo'
+    
+    def ready(self):
+        import apps.catalogo.signals  # noqa: F401
@@ -0,0 +1,15 @@
+"""
+Señales de la app de catálogo
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.cache_utils import DataVersionCache
+from .models import Catalogo
+
+
+@receiver(post_save, sender=Catalogo)
+@receiver(post_delete, sender=Catalogo)
+def actualizar_version_catalogo(sender, **kwargs):
+    """Invalida las respuestas en caché cuando cambian los datos de referencia"""
+    DataVersionCache.bump_version(Catalogo)
@@ -3,11 +3,13 @@ Utilidades de caché para el sistema de papelera de reciclaje.
 Implementa estrategias de caché para mejorar el rendimiento de consultas frecuentes.
 """
 from django.core.cache import cache
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
 from django.utils import timezone
 from datetime import timedelta
 import hashlib
 import json
+import time
 
 
 class RecycleBinCache:
@@ -463,3 +465,159 @@ class PaginationOptimizer:
                 prev_cursor = getattr(page_items[0], cursor_field)
         
         return page_items, next_cursor, prev_cursor
+
+
+class DataVersionCache:
+    """
+    Contador de versión de datos por modelo.
+    Cambia cada vez que se modifican registros del modelo y permite
+    invalidar resultados derivados sin borrar claves por patrón.
+    
+    La versión se guarda en la base de datos (VersionDatos) y no en el
+    caché: con un caché local por proceso un cambio hecho en el proceso
+    web no llegaría a los workers de Celery. Se incrementa al confirmarse
+    la transacción del cambio, una sola vez por transacción, para que la
+    fila de la versión no quede bloqueada mientras la transacción dura.
+    """
+    
+    @staticmethod
+    def _label(model):
+        """Etiqueta 'app.modelo' de un modelo o etiqueta 'app.Modelo'"""
+        label = model if isinstance(model, str) else model._meta.label
+        return label.lower()
+    
+    @classmethod
+    def get_version(cls, model):
+        """
+        Obtiene la versión de datos actual de un modelo.
+        
+        Args:
+            model: Clase del modelo o etiqueta 'app.Modelo'
+            
+        Returns:
+            int: Versión actual
+        """
+        from .models import VersionDatos
+        
+        label = cls._label(model)
+        version = VersionDatos.objects.filter(modelo=label).values_list('version', flat=True).first()
+        if version is None:
+            # Se inicializa con el reloj para no repetir versiones que
+            # hayan quedado en claves de caché anteriores
+            registro, _ = VersionDatos.objects.get_or_create(
+                modelo=label, defaults={'version': time.time_ns()}
+            )
+            version = registro.version
+        return version
+    
+    @classmethod
+    def get_versions(cls, models):
+        """
+        Obtiene las versiones de datos de varios modelos en una consulta.
+        
+        Args:
+            models: Clases de modelos o etiquetas 'app.Modelo'
+            
+        Returns:
+            list: Versiones en el mismo orden que models
+        """
+        from .models import VersionDatos
+        
+        labels = [cls._label(model) for model in models]
+        versiones = dict(VersionDatos.objects.filter(modelo__in=labels).values_list('modelo', 'version'))
+        return [
+            versiones[label] if label in versiones else cls.get_version(label)
+            for label in labels
+        ]
+    
+    @classmethod
+    def bump_version(cls, model):
+        """
+        Incrementa la versión de datos de un modelo.
+        Debe llamarse en cada modificación, incluidas las actualizaciones masivas.
+        
+        Dentro de una transacción el incremento se hace al confirmarla y
+        los incrementos repetidos se reúnen en uno: una importación que
+        guarda miles de bienes en una transacción no bloquea la fila de la
+        versión (ni a los demás cambios de bienes) hasta terminar. Si la
+        transacción se revierte la versión no cambia.
+        
+        Args:
+            model: Clase del modelo o etiqueta 'app.Modelo'
+        """
+        label = cls._label(model)
+        connection = transaction.get_connection()
+        anterior = None
+        if connection.in_atomic_block:
+            anterior = next((
+                func for _, func, _ in reversed(connection.run_on_commit)
+                if isinstance(func, _IncrementoVersion) and func.label == label
+            ), None)
+        transaction.on_commit(_IncrementoVersion(label, anterior))
+    
+    @classmethod
+    def _incrementar(cls, label):
+        """Incrementa la versión guardada de una etiqueta 'app.modelo'"""
+        from .models import VersionDatos
+        
+        ahora = timezone.now()
+        actualizados = VersionDatos.objects.filter(modelo=label).update(
+            version=F('version') + 1, modificado=ahora
+        )
+        if not actualizados:
+            _, creado = VersionDatos.objects.get_or_create(
+                modelo=label, defaults={'version': time.time_ns(), 'modificado': ahora}
+            )
+            if not creado:
+                VersionDatos.objects.filter(modelo=label).update(version=F('version') + 1, modificado=ahora)
+    
+    @classmethod
+    def get_last_modified(cls, model):
+        """
+        Obtiene la fecha de la última modificación registrada de un modelo.
+        Si no hay registro se calcula desde updated_at y deleted_at.
+        
+        Args:
+            model: Clase del modelo (con manager all_objects si es BaseModel)
+            
+        Returns:
+            datetime o None si la tabla está vacía
+        """
+        from .models import VersionDatos
+        
+        last_modified = VersionDatos.objects.filter(
+            modelo=cls._label(model)
+        ).values_list('modificado', flat=True).first()
+        if last_modified is None:
+            manager = getattr(model, 'all_objects', model._default_manager)
+            fechas = manager.aggregate(
+                actualizado=Max('updated_at'),
+                eliminado=Max('deleted_at')
+            )
+            candidatos = [fecha for fecha in fechas.values() if fecha is not None]
+            last_modified = max(candidatos) if candidatos else None
+        return last_modified
+
+
+class _IncrementoVersion:
+    """
+    Incremento de versión aplazado hasta confirmar la transacción.
+    
+    Los incrementos de una misma transacción comparten su estado y solo
+    el primero que se ejecuta actualiza la versión. Si una transacción
+    anidada se revierte, Django descarta sus callbacks y los demás
+    siguen pendientes.
+    """
+    
+    def __init__(self, label, anterior=None):
+        self.label = label
+        if anterior is not None and not anterior.estado['ejecutado']:
+            self.estado = anterior.estado
+        else:
+            self.estado = {'ejecutado': False}
+    
+    def __call__(self):
+        if self.estado['ejecutado']:
+            return
+        self.estado['ejecutado'] = True
+        DataVersionCache._incrementar(self.label)
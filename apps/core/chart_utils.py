@@ -0,0 +1,185 @@
+"""
+Utilidades para renderizar gráficos con caché en disco.
+Cada imagen se identifica por el hash de la función que la dibuja, sus
+datos, opciones y formato; solo se renderizan las imágenes que faltan,
+en paralelo en un pool de procesos con el backend Agg precargado.
+"""
+import hashlib
+import importlib
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .process_utils import can_spawn_processes
+
+logger = logging.getLogger(__name__)
+
+
+class ChartCache:
+    """
+    Caché en disco de imágenes de gráficos.
+
+    Un gráfico se describe como (nombre, renderer, datos, opciones), donde
+    renderer es la ruta 'modulo.funcion' de una función de nivel de módulo
+    con firma renderer(datos, opciones, formato) que devuelve los bytes de
+    la imagen o None si no hay datos que graficar.
+    """
+
+    # Cambiar al modificar el aspecto de los gráficos invalida la caché
+    RENDER_VERSION = 1
+
+    FORMATS = {
+        'png': 'image/png',
+        'svg': 'image/svg+xml',
+    }
+
+    def __init__(self, directory=None, max_workers=None):
+        """
+        Args:
+            directory: Directorio de la caché (por defecto GRAFICOS_CACHE_DIR)
+            max_workers: Procesos para renderizar (por defecto GRAFICOS_PROCESOS)
+        """
+        self.directory = directory or getattr(
+            settings, 'GRAFICOS_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'cache', 'graficos')
+        )
+        self.max_workers = max_workers or getattr(settings, 'GRAFICOS_PROCESOS', min(4, os.cpu_count() or 1))
+
+    @classmethod
+    def key(cls, renderer, data, options=None, fmt='png'):
+        """
+        Calcula la clave de un gráfico.
+
+        Args:
+            renderer: Ruta 'modulo.funcion' del renderer
+            data: Datos del gráfico (serializables a JSON)
+            options: Opciones de estilo
+            fmt: Formato de imagen
+
+        Returns:
+            str: SHA-256 hexadecimal
+        """
+        content = json.dumps(
+            [cls.RENDER_VERSION, renderer, data, options or {}, fmt],
+            sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def path_for(self, key, fmt='png'):
+        """Ruta de la imagen de una clave"""
+        return os.path.join(self.directory, key[:2], f'{key}.{fmt}')
+
+    def get(self, renderer, data, options=None, fmt='png'):
+        """
+        Obtiene la ruta de un gráfico, renderizándolo si no está en caché.
+
+        Returns:
+            str o None si el renderer no produjo imagen
+        """
+        return self.get_many([('grafico', renderer, data, options)], fmt)['grafico']
+
+    def get_many(self, charts, fmt='png'):
+        """
+        Obtiene las rutas de varios gráficos; los que faltan se renderizan
+        en paralelo, o en serie dentro de un proceso daemon (como un worker
+        prefork de Celery).
+
+        Args:
+            charts: Iterable de (nombre, renderer, datos, opciones)
+            fmt: Formato de imagen ('png' o 'svg')
+
+        Returns:
+            dict: {nombre: ruta o None}
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Formato de gráfico no soportado: {fmt}")
+
+        paths = {}
+        missing = []
+        for name, renderer, data, options in charts:
+            path = self.path_for(self.key(renderer, data, options, fmt), fmt)
+            if os.path.exists(path):
+                self._touch(path)
+                paths[name] = path
+            else:
+                missing.append((name, path, (renderer, data, options or {}, fmt)))
+
+        if not missing:
+            return paths
+
+        arguments = [args for _, _, args in missing]
+        workers = min(self.max_workers, len(missing))
+        if workers > 1 and can_spawn_processes():
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_process) as pool:
+                images = list(pool.map(_render_chart, *zip(*arguments)))
+        else:
+            _init_render_process()
+            images = [_render_chart(*args) for args in arguments]
+
+        for (name, path, _), image in zip(missing, images):
+            paths[name] = self._store(path, image) if image is not None else None
+
+        logger.debug(f"Gráficos: {len(paths) - len(missing)} en caché, {len(missing)} renderizados")
+        return paths
+
+    def purge(self, max_age):
+        """
+        Elimina las imágenes no utilizadas en el tiempo indicado.
+
+        Args:
+            max_age: timedelta desde el último uso
+
+        Returns:
+            int: Número de imágenes eliminadas
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+
+        limit = time.time() - max_age.total_seconds()
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for image in os.scandir(entry.path):
+                try:
+                    if image.is_file() and image.stat().st_mtime < limit:
+                        os.remove(image.path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+    def _store(self, path, image):
+        """Guarda la imagen de forma atómica"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as target:
+            target.write(image)
+        os.replace(temp_path, path)
+        return path
+
+    @staticmethod
+    def _touch(path):
+        """Marca el uso de la imagen para la purga por antigüedad"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def _init_render_process():
+    """Precarga matplotlib con el backend Agg en el proceso de renderizado"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+
+
+def _render_chart(renderer, data, options, fmt):
+    """Importa y ejecuta un renderer; devuelve los bytes de la imagen o None"""
+    module_path, function_name = renderer.rsplit('.', 1)
+    function = getattr(importlib.import_module(module_path), function_name)
+    return function(data, options, fmt)
@@ -0,0 +1,268 @@
+"""
+Utilidades para descargar archivos almacenados.
+Los archivos se envían por bloques con FileResponse o se delegan al
+servidor proxy (X-Accel-Redirect / X-Sendfile), con soporte de
+peticiones Range y ETag fuerte basado en el contenido. Los archivos
+guardados con gzip (.gz) se envían comprimidos a los clientes que lo
+aceptan y descomprimidos al resto.
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+
+
+class FileDownload:
+    """
+    Genera respuestas de descarga para archivos de un FileField.
+
+    El modo de entrega se configura con DESCARGAS_SERVIDOR_PROXY:
+    '' (la aplicación envía el archivo), 'NGINX' (X-Accel-Redirect hacia
+    DESCARGAS_PREFIJO_INTERNO) o 'APACHE' (X-Sendfile con la ruta local).
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    HASH_BLOCK_SIZE = 1024 * 1024
+
+    GZIP_SUFFIX = '.gz'
+
+    RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+    @classmethod
+    def compute_hash(cls, field_file):
+        """
+        Calcula el SHA-256 del contenido leyendo por bloques.
+        En los archivos comprimidos se calcula sobre el contenido original.
+
+        Args:
+            field_file: Archivo de un FileField
+
+        Returns:
+            str: Hash hexadecimal
+        """
+        digest = hashlib.sha256()
+        with field_file.storage.open(field_file.name, 'rb') as stored:
+            source = gzip.GzipFile(fileobj=stored, mode='rb') if cls.is_compressed(field_file) else stored
+            for chunk in iter(lambda: source.read(cls.HASH_BLOCK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def is_compressed(cls, field_file):
+        """Indica si el archivo está guardado con gzip"""
+        return field_file.name.endswith(cls.GZIP_SUFFIX)
+
+    @classmethod
+    def respond(cls, request, field_file, filename, content_hash):
+        """
+        Genera la respuesta de descarga.
+
+        Args:
+            request: HttpRequest
+            field_file: Archivo de un FileField
+            filename: Nombre con el que se descarga el archivo
+            content_hash: Hash del contenido, usado como ETag
+
+        Returns:
+            HttpResponse, FileResponse o respuesta 304/206/416
+        """
+        compressed = cls.is_compressed(field_file)
+        gzip_encoding = compressed and cls._accepts_gzip(request)
+        # Cada codificación es una representación distinta con su propio ETag
+        etag = f'"{content_hash}-gzip"' if gzip_encoding else f'"{content_hash}"'
+        last_modified = cls._last_modified(field_file)
+
+        conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if conditional is not None:
+            return cls._add_cache_headers(conditional, etag)
+
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        if compressed:
+            return cls._compressed_response(field_file, filename, content_type, etag, gzip_encoding)
+
+        proxy = getattr(settings, 'DESCARGAS_SERVIDOR_PROXY', '')
+
+        if proxy:
+            response = cls._proxy_response(proxy, field_file, filename, content_type)
+            if response is not None:
+                return cls._add_cache_headers(response, etag)
+
+        size = field_file.size
+        byte_range = None
+        if cls._range_applies(request, etag):
+            byte_range = cls.parse_range(request.headers['Range'], size)
+
+        if byte_range == 'INVALID':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return cls._add_cache_headers(response, etag)
+
+        source = field_file.storage.open(field_file.name, 'rb')
+        if byte_range is None:
+            response = FileResponse(
+                source, as_attachment=True, filename=filename, content_type=content_type
+            )
+            response.block_size = cls.BLOCK_SIZE
+        else:
+            start, end = byte_range
+            source.seek(start)
+            response = FileResponse(
+                _RangeFile(source, end - start + 1),
+                as_attachment=True,
+                filename=filename,
+                content_type=content_type,
+                status=206
+            )
+            response.block_size = cls.BLOCK_SIZE
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        return cls._add_cache_headers(response, etag)
+
+    @classmethod
+    def _compressed_response(cls, field_file, filename, content_type, etag, gzip_encoding):
+        """
+        Envía un archivo guardado con gzip.
+
+        Los clientes que aceptan gzip reciben los bytes almacenados con
+        Content-Encoding; al resto se le descomprime al vuelo. No se
+        atienden peticiones Range.
+        """
+        stored = field_file.storage.open(field_file.name, 'rb')
+        source = stored if gzip_encoding else _GzipStream(stored)
+        response = FileResponse(source, as_attachment=True, filename=filename, content_type=content_type)
+        response.block_size = cls.BLOCK_SIZE
+        if gzip_encoding:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+
+        response = cls._add_cache_headers(response, etag)
+        response['Accept-Ranges'] = 'none'
+        return response
+
+    @staticmethod
+    def _accepts_gzip(request):
+        """Indica si el cliente acepta la codificación gzip"""
+        encodings = request.headers.get('Accept-Encoding', '')
+        for encoding in encodings.split(','):
+            name, _, params = encoding.strip().partition(';')
+            if name.strip().lower() in ('gzip', '*'):
+                return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+        return False
+
+    @classmethod
+    def parse_range(cls, header, size):
+        """
+        Interpreta una cabecera Range de un único intervalo de bytes.
+
+        Args:
+            header: Valor de la cabecera Range
+            size: Tamaño del archivo
+
+        Returns:
+            tuple (inicio, fin), None si la cabecera no se atiende
+            (se envía el archivo completo) o 'INVALID' si el intervalo
+            no es satisfacible
+        """
+        match = cls.RANGE_PATTERN.match(header.strip())
+        if not match or match.groups() == ('', ''):
+            return None
+
+        start, end = match.groups()
+        if not start:
+            # Sufijo: últimos N bytes
+            length = int(end)
+            if length == 0:
+                return 'INVALID'
+            return max(0, size - length), size - 1
+
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+        if start >= size or start > end:
+            return 'INVALID'
+        return start, end
+
+    @staticmethod
+    def _range_applies(request, etag):
+        """Indica si se debe atender la cabecera Range (considerando If-Range)"""
+        if 'Range' not in request.headers or request.method not in ('GET', 'HEAD'):
+            return False
+        if_range = request.headers.get('If-Range')
+        return if_range is None or if_range.strip() == etag
+
+    @staticmethod
+    def _last_modified(field_file):
+        """Fecha de modificación del archivo como timestamp, si el almacenamiento la provee"""
+        try:
+            return int(field_file.storage.get_modified_time(field_file.name).timestamp())
+        except (NotImplementedError, OSError):
+            return None
+
+    @staticmethod
+    def _proxy_response(proxy, field_file, filename, content_type):
+        """Respuesta vacía que delega el envío del archivo al servidor proxy"""
+        response = HttpResponse(content_type=content_type)
+        if proxy == 'NGINX':
+            prefix = getattr(settings, 'DESCARGAS_PREFIJO_INTERNO', '/protected-media/')
+            response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name)
+        elif proxy == 'APACHE':
+            try:
+                response['X-Sendfile'] = field_file.path
+            except NotImplementedError:
+                # Almacenamiento remoto: la aplicación envía el archivo
+                return None
+        else:
+            return None
+
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    @staticmethod
+    def _add_cache_headers(response, etag):
+        """Agrega ETag y cabeceras de caché privadas"""
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class _RangeFile:
+    """Archivo limitado a un número de bytes desde la posición actual"""
+
+    def __init__(self, source, length):
+        self.source = source
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.source.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.source.close()
+
+
+class _GzipStream:
+    """Contenido descomprimido de un archivo gzip, sin tamaño conocido"""
+
+    def __init__(self, source):
+        self.source = source
+        self.stream = gzip.GzipFile(fileobj=source, mode='rb')
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def close(self):
+        self.stream.close()
+        self.source.close()
@@ -0,0 +1,166 @@
+"""
+Utilidades para generar archivos Excel de gran tamaño.
+Usa el modo write_only de openpyxl: las filas se escriben a medida que
+se generan y la memoria no depende del total de registros.
+"""
+from itertools import chain, islice
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+
+
+class ExcelStreamWriter:
+    """
+    Escritor de libros Excel en modo write_only.
+    Registra estilos con nombre una sola vez por libro y estima el ancho
+    de las columnas a partir de una muestra de filas.
+    """
+
+    # Filas usadas para estimar el ancho de las columnas
+    SAMPLE_SIZE = 200
+    MIN_WIDTH = 8
+    MAX_WIDTH = 50
+
+    STYLES = {
+        'titulo': {'font': Font(bold=True, size=14), 'alignment': Alignment(horizontal='center')},
+        'subtitulo': {'font': Font(bold=True, size=12), 'alignment': Alignment(horizontal='center')},
+        'nota': {'font': Font(size=10), 'alignment': Alignment(horizontal='center')},
+        'seccion': {'font': Font(bold=True, size=12)},
+        'encabezado': {
+            'font': Font(bold=True, color='FFFFFF'),
+            'fill': PatternFill(start_color='366092', end_color='366092', fill_type='solid'),
+            'alignment': Alignment(horizontal='center', vertical='center'),
+        },
+        'encabezado_simple': {
+            'font': Font(bold=True),
+            'fill': PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid'),
+        },
+        'alterno': {
+            'fill': PatternFill(start_color='F2F2F2', end_color='F2F2F2', fill_type='solid'),
+        },
+    }
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+        for name, attributes in self.STYLES.items():
+            self.workbook.add_named_style(NamedStyle(name=name, **attributes))
+
+    def create_sheet(self, title):
+        """
+        Crea una hoja nueva.
+
+        Args:
+            title: Título de la hoja
+
+        Returns:
+            WriteOnlyWorksheet
+        """
+        return self.workbook.create_sheet(title)
+
+    def cell(self, ws, value, style=None):
+        """
+        Crea una celda con estilo con nombre para agregar con append().
+
+        Args:
+            ws: Hoja de destino
+            value: Valor de la celda
+            style: Nombre del estilo registrado (opcional)
+
+        Returns:
+            WriteOnlyCell
+        """
+        cell = WriteOnlyCell(ws, value=value)
+        if style:
+            cell.style = style
+        return cell
+
+    def append(self, ws, values, style=None):
+        """Agrega una fila aplicando el mismo estilo a todas sus celdas"""
+        if style is None:
+            ws.append(values)
+        else:
+            ws.append([self.cell(ws, value, style) for value in values])
+
+    @classmethod
+    def estimate_widths(cls, headers, sample_rows):
+        """
+        Estima el ancho de cada columna desde los encabezados y una muestra.
+
+        Args:
+            headers: Lista de encabezados
+            sample_rows: Lista de filas de muestra
+
+        Returns:
+            list: Ancho por columna
+        """
+        widths = [len(str(header)) for header in headers]
+        for row in sample_rows:
+            for index, value in enumerate(row[:len(widths)]):
+                length = len(str(value)) if value is not None else 0
+                if length > widths[index]:
+                    widths[index] = length
+        return [max(cls.MIN_WIDTH, min(width + 2, cls.MAX_WIDTH)) for width in widths]
+
+    def write_table(self, ws, headers, rows, preamble=None, striped=True,
+                    header_style='encabezado', freeze_header=True):
+        """
+        Escribe una tabla completa en una hoja nueva.
+
+        Los anchos de columna y la inmovilización de encabezados se fijan
+        antes de escribir la primera fila, como exige el modo write_only;
+        los anchos se estiman con una muestra de los datos.
+
+        Args:
+            ws: Hoja vacía de destino
+            headers: Lista de encabezados
+            rows: Iterable de filas (tuplas o listas)
+            preamble: Lista de (texto, estilo) escritos antes de la tabla
+                como filas combinadas sobre todo el ancho
+            striped: Si se alternan colores en las filas de datos
+            header_style: Estilo de la fila de encabezados
+            freeze_header: Si se inmovilizan los encabezados
+
+        Returns:
+            int: Número de filas de datos escritas
+        """
+        rows = iter(rows)
+        sample = list(islice(rows, self.SAMPLE_SIZE))
+
+        for index, width in enumerate(self.estimate_widths(headers, sample), start=1):
+            ws.column_dimensions[get_column_letter(index)].width = width
+
+        preamble = preamble or []
+        if freeze_header:
+            # La vista de la hoja se escribe junto con la primera fila
+            ws.freeze_panes = f'A{len(preamble) + 2}'
+
+        last_column = get_column_letter(max(len(headers), 1))
+        for current_row, (text, style) in enumerate(preamble, start=1):
+            if text is None:
+                ws.append([])
+                continue
+            ws.append([self.cell(ws, text, style)])
+            ws.merged_cells.add(f'A{current_row}:{last_column}{current_row}')
+
+        self.append(ws, headers, header_style)
+
+        total = 0
+        for row in chain(sample, rows):
+            total += 1
+            if striped and total % 2 == 0:
+                ws.append([self.cell(ws, value, 'alterno') for value in row])
+            else:
+                ws.append(row)
+
+        return total
+
+    def save(self, destination):
+        """
+        Guarda el libro.
+
+        Args:
+            destination: Ruta o archivo (por ejemplo un HttpResponse)
+        """
+        self.workbook.save(destination)
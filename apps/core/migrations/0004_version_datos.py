@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_add_security_code_attempt_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(help_text="Etiqueta 'app.modelo' en minúsculas", max_length=100, unique=True, verbose_name='Modelo')),
+                ('version', models.BigIntegerField(help_text='Se incrementa con cada modificación del modelo', verbose_name='Versión')),
+                ('modificado', models.DateTimeField(blank=True, null=True, verbose_name='Última modificación')),
+            ],
+            options={
+                'verbose_name': 'Versión de Datos',
+                'verbose_name_plural': 'Versiones de Datos',
+            },
+        ),
+    ]
@@ -1605,5 +1605,35 @@ class RecycleBinConfig(models.Model):
         }
 
 
+class VersionDatos(models.Model):
+    """
+    Versión de datos de un modelo, compartida por todos los procesos.
+    La actualizan las señales de los modelos al confirmarse la transacción
+    del cambio, de modo que web y workers de Celery ven la misma versión.
+    """
+    modelo = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Modelo',
+        help_text="Etiqueta 'app.modelo' en minúsculas"
+    )
+    version = models.BigIntegerField(
+        verbose_name='Versión',
+        help_text='Se incrementa con cada modificación del modelo'
+    )
+    modificado = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Última modificación'
+    )
+
+    class Meta:
+        verbose_name = 'Versión de Datos'
+        verbose_name_plural = 'Versiones de Datos'
+
+    def __str__(self):
+        return f"{self.modelo} v{self.version}"
+
+
 # Alias para compatibilidad con tests
 SecurityAttempt = SecurityCodeAttempt
@@ -0,0 +1,19 @@
+"""
+Utilidades para el trabajo en paralelo con pools de procesos.
+"""
+import multiprocessing
+
+
+def can_spawn_processes():
+    """
+    Indica si el proceso actual puede crear procesos hijos.
+
+    Los workers prefork de Celery (billiard) son procesos daemon y no
+    pueden tener hijos: un ProcessPoolExecutor creado dentro de una tarea
+    falla con "daemonic processes are not allowed to have children", por
+    lo que en ellos el trabajo debe hacerse en serie.
+
+    Returns:
+        bool: False si el proceso actual es daemon
+    """
+    return not multiprocessing.current_process().daemon
@@ -183,9 +183,15 @@ def limpiar_archivos_temporales():
             except OSError:
                 continue
         
-        logger.info(f"Se eliminaron {archivos_eliminados} archivos temporales")
+        # Gráficos en caché sin uso en la última semana
+        from apps.core.chart_utils import ChartCache
+        graficos_eliminados = ChartCache().purge(timedelta(days=7))
         
-        return {'archivos_eliminados': archivos_eliminados}
+        logger.info(
+            f"Se eliminaron {archivos_eliminados} archivos temporales y {graficos_eliminados} gráficos en caché"
+        )
+        
+        return {'archivos_eliminados': archivos_eliminados, 'graficos_eliminados': graficos_eliminados}
         
     except Exception as e:
         logger.error(f"Error limpiando archivos temporales: {str(e)}")
@@ -0,0 +1,87 @@
+"""
+Utilidades para generar archivos ZIP de gran tamaño.
+Los archivos se copian por bloques: ni las entradas ni el ZIP completo
+se mantienen en memoria.
+"""
+import os
+import zipfile
+
+
+class ZipStreamWriter:
+    """
+    Escritor de archivos ZIP por bloques.
+    Puede escribir a una ruta o archivo, o producir el ZIP como un
+    iterador de bytes para un StreamingHttpResponse.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, compression=zipfile.ZIP_DEFLATED):
+        self.compression = compression
+
+    def write_to(self, destination, entries):
+        """
+        Escribe el ZIP en una ruta o archivo.
+
+        Args:
+            destination: Ruta o archivo binario de destino
+            entries: Iterable de (ruta_origen, nombre_en_zip)
+
+        Returns:
+            int: Número de entradas escritas
+        """
+        with zipfile.ZipFile(destination, 'w', self.compression) as zip_file:
+            return sum(1 for _ in self._write_entries(zip_file, entries))
+
+    def iter_bytes(self, entries):
+        """
+        Genera el ZIP como bloques de bytes.
+
+        Args:
+            entries: Iterable de (ruta_origen, nombre_en_zip)
+
+        Yields:
+            bytes: Bloques del archivo ZIP
+        """
+        buffer = _ZipBuffer()
+        with zipfile.ZipFile(buffer, 'w', self.compression) as zip_file:
+            for _ in self._write_entries(zip_file, entries, chunked=True):
+                data = buffer.drain()
+                if data:
+                    yield data
+        # El directorio central se escribe al cerrar el archivo
+        yield buffer.drain()
+
+    def _write_entries(self, zip_file, entries, chunked=False):
+        """Copia cada entrada por bloques; produce un valor por bloque o entrada"""
+        for source_path, arcname in entries:
+            force_zip64 = os.path.getsize(source_path) >= zipfile.ZIP64_LIMIT
+            with open(source_path, 'rb') as source, \
+                    zip_file.open(arcname, 'w', force_zip64=force_zip64) as target:
+                while True:
+                    chunk = source.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    if chunked:
+                        yield arcname
+            yield arcname
+
+
+class _ZipBuffer:
+    """Destino de escritura no posicionable que acumula bytes hasta vaciarse"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
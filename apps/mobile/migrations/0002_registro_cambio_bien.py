@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-18 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mobile', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroCambioBien',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('bien_id', models.BigIntegerField()),
+                ('operacion', models.CharField(choices=[('ACTUALIZADO', 'Creado o actualizado'), ('ELIMINADO', 'Eliminado')], max_length=20)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['fecha'], name='mobile_regi_fecha_4cbb78_idx')],
+            },
+        ),
+    ]
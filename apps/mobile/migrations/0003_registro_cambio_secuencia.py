@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:23
+
+from django.db import migrations, models
+from django.db.models import F, Max, Min
+
+
+def numerar_registros_existentes(apps, schema_editor):
+    """Los cursores entregados hasta ahora eran IDs: la secuencia inicial es el ID"""
+    RegistroCambioBien = apps.get_model('mobile', 'RegistroCambioBien')
+    SecuenciaCambiosBien = apps.get_model('mobile', 'SecuenciaCambiosBien')
+    
+    RegistroCambioBien.objects.update(secuencia=F('id'))
+    rango = RegistroCambioBien.objects.aggregate(primera=Min('id'), ultima=Max('id'))
+    SecuenciaCambiosBien.objects.create(
+        pk=1,
+        ultima=rango['ultima'] or 0,
+        # Lo anterior al primer registro conservado ya fue purgado
+        purgado_hasta=rango['primera'] - 1 if rango['primera'] else 0
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mobile', '0002_registro_cambio_bien'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCambiosBien',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima', models.BigIntegerField(default=0)),
+                ('purgado_hasta', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='registrocambiobien',
+            name='secuencia',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(numerar_registros_existentes, migrations.RunPython.noop),
+    ]
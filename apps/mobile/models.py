@@ -1,7 +1,7 @@
 """
 Modelos para la funcionalidad móvil
 """
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from apps.bienes.models import BienPatrimonial
 import json
@@ -141,4 +141,135 @@ class ConflictoSync(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Conflicto {self.tipo_conflicto} - {self.cambio_offline.bien_codigo_patrimonial}"
\ No newline at end of file
+        return f"Conflicto {self.tipo_conflicto} - {self.cambio_offline.bien_codigo_patrimonial}"
+
+
+class SecuenciaCambiosBien(models.Model):
+    """
+    Contador del feed de cambios de bienes (fila única).
+    Bloquear esta fila serializa la numeración y la purga del feed.
+    """
+    ultima = models.BigIntegerField(default=0)
+    # Secuencia más alta eliminada por la purga
+    purgado_hasta = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Secuencia {self.ultima} (purgado hasta {self.purgado_hasta})"
+    
+    @classmethod
+    def obtener(cls):
+        """Fila del contador"""
+        contador, _ = cls.objects.get_or_create(pk=1)
+        return contador
+    
+    @classmethod
+    def bloquear(cls):
+        """Fila del contador bloqueada hasta el fin de la transacción en curso"""
+        cls.obtener()
+        return cls.objects.select_for_update().get(pk=1)
+
+
+class RegistroCambioBien(models.Model):
+    """
+    Registro de cambios de bienes para la sincronización incremental.
+    
+    El cursor del feed es la secuencia, no el ID: el ID se asigna al
+    insertar y una transacción lenta puede confirmar un ID menor a uno ya
+    entregado. La secuencia se asigna después, solo a registros ya
+    confirmados y con el contador bloqueado, por lo que sigue el orden de
+    confirmación y nunca aparece un valor menor al último entregado.
+    """
+    OPERACIONES = [
+        ('ACTUALIZADO', 'Creado o actualizado'),
+        ('ELIMINADO', 'Eliminado'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    # Sin clave foránea para conservar el registro tras un borrado físico
+    bien_id = models.BigIntegerField()
+    operacion = models.CharField(max_length=20, choices=OPERACIONES)
+    fecha = models.DateTimeField(auto_now_add=True)
+    secuencia = models.BigIntegerField(null=True, blank=True, unique=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.id} - Bien {self.bien_id} - {self.operacion}"
+    
+    @classmethod
+    def registrar(cls, bien_ids, operacion='ACTUALIZADO'):
+        """
+        Registra el cambio de uno o varios bienes
+        
+        Args:
+            bien_ids: ID o iterable de IDs de bienes
+            operacion: ACTUALIZADO o ELIMINADO
+        """
+        if isinstance(bien_ids, int):
+            bien_ids = [bien_ids]
+        cls.objects.bulk_create([
+            cls(bien_id=bien_id, operacion=operacion) for bien_id in bien_ids
+        ])
+    
+    @classmethod
+    def asignar_secuencias(cls):
+        """
+        Numera los registros confirmados que aún no tienen secuencia
+        
+        Returns:
+            int: Registros numerados
+        """
+        if not cls.objects.filter(secuencia__isnull=True).exists():
+            return 0
+        
+        with transaction.atomic():
+            contador = SecuenciaCambiosBien.bloquear()
+            pendientes = list(cls.objects.filter(secuencia__isnull=True).order_by('id').only('id'))
+            for registro in pendientes:
+                contador.ultima += 1
+                registro.secuencia = contador.ultima
+            cls.objects.bulk_update(pendientes, ['secuencia'], batch_size=500)
+            contador.save(update_fields=['ultima'])
+        return len(pendientes)
+    
+    @classmethod
+    def cursor_actual(cls):
+        """Último cursor disponible (0 si no hay cambios registrados)"""
+        cls.asignar_secuencias()
+        return SecuenciaCambiosBien.obtener().ultima
+    
+    @classmethod
+    def purgar_antiguos(cls, dias=90):
+        """
+        Elimina registros antiguos
+        
+        Se elimina un prefijo continuo de la secuencia y se guarda su
+        último valor, para que el feed distinga un cursor purgado de un
+        simple hueco en la numeración.
+        
+        Args:
+            dias: Antigüedad máxima en días
+            
+        Returns:
+            int: Cantidad de registros eliminados
+        """
+        from django.utils import timezone
+        from datetime import timedelta
+        
+        cls.asignar_secuencias()
+        limite = timezone.now() - timedelta(days=dias)
+        with transaction.atomic():
+            contador = SecuenciaCambiosBien.bloquear()
+            hasta = cls.objects.filter(
+                fecha__lt=limite, secuencia__isnull=False
+            ).aggregate(hasta=models.Max('secuencia'))['hasta']
+            if hasta is None:
+                return 0
+            eliminados, _ = cls.objects.filter(secuencia__lte=hasta).delete()
+            contador.purgado_hasta = max(contador.purgado_hasta, hasta)
+            contador.save(update_fields=['purgado_hasta'])
+        return eliminados
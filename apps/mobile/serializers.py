@@ -49,6 +49,119 @@ class BienPatrimonialListSerializer(serializers.ModelSerializer):
         ]
 
 
+class BienPatrimonialListValuesSerializer:
+    """
+    Serialización rápida de listas de bienes a partir de values().
+    Produce la misma salida que BienPatrimonialListSerializer sin
+    instanciar modelos ni recorrer los campos de DRF fila por fila.
+    """
+    
+    # Campo de salida -> columna consultada
+    CAMPOS = {
+        'id': 'id',
+        'codigo_patrimonial': 'codigo_patrimonial',
+        'codigo_interno': 'codigo_interno',
+        'catalogo_denominacion': 'catalogo__denominacion',
+        'oficina_nombre': 'oficina__nombre',
+        'estado_bien': 'estado_bien',
+        'estado_display': 'estado_bien',
+        'marca': 'marca',
+        'modelo': 'modelo',
+        'color': 'color',
+        'serie': 'serie',
+        'placa': 'placa',
+        'matricula': 'matricula',
+        'qr_code': 'qr_code',
+        'url_qr': 'url_qr',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    CAMPOS_FECHA = {'created_at', 'updated_at'}
+    
+    # Tabla de búsqueda para el texto del estado
+    ESTADOS_DISPLAY = dict(BienPatrimonial.ESTADOS_BIEN)
+    
+    def __init__(self, campos=None):
+        """
+        Args:
+            campos: Lista o cadena separada por comas con los campos
+                solicitados (parámetro ?fields=). Por defecto todos.
+        """
+        self.campos = self.campos_validos(campos)
+        self._campo_fecha = serializers.DateTimeField()
+    
+    @classmethod
+    def campos_validos(cls, campos):
+        """
+        Normaliza el conjunto de campos solicitados
+        
+        Args:
+            campos: Lista o cadena separada por comas
+            
+        Returns:
+            Lista de campos en el orden de BienPatrimonialListSerializer
+        """
+        if isinstance(campos, str):
+            campos = campos.split(',')
+        solicitados = {campo.strip() for campo in campos or [] if campo.strip()}
+        
+        seleccion = [campo for campo in cls.CAMPOS if campo in solicitados]
+        return seleccion or list(cls.CAMPOS)
+    
+    def columnas(self):
+        """Columnas que deben consultarse con values()"""
+        return list(dict.fromkeys(self.CAMPOS[campo] for campo in self.campos))
+    
+    def preparar_queryset(self, queryset):
+        """Limita el queryset a las columnas necesarias"""
+        return queryset.values(*self.columnas())
+    
+    def serializar(self, filas):
+        """
+        Construye los diccionarios de respuesta
+        
+        Args:
+            filas: Iterable de dicts obtenidos con preparar_queryset()
+            
+        Returns:
+            Lista de dicts listos para la respuesta
+        """
+        campos = [(campo, self.CAMPOS[campo]) for campo in self.campos]
+        estados = self.ESTADOS_DISPLAY
+        fecha = self._campo_fecha.to_representation
+        
+        resultado = []
+        for fila in filas:
+            item = {}
+            for campo, columna in campos:
+                valor = fila[columna]
+                if campo == 'estado_display':
+                    valor = estados.get(valor, valor)
+                elif campo in self.CAMPOS_FECHA and valor is not None:
+                    valor = fecha(valor)
+                item[campo] = valor
+            resultado.append(item)
+        
+        return resultado
+
+
+class BienPatrimonialSyncValuesSerializer(BienPatrimonialListValuesSerializer):
+    """
+    Serialización compacta de bienes para el feed de sincronización.
+    Agrega las claves foráneas y los campos que el dispositivo guarda localmente.
+    """
+    
+    CAMPOS = {
+        **BienPatrimonialListValuesSerializer.CAMPOS,
+        'catalogo_id': 'catalogo_id',
+        'oficina_id': 'oficina_id',
+        'dimension': 'dimension',
+        'nro_motor': 'nro_motor',
+        'nro_chasis': 'nro_chasis',
+        'observaciones': 'observaciones',
+    }
+
+
 class BienPatrimonialDetailSerializer(serializers.ModelSerializer):
     """Serializer detallado para bienes patrimoniales"""
     catalogo = CatalogoSerializer(read_only=True)
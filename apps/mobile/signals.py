@@ -0,0 +1,23 @@
+"""
+Señales de la app móvil
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.bienes.models import BienPatrimonial
+from .models import RegistroCambioBien
+
+
+@receiver(post_save, sender=BienPatrimonial)
+def registrar_cambio_bien(sender, instance, raw=False, **kwargs):
+    """Registra el cambio en el feed de sincronización"""
+    if raw:
+        return
+    operacion = 'ELIMINADO' if instance.deleted_at else 'ACTUALIZADO'
+    RegistroCambioBien.registrar(instance.pk, operacion)
+
+
+@receiver(post_delete, sender=BienPatrimonial)
+def registrar_eliminacion_bien(sender, instance, **kwargs):
+    """Registra el borrado físico como lápida en el feed de sincronización"""
+    RegistroCambioBien.registrar(instance.pk, 'ELIMINADO')
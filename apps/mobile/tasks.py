@@ -7,7 +7,7 @@ from django.db import transaction
 from django.contrib.auth.models import User
 import logging
 
-from .models import CambioOffline, SesionSync, ConflictoSync
+from .models import CambioOffline, SesionSync, ConflictoSync, RegistroCambioBien
 from apps.bienes.models import BienPatrimonial, HistorialEstado
 from apps.catalogo.models import Catalogo
 from apps.oficinas.models import Oficina
@@ -319,4 +319,15 @@ def crear_conflicto(cambio, tipo_conflicto, datos_servidor):
     cambio.estado_sync = 'CONFLICTO'
     cambio.save()
     
-    return {'estado': 'CONFLICTO', 'tipo': tipo_conflicto}
\ No newline at end of file
+    return {'estado': 'CONFLICTO', 'tipo': tipo_conflicto}
+
+
+@shared_task
+def purgar_registro_cambios(dias=90):
+    """
+    Elimina entradas antiguas del feed de cambios de bienes.
+    Los dispositivos con un cursor anterior deberán resincronizar completo.
+    """
+    eliminados = RegistroCambioBien.purgar_antiguos(dias)
+    logger.info(f"Registro de cambios de bienes: {eliminados} entradas purgadas")
+    return eliminados
@@ -34,6 +34,7 @@ urlpatterns = [
     path('sync/resolver-conflicto/', views.resolver_conflicto, name='resolver_conflicto'),
     path('sync/cambios-pendientes/', views.cambios_pendientes, name='cambios_pendientes'),
     path('sync/reintentar/', views.reintentar_sincronizacion, name='reintentar_sincronizacion'),
+    path('sync/bienes/', views.feed_cambios_bienes, name='feed_cambios_bienes'),
     
     # Incluir URLs del router
     path('', include(router.urls)),
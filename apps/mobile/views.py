@@ -9,15 +9,24 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.views.decorators.gzip import gzip_page
 from django_filters.rest_framework import DjangoFilterBackend
+from datetime import timedelta
+import hashlib
 
 from apps.bienes.models import BienPatrimonial, HistorialEstado
+from apps.core.cache_utils import DataVersionCache
 from apps.catalogo.models import Catalogo
 from apps.oficinas.models import Oficina
 from .serializers import (
-    BienPatrimonialListSerializer, BienPatrimonialDetailSerializer,
+    BienPatrimonialListSerializer, BienPatrimonialListValuesSerializer,
+    BienPatrimonialSyncValuesSerializer, BienPatrimonialDetailSerializer,
     CatalogoSerializer, OficinaSerializer, HistorialEstadoSerializer,
     ActualizarEstadoSerializer
 )
@@ -175,6 +184,21 @@ class BienPatrimonialViewSet(viewsets.ModelViewSet):
             return BienPatrimonialListSerializer
         return BienPatrimonialDetailSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Lista de bienes serializada directamente desde values()
+        
+        Acepta ?fields=campo1,campo2 para devolver solo algunos campos.
+        """
+        serializador = BienPatrimonialListValuesSerializer(request.query_params.get('fields'))
+        queryset = serializador.preparar_queryset(self.filter_queryset(self.get_queryset()))
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializador.serializar(page))
+        
+        return Response(serializador.serializar(queryset))
+
     def perform_create(self, serializer):
         """Asignar el usuario actual como creador"""
         serializer.save(created_by=self.request.user)
@@ -307,7 +331,78 @@ class BienPatrimonialViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_201_CREATED)
 
 
-class CatalogoViewSet(viewsets.ReadOnlyModelViewSet):
+class DatosReferenciaMixin:
+    """
+    GET condicional y modo delta para datos de referencia (catálogo, oficinas)
+    
+    - ETag y Last-Modified derivados de la versión de datos de la tabla,
+      con respuesta 304 cuando el cliente ya tiene la versión actual.
+    - ?since=<cursor> devuelve solo los registros creados, modificados o
+      dados de baja después del cursor, junto con un nuevo cursor.
+    """
+    
+    # Margen para no perder cambios guardados mientras se arma la respuesta;
+    # los clientes aplican los registros repetidos de forma idempotente
+    MARGEN_CURSOR = timedelta(seconds=5)
+    
+    def list(self, request, *args, **kwargs):
+        modelo = self.get_queryset().model
+        version = DataVersionCache.get_version(modelo)
+        etag = '"%s"' % hashlib.md5(
+            f"{version}:{request.get_full_path()}".encode()
+        ).hexdigest()
+        ultima_modificacion = DataVersionCache.get_last_modified(modelo)
+        timestamp = int(ultima_modificacion.timestamp()) if ultima_modificacion else None
+        
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            if 'since' in request.query_params:
+                response = self.list_delta(request)
+            else:
+                response = super().list(request, *args, **kwargs)
+        
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+        
+        return response
+    
+    def list_delta(self, request):
+        """
+        Registros modificados desde el cursor indicado en ?since=
+        """
+        desde = parse_datetime(request.query_params.get('since', ''))
+        if desde is None:
+            return Response({
+                'error': 'Cursor inválido, se espera una fecha ISO 8601'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(desde):
+            desde = timezone.make_aware(desde)
+        
+        cursor = timezone.now() - self.MARGEN_CURSOR
+        base = self.get_queryset()
+        modelo = base.model
+        
+        actualizados = self.filter_queryset(base).filter(Q(created_at__gt=desde) | Q(updated_at__gt=desde))
+        
+        # Registros que dejaron de pertenecer al conjunto: eliminados
+        # lógicamente o excluidos por el filtro base (p.ej. desactivados).
+        # Se comparan con el conjunto sin los filtros de la consulta
+        # (search, ordering...) para que el cliente no borre datos válidos
+        eliminados = modelo.all_objects.filter(
+            Q(updated_at__gt=desde) | Q(deleted_at__gt=desde)
+        ).exclude(pk__in=base.values('pk')).values_list('pk', flat=True)
+        
+        return Response({
+            'cursor': cursor.isoformat(),
+            'actualizados': self.get_serializer(actualizados, many=True).data,
+            'eliminados': list(eliminados),
+        })
+
+
+class CatalogoViewSet(DatosReferenciaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet de solo lectura para el catálogo
     """
@@ -322,7 +417,7 @@ class CatalogoViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['denominacion']
 
 
-class OficinaViewSet(viewsets.ReadOnlyModelViewSet):
+class OficinaViewSet(DatosReferenciaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet de solo lectura para oficinas
     """
@@ -464,7 +559,7 @@ def dashboard_mobile(request):
 
 
 # Vistas para sincronización offline
-from .models import CambioOffline, SesionSync, ConflictoSync
+from .models import CambioOffline, SesionSync, ConflictoSync, RegistroCambioBien, SecuenciaCambiosBien
 from .serializers import (
     CambioOfflineSerializer, SincronizarCambiosSerializer,
     ConflictoSyncSerializer, ResolverConflictoSerializer, SesionSyncSerializer
@@ -658,4 +753,84 @@ def reintentar_sincronizacion(request):
         'sesion_id': sesion.id,
         'cambios_reintentados': cambios_error.count(),
         'mensaje': 'Reintento de sincronización iniciado'
-    }, status=status.HTTP_202_ACCEPTED)
\ No newline at end of file
+    }, status=status.HTTP_202_ACCEPTED)
+
+# Feed de cambios de bienes
+TAMAÑO_LOTE_FEED = 500
+TAMAÑO_LOTE_FEED_MAXIMO = 2000
+
+
+@gzip_page
+@api_view(['GET'])
+def feed_cambios_bienes(request):
+    """
+    Feed incremental de bienes para dispositivos offline
+    
+    Parámetros:
+        cursor: último cursor recibido. Sin cursor se devuelve el cursor
+            actual con reinicio=true (el dispositivo descarga el listado
+            completo y luego continúa desde ese cursor).
+        limite: cantidad máxima de cambios por lote.
+    
+    La respuesta se comprime con gzip si el cliente envía Accept-Encoding.
+    """
+    cursor_param = request.query_params.get('cursor')
+    if cursor_param is None:
+        return Response({
+            'cursor': RegistroCambioBien.cursor_actual(),
+            'reinicio': True,
+            'hay_mas': False,
+            'actualizados': [],
+            'eliminados': [],
+        })
+    
+    try:
+        cursor = int(cursor_param)
+        limite = int(request.query_params.get('limite', TAMAÑO_LOTE_FEED))
+    except ValueError:
+        return Response({
+            'error': 'cursor y limite deben ser números enteros'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limite = max(1, min(limite, TAMAÑO_LOTE_FEED_MAXIMO))
+    
+    # Numerar los cambios confirmados desde la última consulta
+    RegistroCambioBien.asignar_secuencias()
+    
+    # Si el registro ya fue purgado más allá del cursor, hay que reiniciar
+    if cursor < SecuenciaCambiosBien.obtener().purgado_hasta:
+        return Response({
+            'cursor': RegistroCambioBien.cursor_actual(),
+            'reinicio': True,
+            'hay_mas': False,
+            'actualizados': [],
+            'eliminados': [],
+        })
+    
+    registros = list(
+        RegistroCambioBien.objects.filter(
+            secuencia__gt=cursor
+        ).order_by('secuencia').values_list('secuencia', 'bien_id', 'operacion')[:limite]
+    )
+    
+    # La última operación de cada bien dentro del lote es la que cuenta
+    ultima_operacion = {}
+    for _, bien_id, operacion in registros:
+        ultima_operacion[bien_id] = operacion
+    
+    ids_actualizados = [bien_id for bien_id, op in ultima_operacion.items() if op == 'ACTUALIZADO']
+    serializador = BienPatrimonialSyncValuesSerializer()
+    actualizados = serializador.serializar(serializador.preparar_queryset(
+        BienPatrimonial.objects.filter(id__in=ids_actualizados).order_by('id')
+    ))
+    
+    # Bienes eliminados, o actualizados que ya no existen o están dados de baja
+    encontrados = {fila['id'] for fila in actualizados}
+    eliminados = sorted(bien_id for bien_id in ultima_operacion if bien_id not in encontrados)
+    
+    return Response({
+        'cursor': registros[-1][0] if registros else cursor,
+        'reinicio': False,
+        'hay_mas': len(registros) == limite,
+        'actualizados': actualizados,
+        'eliminados': eliminados,
+    })
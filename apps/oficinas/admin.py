@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
+from apps.core.cache_utils import DataVersionCache
 from .models import Oficina
 
 
@@ -108,7 +110,9 @@ class OficinaAdmin(admin.ModelAdmin):
     
     def activar_oficinas(self, request, queryset):
         """Acción para activar oficinas seleccionadas"""
-        updated = queryset.update(estado=True)
+        updated = queryset.update(estado=True, updated_at=timezone.now())
+        # update() no dispara señales
+        DataVersionCache.bump_version(Oficina)
         self.message_user(
             request,
             f'{updated} oficinas fueron activadas exitosamente.'
@@ -131,7 +135,9 @@ class OficinaAdmin(admin.ModelAdmin):
             )
             return
         
-        updated = queryset.update(estado=False)
+        updated = queryset.update(estado=False, updated_at=timezone.now())
+        # update() no dispara señales
+        DataVersionCache.bump_version(Oficina)
         self.message_user(
             request,
             f'{updated} oficinas fueron desactivadas exitosamente.'
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class OficinasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.oficinas'
\ No newline at end of file
+    name = 'apps.oficinas'
+    
+    def ready(self):
+        import apps.oficinas.signals  # noqa: F401
@@ -0,0 +1,15 @@
+"""
+Señales de la app de oficinas
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.cache_utils import DataVersionCache
+from .models import Oficina
+
+
+@receiver(post_save, sender=Oficina)
+@receiver(post_delete, sender=Oficina)
+def actualizar_version_oficinas(sender, **kwargs):
+    """Invalida las respuestas en caché cuando cambian los datos de referencia"""
+    DataVersionCache.bump_version(Oficina)
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
-from .models import ConfiguracionFiltro, ReporteGenerado
+from .models import ConfiguracionFiltro, ReporteGenerado, ParteReporte, ArtefactoReporte, InstantaneaInventario
 
 
 @admin.register(ConfiguracionFiltro)
@@ -73,10 +73,56 @@ class ConfiguracionFiltroAdmin(admin.ModelAdmin):
         return super().has_delete_permission(request, obj)
 
 
+class ParteReporteInline(admin.TabularInline):
+    """Partes de un reporte particionado"""
+    
+    model = ParteReporte
+    extra = 0
+    can_delete = False
+    fields = ['indice', 'titulo', 'estado', 'total_registros', 'fecha_completado', 'mensaje_error']
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArtefactoReporte)
+class ArtefactoReporteAdmin(admin.ModelAdmin):
+    """Archivos de reportes compartidos por contenido"""
+    
+    list_display = ['clave', 'archivo', 'referencias', 'total_registros', 'fecha_creacion', 'fecha_expiracion']
+    search_fields = ['clave', 'archivo']
+    readonly_fields = [
+        'clave', 'archivo', 'hash_archivo', 'total_registros', 'referencias',
+        'fecha_creacion', 'fecha_expiracion'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(InstantaneaInventario)
+class InstantaneaInventarioAdmin(admin.ModelAdmin):
+    """Instantáneas diarias del inventario"""
+    
+    list_display = ['fecha', 'oficina', 'estado_bien', 'grupo', 'total_bienes', 'valor_total']
+    list_filter = ['fecha', 'estado_bien']
+    date_hierarchy = 'fecha'
+    list_select_related = ['oficina']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ReporteGenerado)
 class ReporteGeneradoAdmin(admin.ModelAdmin):
     """Administración de reportes generados"""
     
+    inlines = [ParteReporteInline]
+    
     list_display = [
         'nombre', 'tipo_reporte', 'formato', 'usuario', 'estado',
         'total_registros', 'fecha_inicio', 'tiempo_procesamiento_display',
@@ -88,7 +134,7 @@ class ReporteGeneradoAdmin(admin.ModelAdmin):
     search_fields = ['nombre', 'usuario__username']
     readonly_fields = [
         'fecha_inicio', 'fecha_completado', 'tiempo_procesamiento',
-        'total_registros', 'created_at', 'updated_at'
+        'total_registros', 'artefacto', 'clave_contenido', 'created_at', 'updated_at'
     ]
     
     fieldsets = (
@@ -101,7 +147,7 @@ class ReporteGeneradoAdmin(admin.ModelAdmin):
         }),
         ('Estado y Resultados', {
             'fields': (
-                'estado', 'total_registros', 'archivo_generado',
+                'estado', 'total_registros', 'archivo_generado', 'artefacto',
                 'mensaje_error', 'fecha_expiracion'
             )
         }),
@@ -185,12 +231,11 @@ class ReporteGeneradoAdmin(admin.ModelAdmin):
         cantidad = 0
         for reporte in queryset:
             if reporte.estado == 'COMPLETADO':
-                # Eliminar archivo físico
-                if reporte.archivo_generado:
-                    try:
-                        reporte.archivo_generado.delete()
-                    except Exception:
-                        pass
+                # Liberar archivo (si es compartido solo se descuenta la referencia)
+                try:
+                    reporte.liberar_archivo()
+                except Exception:
+                    pass
                 
                 # Marcar como expirado
                 reporte.estado = 'EXPIRADO'
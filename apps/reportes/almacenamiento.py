@@ -0,0 +1,277 @@
+"""
+Almacenamiento de los archivos de reportes generados.
+
+Los archivos se guardan por contenido: el nombre es el SHA-256 del
+contenido y se reparten en subdirectorios según los primeros caracteres
+del hash, de modo que ningún directorio crece sin límite y dos reportes
+con el mismo contenido comparten un único archivo. Los formatos de texto
+grandes se guardan comprimidos con gzip y se descomprimen al
+descargarlos.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+class AlmacenReportes:
+    """
+    Almacén de archivos de reportes direccionado por contenido.
+    
+    Un archivo se guarda como DIRECTORIO/<ab>/<sha256><extensión>[.gz],
+    donde <ab> son los primeros caracteres del hash. Un archivo solo se
+    elimina cuando ningún reporte ni artefacto lo referencia.
+    """
+    
+    DIRECTORIO = 'reportes/contenido'
+    
+    # Caracteres del hash que forman el subdirectorio (256 subdirectorios)
+    LONGITUD_FRAGMENTO = 2
+    
+    # Formatos de texto que se comprimen; los binarios ya van comprimidos
+    EXTENSIONES_COMPRIMIBLES = {'.csv', '.zpl', '.json', '.txt'}
+    UMBRAL_COMPRESION = 64 * 1024  # 64 KB
+    NIVEL_COMPRESION = 6
+    SUFIJO_COMPRIMIDO = '.gz'
+    
+    BLOQUE = 1024 * 1024  # 1 MB
+    
+    # Los archivos recién guardados aún no tienen reporte que los referencie
+    ANTIGUEDAD_MINIMA_HUERFANO = 3600  # 1 hora
+    PREFIX_CURSOR = 'reportes_almacen_cursor'
+    
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+    
+    @classmethod
+    def nombre_contenido(cls, hash_contenido, extension, comprimido=False):
+        """
+        Nombre del archivo de un contenido
+        
+        Args:
+            hash_contenido: SHA-256 hexadecimal del contenido
+            extension: Extensión original, con punto
+            comprimido: Si el archivo se guarda con gzip
+        
+        Returns:
+            str: Nombre relativo al almacenamiento
+        """
+        sufijo = cls.SUFIJO_COMPRIMIDO if comprimido else ''
+        fragmento = hash_contenido[:cls.LONGITUD_FRAGMENTO]
+        return f"{cls.DIRECTORIO}/{fragmento}/{hash_contenido}{extension}{sufijo}"
+    
+    @classmethod
+    def esta_comprimido(cls, nombre):
+        """Indica si un archivo almacenado está comprimido"""
+        return nombre.endswith(cls.SUFIJO_COMPRIMIDO)
+    
+    @classmethod
+    def extension(cls, nombre):
+        """
+        Extensión del contenido de un archivo almacenado
+        
+        Returns:
+            str: Extensión con punto, sin el sufijo de compresión
+        """
+        if cls.esta_comprimido(nombre):
+            nombre = nombre[:-len(cls.SUFIJO_COMPRIMIDO)]
+        return os.path.splitext(nombre)[1]
+    
+    def guardar(self, ruta_local):
+        """
+        Guarda un archivo local en el almacén
+        
+        Si ya existe un archivo con el mismo contenido no se vuelve a
+        escribir; se renueva su fecha de modificación para que el barrido
+        de huérfanos no lo elimine antes de que el nuevo reporte lo
+        referencie.
+        
+        Args:
+            ruta_local: Ruta del archivo generado
+        
+        Returns:
+            tuple: (nombre almacenado, SHA-256 del contenido sin comprimir)
+        """
+        extension = os.path.splitext(ruta_local)[1].lower()
+        hash_contenido = self._calcular_hash(ruta_local)
+        comprimir = (
+            extension in self.EXTENSIONES_COMPRIMIBLES and
+            os.path.getsize(ruta_local) >= self.UMBRAL_COMPRESION
+        )
+        nombre = self.nombre_contenido(hash_contenido, extension, comprimir)
+        
+        if self.storage.exists(nombre) and self._renovar(nombre):
+            return nombre, hash_contenido
+        
+        return self._escribir(ruta_local, nombre), hash_contenido
+    
+    def confirmar(self, ruta_local, nombre):
+        """
+        Comprueba que el archivo sigue en el almacén una vez guardado el reporte
+        
+        Entre guardar() y el registro que lo referencia, el barrido de
+        huérfanos o un eliminar() concurrente pudieron borrarlo por no
+        estar en uso; en ese caso se vuelve a escribir. Debe llamarse
+        después de guardar el reporte y antes de borrar el archivo local.
+        
+        Args:
+            ruta_local: Ruta del archivo generado
+            nombre: Nombre devuelto por guardar()
+        """
+        if not self.storage.exists(nombre):
+            logger.warning(f"El archivo {nombre} se eliminó antes de registrarse; se vuelve a guardar")
+            self._escribir(ruta_local, nombre)
+    
+    def _renovar(self, nombre):
+        """
+        Actualiza la fecha de modificación de un archivo almacenado
+        
+        Returns:
+            bool: False si el archivo ya no existe
+        """
+        try:
+            os.utime(self.storage.path(nombre))
+        except NotImplementedError:
+            # Almacenamiento remoto: el barrido de huérfanos no lo recorre
+            pass
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def _escribir(self, ruta_local, nombre):
+        """
+        Escribe un archivo local en el almacén con el nombre indicado
+        
+        Returns:
+            str: Nombre almacenado
+        """
+        if self.esta_comprimido(nombre):
+            with tempfile.TemporaryFile() as temporal:
+                # mtime fijo: el mismo contenido produce los mismos bytes
+                with open(ruta_local, 'rb') as origen, gzip.GzipFile(
+                    filename='', mode='wb', fileobj=temporal,
+                    compresslevel=self.NIVEL_COMPRESION, mtime=0
+                ) as destino:
+                    shutil.copyfileobj(origen, destino, self.BLOQUE)
+                temporal.seek(0)
+                return self.storage.save(nombre, File(temporal))
+        
+        with open(ruta_local, 'rb') as origen:
+            return self.storage.save(nombre, File(origen))
+    
+    def _calcular_hash(self, ruta_local):
+        """SHA-256 de un archivo local, leído por bloques"""
+        digest = hashlib.sha256()
+        with open(ruta_local, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(self.BLOQUE), b''):
+                digest.update(bloque)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def en_uso(nombres):
+        """
+        Archivos referenciados por algún reporte o artefacto
+        
+        Args:
+            nombres: Nombres de archivos almacenados
+        
+        Returns:
+            set: Nombres que siguen en uso
+        """
+        from .models import ArtefactoReporte, ReporteGenerado
+        
+        nombres = list(nombres)
+        en_uso = set(
+            ReporteGenerado.all_objects.filter(archivo_generado__in=nombres).values_list('archivo_generado', flat=True)
+        )
+        en_uso.update(ArtefactoReporte.objects.filter(archivo__in=nombres).values_list('archivo', flat=True))
+        return en_uso
+    
+    def eliminar(self, nombres):
+        """
+        Elimina los archivos que ya no utiliza ningún reporte ni artefacto
+        
+        Args:
+            nombres: Nombres de archivos almacenados
+        
+        Returns:
+            int: Archivos eliminados
+        """
+        nombres = {nombre for nombre in nombres if nombre}
+        if not nombres:
+            return 0
+        
+        eliminados = 0
+        for nombre in nombres - self.en_uso(nombres):
+            try:
+                self.storage.delete(nombre)
+                eliminados += 1
+            except OSError as e:
+                logger.warning(f"No se pudo eliminar el archivo {nombre}: {str(e)}")
+        return eliminados
+    
+    def barrer_huerfanos(self, limite):
+        """
+        Elimina los archivos del almacén que ningún reporte utiliza
+        
+        Recorre los subdirectorios con os.scandir y consulta las
+        referencias de cada subdirectorio en un solo lote. El recorrido
+        continúa en la siguiente ejecución desde el último subdirectorio
+        revisado si se agota el tiempo.
+        
+        Args:
+            limite: Valor de time.monotonic() hasta el que puede trabajar
+        
+        Returns:
+            int: Archivos eliminados
+        """
+        try:
+            raiz = self.storage.path(self.DIRECTORIO)
+        except NotImplementedError:
+            # Almacenamiento remoto: solo se eliminan los archivos de los reportes expirados
+            return 0
+        if not os.path.isdir(raiz):
+            return 0
+        
+        with os.scandir(raiz) as entradas:
+            fragmentos = sorted(entrada.name for entrada in entradas if entrada.is_dir())
+        cursor = cache.get(self.PREFIX_CURSOR, '')
+        fragmentos = [f for f in fragmentos if f > cursor] + [f for f in fragmentos if f <= cursor]
+        
+        antiguedad = time.time() - self.ANTIGUEDAD_MINIMA_HUERFANO
+        eliminados = 0
+        for fragmento in fragmentos:
+            if time.monotonic() >= limite:
+                break
+            
+            with os.scandir(os.path.join(raiz, fragmento)) as entradas:
+                candidatos = {
+                    f"{self.DIRECTORIO}/{fragmento}/{entrada.name}": entrada.path
+                    for entrada in entradas
+                    if entrada.is_file() and entrada.stat().st_mtime < antiguedad
+                }
+            
+            if candidatos:
+                en_uso = self.en_uso(candidatos)
+                for nombre, ruta in candidatos.items():
+                    if nombre in en_uso:
+                        continue
+                    try:
+                        os.remove(ruta)
+                        eliminados += 1
+                    except OSError as e:
+                        logger.warning(f"No se pudo eliminar el archivo {nombre}: {str(e)}")
+            
+            cache.set(self.PREFIX_CURSOR, fragmento, None)
+        
+        return eliminados
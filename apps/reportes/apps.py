@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.reportes'
\ No newline at end of file
+    name = 'apps.reportes'
+
+    def ready(self):
+        import apps.reportes.signals  # noqa: F401
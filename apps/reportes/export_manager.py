@@ -2,18 +2,27 @@
 Gestor centralizado de exportaciones en múltiples formatos
 """
 
+import math
 import os
+import shutil
 import tempfile
-from datetime import datetime
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files import File
+from django.db.models import Count
 from django.utils import timezone
 from django.template.loader import render_to_string
 import logging
 
-from .exportadores import ExportadorExcel, ExportadorCSV, ExportadorZPL
-from .generadores import GeneradorReportePDF, GeneradorReporteEstadistico, GeneradorIndicadoresClave
-from .models import ReporteGenerado
+from .exportadores import ExportadorExcel, ExportadorCSV, ExportadorParquet, ExportadorZPL
+from .generadores import (
+    GeneradorReportePDF, GeneradorListadoPDF, GeneradorReporteEstadistico, GeneradorIndicadoresClave
+)
+from .models import ParteReporte, ReporteGenerado
 from .utils import FiltroAvanzado
 
 logger = logging.getLogger(__name__)
@@ -50,6 +59,13 @@ class ExportManager:
             'descripcion': 'Plantilla ZPL para Zebra',
             'icono': 'fas fa-print',
             'color': '#6f42c1'
+        },
+        'PARQUET': {
+            'extension': '.parquet',
+            'content_type': 'application/vnd.apache.parquet',
+            'descripcion': 'Apache Parquet (columnar)',
+            'icono': 'fas fa-database',
+            'color': '#50abf1'
         }
     }
     
@@ -57,9 +73,15 @@ class ExportManager:
         'INVENTARIO': {
             'nombre': 'Inventario General',
             'descripcion': 'Lista completa de bienes con todos los detalles',
-            'formatos_soportados': ['EXCEL', 'PDF', 'CSV'],
+            'formatos_soportados': ['EXCEL', 'PDF', 'CSV', 'PARQUET'],
             'icono': 'fas fa-list'
         },
+        'POR_OFICINA': {
+            'nombre': 'Inventario por Oficina',
+            'descripcion': 'Libro con una hoja por oficina y un resumen de totales',
+            'formatos_soportados': ['EXCEL'],
+            'icono': 'fas fa-building'
+        },
         'ESTADISTICO': {
             'nombre': 'Reporte Estadístico',
             'descripcion': 'Análisis estadístico con gráficos y tendencias',
@@ -86,7 +108,46 @@ class ExportManager:
         }
     }
     
-    def __init__(self):
+    # Registros por segundo que procesa un worker, por formato
+    RENDIMIENTO_FORMATO = {
+        'CSV': 4000,
+        'EXCEL': 1500,
+        'PDF': 150,
+        'ZPL': 2500,
+        'PARQUET': 20000
+    }
+    
+    # Multiplicadores de costo por tipo de reporte
+    MULTIPLICADORES_TIPO = {
+        'INVENTARIO': 1.0,
+        'POR_OFICINA': 1.0,
+        'ESTADISTICO': 2.0,
+        'EJECUTIVO': 1.5,
+        'STICKERS': 0.8,
+        'PERSONALIZADO': 1.2
+    }
+    
+    # Tipos y formatos que pueden generarse en partes paralelas
+    TIPOS_PARTICIONABLES = ['INVENTARIO']
+    FORMATOS_PARTICIONABLES = ['EXCEL', 'CSV']
+    
+    # Segundos que puede tomar un archivo generado en una sola tarea
+    TIEMPO_MAXIMO_DIRECTO = 120
+    # Segundos aceptables para formatos que no admiten partes
+    TIEMPO_MAXIMO_NO_PARTICIONADO = 900
+    # Segundos objetivo para generar cada parte
+    TIEMPO_OBJETIVO_PARTE = 60
+    # Límites del tamaño calculado de cada parte (una hoja Excel admite
+    # 1.048.576 filas)
+    TAMAÑO_MINIMO_PARTE = 1000
+    TAMAÑO_MAXIMO_PARTE = 1000000
+    # Partes que se generan en paralelo
+    WORKERS_EXPORTACION = getattr(settings, 'REPORTES_WORKERS_EXPORTACION', 4)
+    
+    def __init__(self, directorio=None):
+        # Directorio donde se escriben los archivos (temporal del sistema
+        # si no se indica)
+        self.directorio = directorio
         self.temp_files = []
     
     def exportar(self, queryset, tipo_reporte, formato, parametros=None, usuario=None):
@@ -112,6 +173,9 @@ class ExportManager:
         if formato not in self.TIPOS_REPORTE[tipo_reporte]['formatos_soportados']:
             raise ValueError(f"Formato {formato} no soportado para tipo {tipo_reporte}")
         
+        if not self.formato_instalado(formato):
+            raise ValueError(f"El formato {formato} requiere pyarrow, que no está instalado")
+        
         parametros = parametros or {}
         
         try:
@@ -140,6 +204,8 @@ class ExportManager:
         
         if tipo_reporte == 'INVENTARIO':
             return self._generar_inventario(queryset, formato, timestamp, parametros)
+        elif tipo_reporte == 'POR_OFICINA':
+            return self._generar_por_oficina(queryset, formato, timestamp, parametros)
         elif tipo_reporte == 'ESTADISTICO':
             return self._generar_estadistico(queryset, formato, timestamp, parametros)
         elif tipo_reporte == 'EJECUTIVO':
@@ -164,9 +230,14 @@ class ExportManager:
             exportador.exportar_bienes(queryset, archivo_temp)
             
         elif formato == 'PDF':
-            generador = GeneradorReportePDF(queryset, parametros)
+            generador = GeneradorListadoPDF(queryset, parametros)
             archivo_temp = self._crear_archivo_temporal('.pdf', f'inventario_{timestamp}_')
             generador.generar_reporte_completo(archivo_temp)
+            
+        elif formato == 'PARQUET':
+            exportador = ExportadorParquet()
+            archivo_temp = self._crear_archivo_temporal('.parquet', f'inventario_{timestamp}_')
+            exportador.exportar_bienes(queryset, archivo_temp)
         
         return {
             'archivo_path': archivo_temp,
@@ -174,6 +245,18 @@ class ExportManager:
             'content_type': self.FORMATOS_DISPONIBLES[formato]['content_type']
         }
     
+    def _generar_por_oficina(self, queryset, formato, timestamp, parametros):
+        """Genera el libro de inventario con una hoja por oficina"""
+        exportador = ExportadorExcel()
+        archivo_temp = self._crear_archivo_temporal('.xlsx', f'inventario_oficinas_{timestamp}_')
+        exportador.exportar_por_oficina(queryset, archivo_temp)
+        
+        return {
+            'archivo_path': archivo_temp,
+            'nombre_archivo': f'inventario_oficinas_{timestamp}{self.FORMATOS_DISPONIBLES[formato]["extension"]}',
+            'content_type': self.FORMATOS_DISPONIBLES[formato]['content_type']
+        }
+    
     def _generar_estadistico(self, queryset, formato, timestamp, parametros):
         """Genera reporte estadístico"""
         if formato == 'PDF':
@@ -220,6 +303,7 @@ class ExportManager:
             generador_stats = GeneradorReporteEstadistico(queryset, parametros_con_kpis)
             estadisticas = generador_stats.generar_estadisticas()
             estadisticas['kpis'] = kpis
+            estadisticas['kpis_por_oficina'] = generador_kpis.calcular_kpis_por_oficina()
             
             exportador.exportar_estadisticas(estadisticas, archivo_temp)
         
@@ -232,9 +316,17 @@ class ExportManager:
     def _generar_stickers(self, queryset, formato, timestamp, parametros):
         """Genera plantilla de stickers"""
         if formato == 'ZPL':
+            from .zpl_utils import ConfiguracionSticker
+            
+            config_datos = parametros.get('configuracion_stickers')
             exportador = ExportadorZPL()
             archivo_temp = self._crear_archivo_temporal('.zpl', f'stickers_{timestamp}_')
-            exportador.generar_plantilla_stickers(queryset, archivo_temp)
+            exportador.generar_plantilla_stickers(
+                queryset,
+                archivo_temp,
+                ConfiguracionSticker(**config_datos) if config_datos else None,
+                parametros.get('orden_stickers', 'codigo')
+            )
         
         return {
             'archivo_path': archivo_temp,
@@ -260,7 +352,8 @@ class ExportManager:
         archivo_temp = tempfile.NamedTemporaryFile(
             suffix=extension,
             delete=False,
-            prefix=prefix
+            prefix=prefix,
+            dir=self.directorio
         )
         archivo_temp.close()
         self.temp_files.append(archivo_temp.name)
@@ -287,14 +380,26 @@ class ExportManager:
         Returns:
             dict: Formatos disponibles con información
         """
+        formatos = {
+            formato: info for formato, info in self.FORMATOS_DISPONIBLES.items()
+            if self.formato_instalado(formato)
+        }
+        
         if tipo_reporte and tipo_reporte in self.TIPOS_REPORTE:
             formatos_soportados = self.TIPOS_REPORTE[tipo_reporte]['formatos_soportados']
             return {
-                formato: info for formato, info in self.FORMATOS_DISPONIBLES.items()
+                formato: info for formato, info in formatos.items()
                 if formato in formatos_soportados
             }
         
-        return self.FORMATOS_DISPONIBLES.copy()
+        return formatos
+    
+    @staticmethod
+    def formato_instalado(formato):
+        """Indica si están instaladas las librerías que requiere el formato"""
+        if formato == 'PARQUET':
+            return ExportadorParquet.disponible()
+        return True
     
     def validar_exportacion(self, tipo_reporte, formato, queryset=None):
         """
@@ -317,15 +422,93 @@ class ExportManager:
         if formato not in self.TIPOS_REPORTE[tipo_reporte]['formatos_soportados']:
             return False, f"Formato '{formato}' no soportado para tipo '{tipo_reporte}'"
         
-        if queryset is not None and queryset.count() == 0:
-            return False, "No hay datos para exportar"
+        if not self.formato_instalado(formato):
+            return False, f"El formato '{formato}' no está disponible en este servidor"
         
-        if queryset is not None and queryset.count() > 10000:
-            return False, "Demasiados registros para exportar (máximo 10,000)"
+        if queryset is not None:
+            total_registros = queryset.count()
+            if total_registros == 0:
+                return False, "No hay datos para exportar"
+            
+            plan = self.planificar_exportacion(tipo_reporte, formato, total_registros)
+            if plan['modo'] == 'DIRECTO' and plan['tiempo_estimado'] > self.TIEMPO_MAXIMO_NO_PARTICIONADO:
+                minutos = math.ceil(plan['tiempo_estimado'] / 60)
+                return False, (
+                    f"La exportación en formato {formato} tomaría aproximadamente {minutos} minutos; "
+                    "aplique filtros o utilice Excel o CSV"
+                )
         
         return True, "Exportación válida"
     
-    def estimar_tiempo_exportacion(self, tipo_reporte, formato, total_registros):
+    def planificar_exportacion(self, tipo_reporte, formato, total_registros, tamaño_parte=None,
+                               con_graficos=False, columnas=None):
+        """
+        Planifica una exportación según el rendimiento esperado por formato
+        
+        Las exportaciones que tomarían más de TIEMPO_MAXIMO_DIRECTO se
+        dividen en partes que se generan en paralelo.
+        
+        Args:
+            tipo_reporte: Tipo de reporte
+            formato: Formato de exportación
+            total_registros: Número de registros
+            tamaño_parte: Registros por parte (opcional, fuerza el modo
+                particionado si el formato lo admite)
+            con_graficos: Si el reporte incluye gráficos
+            columnas: Columnas por registro (opcional)
+            
+        Returns:
+            dict: modo (DIRECTO o PARTICIONADO), partes, tamaño_parte,
+                tiempo_estimado en segundos y fuente de la estimación
+                (HISTORIAL o CONSTANTES)
+        """
+        multiplicador = self.MULTIPLICADORES_TIPO.get(tipo_reporte, 1.0)
+        modelo = EstimadorExportacion().modelo(formato)
+        
+        if modelo:
+            # Rendimiento aprendido de las ejecuciones anteriores
+            celdas = columnas or EstimadorExportacion.COLUMNAS_PREDETERMINADAS
+            segundos_por_registro = modelo['por_celda'] * celdas * multiplicador
+            tiempo_fijo = modelo['fijo'] + (modelo['graficos'] if con_graficos else 0)
+            fuente = 'HISTORIAL'
+        else:
+            segundos_por_registro = multiplicador / self.RENDIMIENTO_FORMATO.get(formato, 1500)
+            tiempo_fijo = 0
+            fuente = 'CONSTANTES'
+        tiempo_directo = tiempo_fijo + total_registros * segundos_por_registro
+        
+        particionable = (
+            tipo_reporte in self.TIPOS_PARTICIONABLES and
+            formato in self.FORMATOS_PARTICIONABLES
+        )
+        if particionable and (tamaño_parte or tiempo_directo > self.TIEMPO_MAXIMO_DIRECTO):
+            if not tamaño_parte:
+                tamaño_parte = int(self.TIEMPO_OBJETIVO_PARTE / segundos_por_registro)
+                tamaño_parte = max(self.TAMAÑO_MINIMO_PARTE, min(tamaño_parte, self.TAMAÑO_MAXIMO_PARTE))
+            tamaño_parte = min(int(tamaño_parte), self.TAMAÑO_MAXIMO_PARTE)
+            partes = math.ceil(total_registros / tamaño_parte)
+            
+            if partes > 1:
+                # Las partes se generan por rondas de WORKERS_EXPORTACION
+                rondas = math.ceil(partes / self.WORKERS_EXPORTACION)
+                tiempo_parte = tiempo_fijo + min(tamaño_parte, total_registros) * segundos_por_registro
+                return {
+                    'modo': 'PARTICIONADO',
+                    'partes': partes,
+                    'tamaño_parte': tamaño_parte,
+                    'tiempo_estimado': math.ceil(rondas * tiempo_parte),
+                    'fuente': fuente,
+                }
+        
+        return {
+            'modo': 'DIRECTO',
+            'partes': 1,
+            'tamaño_parte': total_registros,
+            'tiempo_estimado': math.ceil(tiempo_directo),
+            'fuente': fuente,
+        }
+    
+    def estimar_tiempo_exportacion(self, tipo_reporte, formato, total_registros, con_graficos=False, columnas=None):
         """
         Estima el tiempo de exportación
         
@@ -333,34 +516,86 @@ class ExportManager:
             tipo_reporte: Tipo de reporte
             formato: Formato de exportación
             total_registros: Número de registros
+            con_graficos: Si el reporte incluye gráficos
+            columnas: Columnas por registro (opcional)
             
         Returns:
             int: Tiempo estimado en segundos
         """
-        # Tiempos base por formato (segundos por 1000 registros)
-        tiempos_base = {
-            'CSV': 2,
-            'EXCEL': 5,
-            'PDF': 10,
-            'ZPL': 3
-        }
+        plan = self.planificar_exportacion(
+            tipo_reporte, formato, total_registros, con_graficos=con_graficos, columnas=columnas
+        )
         
-        # Multiplicadores por tipo de reporte
-        multiplicadores = {
-            'INVENTARIO': 1.0,
-            'ESTADISTICO': 2.0,
-            'EJECUTIVO': 1.5,
-            'STICKERS': 0.8,
-            'PERSONALIZADO': 1.2
-        }
+        # Mínimo 5 segundos
+        return max(5, plan['tiempo_estimado'])
+    
+    def particionar(self, queryset, tamaño_parte, criterio='RANGO'):
+        """
+        Divide un QuerySet en partes disjuntas
+        
+        Args:
+            queryset: QuerySet de bienes
+            tamaño_parte: Máximo de registros por parte
+            criterio: RANGO (rangos consecutivos de ID) u OFICINA (una o
+                más partes por oficina)
+            
+        Returns:
+            list: Definiciones de parte con indice, titulo, filtros y total
+        """
+        definiciones = []
+        
+        if criterio == 'OFICINA':
+            oficinas = queryset.order_by().values(
+                'oficina_id', 'oficina__nombre'
+            ).annotate(total=Count('id')).order_by('oficina__nombre')
+            
+            for oficina in oficinas:
+                rangos = self._rangos_keyset(
+                    queryset.filter(oficina_id=oficina['oficina_id']), tamaño_parte
+                )
+                for numero, (filtros, total) in enumerate(rangos, start=1):
+                    titulo = oficina['oficina__nombre'] or 'Sin oficina'
+                    if len(rangos) > 1:
+                        titulo = f"{titulo} ({numero})"
+                    filtros['oficina_id'] = oficina['oficina_id']
+                    definiciones.append({'titulo': titulo, 'filtros': filtros, 'total': total})
+        else:
+            for numero, (filtros, total) in enumerate(self._rangos_keyset(queryset, tamaño_parte), start=1):
+                definiciones.append({'titulo': f"Parte {numero}", 'filtros': filtros, 'total': total})
+        
+        for indice, definicion in enumerate(definiciones, start=1):
+            definicion['indice'] = indice
+        
+        return definiciones
+    
+    def _rangos_keyset(self, queryset, tamaño_parte):
+        """
+        Calcula rangos consecutivos de ID con tamaño_parte registros cada uno
         
-        tiempo_base = tiempos_base.get(formato, 5)
-        multiplicador = multiplicadores.get(tipo_reporte, 1.0)
+        Cada límite se obtiene con una consulta sobre el índice de la clave
+        primaria, sin leer los registros intermedios.
         
-        tiempo_estimado = (total_registros / 1000) * tiempo_base * multiplicador
+        Returns:
+            list: Tuplas (filtros, total)
+        """
+        ids = queryset.order_by('id').values_list('id', flat=True)
+        rangos = []
+        ultimo_id = None
         
-        # Mínimo 5 segundos, máximo 300 segundos (5 minutos)
-        return max(5, min(300, int(tiempo_estimado)))
+        while True:
+            pendientes = ids if ultimo_id is None else ids.filter(id__gt=ultimo_id)
+            limite = list(pendientes[tamaño_parte - 1:tamaño_parte])
+            
+            filtros = {} if ultimo_id is None else {'id__gt': ultimo_id}
+            if not limite:
+                restantes = pendientes.count()
+                if restantes:
+                    rangos.append((filtros, restantes))
+                return rangos
+            
+            filtros['id__lte'] = limite[0]
+            rangos.append((filtros, tamaño_parte))
+            ultimo_id = limite[0]
     
     def generar_nombre_archivo(self, tipo_reporte, formato, timestamp=None, prefijo=None):
         """
@@ -411,15 +646,124 @@ class ExportManager:
             return {}
 
 
+class EstimadorExportacion:
+    """
+    Rendimiento de exportación aprendido de los reportes generados.
+    
+    Para cada formato ajusta por mínimos cuadrados
+    
+        duración = fijo + por_celda · registros · columnas · multiplicador_tipo
+                   + graficos · incluye_graficos
+    
+    sobre los reportes completados más recientes con métricas. El modelo
+    se guarda en caché unos minutos; sin historial suficiente, o si el
+    ajuste no tiene sentido, no hay modelo y ExportManager usa las
+    constantes de rendimiento.
+    """
+    
+    HISTORIAL = 200
+    DIAS_HISTORIAL = 90
+    MINIMO_MUESTRAS = 8
+    
+    PREFIX_MODELO = 'reportes_estimador_exportacion'
+    TIMEOUT_MODELO = 600  # 10 minutos
+    
+    # Columnas de un registro cuando el reporte no las registró
+    COLUMNAS_PREDETERMINADAS = len(ExportadorExcel.COLUMNAS_BIENES)
+    
+    def modelo(self, formato):
+        """
+        Obtiene el modelo ajustado de un formato
+        
+        Args:
+            formato: Formato de exportación
+        
+        Returns:
+            dict con fijo, por_celda, graficos y muestras, o None si no
+            hay historial suficiente
+        """
+        clave = f"{self.PREFIX_MODELO}:{formato}"
+        modelo = cache.get(clave)
+        if modelo is None:
+            # Se guarda también la ausencia de modelo para no repetir la consulta
+            modelo = self.ajustar(formato) or {}
+            cache.set(clave, modelo, self.TIMEOUT_MODELO)
+        return modelo or None
+    
+    def historial(self, formato):
+        """Métricas de los últimos reportes completados de un formato"""
+        desde = timezone.now() - timedelta(days=self.DIAS_HISTORIAL)
+        return list(
+            ReporteGenerado.objects.filter(
+                formato=formato,
+                estado='COMPLETADO',
+                fecha_completado__gte=desde,
+                duracion_generacion__isnull=False,
+                total_registros__gt=0,
+            ).order_by('-fecha_completado').values_list(
+                'tipo_reporte', 'total_registros', 'total_columnas', 'incluye_graficos', 'duracion_generacion'
+            )[:self.HISTORIAL]
+        )
+    
+    def ajustar(self, formato):
+        """
+        Ajusta el modelo de un formato con su historial
+        
+        Returns:
+            dict con el modelo, o None
+        """
+        import numpy as np
+        
+        muestras = self.historial(formato)
+        if len(muestras) < self.MINIMO_MUESTRAS:
+            return None
+        
+        x = np.array([
+            [
+                1.0,
+                registros * (columnas or self.COLUMNAS_PREDETERMINADAS) *
+                ExportManager.MULTIPLICADORES_TIPO.get(tipo, 1.0),
+                1.0 if graficos else 0.0,
+            ]
+            for tipo, registros, columnas, graficos, _ in muestras
+        ])
+        y = np.array([duracion for *_, duracion in muestras])
+        
+        coeficientes = np.linalg.lstsq(x, y, rcond=None)[0]
+        fijo, por_celda, graficos = (float(valor) for valor in coeficientes)
+        if not math.isfinite(por_celda) or por_celda <= 0:
+            return None
+        
+        return {
+            'fijo': max(0.0, fijo),
+            'por_celda': por_celda,
+            'graficos': max(0.0, graficos),
+            'muestras': len(muestras),
+        }
+
+
 class BatchExportManager:
-    """Gestor para exportaciones masivas"""
+    """
+    Gestor para exportaciones masivas
+    
+    Las exportaciones de un lote pueden ejecutarse en paralelo: como un
+    chord de Celery o, si Celery está en modo eager, en un pool local de
+    procesos. Cada archivo se escribe directamente en el directorio del
+    lote y el ZIP final se arma por bloques desde disco. El lote se
+    registra desde el inicio como un reporte masivo con una parte por
+    exportación, de modo que su avance puede consultarse mientras se
+    genera.
+    """
+    
+    # Procesos del pool local cuando Celery se ejecuta en modo eager
+    PROCESOS_LOCALES = getattr(settings, 'REPORTES_PROCESOS_LOTE', ExportManager.WORKERS_EXPORTACION)
     
     def __init__(self):
         self.export_manager = ExportManager()
     
     def exportar_por_lotes(self, configuraciones_exportacion, usuario=None):
         """
-        Exporta múltiples reportes en lote
+        Exporta múltiples reportes en lote dentro del proceso actual
         
         Args:
             configuraciones_exportacion: Lista de configuraciones
@@ -431,6 +775,7 @@ class BatchExportManager:
         resultados = []
         
         for i, config in enumerate(configuraciones_exportacion):
+            inicio = time.perf_counter()
             try:
                 resultado = self.export_manager.exportar(
                     queryset=config['queryset'],
@@ -443,6 +788,7 @@ class BatchExportManager:
                 resultado['lote_indice'] = i + 1
                 resultado['lote_total'] = len(configuraciones_exportacion)
                 resultado['estado'] = 'EXITOSO'
+                resultado['duracion_segundos'] = round(time.perf_counter() - inicio, 3)
                 
                 resultados.append(resultado)
                 
@@ -454,11 +800,82 @@ class BatchExportManager:
                     'lote_total': len(configuraciones_exportacion),
                     'estado': 'ERROR',
                     'error': str(e),
-                    'configuracion': config
+                    'configuracion': config,
+                    'duracion_segundos': round(time.perf_counter() - inicio, 3)
                 })
         
         return resultados
     
+    def exportar_en_paralelo(self, configuraciones_exportacion, usuario, nombre_lote=None):
+        """
+        Exporta un lote en paralelo y lo entrega como un ZIP
+        
+        Las configuraciones deben ser serializables: en lugar de un
+        QuerySet llevan los parámetros de FiltroAvanzado en 'filtros'.
+        
+        Args:
+            configuraciones_exportacion: Lista de dicts con filtros,
+                tipo_reporte, formato y parametros
+            usuario: Usuario que solicita las exportaciones
+            nombre_lote: Nombre del reporte ZIP (opcional)
+            
+        Returns:
+            dict: lote_id, modo (CELERY o LOCAL), total y el ID del
+                reporte que agrupa el lote
+        """
+        from celery import chord, current_app, group
+        from apps.core.process_utils import can_spawn_processes
+        from .tasks import exportar_item_lote, empaquetar_lote_exportacion
+        
+        lote_id = uuid.uuid4().hex
+        directorio = os.path.join(settings.MEDIA_ROOT, 'reportes', 'lotes', lote_id)
+        os.makedirs(directorio, exist_ok=True)
+        
+        total = len(configuraciones_exportacion)
+        reporte = ReporteGenerado.objects.create(
+            nombre=nombre_lote or f"Exportación Masiva - {total} archivos",
+            tipo_reporte='PERSONALIZADO',
+            formato='ZIP',
+            usuario=usuario,
+            parametros={'masivo': {'lote_id': lote_id, 'total': total}}
+        )
+        ParteReporte.objects.bulk_create([
+            ParteReporte(
+                reporte=reporte,
+                indice=i + 1,
+                titulo=f"{config.get('tipo_reporte')} {config.get('formato')}",
+                filtros=config.get('filtros') or {}
+            )
+            for i, config in enumerate(configuraciones_exportacion)
+        ])
+        
+        if not current_app.conf.task_always_eager:
+            chord(
+                group(
+                    exportar_item_lote.s(config, i + 1, total, directorio, reporte.id)
+                    for i, config in enumerate(configuraciones_exportacion)
+                ),
+                empaquetar_lote_exportacion.s(directorio, reporte.id)
+            ).apply_async()
+            return {'lote_id': lote_id, 'modo': 'CELERY', 'total': total, 'reporte_id': reporte.id}
+        
+        argumentos = [
+            (config, i + 1, total, directorio, reporte.id)
+            for i, config in enumerate(configuraciones_exportacion)
+        ]
+        procesos = min(self.PROCESOS_LOCALES, total)
+        if procesos > 1 and can_spawn_processes():
+            # Las conexiones abiertas no deben compartirse con los procesos hijos
+            from django.db import connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso_lote) as pool:
+                resultados = list(pool.map(exportar_configuracion_serializada, *zip(*argumentos)))
+        else:
+            resultados = [exportar_configuracion_serializada(*args) for args in argumentos]
+        
+        empaquetar_lote(resultados, directorio, reporte.id)
+        return {'lote_id': lote_id, 'modo': 'LOCAL', 'total': total, 'reporte_id': reporte.id}
+    
     def crear_zip_exportaciones(self, archivos_exportacion, nombre_zip=None):
         """
         Crea un archivo ZIP con múltiples exportaciones
@@ -470,11 +887,7 @@ class BatchExportManager:
         Returns:
             str: Ruta del archivo ZIP creado
         """
-        import zipfile
-        
-        if not nombre_zip:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            nombre_zip = f'exportaciones_masivas_{timestamp}.zip'
+        from apps.core.zip_utils import ZipStreamWriter
         
         archivo_zip = tempfile.NamedTemporaryFile(
             suffix='.zip',
@@ -484,12 +897,7 @@ class BatchExportManager:
         archivo_zip.close()
         
         try:
-            with zipfile.ZipFile(archivo_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for archivo_path in archivos_exportacion:
-                    if os.path.exists(archivo_path):
-                        nombre_en_zip = os.path.basename(archivo_path)
-                        zipf.write(archivo_path, nombre_en_zip)
-            
+            ZipStreamWriter().write_to(archivo_zip.name, self._entradas_zip(archivos_exportacion))
             return archivo_zip.name
             
         except Exception as e:
@@ -498,4 +906,171 @@ class BatchExportManager:
                 os.remove(archivo_zip.name)
             except OSError:
                 pass
-            raise
\ No newline at end of file
+            raise
+    
+    def respuesta_zip_streaming(self, archivos_exportacion, nombre_zip=None):
+        """
+        Entrega un ZIP con múltiples exportaciones sin crearlo en disco
+        
+        Args:
+            archivos_exportacion: Lista de rutas de archivos
+            nombre_zip: Nombre del archivo ZIP (opcional)
+            
+        Returns:
+            StreamingHttpResponse
+        """
+        from django.http import StreamingHttpResponse
+        from apps.core.zip_utils import ZipStreamWriter
+        
+        if not nombre_zip:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            nombre_zip = f'exportaciones_masivas_{timestamp}.zip'
+        
+        response = StreamingHttpResponse(
+            ZipStreamWriter().iter_bytes(self._entradas_zip(archivos_exportacion)),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{nombre_zip}"'
+        return response
+    
+    @staticmethod
+    def _entradas_zip(archivos_exportacion):
+        """Entradas (ruta, nombre) de los archivos existentes"""
+        return [
+            (archivo_path, os.path.basename(archivo_path))
+            for archivo_path in archivos_exportacion
+            if os.path.exists(archivo_path)
+        ]
+
+
+def _inicializar_proceso_lote():
+    """Prepara Django en un proceso del pool local"""
+    import django
+    django.setup()
+
+
+def exportar_configuracion_serializada(config, indice, total, directorio, reporte_id=None):
+    """
+    Ejecuta una exportación de un lote a partir de una configuración
+    serializable y escribe el archivo en el directorio del lote
+    
+    Args:
+        config: Dict con filtros, tipo_reporte, formato y parametros
+        indice: Posición dentro del lote
+        total: Total de exportaciones del lote
+        directorio: Directorio de salida del lote
+        reporte_id: ID del reporte del lote cuya parte registra el avance
+            (opcional)
+        
+    Returns:
+        dict: Resultado serializable con tiempos para diagnóstico
+    """
+    partes = ParteReporte.objects.filter(reporte_id=reporte_id, indice=indice)
+    if reporte_id:
+        partes.update(estado='GENERANDO')
+    
+    inicio = time.perf_counter()
+    resultado = {
+        'lote_indice': indice,
+        'lote_total': total,
+        'tipo_reporte': config.get('tipo_reporte'),
+        'formato': config.get('formato'),
+    }
+    
+    try:
+        queryset = FiltroAvanzado(parametros=config.get('filtros') or {}).aplicar_filtros()
+        manager = ExportManager(directorio=directorio)
+        archivo_info = manager.exportar(
+            queryset=queryset,
+            tipo_reporte=config['tipo_reporte'],
+            formato=config['formato'],
+            parametros=config.get('parametros', {})
+        )
+        
+        resultado.update({
+            'estado': 'EXITOSO',
+            'archivo_path': archivo_info['archivo_path'],
+            'nombre_archivo': f"{indice:02d}_{archivo_info['nombre_archivo']}",
+            'total_registros': archivo_info['total_registros'],
+            'tamaño_bytes': os.path.getsize(archivo_info['archivo_path']),
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en exportación de lote {indice}: {str(e)}")
+        resultado.update({'estado': 'ERROR', 'error': str(e)})
+    
+    resultado['duracion_segundos'] = round(time.perf_counter() - inicio, 3)
+    
+    if reporte_id:
+        partes.update(
+            estado='COMPLETADO' if resultado['estado'] == 'EXITOSO' else 'ERROR',
+            total_registros=resultado.get('total_registros', 0),
+            mensaje_error=resultado.get('error', ''),
+            fecha_completado=timezone.now()
+        )
+    return resultado
+
+
+def empaquetar_lote(resultados, directorio, reporte_id):
+    """
+    Arma el ZIP de un lote y completa el ReporteGenerado que lo agrupa
+    
+    Args:
+        resultados: Resultados de exportar_configuracion_serializada
+        directorio: Directorio del lote (se elimina al terminar)
+        reporte_id: ID del reporte del lote
+        
+    Returns:
+        int: ID del reporte generado
+    """
+    from apps.core.zip_utils import ZipStreamWriter
+    
+    exitosos = [r for r in resultados if r.get('estado') == 'EXITOSO']
+    diagnostico = [
+        {clave: r.get(clave) for clave in (
+            'lote_indice', 'tipo_reporte', 'formato', 'estado', 'total_registros',
+            'tamaño_bytes', 'duracion_segundos', 'error'
+        )}
+        for r in sorted(resultados, key=lambda r: r['lote_indice'])
+    ]
+    
+    reporte = ReporteGenerado.objects.get(id=reporte_id)
+    reporte.total_registros = sum(r['total_registros'] for r in exitosos)
+    reporte.parametros = {
+        **reporte.parametros,
+        'archivos_incluidos': len(exitosos),
+        'lote': diagnostico,
+        'duracion_total_segundos': round(sum(r['duracion_segundos'] for r in resultados), 3),
+    }
+    
+    try:
+        if not exitosos:
+            raise Exception("Ninguna exportación del lote se generó correctamente")
+        
+        archivo_zip = os.path.join(directorio, 'lote.zip')
+        ZipStreamWriter().write_to(
+            archivo_zip,
+            [(r['archivo_path'], r['nombre_archivo']) for r in sorted(exitosos, key=lambda r: r['lote_indice'])]
+        )
+        
+        with open(archivo_zip, 'rb') as f:
+            reporte.archivo_generado.save(
+                f'exportacion_masiva_{timezone.now().strftime("%Y%m%d_%H%M")}.zip',
+                File(f),
+                save=False
+            )
+        reporte.marcar_completado()
+        
+        logger.info(
+            f"Lote {os.path.basename(directorio)}: {len(exitosos)}/{len(resultados)} exportaciones, "
+            f"tiempos {[r['duracion_segundos'] for r in diagnostico]}"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error empaquetando lote: {str(e)}")
+        reporte.marcar_error(str(e))
+        
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    
+    return reporte.id
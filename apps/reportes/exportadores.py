@@ -1,15 +1,21 @@
 import os
 import csv
 import json
+import pickle
+import shutil
+import tempfile
 from datetime import datetime
 from io import BytesIO
-import pandas as pd
+from itertools import groupby, islice
+from operator import itemgetter
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.styles import Font, Border, Side
 from openpyxl.chart import PieChart, BarChart, Reference
 from django.conf import settings
 from django.utils import timezone
+from apps.core.excel_utils import ExcelStreamWriter
+from apps.core.process_utils import can_spawn_processes
+from .zpl_utils import GeneradorZPL
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,64 +24,125 @@ logger = logging.getLogger(__name__)
 class ExportadorBase:
     """Clase base para todos los exportadores"""
     
-    def __init__(self):
+    def __init__(self, incluir_cambios=False):
+        """
+        Args:
+            incluir_cambios: Si se agregan las columnas de modificación y
+                baja, usadas por los reportes incrementales
+        """
         self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.total_registros = 0
+        if incluir_cambios:
+            self.COLUMNAS_BIENES = self.COLUMNAS_BIENES + self.COLUMNAS_CAMBIOS
+    
+    # Columnas de exportación de bienes: (clave, columna consultada)
+    COLUMNAS_BIENES = [
+        ('codigo_patrimonial', 'codigo_patrimonial'),
+        ('codigo_interno', 'codigo_interno'),
+        ('denominacion', 'catalogo__denominacion'),
+        ('grupo', 'catalogo__grupo'),
+        ('clase', 'catalogo__clase'),
+        ('estado_bien', 'estado_bien'),
+        ('marca', 'marca'),
+        ('modelo', 'modelo'),
+        ('color', 'color'),
+        ('serie', 'serie'),
+        ('dimension', 'dimension'),
+        ('placa', 'placa'),
+        ('matricula', 'matricula'),
+        ('nro_motor', 'nro_motor'),
+        ('nro_chasis', 'nro_chasis'),
+        ('oficina_codigo', 'oficina__codigo'),
+        ('oficina_nombre', 'oficina__nombre'),
+        ('responsable', 'oficina__responsable'),
+        ('fecha_adquisicion', 'fecha_adquisicion'),
+        ('valor_adquisicion', 'valor_adquisicion'),
+        ('observaciones', 'observaciones'),
+        ('url_qr', 'url_qr'),
+        ('fecha_registro', 'created_at'),
+    ]
+    
+    # Columnas adicionales de los reportes incrementales
+    COLUMNAS_CAMBIOS = [
+        ('fecha_modificacion', 'updated_at'),
+        ('fecha_baja', 'deleted_at'),
+    ]
+    
+    # Columnas de fecha y hora, formateadas como texto
+    COLUMNAS_FECHA_HORA = {'created_at', 'updated_at', 'deleted_at'}
+    
+    # Filas leídas de la base de datos por cada viaje
+    TAMAÑO_LOTE = 2000
+    
+    @property
+    def claves_bienes(self):
+        """Nombres de las columnas exportadas"""
+        return [clave for clave, _ in self.COLUMNAS_BIENES]
+    
+    def _iterar_filas_bienes(self, queryset):
+        """
+        Itera los bienes como tuplas ya formateadas para exportación
+        
+        Consulta solo las columnas necesarias con values_list() e
+        iterator(), por lo que la memoria no depende del total de filas.
+        
+        Args:
+            queryset: QuerySet de bienes
+            
+        Yields:
+            Tuplas en el orden de COLUMNAS_BIENES
+        """
+        from apps.bienes.models import BienPatrimonial
+        
+        estados = dict(BienPatrimonial.ESTADOS_BIEN)
+        columnas = [columna for _, columna in self.COLUMNAS_BIENES]
+        indice_estado = columnas.index('estado_bien')
+        indice_fecha_adq = columnas.index('fecha_adquisicion')
+        indice_valor = columnas.index('valor_adquisicion')
+        indices_fecha_hora = [i for i, columna in enumerate(columnas) if columna in self.COLUMNAS_FECHA_HORA]
+        
+        filas = queryset.values_list(*columnas).iterator(chunk_size=self.TAMAÑO_LOTE)
+        for fila in filas:
+            fila = ['' if valor is None else valor for valor in fila]
+            fila[indice_estado] = estados.get(fila[indice_estado], fila[indice_estado])
+            if fila[indice_fecha_adq]:
+                fila[indice_fecha_adq] = fila[indice_fecha_adq].strftime('%d/%m/%Y')
+            fila[indice_valor] = fila[indice_valor] or 0
+            for indice in indices_fecha_hora:
+                if fila[indice]:
+                    fila[indice] = fila[indice].strftime('%d/%m/%Y %H:%M')
+            yield tuple(fila)
     
     def _preparar_datos_bienes(self, queryset):
         """Prepara los datos de bienes para exportación"""
-        datos = []
-        
-        for bien in queryset.select_related('catalogo', 'oficina'):
-            datos.append({
-                'codigo_patrimonial': bien.codigo_patrimonial,
-                'codigo_interno': bien.codigo_interno or '',
-                'denominacion': bien.catalogo.denominacion if bien.catalogo else '',
-                'grupo': bien.catalogo.grupo if bien.catalogo else '',
-                'clase': bien.catalogo.clase if bien.catalogo else '',
-                'estado_bien': bien.get_estado_bien_display(),
-                'marca': bien.marca or '',
-                'modelo': bien.modelo or '',
-                'color': bien.color or '',
-                'serie': bien.serie or '',
-                'dimension': bien.dimension or '',
-                'placa': bien.placa or '',
-                'matricula': bien.matricula or '',
-                'nro_motor': bien.nro_motor or '',
-                'nro_chasis': bien.nro_chasis or '',
-                'oficina_codigo': bien.oficina.codigo if bien.oficina else '',
-                'oficina_nombre': bien.oficina.nombre if bien.oficina else '',
-                'responsable': bien.oficina.responsable if bien.oficina else '',
-                'fecha_adquisicion': bien.fecha_adquisicion.strftime('%d/%m/%Y') if bien.fecha_adquisicion else '',
-                'valor_adquisicion': bien.valor_adquisicion or 0,
-                'observaciones': bien.observaciones or '',
-                'url_qr': bien.url_qr or '',
-                'fecha_registro': bien.created_at.strftime('%d/%m/%Y %H:%M') if bien.created_at else '',
-            })
-        
-        return datos
+        claves = self.claves_bienes
+        return [dict(zip(claves, fila)) for fila in self._iterar_filas_bienes(queryset)]
 
 
 class ExportadorExcel(ExportadorBase):
     """Exportador para archivos Excel (.xlsx)"""
     
-    def exportar_bienes(self, queryset, archivo_salida=None):
+    def exportar_bienes(self, queryset, archivo_salida=None, incluir_estadisticas=True,
+                        incluir_encabezado=True):
         """
         Exporta bienes a Excel
         
         Args:
             queryset: QuerySet de bienes
-            archivo_salida: Ruta del archivo de salida (opcional)
+            archivo_salida: Ruta o archivo de salida, por ejemplo un
+                HttpResponse (opcional)
+            incluir_estadisticas: Si se agregan las hojas de estadísticas
+                y gráficos
+            incluir_encabezado: Si se escribe el encabezado institucional
+                antes de la tabla
             
         Returns:
-            str: Ruta del archivo generado
+            Ruta o archivo donde se guardó el libro
         """
         if not archivo_salida:
             archivo_salida = f'inventario_{self.timestamp}.xlsx'
         
-        # Preparar datos
-        datos = self._preparar_datos_bienes(queryset)
-        
-        if not datos:
+        if not queryset.exists():
             # Crear archivo vacío
             wb = Workbook()
             ws = wb.active
@@ -84,39 +151,230 @@ class ExportadorExcel(ExportadorBase):
             wb.save(archivo_salida)
             return archivo_salida
         
-        # Crear DataFrame
-        df = pd.DataFrame(datos)
-        
-        # Crear workbook
-        wb = Workbook()
-        
-        # Hoja principal de inventario
-        ws_inventario = wb.active
-        ws_inventario.title = "Inventario"
+        escritor = ExcelStreamWriter()
+        
+        # Hoja principal de inventario, escrita fila por fila desde la BD
+        ws_inventario = escritor.create_sheet("Inventario")
+        self.total_registros = escritor.write_table(
+            ws_inventario,
+            self.claves_bienes,
+            self._iterar_filas_bienes(queryset),
+            preamble=self._encabezado_institucional() if incluir_encabezado else None
+        )
+        
+        if incluir_estadisticas:
+            # Las estadísticas se calculan una sola vez para ambas hojas
+            from .utils import FiltroAvanzado
+            estadisticas = FiltroAvanzado().obtener_estadisticas(queryset)
+            
+            # Crear hoja de estadísticas
+            ws_stats = escritor.create_sheet("Estadísticas")
+            self._crear_hoja_estadisticas(escritor, ws_stats, estadisticas)
+            
+            # Crear hoja de gráficos
+            ws_graficos = escritor.create_sheet("Gráficos")
+            self._crear_graficos_excel(escritor, ws_graficos, estadisticas)
         
-        # Agregar encabezados institucionales
-        self._agregar_encabezado_institucional(ws_inventario)
+        # Guardar archivo
+        escritor.save(archivo_salida)
         
-        # Agregar datos
-        for r in dataframe_to_rows(df, index=False, header=True):
-            ws_inventario.append(r)
+        logger.info(f"Archivo Excel generado con {self.total_registros} registros")
+        return archivo_salida
+    
+    # Bienes a partir de los cuales las hojas por oficina se arman en paralelo
+    MINIMO_BIENES_PARALELO = 20000
+    PROCESOS_HOJAS = getattr(settings, 'REPORTES_PROCESOS_HOJAS', min(4, os.cpu_count() or 1))
+    
+    def exportar_por_oficina(self, queryset, archivo_salida=None):
+        """
+        Exporta bienes a un libro con una hoja por oficina y una hoja de
+        resumen
         
-        # Aplicar formato
-        self._aplicar_formato_inventario(ws_inventario, len(datos))
+        El resumen sale de una consulta agrupada por oficina. Las filas de
+        las hojas se leen en un único recorrido ordenado por oficina; en
+        inventarios grandes el recorrido se reparte entre procesos por
+        grupos consecutivos de oficinas y el libro se arma en modo
+        write_only a medida que se leen sus resultados.
         
-        # Crear hoja de estadísticas
-        ws_stats = wb.create_sheet("Estadísticas")
-        self._crear_hoja_estadisticas(ws_stats, queryset)
+        Args:
+            queryset: QuerySet de bienes
+            archivo_salida: Ruta o archivo de salida (opcional)
+            
+        Returns:
+            Ruta o archivo donde se guardó el libro
+        """
+        if not archivo_salida:
+            archivo_salida = f'inventario_por_oficina_{self.timestamp}.xlsx'
+        
+        oficinas = self._resumen_oficinas(queryset)
+        
+        escritor = ExcelStreamWriter()
+        ws_resumen = escritor.create_sheet("Resumen")
+        self._crear_hoja_resumen_oficinas(escritor, ws_resumen, oficinas)
+        
+        queryset = queryset.order_by('oficina__nombre', 'oficina__codigo', 'codigo_patrimonial')
+        encabezado = self._encabezado_institucional()
+        titulos = set()
+        self.total_registros = 0
+        
+        for oficina, filas in self._hojas_por_oficina(queryset, oficinas):
+            ws = escritor.create_sheet(self._titulo_hoja_oficina(oficina, titulos))
+            titulo_oficina = f"Oficina: {oficina['oficina__codigo']} - {oficina['oficina__nombre']}"
+            self.total_registros += escritor.write_table(
+                ws,
+                self.claves_bienes,
+                filas,
+                preamble=encabezado[:-1] + [(titulo_oficina, 'subtitulo'), (None, None)]
+            )
+        
+        escritor.save(archivo_salida)
+        
+        logger.info(
+            f"Libro por oficina generado con {len(oficinas)} hojas y {self.total_registros} registros"
+        )
+        return archivo_salida
+    
+    def _resumen_oficinas(self, queryset):
+        """
+        Totales por oficina en una única consulta agrupada
         
-        # Crear hoja de gráficos
-        ws_graficos = wb.create_sheet("Gráficos")
-        self._crear_graficos_excel(ws_graficos, queryset)
+        Returns:
+            list: Diccionarios por oficina ordenados por nombre
+        """
+        from django.db.models import Count, Q, Sum
+        
+        return list(
+            queryset.order_by()
+            .values('oficina_id', 'oficina__codigo', 'oficina__nombre', 'oficina__responsable')
+            .annotate(
+                total=Count('id'),
+                operativos=Count('id', filter=Q(estado_bien__in=['N', 'B', 'R'])),
+                atencion=Count('id', filter=Q(estado_bien__in=['M', 'E', 'C'])),
+                valor_total=Sum('valor_adquisicion'),
+            )
+            .order_by('oficina__nombre', 'oficina__codigo')
+        )
+    
+    def _hojas_por_oficina(self, queryset, oficinas):
+        """
+        Itera las filas de cada oficina en el orden del resumen
         
-        # Guardar archivo
-        wb.save(archivo_salida)
+        Yields:
+            Tuplas (oficina, iterable de filas)
+        """
+        total = sum(oficina['total'] for oficina in oficinas)
+        grupos = self._repartir_oficinas(oficinas, self.PROCESOS_HOJAS)
+        
+        if total < self.MINIMO_BIENES_PARALELO or len(grupos) < 2 or not can_spawn_processes():
+            # Un solo recorrido ordenado, cortado en cada cambio de oficina;
+            # también dentro de un worker prefork de Celery, que es daemon
+            indice_oficina = self.claves_bienes.index('oficina_codigo')
+            por_codigo = {oficina['oficina__codigo']: oficina for oficina in oficinas}
+            for codigo, filas in groupby(self._iterar_filas_bienes(queryset), key=itemgetter(indice_oficina)):
+                if codigo in por_codigo:
+                    yield por_codigo[codigo], filas
+            return
+        
+        from concurrent.futures import ProcessPoolExecutor
+        from django.db import connections
+        
+        directorio = tempfile.mkdtemp(prefix='patrimonio_hojas_')
+        try:
+            # Las conexiones abiertas no deben compartirse con los procesos hijos
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=len(grupos), initializer=_inicializar_proceso_exportacion
+            ) as pool:
+                futuros = [
+                    pool.submit(
+                        construir_filas_oficinas,
+                        queryset.query,
+                        {oficina['oficina__codigo']: oficina['oficina_id'] for oficina in grupo},
+                        directorio
+                    )
+                    for grupo in grupos
+                ]
+                # Las hojas se escriben en orden a medida que termina cada grupo
+                for grupo, futuro in zip(grupos, futuros):
+                    archivos = futuro.result()
+                    for oficina in grupo:
+                        if oficina['oficina_id'] in archivos:
+                            yield oficina, _leer_filas_temporales(archivos[oficina['oficina_id']])
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    
+    @staticmethod
+    def _repartir_oficinas(oficinas, procesos):
+        """
+        Reparte las oficinas en grupos consecutivos con una cantidad
+        similar de bienes
         
-        logger.info(f"Archivo Excel generado: {archivo_salida} con {len(datos)} registros")
-        return archivo_salida
+        Returns:
+            list: Listas de oficinas, una por proceso
+        """
+        total = sum(oficina['total'] for oficina in oficinas)
+        objetivo = total / max(procesos, 1)
+        grupos = []
+        actual = []
+        acumulado = 0
+        
+        for oficina in oficinas:
+            actual.append(oficina)
+            acumulado += oficina['total']
+            if acumulado >= objetivo * (len(grupos) + 1) and len(grupos) < procesos - 1:
+                grupos.append(actual)
+                actual = []
+        if actual:
+            grupos.append(actual)
+        
+        return grupos
+    
+    @staticmethod
+    def _titulo_hoja_oficina(oficina, usados):
+        """Título de hoja Excel único y válido para una oficina"""
+        texto = f"{oficina['oficina__codigo']} {oficina['oficina__nombre']}"
+        titulo = ''.join(c for c in texto if c not in '[]:*?/\\')[:31].strip()
+        
+        base = titulo
+        numero = 2
+        while titulo.lower() in usados:
+            sufijo = f" ({numero})"
+            titulo = base[:31 - len(sufijo)] + sufijo
+            numero += 1
+        usados.add(titulo.lower())
+        return titulo
+    
+    def _crear_hoja_resumen_oficinas(self, escritor, ws, oficinas):
+        """Crea la hoja de resumen del libro por oficina"""
+        encabezados = [
+            "Código", "Oficina", "Responsable", "Total Bienes",
+            "Operativos", "Requieren Atención", "Valor Total (S/)"
+        ]
+        filas = [
+            (
+                oficina['oficina__codigo'],
+                oficina['oficina__nombre'],
+                oficina['oficina__responsable'],
+                oficina['total'],
+                oficina['operativos'],
+                oficina['atencion'],
+                oficina['valor_total'] or 0,
+            )
+            for oficina in oficinas
+        ]
+        escritor.write_table(
+            ws,
+            encabezados,
+            filas,
+            preamble=self._encabezado_institucional() + [("RESUMEN POR OFICINA", 'seccion')]
+        )
+        escritor.append(ws, [
+            "TOTAL", f"{len(oficinas)} oficinas", None,
+            sum(fila[3] for fila in filas),
+            sum(fila[4] for fila in filas),
+            sum(fila[5] for fila in filas),
+            sum(fila[6] for fila in filas),
+        ], 'encabezado_simple')
     
     def exportar_estadisticas(self, estadisticas, archivo_salida=None):
         """
@@ -151,166 +409,84 @@ class ExportadorExcel(ExportadorBase):
         ws_grupos = wb.create_sheet("Por Grupo")
         self._crear_hoja_grupos(ws_grupos, estadisticas.get('por_grupo', []))
         
+        # Hoja de KPIs por oficina (reportes ejecutivos)
+        if estadisticas.get('kpis_por_oficina'):
+            ws_kpis = wb.create_sheet("KPIs por Oficina")
+            self._crear_hoja_kpis_oficinas(ws_kpis, estadisticas['kpis_por_oficina'])
+        
         wb.save(archivo_salida)
         
         logger.info(f"Archivo de estadísticas Excel generado: {archivo_salida}")
         return archivo_salida
     
-    def _agregar_encabezado_institucional(self, ws):
-        """Agrega encabezado institucional al Excel"""
-        # Título principal
-        ws.merge_cells('A1:T1')
-        ws['A1'] = "DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO"
-        ws['A1'].font = Font(bold=True, size=14)
-        ws['A1'].alignment = Alignment(horizontal='center')
-        
-        # Subtítulo
-        ws.merge_cells('A2:T2')
-        ws['A2'] = "SISTEMA DE REGISTRO DE PATRIMONIO"
-        ws['A2'].font = Font(bold=True, size=12)
-        ws['A2'].alignment = Alignment(horizontal='center')
-        
-        # Fecha de generación
-        ws.merge_cells('A3:T3')
-        ws['A3'] = f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-        ws['A3'].font = Font(size=10)
-        ws['A3'].alignment = Alignment(horizontal='center')
-        
-        # Línea en blanco
-        ws.append([])
+    def _encabezado_institucional(self):
+        """Filas del encabezado institucional: (texto, estilo)"""
+        return [
+            ("DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO", 'titulo'),
+            ("SISTEMA DE REGISTRO DE PATRIMONIO", 'subtitulo'),
+            (f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 'nota'),
+            (None, None),  # Línea en blanco
+        ]
     
-    def _aplicar_formato_inventario(self, ws, num_filas):
-        """Aplica formato a la hoja de inventario"""
-        # Colores
-        color_encabezado = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        color_alternado = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-        
-        # Fuente para encabezados
-        fuente_encabezado = Font(bold=True, color="FFFFFF")
-        
-        # Encontrar fila de encabezados (después del encabezado institucional)
-        fila_encabezado = 5  # Ajustar según el encabezado institucional
-        
-        # Formatear encabezados
-        for col in range(1, ws.max_column + 1):
-            celda = ws.cell(row=fila_encabezado, column=col)
-            celda.fill = color_encabezado
-            celda.font = fuente_encabezado
-            celda.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Formatear filas de datos (alternadas)
-        for fila in range(fila_encabezado + 1, fila_encabezado + num_filas + 1):
-            if (fila - fila_encabezado) % 2 == 0:
-                for col in range(1, ws.max_column + 1):
-                    ws.cell(row=fila, column=col).fill = color_alternado
-        
-        # Ajustar ancho de columnas
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)  # Máximo 50 caracteres
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
-    def _crear_hoja_estadisticas(self, ws, queryset):
+    def _crear_hoja_estadisticas(self, escritor, ws, estadisticas):
         """Crea hoja de estadísticas"""
-        from .utils import FiltroAvanzado
-        
-        # Generar estadísticas
-        filtro = FiltroAvanzado()
-        estadisticas = filtro.obtener_estadisticas(queryset)
+        ws.column_dimensions['A'].width = 40
+        ws.column_dimensions['B'].width = 12
+        ws.column_dimensions['C'].width = 12
         
         # Título
-        ws['A1'] = "ESTADÍSTICAS DEL INVENTARIO"
-        ws['A1'].font = Font(bold=True, size=14)
-        ws.merge_cells('A1:D1')
-        
-        fila_actual = 3
+        escritor.append(ws, ["ESTADÍSTICAS DEL INVENTARIO"], 'titulo')
+        ws.merged_cells.add('A1:D1')
+        ws.append([])
         
         # Estadísticas por estado
-        ws[f'A{fila_actual}'] = "DISTRIBUCIÓN POR ESTADO"
-        ws[f'A{fila_actual}'].font = Font(bold=True, size=12)
-        fila_actual += 1
-        
-        ws[f'A{fila_actual}'] = "Estado"
-        ws[f'B{fila_actual}'] = "Cantidad"
-        ws[f'C{fila_actual}'] = "Porcentaje"
-        
-        # Aplicar formato a encabezados
-        for col in ['A', 'B', 'C']:
-            celda = ws[f'{col}{fila_actual}']
-            celda.font = Font(bold=True)
-            celda.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
-        fila_actual += 1
+        escritor.append(ws, ["DISTRIBUCIÓN POR ESTADO"], 'seccion')
+        escritor.append(ws, ["Estado", "Cantidad", "Porcentaje"], 'encabezado_simple')
         
         for estado in estadisticas.get('por_estado', []):
-            ws[f'A{fila_actual}'] = estado.get('estado_bien', 'N/A')
-            ws[f'B{fila_actual}'] = estado.get('total', 0)
-            ws[f'C{fila_actual}'] = f"{estado.get('porcentaje', 0):.1f}%"
-            fila_actual += 1
+            ws.append([
+                estado.get('estado_bien', 'N/A'),
+                estado.get('total', 0),
+                f"{estado.get('porcentaje', 0):.1f}%",
+            ])
         
-        fila_actual += 2
+        ws.append([])
+        ws.append([])
         
         # Estadísticas por oficina (top 10)
-        ws[f'A{fila_actual}'] = "TOP 10 OFICINAS"
-        ws[f'A{fila_actual}'].font = Font(bold=True, size=12)
-        fila_actual += 1
-        
-        ws[f'A{fila_actual}'] = "Oficina"
-        ws[f'B{fila_actual}'] = "Cantidad"
-        
-        # Aplicar formato a encabezados
-        for col in ['A', 'B']:
-            celda = ws[f'{col}{fila_actual}']
-            celda.font = Font(bold=True)
-            celda.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        
-        fila_actual += 1
+        escritor.append(ws, ["TOP 10 OFICINAS"], 'seccion')
+        escritor.append(ws, ["Oficina", "Cantidad"], 'encabezado_simple')
         
         for oficina in estadisticas.get('por_oficina', [])[:10]:
-            ws[f'A{fila_actual}'] = oficina.get('oficina__nombre', 'Sin nombre')
-            ws[f'B{fila_actual}'] = oficina.get('total', 0)
-            fila_actual += 1
+            ws.append([
+                oficina.get('oficina__nombre', 'Sin nombre'),
+                oficina.get('total', 0),
+            ])
     
-    def _crear_graficos_excel(self, ws, queryset):
+    def _crear_graficos_excel(self, escritor, ws, estadisticas):
         """Crea gráficos en Excel"""
-        from .utils import FiltroAvanzado
-        
-        # Generar estadísticas
-        filtro = FiltroAvanzado()
-        estadisticas = filtro.obtener_estadisticas(queryset)
-        
         # Preparar datos para gráfico de estados
         estados_data = estadisticas.get('por_estado', [])
-        if estados_data:
-            # Crear datos en la hoja
-            ws['A1'] = "Estado"
-            ws['B1'] = "Cantidad"
-            
-            fila = 2
-            for estado in estados_data:
-                ws[f'A{fila}'] = estado.get('estado_bien', 'N/A')
-                ws[f'B{fila}'] = estado.get('total', 0)
-                fila += 1
-            
-            # Crear gráfico de torta
-            pie_chart = PieChart()
-            labels = Reference(ws, min_col=1, min_row=2, max_row=fila-1)
-            data = Reference(ws, min_col=2, min_row=1, max_row=fila-1)
-            
-            pie_chart.add_data(data, titles_from_data=True)
-            pie_chart.set_categories(labels)
-            pie_chart.title = "Distribución por Estado"
-            
-            ws.add_chart(pie_chart, "D2")
+        if not estados_data:
+            return
+        
+        # Crear datos en la hoja
+        ws.append(["Estado", "Cantidad"])
+        for estado in estados_data:
+            ws.append([estado.get('estado_bien', 'N/A'), estado.get('total', 0)])
+        
+        ultima_fila = len(estados_data) + 1
+        
+        # Crear gráfico de torta
+        pie_chart = PieChart()
+        labels = Reference(ws, min_col=1, min_row=2, max_row=ultima_fila)
+        data = Reference(ws, min_col=2, min_row=1, max_row=ultima_fila)
+        
+        pie_chart.add_data(data, titles_from_data=True)
+        pie_chart.set_categories(labels)
+        pie_chart.title = "Distribución por Estado"
+        
+        ws.add_chart(pie_chart, "D2")
     
     def _crear_hoja_resumen_estadisticas(self, ws, estadisticas):
         """Crea hoja de resumen de estadísticas"""
@@ -365,6 +541,32 @@ class ExportadorExcel(ExportadorBase):
             ws[f'C{fila}'] = f"{oficina.get('porcentaje', 0):.1f}%"
             fila += 1
     
+    def _crear_hoja_kpis_oficinas(self, ws, kpis_oficinas):
+        """Crea hoja de indicadores clave por oficina"""
+        ws['A1'] = "INDICADORES CLAVE POR OFICINA"
+        ws['A1'].font = Font(bold=True, size=12)
+        
+        encabezados = [
+            "Código", "Oficina", "Bienes", "% Operativos", "% Atención",
+            "Valor Total", "Completitud (%)", "Antigüedad (años)"
+        ]
+        for columna, encabezado in enumerate(encabezados, 1):
+            ws.cell(row=3, column=columna, value=encabezado).font = Font(bold=True)
+        
+        for fila, kpis in enumerate(kpis_oficinas, 4):
+            valores = [
+                kpis['oficina_codigo'],
+                kpis['oficina_nombre'],
+                kpis['total_bienes'],
+                kpis.get('porcentaje_operativos', 0),
+                kpis.get('porcentaje_atencion', 0),
+                float(kpis['valor_total_inventario']),
+                kpis['completitud_datos'],
+                kpis['antiguedad_promedio'],
+            ]
+            for columna, valor in enumerate(valores, 1):
+                ws.cell(row=fila, column=columna, value=valor)
+    
     def _crear_hoja_grupos(self, ws, grupos_data):
         """Crea hoja de estadísticas por grupo"""
         ws['A1'] = "ESTADÍSTICAS POR GRUPO"
@@ -385,9 +587,32 @@ class ExportadorExcel(ExportadorBase):
 class ExportadorCSV(ExportadorBase):
     """Exportador para archivos CSV"""
     
+    MENSAJE_SIN_DATOS = "No se encontraron bienes con los filtros aplicados"
+    
+    def _filas_csv(self, queryset):
+        """
+        Genera todas las filas del CSV: encabezado institucional,
+        nombres de columnas y datos
+        """
+        yield ["DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO"]
+        yield ["SISTEMA DE REGISTRO DE PATRIMONIO"]
+        yield [f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}"]
+        yield []  # Línea en blanco
+        yield self.claves_bienes
+        
+        total = 0
+        for fila in self._iterar_filas_bienes(queryset):
+            total += 1
+            yield fila
+        
+        if total == 0:
+            yield [self.MENSAJE_SIN_DATOS]
+        
+        self.total_registros = total
+    
     def exportar_bienes(self, queryset, archivo_salida=None):
         """
-        Exporta bienes a CSV
+        Exporta bienes a CSV escribiendo el archivo de forma incremental
         
         Args:
             queryset: QuerySet de bienes
@@ -399,47 +624,191 @@ class ExportadorCSV(ExportadorBase):
         if not archivo_salida:
             archivo_salida = f'inventario_{self.timestamp}.csv'
         
-        # Preparar datos
-        datos = self._preparar_datos_bienes(queryset)
+        with open(archivo_salida, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            csv.writer(csvfile).writerows(self._filas_csv(queryset))
         
-        if not datos:
-            # Crear archivo vacío
-            with open(archivo_salida, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["No se encontraron bienes con los filtros aplicados"])
-            return archivo_salida
+        logger.info(f"Archivo CSV generado: {archivo_salida} con {self.total_registros} registros")
+        return archivo_salida
+    
+    def generar_contenido(self, queryset):
+        """
+        Genera el CSV por partes para respuestas en streaming
         
-        # Escribir CSV
-        with open(archivo_salida, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            fieldnames = datos[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        Args:
+            queryset: QuerySet de bienes
             
-            # Escribir encabezado institucional
-            writer.writerow({fieldnames[0]: "DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO"})
-            writer.writerow({fieldnames[0]: "SISTEMA DE REGISTRO DE PATRIMONIO"})
-            writer.writerow({fieldnames[0]: f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}"})
-            writer.writerow({})  # Línea en blanco
+        Yields:
+            str: Líneas CSV (la primera incluye el BOM UTF-8 para Excel)
+        """
+        writer = csv.writer(_BufferEco())
+        yield '\ufeff'
+        for fila in self._filas_csv(queryset):
+            yield writer.writerow(fila)
+    
+    def respuesta_streaming(self, queryset, nombre_archivo=None):
+        """
+        Crea una respuesta HTTP que envía el CSV mientras se genera
+        
+        Args:
+            queryset: QuerySet de bienes
+            nombre_archivo: Nombre sugerido para la descarga
             
-            # Escribir encabezados
-            writer.writeheader()
+        Returns:
+            StreamingHttpResponse
+        """
+        from django.http import StreamingHttpResponse
+        
+        nombre_archivo = nombre_archivo or f'inventario_{self.timestamp}.csv'
+        response = StreamingHttpResponse(
+            self.generar_contenido(queryset),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return response
+
+
+class _BufferEco:
+    """Pseudo-buffer que devuelve lo escrito, para usar csv.writer en streaming"""
+    
+    def write(self, valor):
+        return valor
+
+
+class ExportadorParquet(ExportadorBase):
+    """
+    Exportador a Parquet para herramientas de análisis.
+    
+    Escribe las columnas con su tipo (fechas, decimales, marcas de tiempo)
+    y comprimidas; oficina, estado y catálogo se codifican como
+    diccionario porque se repiten en muchas filas. Los bienes se leen con
+    values_list() por lotes y cada lote se escribe como un grupo de filas,
+    por lo que la memoria no depende del total de bienes. Requiere
+    pyarrow.
+    """
+    
+    # Bienes por grupo de filas del archivo
+    FILAS_POR_GRUPO = 50000
+    COMPRESION = 'zstd'
+    
+    # Columnas codificadas como diccionario
+    COLUMNAS_DICCIONARIO = {
+        'denominacion', 'grupo', 'clase', 'estado_bien',
+        'oficina_codigo', 'oficina_nombre', 'responsable',
+    }
+    
+    @staticmethod
+    def disponible():
+        """Indica si está instalado pyarrow"""
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    
+    def esquema(self):
+        """
+        Esquema de las columnas exportadas
+        
+        Returns:
+            pyarrow.Schema con el orden de COLUMNAS_BIENES
+        """
+        import pyarrow as pa
+        
+        texto_repetido = pa.dictionary(pa.int32(), pa.string())
+        tipos = {
+            'fecha_adquisicion': pa.date32(),
+            'valor_adquisicion': pa.decimal128(12, 2),
+        }
+        campos = []
+        for clave, columna in self.COLUMNAS_BIENES:
+            if columna in self.COLUMNAS_FECHA_HORA:
+                tipo = pa.timestamp('us', tz='UTC')
+            elif clave in self.COLUMNAS_DICCIONARIO:
+                tipo = texto_repetido
+            else:
+                tipo = tipos.get(clave, pa.string())
+            campos.append(pa.field(clave, tipo))
+        
+        return pa.schema(campos, metadata={
+            'institucion': 'DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO',
+            'fecha_generacion': timezone.now().isoformat(),
+        })
+    
+    def _iterar_lotes(self, queryset, esquema):
+        """
+        Itera los bienes como lotes columnares
+        
+        Args:
+            queryset: QuerySet de bienes
+            esquema: Esquema de esquema()
+        
+        Yields:
+            pyarrow.RecordBatch de hasta FILAS_POR_GRUPO filas
+        """
+        import pyarrow as pa
+        from apps.bienes.models import BienPatrimonial
+        
+        estados = dict(BienPatrimonial.ESTADOS_BIEN)
+        columnas = [columna for _, columna in self.COLUMNAS_BIENES]
+        indice_estado = columnas.index('estado_bien')
+        
+        filas = queryset.values_list(*columnas).iterator(chunk_size=self.TAMAÑO_LOTE)
+        while True:
+            lote = list(islice(filas, self.FILAS_POR_GRUPO))
+            if not lote:
+                break
             
-            # Escribir datos
-            writer.writerows(datos)
+            valores = [list(columna) for columna in zip(*lote)]
+            valores[indice_estado] = [estados.get(estado, estado) for estado in valores[indice_estado]]
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(columna, type=campo.type) for columna, campo in zip(valores, esquema)],
+                schema=esquema
+            )
+    
+    def exportar_bienes(self, queryset, archivo_salida=None):
+        """
+        Exporta bienes a un archivo Parquet
+        
+        Args:
+            queryset: QuerySet de bienes
+            archivo_salida: Ruta del archivo de salida
+        
+        Returns:
+            str: Ruta del archivo generado
+        """
+        import pyarrow.parquet as pq
+        
+        if not archivo_salida:
+            archivo_salida = f'inventario_{self.timestamp}.parquet'
         
-        logger.info(f"Archivo CSV generado: {archivo_salida} con {len(datos)} registros")
+        esquema = self.esquema()
+        total = 0
+        with pq.ParquetWriter(archivo_salida, esquema, compression=self.COMPRESION) as escritor:
+            for lote in self._iterar_lotes(queryset, esquema):
+                escritor.write_batch(lote)
+                total += lote.num_rows
+        
+        self.total_registros = total
+        logger.info(f"Archivo Parquet generado: {archivo_salida} con {total} registros")
         return archivo_salida
 
 
 class ExportadorZPL(ExportadorBase):
     """Exportador para plantillas ZPL (Zebra Programming Language)"""
     
-    def generar_plantilla_stickers(self, queryset, archivo_salida=None):
+    def generar_plantilla_stickers(self, queryset, archivo_salida=None, configuracion=None, orden='codigo'):
         """
         Genera plantilla ZPL para stickers
         
+        Los stickers se generan con la plantilla compilada de la
+        configuración sobre páginas de values() de los bienes y se
+        escriben en el archivo a medida que se generan.
+        
         Args:
             queryset: QuerySet de bienes
             archivo_salida: Ruta del archivo de salida
+            configuracion: ConfiguracionSticker (opcional)
+            orden: Orden de los stickers ('codigo' o 'ubicacion')
             
         Returns:
             str: Ruta del archivo generado
@@ -447,158 +816,62 @@ class ExportadorZPL(ExportadorBase):
         if not archivo_salida:
             archivo_salida = f'stickers_{self.timestamp}.zpl'
         
-        # Configuración del sticker (en dots, 203 DPI)
-        config = {
-            'ancho_sticker': 400,  # ~2 pulgadas
-            'alto_sticker': 300,   # ~1.5 pulgadas
-            'margen': 20,
-            'tamaño_qr': 100,
-            'fuente_titulo': 'A',
-            'tamaño_titulo': 'N',
-            'fuente_texto': 'A',
-            'tamaño_texto': 'N',
-        }
-        
-        plantilla_zpl = []
-        
-        # Encabezado ZPL
-        plantilla_zpl.append("^XA")  # Inicio de etiqueta
-        
-        for bien in queryset:
-            # Inicio de nueva etiqueta
-            plantilla_zpl.append("^XA")
-            
-            # Configurar origen
-            plantilla_zpl.append("^LH0,0")
-            
-            # Código QR (esquina superior izquierda)
-            if bien.qr_code:
-                plantilla_zpl.append(f"^FO{config['margen']},{config['margen']}")
-                plantilla_zpl.append(f"^BQN,2,{config['tamaño_qr']//10}")
-                plantilla_zpl.append(f"^FDQA,{bien.qr_code}^FS")
-            
-            # Código patrimonial (título principal)
-            x_texto = config['margen'] + config['tamaño_qr'] + 20
-            y_texto = config['margen']
-            
-            plantilla_zpl.append(f"^FO{x_texto},{y_texto}")
-            plantilla_zpl.append(f"^{config['fuente_titulo']}{config['tamaño_titulo']}")
-            plantilla_zpl.append(f"^FD{bien.codigo_patrimonial}^FS")
-            
-            # Denominación (truncada)
-            y_texto += 40
-            denominacion = bien.catalogo.denominacion if bien.catalogo else "Sin denominación"
-            if len(denominacion) > 25:
-                denominacion = denominacion[:22] + "..."
-            
-            plantilla_zpl.append(f"^FO{x_texto},{y_texto}")
-            plantilla_zpl.append(f"^{config['fuente_texto']}{config['tamaño_texto']}")
-            plantilla_zpl.append(f"^FD{denominacion}^FS")
-            
-            # Oficina
-            y_texto += 30
-            oficina = bien.oficina.codigo if bien.oficina else "Sin oficina"
-            
-            plantilla_zpl.append(f"^FO{x_texto},{y_texto}")
-            plantilla_zpl.append(f"^{config['fuente_texto']}{config['tamaño_texto']}")
-            plantilla_zpl.append(f"^FD{oficina}^FS")
-            
-            # Estado
-            y_texto += 30
-            estado = bien.get_estado_bien_display()
-            
-            plantilla_zpl.append(f"^FO{x_texto},{y_texto}")
-            plantilla_zpl.append(f"^{config['fuente_texto']}{config['tamaño_texto']}")
-            plantilla_zpl.append(f"^FD{estado}^FS")
-            
-            # Marca/Modelo (si existe)
-            if bien.marca or bien.modelo:
-                y_texto += 30
-                marca_modelo = f"{bien.marca or ''} {bien.modelo or ''}".strip()
-                if len(marca_modelo) > 20:
-                    marca_modelo = marca_modelo[:17] + "..."
-                
-                plantilla_zpl.append(f"^FO{x_texto},{y_texto}")
-                plantilla_zpl.append(f"^{config['fuente_texto']}{config['tamaño_texto']}")
-                plantilla_zpl.append(f"^FD{marca_modelo}^FS")
-            
-            # Serie (si existe)
-            if bien.serie:
-                y_texto += 25
-                serie = f"S/N: {bien.serie}"
-                if len(serie) > 20:
-                    serie = serie[:17] + "..."
-                
-                plantilla_zpl.append(f"^FO{x_texto},{y_texto}")
-                plantilla_zpl.append(f"^{config['fuente_texto']}{config['tamaño_texto']}")
-                plantilla_zpl.append(f"^FD{serie}^FS")
-            
-            # Línea separadora (opcional)
-            plantilla_zpl.append(f"^FO{config['margen']},{config['alto_sticker'] - 40}")
-            plantilla_zpl.append(f"^GB{config['ancho_sticker'] - 2*config['margen']},2,2^FS")
-            
-            # Fecha de generación (pequeña)
-            plantilla_zpl.append(f"^FO{config['margen']},{config['alto_sticker'] - 30}")
-            plantilla_zpl.append("^A0N,15,15")
-            plantilla_zpl.append(f"^FD{datetime.now().strftime('%d/%m/%Y')}^FS")
-            
-            # Fin de etiqueta
-            plantilla_zpl.append("^XZ")
-        
-        # Escribir archivo ZPL
-        with open(archivo_salida, 'w', encoding='utf-8') as zpl_file:
-            zpl_file.write('\n'.join(plantilla_zpl))
+        generador = GeneradorZPL(configuracion)
+        generador.generar_stickers_masivos(queryset, archivo_salida, orden)
+        self.total_registros = generador.total_stickers
         
-        logger.info(f"Plantilla ZPL generada: {archivo_salida} con {queryset.count()} stickers")
+        logger.info(f"Plantilla ZPL generada: {archivo_salida} con {self.total_registros} stickers")
         return archivo_salida
+
+
+def _inicializar_proceso_exportacion():
+    """Prepara Django en un proceso del pool de exportación"""
+    import django
+    django.setup()
+
+
+def construir_filas_oficinas(consulta, oficinas, directorio):
+    """
+    Lee en un recorrido ordenado los bienes de un grupo de oficinas y
+    guarda las filas de cada una en un archivo temporal
     
-    def generar_sticker_individual(self, bien, config=None):
-        """
-        Genera código ZPL para un sticker individual
-        
-        Args:
-            bien: Instancia de BienPatrimonial
-            config: Configuración personalizada del sticker
-            
-        Returns:
-            str: Código ZPL para el sticker
-        """
-        if not config:
-            config = {
-                'ancho_sticker': 400,
-                'alto_sticker': 300,
-                'margen': 20,
-                'tamaño_qr': 100,
-            }
-        
-        zpl_lines = []
-        
-        # Inicio de etiqueta
-        zpl_lines.append("^XA")
-        zpl_lines.append("^LH0,0")
-        
-        # Código QR
-        if bien.qr_code:
-            zpl_lines.append(f"^FO{config['margen']},{config['margen']}")
-            zpl_lines.append(f"^BQN,2,{config['tamaño_qr']//10}")
-            zpl_lines.append(f"^FDQA,{bien.qr_code}^FS")
-        
-        # Código patrimonial
-        x_texto = config['margen'] + config['tamaño_qr'] + 20
-        zpl_lines.append(f"^FO{x_texto},{config['margen']}")
-        zpl_lines.append("^AN")
-        zpl_lines.append(f"^FD{bien.codigo_patrimonial}^FS")
-        
-        # Denominación
-        denominacion = bien.catalogo.denominacion if bien.catalogo else "Sin denominación"
-        if len(denominacion) > 25:
-            denominacion = denominacion[:22] + "..."
-        
-        zpl_lines.append(f"^FO{x_texto},{config['margen'] + 40}")
-        zpl_lines.append("^AN")
-        zpl_lines.append(f"^FD{denominacion}^FS")
-        
-        # Fin de etiqueta
-        zpl_lines.append("^XZ")
-        
-        return '\n'.join(zpl_lines)
\ No newline at end of file
+    Args:
+        consulta: Query del QuerySet ordenado por oficina
+        oficinas: Dict {codigo de oficina: oficina_id} del grupo
+        directorio: Directorio de los archivos temporales
+        
+    Returns:
+        dict: {oficina_id: ruta del archivo de filas}
+    """
+    from apps.bienes.models import BienPatrimonial
+    
+    queryset = BienPatrimonial.objects.all()
+    queryset.query = consulta
+    queryset = queryset.filter(oficina_id__in=list(oficinas.values()))
+    
+    exportador = ExportadorExcel()
+    indice_oficina = exportador.claves_bienes.index('oficina_codigo')
+    
+    archivos = {}
+    for codigo, filas in groupby(exportador._iterar_filas_bienes(queryset), key=itemgetter(indice_oficina)):
+        ruta = os.path.join(directorio, f'oficina_{oficinas[codigo]}.pkl')
+        with open(ruta, 'wb') as destino:
+            while True:
+                lote = list(islice(filas, ExportadorBase.TAMAÑO_LOTE))
+                if not lote:
+                    break
+                pickle.dump(lote, destino, protocol=pickle.HIGHEST_PROTOCOL)
+        archivos[oficinas[codigo]] = ruta
+    
+    return archivos
+
+
+def _leer_filas_temporales(ruta):
+    """Itera las filas guardadas por construir_filas_oficinas"""
+    with open(ruta, 'rb') as origen:
+        while True:
+            try:
+                lote = pickle.load(origen)
+            except EOFError:
+                return
+            yield from lote
@@ -462,6 +462,18 @@ class GenerarReporteForm(forms.Form):
         help_text='Cómo agrupar los datos en el reporte'
     )
     
+    entrega = forms.ChoiceField(
+        choices=[
+            ('ZIP', 'Archivo ZIP con una parte por archivo'),
+            ('LIBRO', 'Libro Excel con una hoja por parte'),
+        ],
+        required=False,
+        initial='ZIP',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Entrega de Reportes Grandes',
+        help_text='Formato de entrega cuando el inventario se genera en partes (libro solo en Excel)'
+    )
+    
     def clean(self):
         """Validaciones personalizadas"""
         cleaned_data = super().clean()
@@ -475,4 +487,16 @@ class GenerarReporteForm(forms.Form):
                 'incluir_graficos': 'Los gráficos solo están disponibles en formato PDF'
             })
         
+        # El libro por oficina solo se genera en Excel
+        if cleaned_data.get('tipo_reporte') == 'POR_OFICINA' and formato != 'EXCEL':
+            raise ValidationError({
+                'formato': 'El inventario por oficina solo está disponible en formato Excel'
+            })
+        
+        # Parquet solo exporta el inventario tabular
+        if formato == 'PARQUET' and cleaned_data.get('tipo_reporte') != 'INVENTARIO':
+            raise ValidationError({
+                'formato': 'El formato Parquet solo está disponible para el inventario general'
+            })
+        
         return cleaned_data
\ No newline at end of file
@@ -1,18 +1,18 @@
 import io
+import math
 import os
-from datetime import datetime, timedelta
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
 from django.conf import settings
-from django.db.models import Count, Sum, Avg, Q
+from django.db.models import Count, Sum, Avg, Q, F, Value, DurationField, ExpressionWrapper
+from django.db.models.functions import Extract
 from django.utils import timezone
 from django.template.loader import render_to_string
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.backends.backend_pdf import PdfPages
-import pandas as pd
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.pagesizes import letter, A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
@@ -20,340 +20,150 @@ from reportlab.graphics.shapes import Drawing
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.lib.colors import HexColor
+from reportlab.pdfgen import canvas
 
 from apps.bienes.models import BienPatrimonial
 from apps.catalogo.models import Catalogo
+from apps.core.process_utils import can_spawn_processes
 from apps.oficinas.models import Oficina
-from .utils import FiltroAvanzado, GeneradorEstadisticas
+from .models import InstantaneaInventario
+from .utils import FiltroAvanzado, GeneradorEstadisticas, EstadisticasAgregadas
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Configurar estilo de matplotlib
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
-
 
 class GeneradorReporteEstadistico:
     """Generador de reportes estadísticos con gráficos"""
     
-    def __init__(self, queryset=None, parametros=None):
+    def __init__(self, queryset=None, parametros=None, agregados=None):
         """
         Inicializa el generador
         
         Args:
             queryset: QuerySet de bienes a analizar
             parametros: Parámetros adicionales para el reporte
+            agregados: EstadisticasAgregadas ya calculadas del queryset (opcional)
         """
-        self.queryset = queryset or BienPatrimonial.objects.all()
+        self.queryset = queryset if queryset is not None else BienPatrimonial.objects.all()
         self.parametros = parametros or {}
+        self.agregados = agregados
         self.estadisticas = None
         self.graficos_generados = []
     
     def generar_estadisticas(self):
         """Genera todas las estadísticas necesarias"""
-        filtro = FiltroAvanzado()
-        self.estadisticas = filtro.obtener_estadisticas(self.queryset)
+        # Todos los desgloses salen de las mismas consultas agregadas
+        agregados = self.agregados or EstadisticasAgregadas(self.queryset)
+        self.estadisticas = FiltroAvanzado().obtener_estadisticas(agregados=agregados)
         
         # Estadísticas adicionales
         self.estadisticas.update({
-            'resumen_ejecutivo': GeneradorEstadisticas.generar_resumen_ejecutivo(self.queryset),
-            'alertas': GeneradorEstadisticas.generar_alertas_mantenimiento(self.queryset),
-            'tendencias': self._generar_tendencias(),
-            'comparativas': self._generar_comparativas(),
+            'resumen_ejecutivo': GeneradorEstadisticas.generar_resumen_ejecutivo(agregados=agregados),
+            'alertas': GeneradorEstadisticas.generar_alertas_mantenimiento(agregados=agregados),
+            'tendencias': self._generar_tendencias(agregados),
+            'comparativas': agregados.comparativas(),
         })
         
         return self.estadisticas
     
-    def _generar_tendencias(self):
+    def _generar_tendencias(self, agregados):
         """Genera análisis de tendencias temporales"""
         # Tendencias por año de registro
-        tendencias_año = list(self.queryset.extra(
-            select={'año': 'EXTRACT(year FROM created_at)'}
-        ).values('año').annotate(
-            total=Count('id')
-        ).order_by('año'))
-        
-        # Tendencias por mes (últimos 12 meses)
-        fecha_limite = timezone.now() - timedelta(days=365)
-        tendencias_mes = list(self.queryset.filter(
-            created_at__gte=fecha_limite
-        ).extra(
-            select={
-                'año': 'EXTRACT(year FROM created_at)',
-                'mes': 'EXTRACT(month FROM created_at)'
+        tendencias_año = agregados.por_año()
+        
+        # Evolución mensual (últimos 12 meses) desde las instantáneas diarias,
+        # que solo se incluye si los filtros del reporte pueden aplicarse a ellas
+        filtros = self.parametros.get('filtros') or {}
+        no_soportados = InstantaneaInventario.filtros_no_soportados(filtros)
+        if no_soportados:
+            return {
+                'por_año': tendencias_año,
+                'por_mes': [],
+                'variacion_mensual': None,
+                'filtros_no_soportados': no_soportados,
             }
-        ).values('año', 'mes').annotate(
-            total=Count('id')
-        ).order_by('año', 'mes'))
         
         return {
             'por_año': tendencias_año,
-            'por_mes': tendencias_mes,
+            'por_mes': InstantaneaInventario.serie_mensual(meses=12, filtros=filtros),
+            'variacion_mensual': InstantaneaInventario.comparativa_mensual(filtros=filtros),
         }
     
-    def _generar_comparativas(self):
-        """Genera análisis comparativos"""
-        # Comparativa por estado vs oficina
-        comparativa_estado_oficina = list(self.queryset.values(
-            'estado_bien', 'oficina__nombre'
-        ).annotate(
-            total=Count('id')
-        ).order_by('oficina__nombre', 'estado_bien'))
-        
-        # Comparativa por grupo vs estado
-        comparativa_grupo_estado = list(self.queryset.values(
-            'catalogo__grupo', 'estado_bien'
-        ).annotate(
-            total=Count('id')
-        ).order_by('catalogo__grupo', 'estado_bien'))
-        
-        return {
-            'estado_oficina': comparativa_estado_oficina,
-            'grupo_estado': comparativa_grupo_estado,
-        }
+    # Renderers de apps.reportes.graficos usados para cada gráfico
+    GRAFICOS = {
+        'estados': 'apps.reportes.graficos.graficar_estados',
+        'oficinas': 'apps.reportes.graficos.graficar_oficinas',
+        'tendencias': 'apps.reportes.graficos.graficar_tendencias',
+        'grupos': 'apps.reportes.graficos.graficar_grupos',
+    }
     
-    def generar_grafico_estados(self, archivo_salida=None):
-        """Genera gráfico de distribución por estados"""
-        if not self.estadisticas:
-            self.generar_estadisticas()
-        
-        # Preparar datos
-        estados_data = self.estadisticas['por_estado']
-        if not estados_data:
-            return None
-        
-        estados_nombres = []
-        estados_valores = []
-        estados_colores = []
-        
-        color_map = {
-            'N': '#28a745',  # Verde para Nuevo
-            'B': '#17a2b8',  # Azul para Bueno
-            'R': '#ffc107',  # Amarillo para Regular
-            'M': '#fd7e14',  # Naranja para Malo
-            'E': '#6f42c1',  # Púrpura para RAEE
-            'C': '#dc3545'   # Rojo para Chatarra
-        }
-        
-        estados_texto = {
-            'N': 'Nuevo',
-            'B': 'Bueno',
-            'R': 'Regular',
-            'M': 'Malo',
-            'E': 'RAEE',
-            'C': 'Chatarra'
-        }
-        
-        for estado in estados_data:
-            codigo = estado['estado_bien']
-            estados_nombres.append(estados_texto.get(codigo, codigo))
-            estados_valores.append(estado['total'])
-            estados_colores.append(color_map.get(codigo, '#6c757d'))
-        
-        # Crear gráfico
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # Gráfico de torta
-        wedges, texts, autotexts = ax1.pie(
-            estados_valores, 
-            labels=estados_nombres,
-            colors=estados_colores,
-            autopct='%1.1f%%',
-            startangle=90
-        )
-        ax1.set_title('Distribución de Bienes por Estado', fontsize=14, fontweight='bold')
-        
-        # Gráfico de barras
-        bars = ax2.bar(estados_nombres, estados_valores, color=estados_colores)
-        ax2.set_title('Cantidad de Bienes por Estado', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Cantidad de Bienes')
-        ax2.tick_params(axis='x', rotation=45)
-        
-        # Agregar valores en las barras
-        for bar in bars:
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(height)}',
-                    ha='center', va='bottom')
-        
-        plt.tight_layout()
-        
-        # Guardar archivo
-        if archivo_salida:
-            plt.savefig(archivo_salida, dpi=300, bbox_inches='tight')
-            self.graficos_generados.append(archivo_salida)
-        
-        return fig
+    TOP_OFICINAS = 10
+    TOP_GRUPOS = 8
     
-    def generar_grafico_oficinas(self, archivo_salida=None, top_n=10):
-        """Genera gráfico de distribución por oficinas"""
-        if not self.estadisticas:
-            self.generar_estadisticas()
-        
-        # Preparar datos (top N oficinas)
-        oficinas_data = self.estadisticas['por_oficina'][:top_n]
-        if not oficinas_data:
-            return None
-        
-        oficinas_nombres = [item['oficina__nombre'] or 'Sin nombre' for item in oficinas_data]
-        oficinas_valores = [item['total'] for item in oficinas_data]
-        
-        # Crear gráfico
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        bars = ax.barh(oficinas_nombres, oficinas_valores, color='skyblue')
-        ax.set_title(f'Top {top_n} Oficinas con Más Bienes', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Cantidad de Bienes')
-        
-        # Agregar valores en las barras
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width, bar.get_y() + bar.get_height()/2.,
-                   f'{int(width)}',
-                   ha='left', va='center', fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Guardar archivo
-        if archivo_salida:
-            plt.savefig(archivo_salida, dpi=300, bbox_inches='tight')
-            self.graficos_generados.append(archivo_salida)
+    def datos_graficos(self):
+        """
+        Datos de entrada de cada gráfico: (nombre, renderer, datos, opciones)
         
-        return fig
-    
-    def generar_grafico_tendencias(self, archivo_salida=None):
-        """Genera gráfico de tendencias temporales"""
+        Returns:
+            Lista de especificaciones para ChartCache.get_many
+        """
         if not self.estadisticas:
             self.generar_estadisticas()
         
         tendencias = self.estadisticas.get('tendencias', {})
-        tendencias_año = tendencias.get('por_año', [])
-        
-        if not tendencias_año:
-            return None
-        
-        # Preparar datos
-        años = [int(item['año']) for item in tendencias_año]
-        totales = [item['total'] for item in tendencias_año]
-        
-        # Crear gráfico
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        ax.plot(años, totales, marker='o', linewidth=2, markersize=8, color='#007bff')
-        ax.fill_between(años, totales, alpha=0.3, color='#007bff')
-        
-        ax.set_title('Tendencia de Registro de Bienes por Año', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Año')
-        ax.set_ylabel('Cantidad de Bienes Registrados')
-        ax.grid(True, alpha=0.3)
-        
-        # Agregar valores en los puntos
-        for x, y in zip(años, totales):
-            ax.annotate(f'{y}', (x, y), textcoords="offset points", 
-                       xytext=(0,10), ha='center', fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Guardar archivo
-        if archivo_salida:
-            plt.savefig(archivo_salida, dpi=300, bbox_inches='tight')
-            self.graficos_generados.append(archivo_salida)
-        
-        return fig
-    
-    def generar_grafico_grupos(self, archivo_salida=None, top_n=8):
-        """Genera gráfico de distribución por grupos de catálogo"""
-        if not self.estadisticas:
-            self.generar_estadisticas()
-        
-        # Preparar datos
-        grupos_data = self.estadisticas['por_grupo'][:top_n]
-        if not grupos_data:
-            return None
-        
-        grupos_nombres = []
-        grupos_valores = []
-        
-        for item in grupos_data:
-            grupo = item['catalogo__grupo'] or 'Sin grupo'
-            # Truncar nombres largos
-            if len(grupo) > 30:
-                grupo = grupo[:27] + '...'
-            grupos_nombres.append(grupo)
-            grupos_valores.append(item['total'])
-        
-        # Crear gráfico
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        bars = ax.bar(range(len(grupos_nombres)), grupos_valores, 
-                     color=plt.cm.Set3(range(len(grupos_nombres))))
-        
-        ax.set_title(f'Top {top_n} Grupos de Catálogo', fontsize=14, fontweight='bold')
-        ax.set_ylabel('Cantidad de Bienes')
-        ax.set_xticks(range(len(grupos_nombres)))
-        ax.set_xticklabels(grupos_nombres, rotation=45, ha='right')
-        
-        # Agregar valores en las barras
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                   f'{int(height)}',
-                   ha='center', va='bottom', fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Guardar archivo
-        if archivo_salida:
-            plt.savefig(archivo_salida, dpi=300, bbox_inches='tight')
-            self.graficos_generados.append(archivo_salida)
-        
-        return fig
+        datos = {
+            'estados': [
+                [item['estado_bien'], item['total']] for item in self.estadisticas['por_estado']
+            ],
+            'oficinas': [
+                [item['oficina__nombre'] or 'Sin nombre', item['total']]
+                for item in self.estadisticas['por_oficina'][:self.TOP_OFICINAS]
+            ],
+            'tendencias': {
+                'por_mes': [
+                    [f"{item['mes']:02d}/{item['año']}", item['total']]
+                    for item in tendencias.get('por_mes', [])
+                ],
+                'por_año': [[item['año'], item['total']] for item in tendencias.get('por_año', [])],
+            },
+            'grupos': [
+                [item['catalogo__grupo'] or 'Sin grupo', item['total']]
+                for item in self.estadisticas['por_grupo'][:self.TOP_GRUPOS]
+            ],
+        }
+        opciones = {
+            'oficinas': {'top_n': self.TOP_OFICINAS},
+            'grupos': {'top_n': self.TOP_GRUPOS},
+        }
+        return [
+            (nombre, renderer, datos[nombre], opciones.get(nombre))
+            for nombre, renderer in self.GRAFICOS.items()
+        ]
     
-    def generar_todos_los_graficos(self, directorio_salida=None):
-        """Genera todos los gráficos estadísticos"""
-        if not directorio_salida:
-            directorio_salida = os.path.join(settings.MEDIA_ROOT, 'reportes', 'graficos')
-        
-        os.makedirs(directorio_salida, exist_ok=True)
+    def generar_todos_los_graficos(self, directorio_salida=None, formato='png'):
+        """
+        Genera todos los gráficos estadísticos.
+        Las imágenes se reutilizan de la caché mientras los datos no cambien;
+        las que faltan se renderizan en paralelo.
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        Args:
+            directorio_salida: Directorio de la caché de gráficos (opcional)
+            formato: 'png' o 'svg'
         
-        graficos = {}
+        Returns:
+            Dict {nombre: ruta de la imagen}
+        """
+        from apps.core.chart_utils import ChartCache
         
         try:
-            # Gráfico de estados
-            archivo_estados = os.path.join(directorio_salida, f'estados_{timestamp}.png')
-            fig_estados = self.generar_grafico_estados(archivo_estados)
-            if fig_estados:
-                graficos['estados'] = archivo_estados
-                plt.close(fig_estados)
-            
-            # Gráfico de oficinas
-            archivo_oficinas = os.path.join(directorio_salida, f'oficinas_{timestamp}.png')
-            fig_oficinas = self.generar_grafico_oficinas(archivo_oficinas)
-            if fig_oficinas:
-                graficos['oficinas'] = archivo_oficinas
-                plt.close(fig_oficinas)
-            
-            # Gráfico de tendencias
-            archivo_tendencias = os.path.join(directorio_salida, f'tendencias_{timestamp}.png')
-            fig_tendencias = self.generar_grafico_tendencias(archivo_tendencias)
-            if fig_tendencias:
-                graficos['tendencias'] = archivo_tendencias
-                plt.close(fig_tendencias)
-            
-            # Gráfico de grupos
-            archivo_grupos = os.path.join(directorio_salida, f'grupos_{timestamp}.png')
-            fig_grupos = self.generar_grafico_grupos(archivo_grupos)
-            if fig_grupos:
-                graficos['grupos'] = archivo_grupos
-                plt.close(fig_grupos)
-            
+            rutas = ChartCache(directory=directorio_salida).get_many(self.datos_graficos(), formato)
         except Exception as e:
             logger.error(f"Error generando gráficos: {str(e)}")
             raise
         
+        graficos = {nombre: ruta for nombre, ruta in rutas.items() if ruta}
+        self.graficos_generados.extend(graficos.values())
         return graficos
 
 
@@ -447,12 +257,9 @@ class GeneradorReportePDF:
         # Alertas y recomendaciones
         story.extend(self._generar_alertas_recomendaciones(estadisticas))
         
-        # Construir PDF
+        # Construir PDF (las imágenes quedan en la caché de gráficos)
         doc.build(story)
         
-        # Limpiar archivos temporales de gráficos
-        self._limpiar_graficos_temporales(graficos)
-        
         return archivo_salida
     
     def _generar_portada(self, estadisticas):
@@ -626,6 +433,35 @@ class GeneradorReportePDF:
                 story.append(parrafo_analisis)
                 story.append(Spacer(1, 20))
         
+        # La evolución mensual se omite si no refleja los filtros del reporte
+        no_soportados = estadisticas.get('tendencias', {}).get('filtros_no_soportados')
+        if no_soportados:
+            texto = (
+                "<b>Evolución Mensual:</b> no se incluye porque los filtros "
+                f"{', '.join(no_soportados)} no pueden aplicarse al historial del inventario."
+            )
+            story.append(Paragraph(texto, self.styles['TextoNormal']))
+            story.append(Spacer(1, 20))
+        
+        # Comparativa con el mes anterior (instantáneas diarias)
+        variacion = estadisticas.get('tendencias', {}).get('variacion_mensual')
+        if variacion:
+            lineas = []
+            for clave, etiqueta in [
+                ('total_bienes', 'Total de bienes'),
+                ('valor_total', 'Valor total (S/)'),
+                ('bienes_requieren_atencion', 'Bienes que requieren atención'),
+            ]:
+                cambio = variacion['variacion'][clave]
+                porcentaje = f" ({cambio['porcentaje']:+.2f}%)" if cambio['porcentaje'] is not None else ""
+                lineas.append(
+                    f"• {etiqueta}: {variacion['actual'][clave]:,} frente a "
+                    f"{variacion['anterior'][clave]:,}{porcentaje}"
+                )
+            texto = "<b>Comparativa Mensual:</b><br/>" + "<br/>".join(lineas)
+            story.append(Paragraph(texto, self.styles['TextoNormal']))
+            story.append(Spacer(1, 20))
+        
         return story
     
     def _generar_alertas_recomendaciones(self, estadisticas):
@@ -695,46 +531,409 @@ class GeneradorReportePDF:
         story.append(Spacer(1, 20))
         
         return story
+
+
+class GeneradorListadoPDF:
+    """
+    Generador del listado de inventario en PDF con memoria acotada
+    
+    Las filas se leen de la base de datos por lotes y se dibujan página por
+    página en tablas de tamaño fijo, sin construir un story con todo el
+    listado. Los listados extensos se dividen en rangos de páginas que se
+    generan en procesos separados y se unen al final (requiere pypdf; sin
+    él, o dentro de un proceso daemon como un worker prefork de Celery,
+    todas las páginas se generan en un solo proceso).
+    """
+    
+    # Columnas del listado: (título, columna consultada, ancho en puntos)
+    COLUMNAS = [
+        ('Código', 'codigo_patrimonial', 78),
+        ('Denominación', 'catalogo__denominacion', 196),
+        ('Estado', 'estado_bien', 52),
+        ('Marca', 'marca', 78),
+        ('Modelo', 'modelo', 78),
+        ('Serie', 'serie', 78),
+        ('Oficina', 'oficina__nombre', 150),
+        ('Valor (S/)', 'valor_adquisicion', 62),
+    ]
+    
+    TAMAÑO_PAGINA = landscape(A4)
+    MARGEN = 30
+    ALTO_ENCABEZADO = 60
+    ALTO_FILA = 14
+    FILAS_POR_PAGINA = 32
+    
+    # Ancho promedio de un carácter en la fuente de la tabla, para truncar
+    ANCHO_CARACTER = 4.4
+    
+    # Filas leídas de la base de datos por cada viaje
+    TAMAÑO_LOTE = 2000
+    
+    # Páginas generadas por cada proceso
+    PAGINAS_POR_PARTE = 250
+    PROCESOS = getattr(settings, 'REPORTES_PROCESOS_PDF', min(4, os.cpu_count() or 1))
+    
+    # Estilo compartido por las tablas de todas las páginas
+    ESTILO_TABLA = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('ALIGN', (-1, 1), (-1, -1), 'RIGHT'),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, HexColor('#f2f2f2')]),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ])
+    
+    def __init__(self, queryset=None, parametros=None):
+        """
+        Inicializa el generador del listado
+        
+        Args:
+            queryset: QuerySet de bienes
+            parametros: Parámetros del reporte
+        """
+        self.queryset = queryset if queryset is not None else BienPatrimonial.objects.all()
+        self.parametros = parametros or {}
+    
+    def generar_reporte_completo(self, archivo_salida):
+        """
+        Genera el listado PDF completo
+        
+        Args:
+            archivo_salida: Ruta del archivo PDF a generar
+            
+        Returns:
+            str: Ruta del archivo generado
+        """
+        queryset = self.queryset.order_by('codigo_patrimonial')
+        total = queryset.count()
+        total_paginas = max(1, math.ceil(total / self.FILAS_POR_PAGINA))
+        encabezado = self._encabezado(total)
+        
+        filas_por_parte = self.PAGINAS_POR_PARTE * self.FILAS_POR_PAGINA
+        partes = math.ceil(total / filas_por_parte)
+        if partes > 1 and self._union_disponible() and can_spawn_processes():
+            rangos = self._rangos_codigo(queryset, filas_por_parte, partes)
+            self._generar_por_partes(queryset, rangos, archivo_salida, total_paginas, encabezado)
+        else:
+            self.dibujar_paginas(self.iterar_filas(queryset), archivo_salida, 1, total_paginas, encabezado)
+        
+        logger.info(f"Listado PDF generado: {total} bienes en {total_paginas} páginas")
+        return archivo_salida
+    
+    def _generar_por_partes(self, queryset, rangos, archivo_salida, total_paginas, encabezado):
+        """Genera rangos de páginas en paralelo y los une en el archivo final"""
+        from pypdf import PdfWriter
+        
+        directorio = tempfile.mkdtemp(prefix='patrimonio_pdf_')
+        try:
+            argumentos = []
+            for numero, filtros in enumerate(rangos):
+                argumentos.append((
+                    queryset.query,
+                    filtros,
+                    os.path.join(directorio, f'parte_{numero:04d}.pdf'),
+                    numero * self.PAGINAS_POR_PARTE + 1,
+                    total_paginas,
+                    encabezado,
+                ))
+            
+            procesos = min(self.PROCESOS, len(argumentos))
+            if procesos > 1:
+                # Las conexiones abiertas no deben compartirse con los procesos hijos
+                from django.db import connections
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso_pdf) as pool:
+                    list(pool.map(generar_parte_listado_pdf, *zip(*argumentos)))
+            else:
+                for args in argumentos:
+                    generar_parte_listado_pdf(*args)
+            
+            escritor = PdfWriter()
+            for args in argumentos:
+                escritor.append(args[2])
+            with open(archivo_salida, 'wb') as salida:
+                escritor.write(salida)
+            escritor.close()
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    
+    @staticmethod
+    def _rangos_codigo(queryset, filas_por_parte, partes):
+        """
+        Calcula rangos consecutivos de código patrimonial con
+        filas_por_parte bienes cada uno
+        
+        Cada límite se obtiene con una consulta sobre el índice del código,
+        sin leer los bienes intermedios.
+        
+        Returns:
+            list: Filtros de cada rango
+        """
+        codigos = queryset.values_list('codigo_patrimonial', flat=True)
+        rangos = []
+        filtros = {}
+        
+        for _ in range(partes - 1):
+            pendientes = codigos.filter(**filtros)
+            limite = list(pendientes[filas_por_parte - 1:filas_por_parte])
+            if not limite:
+                break
+            rangos.append(dict(filtros, codigo_patrimonial__lte=limite[0]))
+            filtros = {'codigo_patrimonial__gt': limite[0]}
+        
+        rangos.append(filtros)
+        return rangos
     
-    def _limpiar_graficos_temporales(self, graficos):
-        """Limpia los archivos temporales de gráficos"""
-        for archivo in graficos.values():
-            try:
-                if os.path.exists(archivo):
-                    os.remove(archivo)
-            except Exception as e:
-                logger.warning(f"No se pudo eliminar archivo temporal {archivo}: {str(e)}")
+    @staticmethod
+    def _union_disponible():
+        """Indica si está instalado pypdf para unir las partes"""
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    
+    def _encabezado(self, total):
+        """Texto de encabezado repetido en cada página"""
+        return (
+            f"Generado el {datetime.now().strftime('%d/%m/%Y %H:%M')} - "
+            f"Total de bienes: {total:,}"
+        )
+    
+    @classmethod
+    def iterar_filas(cls, queryset):
+        """
+        Itera los bienes como filas de texto listas para la tabla
+        
+        Args:
+            queryset: QuerySet de bienes ya ordenado
+            
+        Yields:
+            Listas de celdas en el orden de COLUMNAS
+        """
+        estados = dict(BienPatrimonial.ESTADOS_BIEN)
+        columnas = [columna for _, columna, _ in cls.COLUMNAS]
+        limites = [int((ancho - 6) / cls.ANCHO_CARACTER) for _, _, ancho in cls.COLUMNAS]
+        indice_estado = columnas.index('estado_bien')
+        indice_valor = columnas.index('valor_adquisicion')
+        
+        for fila in queryset.values_list(*columnas).iterator(chunk_size=cls.TAMAÑO_LOTE):
+            celdas = ['' if valor is None else str(valor) for valor in fila]
+            celdas[indice_estado] = estados.get(fila[indice_estado], celdas[indice_estado])
+            celdas[indice_valor] = f"{fila[indice_valor]:,.2f}" if fila[indice_valor] is not None else ''
+            yield [
+                celda if len(celda) <= limite else celda[:limite - 1] + '…'
+                for celda, limite in zip(celdas, limites)
+            ]
+    
+    @classmethod
+    def dibujar_paginas(cls, filas, archivo_salida, pagina_inicial=1, total_paginas=None, encabezado=''):
+        """
+        Dibuja las filas en páginas de FILAS_POR_PAGINA filas
+        
+        Cada página se dibuja en el lienzo y se descarta, por lo que solo
+        hay una tabla en memoria a la vez.
+        
+        Args:
+            filas: Iterable de filas de iterar_filas
+            archivo_salida: Ruta del archivo PDF
+            pagina_inicial: Número de la primera página
+            total_paginas: Total de páginas del listado completo
+            encabezado: Texto del encabezado de cada página
+            
+        Returns:
+            int: Número de páginas dibujadas
+        """
+        ancho, alto = cls.TAMAÑO_PAGINA
+        titulos = [titulo for titulo, _, _ in cls.COLUMNAS]
+        anchos = [ancho_columna for _, _, ancho_columna in cls.COLUMNAS]
+        
+        lienzo = canvas.Canvas(archivo_salida, pagesize=cls.TAMAÑO_PAGINA, pageCompression=1)
+        lienzo.setTitle('Listado de Inventario Patrimonial')
+        
+        filas = iter(filas)
+        paginas = 0
+        while True:
+            bloque = list(islice(filas, cls.FILAS_POR_PAGINA))
+            if not bloque and paginas:
+                break
+            
+            numero = pagina_inicial + paginas
+            cls._dibujar_encabezado(lienzo, encabezado, numero, total_paginas or numero)
+            
+            tabla = Table([titulos] + bloque, colWidths=anchos, rowHeights=cls.ALTO_FILA)
+            tabla.setStyle(cls.ESTILO_TABLA)
+            _, alto_tabla = tabla.wrapOn(lienzo, ancho, alto)
+            tabla.drawOn(lienzo, cls.MARGEN, alto - cls.MARGEN - cls.ALTO_ENCABEZADO - alto_tabla)
+            
+            lienzo.showPage()
+            paginas += 1
+        
+        lienzo.save()
+        return paginas
+    
+    @classmethod
+    def _dibujar_encabezado(cls, lienzo, encabezado, numero, total_paginas):
+        """Dibuja el título y la numeración de una página"""
+        ancho, alto = cls.TAMAÑO_PAGINA
+        superior = alto - cls.MARGEN
+        
+        lienzo.setFillColor(colors.darkblue)
+        lienzo.setFont('Helvetica-Bold', 14)
+        lienzo.drawString(cls.MARGEN, superior - 14, 'LISTADO DE INVENTARIO PATRIMONIAL')
+        
+        lienzo.setFillColor(colors.black)
+        lienzo.setFont('Helvetica', 8)
+        lienzo.drawString(
+            cls.MARGEN, superior - 30,
+            'Dirección Regional de Transportes y Comunicaciones - Puno'
+        )
+        lienzo.drawString(cls.MARGEN, superior - 42, encabezado)
+        lienzo.drawRightString(ancho - cls.MARGEN, superior - 42, f'Página {numero} de {total_paginas}')
+
+
+def _inicializar_proceso_pdf():
+    """Prepara Django en un proceso del pool de páginas PDF"""
+    import django
+    django.setup()
+
+
+def generar_parte_listado_pdf(consulta, filtros, archivo_salida, pagina_inicial, total_paginas, encabezado):
+    """
+    Genera un rango de páginas del listado de inventario
+    
+    Args:
+        consulta: Query del QuerySet ordenado del listado
+        filtros: Filtros del rango de códigos de la parte
+        archivo_salida: Ruta del PDF de la parte
+        pagina_inicial: Número de la primera página de la parte
+        total_paginas: Total de páginas del listado
+        encabezado: Texto del encabezado de cada página
+        
+    Returns:
+        int: Número de páginas generadas
+    """
+    queryset = BienPatrimonial.objects.all()
+    queryset.query = consulta
+    return GeneradorListadoPDF.dibujar_paginas(
+        GeneradorListadoPDF.iterar_filas(queryset.filter(**filtros)),
+        archivo_salida,
+        pagina_inicial,
+        total_paginas,
+        encabezado
+    )
 
 
 class GeneradorIndicadoresClave:
-    """Generador de indicadores clave de rendimiento (KPIs)"""
+    """
+    Generador de indicadores clave de rendimiento (KPIs).
+    
+    Los indicadores se declaran como expresiones de agregación: los KPIs
+    de un ámbito se calculan en una sola consulta y los KPIs por oficina
+    en una única consulta agrupada, sin recorrer los bienes en Python.
+    """
+    
+    ESTADOS_OPERATIVOS = ['N', 'B', 'R']
+    ESTADOS_ATENCION = ['M', 'E', 'C']
+    DIAS_POR_AÑO = 365.25
     
     def __init__(self, queryset=None):
-        self.queryset = queryset or BienPatrimonial.objects.all()
+        self.queryset = queryset if queryset is not None else BienPatrimonial.objects.all()
+    
+    def expresiones_kpi(self):
+        """
+        Expresiones de agregación de los indicadores
+        
+        Returns:
+            Dict {alias: expresión} válido para aggregate() o annotate()
+        """
+        fecha_actual = timezone.now().date()
+        expresiones = {
+            'total_bienes': Count('id'),
+            'bienes_operativos': Count('id', filter=Q(estado_bien__in=self.ESTADOS_OPERATIVOS)),
+            'bienes_requieren_atencion': Count('id', filter=Q(estado_bien__in=self.ESTADOS_ATENCION)),
+            'valor_total_inventario': Sum('valor_adquisicion'),
+            'valor_promedio_bien': Avg('valor_adquisicion'),
+            'con_valor': Count('id', filter=Q(valor_adquisicion__isnull=False)),
+            'con_fecha': Count('id', filter=Q(fecha_adquisicion__isnull=False)),
+            'con_serie': Count('id', filter=~Q(serie='')),
+            # Antigüedad media como intervalo: AVG(fecha_actual - fecha_adquisicion)
+            'antiguedad_media': Avg(ExpressionWrapper(
+                Value(fecha_actual) - F('fecha_adquisicion'),
+                output_field=DurationField()
+            )),
+        }
+        for codigo, _ in BienPatrimonial.ESTADOS_BIEN:
+            expresiones[f'estado_{codigo}'] = Count('id', filter=Q(estado_bien=codigo))
+        return expresiones
     
     def calcular_kpis(self):
         """Calcula todos los KPIs del sistema"""
-        total_bienes = self.queryset.count()
+        valores = self.queryset.order_by().aggregate(
+            cobertura_oficinas=Count('oficina', distinct=True),
+            **self.expresiones_kpi()
+        )
         
-        if total_bienes == 0:
+        if valores['total_bienes'] == 0:
             return self._kpis_vacios()
         
-        # KPIs básicos
+        kpis = self._construir_kpis(valores)
+        kpis['cobertura_oficinas'] = valores['cobertura_oficinas']
+        kpis['tendencia_registro'] = self._calcular_tendencia_registro()
+        return kpis
+    
+    def calcular_kpis_por_oficina(self):
+        """
+        Calcula los KPIs de cada oficina en una única consulta agrupada
+        
+        Returns:
+            Lista de dicts con oficina_id, oficina_codigo, oficina_nombre y los KPIs
+        """
+        filas = self.queryset.order_by().values(
+            'oficina_id', 'oficina__codigo', 'oficina__nombre'
+        ).annotate(**self.expresiones_kpi()).order_by('oficina__nombre')
+        
+        return [
+            {
+                'oficina_id': fila['oficina_id'],
+                'oficina_codigo': fila['oficina__codigo'],
+                'oficina_nombre': fila['oficina__nombre'],
+                **self._construir_kpis(fila),
+            }
+            for fila in filas
+        ]
+    
+    def _construir_kpis(self, valores):
+        """Convierte los valores agregados en el diccionario de KPIs"""
+        total = valores['total_bienes']
+        antiguedad = valores['antiguedad_media']
+        
         kpis = {
-            'total_bienes': total_bienes,
-            'bienes_operativos': self._calcular_bienes_operativos(),
-            'bienes_requieren_atencion': self._calcular_bienes_atencion(),
-            'valor_total_inventario': self._calcular_valor_total(),
-            'valor_promedio_bien': self._calcular_valor_promedio(),
-            'distribucion_estados': self._calcular_distribucion_estados(),
-            'cobertura_oficinas': self._calcular_cobertura_oficinas(),
-            'completitud_datos': self._calcular_completitud_datos(),
-            'antiguedad_promedio': self._calcular_antiguedad_promedio(),
-            'tendencia_registro': self._calcular_tendencia_registro(),
+            'total_bienes': total,
+            'bienes_operativos': valores['bienes_operativos'],
+            'bienes_requieren_atencion': valores['bienes_requieren_atencion'],
+            'valor_total_inventario': valores['valor_total_inventario'] or 0,
+            'valor_promedio_bien': valores['valor_promedio_bien'] or 0,
+            'distribucion_estados': {
+                codigo: valores[f'estado_{codigo}']
+                for codigo, _ in sorted(BienPatrimonial.ESTADOS_BIEN)
+                if valores[f'estado_{codigo}']
+            },
+            'completitud_datos': round(
+                (valores['con_valor'] + valores['con_fecha'] + valores['con_serie']) / (total * 3) * 100, 2
+            ) if total else 0,
+            'antiguedad_promedio': round(
+                antiguedad.total_seconds() / 86400 / self.DIAS_POR_AÑO, 1
+            ) if antiguedad is not None else 0,
         }
         
         # Calcular porcentajes
-        kpis.update(self._calcular_porcentajes(kpis, total_bienes))
+        kpis.update(self._calcular_porcentajes(kpis, total))
         
         return kpis
     
@@ -753,86 +952,13 @@ class GeneradorIndicadoresClave:
             'tendencia_registro': [],
         }
     
-    def _calcular_bienes_operativos(self):
-        """Calcula bienes en estado operativo (N, B, R)"""
-        return self.queryset.filter(estado_bien__in=['N', 'B', 'R']).count()
-    
-    def _calcular_bienes_atencion(self):
-        """Calcula bienes que requieren atención (M, E, C)"""
-        return self.queryset.filter(estado_bien__in=['M', 'E', 'C']).count()
-    
-    def _calcular_valor_total(self):
-        """Calcula el valor total del inventario"""
-        resultado = self.queryset.aggregate(
-            total=Sum('valor_adquisicion')
-        )
-        return resultado['total'] or 0
-    
-    def _calcular_valor_promedio(self):
-        """Calcula el valor promedio por bien"""
-        resultado = self.queryset.aggregate(
-            promedio=Avg('valor_adquisicion')
-        )
-        return resultado['promedio'] or 0
-    
-    def _calcular_distribucion_estados(self):
-        """Calcula la distribución por estados"""
-        distribucion = self.queryset.values('estado_bien').annotate(
-            total=Count('id')
-        ).order_by('estado_bien')
-        
-        return {item['estado_bien']: item['total'] for item in distribucion}
-    
-    def _calcular_cobertura_oficinas(self):
-        """Calcula el número de oficinas con bienes asignados"""
-        return self.queryset.values('oficina').distinct().count()
-    
-    def _calcular_completitud_datos(self):
-        """Calcula el porcentaje de completitud de datos críticos"""
-        total = self.queryset.count()
-        if total == 0:
-            return 0
-        
-        # Campos críticos que deben estar completos
-        con_valor = self.queryset.filter(valor_adquisicion__isnull=False).count()
-        con_fecha = self.queryset.filter(fecha_adquisicion__isnull=False).count()
-        con_serie = self.queryset.exclude(serie='').count()
-        
-        # Promedio de completitud
-        completitud = ((con_valor + con_fecha + con_serie) / (total * 3)) * 100
-        return round(completitud, 2)
-    
-    def _calcular_antiguedad_promedio(self):
-        """Calcula la antigüedad promedio de los bienes"""
-        bienes_con_fecha = self.queryset.filter(fecha_adquisicion__isnull=False)
-        if not bienes_con_fecha.exists():
-            return 0
-        
-        from django.utils import timezone
-        fecha_actual = timezone.now().date()
-        
-        total_dias = 0
-        count = 0
-        
-        for bien in bienes_con_fecha:
-            dias = (fecha_actual - bien.fecha_adquisicion).days
-            total_dias += dias
-            count += 1
-        
-        if count == 0:
-            return 0
-        
-        return round(total_dias / count / 365.25, 1)  # Años
-    
     def _calcular_tendencia_registro(self):
         """Calcula la tendencia de registro de bienes"""
-        tendencia = list(self.queryset.extra(
-            select={'año': 'EXTRACT(year FROM created_at)'}
+        return list(self.queryset.order_by().annotate(
+            año=Extract('created_at', 'year')
         ).values('año').annotate(
             total=Count('id')
         ).order_by('año'))
-        
-        return tendencia
     
     def _calcular_porcentajes(self, kpis, total):
         """Calcula porcentajes basados en los KPIs"""
@@ -843,4 +969,4 @@ class GeneradorIndicadoresClave:
             'porcentaje_operativos': round((kpis['bienes_operativos'] / total) * 100, 2),
             'porcentaje_atencion': round((kpis['bienes_requieren_atencion'] / total) * 100, 2),
             'porcentaje_completitud': kpis['completitud_datos'],
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,184 @@
+"""
+Funciones de dibujo de los gráficos estadísticos.
+
+Son funciones de nivel de módulo con firma (datos, opciones, formato)
+que devuelven los bytes de la imagen, de modo que ChartCache pueda
+ejecutarlas en procesos separados y guardar el resultado en caché.
+"""
+import io
+
+import matplotlib
+matplotlib.use('Agg')  # Use non-interactive backend
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# Configurar estilo de matplotlib
+plt.style.use('seaborn-v0_8')
+sns.set_palette("husl")
+
+COLORES_ESTADO = {
+    'N': '#28a745',  # Verde para Nuevo
+    'B': '#17a2b8',  # Azul para Bueno
+    'R': '#ffc107',  # Amarillo para Regular
+    'M': '#fd7e14',  # Naranja para Malo
+    'E': '#6f42c1',  # Púrpura para RAEE
+    'C': '#dc3545'   # Rojo para Chatarra
+}
+
+TEXTO_ESTADO = {
+    'N': 'Nuevo',
+    'B': 'Bueno',
+    'R': 'Regular',
+    'M': 'Malo',
+    'E': 'RAEE',
+    'C': 'Chatarra'
+}
+
+DPI_PREDETERMINADO = 300
+
+
+def _exportar(fig, opciones, formato):
+    """Serializa la figura en el formato pedido y la cierra"""
+    salida = io.BytesIO()
+    try:
+        fig.tight_layout()
+        fig.savefig(salida, format=formato, dpi=opciones.get('dpi', DPI_PREDETERMINADO), bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return salida.getvalue()
+
+
+def graficar_estados(datos, opciones, formato):
+    """
+    Distribución por estado (torta y barras)
+
+    Args:
+        datos: Lista de [codigo_estado, total]
+    """
+    if not datos:
+        return None
+
+    nombres = [TEXTO_ESTADO.get(codigo, codigo) for codigo, _ in datos]
+    valores = [total for _, total in datos]
+    colores = [COLORES_ESTADO.get(codigo, '#6c757d') for codigo, _ in datos]
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+    # Gráfico de torta
+    ax1.pie(valores, labels=nombres, colors=colores, autopct='%1.1f%%', startangle=90)
+    ax1.set_title('Distribución de Bienes por Estado', fontsize=14, fontweight='bold')
+
+    # Gráfico de barras
+    bars = ax2.bar(nombres, valores, color=colores)
+    ax2.set_title('Cantidad de Bienes por Estado', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Cantidad de Bienes')
+    ax2.tick_params(axis='x', rotation=45)
+
+    # Agregar valores en las barras
+    for bar in bars:
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width() / 2., height, f'{int(height)}', ha='center', va='bottom')
+
+    return _exportar(fig, opciones, formato)
+
+
+def graficar_oficinas(datos, opciones, formato):
+    """
+    Oficinas con más bienes (barras horizontales)
+
+    Args:
+        datos: Lista de [nombre_oficina, total]
+    """
+    if not datos:
+        return None
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    bars = ax.barh([nombre for nombre, _ in datos], [total for _, total in datos], color='skyblue')
+    ax.set_title(f"Top {opciones.get('top_n', len(datos))} Oficinas con Más Bienes", fontsize=14, fontweight='bold')
+    ax.set_xlabel('Cantidad de Bienes')
+
+    # Agregar valores en las barras
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width, bar.get_y() + bar.get_height() / 2., f'{int(width)}',
+                ha='left', va='center', fontweight='bold')
+
+    return _exportar(fig, opciones, formato)
+
+
+def graficar_tendencias(datos, opciones, formato):
+    """
+    Evolución mensual del inventario o, sin historial suficiente,
+    registros por año
+
+    Args:
+        datos: Dict con 'por_mes' (lista de [etiqueta, total]) y
+            'por_año' (lista de [año, total])
+    """
+    por_mes = datos.get('por_mes') or []
+    por_año = datos.get('por_año') or []
+
+    if len(por_mes) >= 2:
+        etiquetas = [etiqueta for etiqueta, _ in por_mes]
+        totales = [total for _, total in por_mes]
+        ejes = list(range(len(etiquetas)))
+        titulo, eje_x, eje_y = 'Evolución Mensual del Inventario', 'Mes', 'Cantidad de Bienes'
+    elif por_año:
+        etiquetas = None
+        ejes = [int(año) for año, _ in por_año]
+        totales = [total for _, total in por_año]
+        titulo, eje_x, eje_y = 'Tendencia de Registro de Bienes por Año', 'Año', 'Cantidad de Bienes Registrados'
+    else:
+        return None
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    ax.plot(ejes, totales, marker='o', linewidth=2, markersize=8, color='#007bff')
+    ax.fill_between(ejes, totales, alpha=0.3, color='#007bff')
+    if etiquetas:
+        ax.set_xticks(ejes)
+        ax.set_xticklabels(etiquetas, rotation=45)
+
+    ax.set_title(titulo, fontsize=14, fontweight='bold')
+    ax.set_xlabel(eje_x)
+    ax.set_ylabel(eje_y)
+    ax.grid(True, alpha=0.3)
+
+    # Agregar valores en los puntos
+    for x, y in zip(ejes, totales):
+        ax.annotate(f'{y}', (x, y), textcoords="offset points", xytext=(0, 10), ha='center', fontweight='bold')
+
+    return _exportar(fig, opciones, formato)
+
+
+def graficar_grupos(datos, opciones, formato):
+    """
+    Grupos de catálogo con más bienes (barras)
+
+    Args:
+        datos: Lista de [nombre_grupo, total]
+    """
+    if not datos:
+        return None
+
+    # Truncar nombres largos
+    nombres = [grupo if len(grupo) <= 30 else grupo[:27] + '...' for grupo, _ in datos]
+    valores = [total for _, total in datos]
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    bars = ax.bar(range(len(nombres)), valores, color=plt.cm.Set3(range(len(nombres))))
+
+    ax.set_title(f"Top {opciones.get('top_n', len(datos))} Grupos de Catálogo", fontsize=14, fontweight='bold')
+    ax.set_ylabel('Cantidad de Bienes')
+    ax.set_xticks(range(len(nombres)))
+    ax.set_xticklabels(nombres, rotation=45, ha='right')
+
+    # Agregar valores en las barras
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height, f'{int(height)}',
+                ha='center', va='bottom', fontweight='bold')
+
+    return _exportar(fig, opciones, formato)
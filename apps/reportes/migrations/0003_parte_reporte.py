@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-18 23:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0002_configuracionfiltro_deleted_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParteReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indice', models.PositiveIntegerField(help_text='Posición de la parte dentro del reporte', verbose_name='Índice')),
+                ('titulo', models.CharField(help_text='Nombre de la parte en el archivo final', max_length=100, verbose_name='Título')),
+                ('filtros', models.JSONField(default=dict, help_text='Condiciones que delimitan los bienes de la parte', verbose_name='Filtros')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('GENERANDO', 'Generando'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=15, verbose_name='Estado')),
+                ('total_registros', models.PositiveIntegerField(default=0, verbose_name='Total de Registros')),
+                ('archivo', models.CharField(blank=True, help_text='Ruta de la parte generada en el almacenamiento', max_length=255, verbose_name='Archivo')),
+                ('fecha_completado', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Completado')),
+                ('mensaje_error', models.TextField(blank=True, verbose_name='Mensaje de Error')),
+                ('reporte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='partes', to='reportes.reportegenerado', verbose_name='Reporte')),
+            ],
+            options={
+                'verbose_name': 'Parte de Reporte',
+                'verbose_name_plural': 'Partes de Reportes',
+                'ordering': ['reporte', 'indice'],
+                'constraints': [models.UniqueConstraint(fields=('reporte', 'indice'), name='reportes_parte_unica')],
+            },
+        ),
+    ]
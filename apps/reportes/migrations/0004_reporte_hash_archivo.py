@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0003_parte_reporte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='hash_archivo',
+            field=models.CharField(blank=True, help_text='SHA-256 del archivo generado, usado como ETag en la descarga', max_length=64, verbose_name='Hash del Archivo'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.3 on 2026-10-18 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0004_reporte_hash_archivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtefactoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='Hash del contenido lógico del reporte', max_length=64, unique=True, verbose_name='Clave')),
+                ('archivo', models.FileField(upload_to='reportes/', verbose_name='Archivo')),
+                ('hash_archivo', models.CharField(blank=True, max_length=64, verbose_name='Hash del Archivo')),
+                ('total_registros', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de Registros')),
+                ('referencias', models.PositiveIntegerField(default=0, help_text='Reportes que utilizan el archivo', verbose_name='Referencias')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_expiracion', models.DateTimeField(blank=True, help_text='Expiración más lejana entre los reportes que lo utilizan', null=True, verbose_name='Fecha de Expiración')),
+            ],
+            options={
+                'verbose_name': 'Artefacto de Reporte',
+                'verbose_name_plural': 'Artefactos de Reportes',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='clave_contenido',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash de tipo, formato, parámetros y versión de datos del reporte', max_length=64, verbose_name='Clave de Contenido'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='artefacto',
+            field=models.ForeignKey(blank=True, help_text='Archivo compartido con otros reportes de igual contenido', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes', to='reportes.artefactoreporte', verbose_name='Artefacto'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-19 00:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oficinas', '0003_oficina_deleted_at_oficina_deleted_by_and_more'),
+        ('reportes', '0005_artefacto_reporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstantaneaInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día al que corresponde la instantánea', verbose_name='Fecha')),
+                ('estado_bien', models.CharField(max_length=1, verbose_name='Estado del Bien')),
+                ('grupo', models.CharField(blank=True, max_length=50, verbose_name='Grupo de Catálogo')),
+                ('total_bienes', models.PositiveIntegerField(default=0, verbose_name='Total de Bienes')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Valor Total')),
+                ('oficina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='oficinas.oficina', verbose_name='Oficina')),
+            ],
+            options={
+                'verbose_name': 'Instantánea de Inventario',
+                'verbose_name_plural': 'Instantáneas de Inventario',
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['fecha', 'estado_bien'], name='reportes_in_fecha_02580e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'oficina', 'estado_bien', 'grupo'), name='reportes_instantanea_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0006_instantanea_inventario'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportegenerado',
+            name='tipo_reporte',
+            field=models.CharField(choices=[('INVENTARIO', 'Inventario General'), ('POR_OFICINA', 'Inventario por Oficina'), ('ESTADISTICO', 'Reporte Estadístico'), ('EJECUTIVO', 'Reporte Ejecutivo'), ('STICKERS', 'Plantilla de Stickers'), ('PERSONALIZADO', 'Reporte Personalizado')], help_text='Tipo de reporte generado', max_length=20, verbose_name='Tipo de Reporte'),
+        ),
+    ]
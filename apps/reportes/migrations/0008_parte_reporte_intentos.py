@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0007_reporte_por_oficina'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partereporte',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Veces que se inició la generación de la parte', verbose_name='Intentos'),
+        ),
+    ]
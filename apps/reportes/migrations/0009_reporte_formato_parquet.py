@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0008_parte_reporte_intentos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportegenerado',
+            name='formato',
+            field=models.CharField(choices=[('EXCEL', 'Excel (.xlsx)'), ('PDF', 'PDF'), ('CSV', 'CSV'), ('ZPL', 'Plantilla ZPL'), ('PARQUET', 'Parquet (.parquet)')], help_text='Formato de exportación del reporte', max_length=10, verbose_name='Formato'),
+        ),
+    ]
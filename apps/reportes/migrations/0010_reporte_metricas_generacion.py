@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-19 00:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0009_reporte_formato_parquet'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='duracion_generacion',
+            field=models.FloatField(blank=True, help_text='Segundos que tomó generar el archivo, sin el tiempo en cola', null=True, verbose_name='Duración de Generación'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='incluye_graficos',
+            field=models.BooleanField(default=False, help_text='Si el archivo generado incluye gráficos', verbose_name='Incluye Gráficos'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='memoria_pico',
+            field=models.PositiveIntegerField(blank=True, help_text='Memoria máxima del proceso que generó el archivo', null=True, verbose_name='Memoria Pico (KB)'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='total_columnas',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Columnas por registro exportado', null=True, verbose_name='Total de Columnas'),
+        ),
+        migrations.AddIndex(
+            model_name='reportegenerado',
+            index=models.Index(fields=['formato', 'fecha_completado'], name='reportes_re_formato_3ba9cf_idx'),
+        ),
+    ]
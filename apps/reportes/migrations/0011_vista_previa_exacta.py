@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0010_reporte_metricas_generacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VistaPreviaExacta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='Filtro y versión de los datos de la vista previa', max_length=100, unique=True, verbose_name='Clave')),
+                ('resultado', models.JSONField(blank=True, help_text='Total y distribución por estado; vacío mientras se calcula', null=True, verbose_name='Resultado')),
+                ('fecha', models.DateTimeField(help_text='Inicio del cálculo o momento en que se guardó el resultado', verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Vista Previa Exacta',
+                'verbose_name_plural': 'Vistas Previas Exactas',
+                'indexes': [models.Index(fields=['fecha'], name='reportes_vi_fecha_887e28_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0011_vista_previa_exacta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportegenerado',
+            name='memoria_pico',
+            field=models.PositiveIntegerField(blank=True, help_text='Memoria residente máxima durante la generación del archivo', null=True, verbose_name='Memoria Pico (KB)'),
+        ),
+    ]
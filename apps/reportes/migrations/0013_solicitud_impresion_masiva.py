@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-19 01:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0012_memoria_pico_por_generacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudImpresionMasiva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solicitudes_impresion_masiva', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Solicitud de Impresión Masiva',
+                'verbose_name_plural': 'Solicitudes de Impresión Masiva',
+                'indexes': [models.Index(fields=['usuario', 'fecha'], name='reportes_so_usuario_f2e091_idx')],
+            },
+        ),
+    ]
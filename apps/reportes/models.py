@@ -275,8 +275,12 @@ class ConfiguracionFiltro(BaseModel):
 class ReporteGenerado(BaseModel):
     """Modelo para almacenar información de reportes generados"""
     
+    # Limpieza de reportes expirados
+    LOTE_LIMPIEZA = 500
+    
     TIPOS_REPORTE = [
         ('INVENTARIO', 'Inventario General'),
+        ('POR_OFICINA', 'Inventario por Oficina'),
         ('ESTADISTICO', 'Reporte Estadístico'),
         ('EJECUTIVO', 'Reporte Ejecutivo'),
         ('STICKERS', 'Plantilla de Stickers'),
@@ -288,6 +292,7 @@ class ReporteGenerado(BaseModel):
         ('PDF', 'PDF'),
         ('CSV', 'CSV'),
         ('ZPL', 'Plantilla ZPL'),
+        ('PARQUET', 'Parquet (.parquet)'),
     ]
     
     ESTADOS_REPORTE = [
@@ -356,6 +361,28 @@ class ReporteGenerado(BaseModel):
         verbose_name='Archivo Generado',
         help_text='Archivo del reporte generado'
     )
+    hash_archivo = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Hash del Archivo',
+        help_text='SHA-256 del archivo generado, usado como ETag en la descarga'
+    )
+    clave_contenido = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        verbose_name='Clave de Contenido',
+        help_text='Hash de tipo, formato, parámetros y versión de datos del reporte'
+    )
+    artefacto = models.ForeignKey(
+        'ArtefactoReporte',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes',
+        verbose_name='Artefacto',
+        help_text='Archivo compartido con otros reportes de igual contenido'
+    )
     
     # Información de procesamiento
     fecha_inicio = models.DateTimeField(
@@ -381,6 +408,31 @@ class ReporteGenerado(BaseModel):
         help_text='Mensaje de error si el reporte falló'
     )
     
+    # Métricas de generación, usadas para estimar exportaciones futuras
+    duracion_generacion = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Duración de Generación',
+        help_text='Segundos que tomó generar el archivo, sin el tiempo en cola'
+    )
+    memoria_pico = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Memoria Pico (KB)',
+        help_text='Memoria residente máxima durante la generación del archivo'
+    )
+    total_columnas = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Total de Columnas',
+        help_text='Columnas por registro exportado'
+    )
+    incluye_graficos = models.BooleanField(
+        default=False,
+        verbose_name='Incluye Gráficos',
+        help_text='Si el archivo generado incluye gráficos'
+    )
+    
     # Configuración de expiración
     fecha_expiracion = models.DateTimeField(
         null=True,
@@ -398,6 +450,7 @@ class ReporteGenerado(BaseModel):
             models.Index(fields=['tipo_reporte']),
             models.Index(fields=['estado']),
             models.Index(fields=['fecha_inicio']),
+            models.Index(fields=['formato', 'fecha_completado']),
         ]
     
     def __str__(self):
@@ -411,8 +464,26 @@ class ReporteGenerado(BaseModel):
         self.fecha_completado = timezone.now()
         if self.fecha_inicio:
             self.tiempo_procesamiento = self.fecha_completado - self.fecha_inicio
+        if self.archivo_generado and not self.hash_archivo:
+            self.hash_archivo = self.calcular_hash_archivo()
         self.save()
     
+    def calcular_hash_archivo(self):
+        """Calcula el SHA-256 del archivo generado ('' si no puede leerse)"""
+        from apps.core.download_utils import FileDownload
+        try:
+            return FileDownload.compute_hash(self.archivo_generado)
+        except (OSError, ValueError):
+            return ''
+    
+    def obtener_hash_archivo(self):
+        """Obtiene el hash del archivo, calculándolo una sola vez"""
+        if not self.hash_archivo and self.archivo_generado:
+            self.hash_archivo = self.calcular_hash_archivo()
+            if self.hash_archivo:
+                ReporteGenerado.objects.filter(pk=self.pk).update(hash_archivo=self.hash_archivo)
+        return self.hash_archivo
+    
     def marcar_error(self, mensaje_error):
         """Marca el reporte como error"""
         from django.utils import timezone
@@ -429,34 +500,866 @@ class ReporteGenerado(BaseModel):
         return (self.fecha_expiracion and 
                 timezone.now() > self.fecha_expiracion)
     
+    @property
+    def es_particionado(self):
+        """Indica si el reporte se genera en partes paralelas"""
+        return bool(self.parametros.get('particion'))
+    
+    @property
+    def es_masivo(self):
+        """Indica si el reporte agrupa los reportes de una generación masiva"""
+        return bool(self.parametros.get('masivo'))
+    
+    def obtener_progreso(self):
+        """
+        Obtiene el progreso de un reporte particionado o masivo
+        
+        Returns:
+            dict: Partes totales, completadas, con error, en curso,
+                pendientes y porcentaje
+        """
+        from django.db.models import Count, Q, Sum
+        
+        resumen = self.partes.aggregate(
+            total=Count('id'),
+            completadas=Count('id', filter=Q(estado='COMPLETADO')),
+            errores=Count('id', filter=Q(estado='ERROR')),
+            en_curso=Count('id', filter=Q(estado='GENERANDO')),
+            registros=Sum('total_registros', filter=Q(estado='COMPLETADO'))
+        )
+        total = resumen['total']
+        return {
+            'partes': total,
+            'completadas': resumen['completadas'],
+            'errores': resumen['errores'],
+            'en_curso': resumen['en_curso'],
+            'pendientes': total - resumen['completadas'] - resumen['errores'] - resumen['en_curso'],
+            'registros_procesados': resumen['registros'] or 0,
+            'porcentaje': round(resumen['completadas'] * 100 / total, 1) if total else 0,
+        }
+    
     def puede_descargarse(self):
         """Verifica si el reporte puede descargarse"""
         return (self.estado == 'COMPLETADO' and 
                 self.archivo_generado and 
                 not self.esta_expirado())
     
+    def liberar_archivo(self):
+        """
+        Libera el archivo generado del reporte.
+        Si el archivo es compartido solo se descuenta la referencia; el
+        archivo se elimina cuando ningún reporte lo utiliza.
+        """
+        from .almacenamiento import AlmacenReportes
+        
+        artefacto = self.artefacto if self.artefacto_id else None
+        nombre = self.archivo_generado.name if self.archivo_generado else ''
+        
+        # Primero se quita la referencia, para que el archivo quede sin uso
+        self.archivo_generado = None
+        self.artefacto = None
+        self.hash_archivo = ''
+        if self.pk:
+            self.save(update_fields=['archivo_generado', 'artefacto', 'hash_archivo'])
+        
+        if artefacto is not None:
+            artefacto.liberar()
+        elif nombre:
+            AlmacenReportes().eliminar([nombre])
+    
+    @classmethod
+    def limpiar_expirados(cls, tamaño_lote=None, limite=None):
+        """
+        Limpia reportes expirados por lotes
+        
+        Cada lote se marca como expirado con una sola actualización, se
+        descuentan en bloque las referencias de sus artefactos y se
+        eliminan los archivos que quedan sin uso.
+        
+        Args:
+            tamaño_lote: Reportes por lote (LOTE_LIMPIEZA por defecto)
+            limite: Valor de time.monotonic() hasta el que puede trabajar;
+                los reportes restantes quedan para la siguiente ejecución
+        
+        Returns:
+            int: Reportes marcados como expirados
+        """
+        import time
+        from collections import Counter
+        from django.db import transaction
+        from django.utils import timezone
+        from .almacenamiento import AlmacenReportes
+        
+        tamaño_lote = tamaño_lote or cls.LOTE_LIMPIEZA
+        ahora = timezone.now()
+        almacen = AlmacenReportes()
+        total = 0
+        
+        while limite is None or time.monotonic() < limite:
+            lote = list(cls.objects.filter(
+                fecha_expiracion__lt=ahora,
+                estado='COMPLETADO'
+            ).order_by('pk').values_list('pk', 'archivo_generado', 'artefacto_id')[:tamaño_lote])
+            if not lote:
+                break
+            
+            with transaction.atomic():
+                cls.objects.filter(pk__in=[pk for pk, _, _ in lote]).update(
+                    estado='EXPIRADO',
+                    archivo_generado='',
+                    artefacto=None,
+                    hash_archivo=''
+                )
+                # Los archivos compartidos se eliminan con la última referencia
+                nombres = {archivo for _, archivo, artefacto_id in lote if archivo and not artefacto_id}
+                nombres.update(ArtefactoReporte.descontar(
+                    Counter(artefacto_id for _, _, artefacto_id in lote if artefacto_id)
+                ))
+            
+            almacen.eliminar(nombres)
+            total += len(lote)
+        
+        return total
+
+
+class ParteReporte(models.Model):
+    """
+    Parte de un reporte particionado o masivo.
+    
+    En un reporte particionado cada parte cubre un subconjunto disjunto de
+    los bienes del reporte (un rango de IDs y/o una oficina); en uno
+    masivo, cada parte es un reporte con sus propios filtros de
+    FiltroAvanzado. Cada parte se genera en una tarea independiente y el
+    reporte se ensambla cuando todas terminan.
+    """
+    
+    ESTADOS_PARTE = [
+        ('PENDIENTE', 'Pendiente'),
+        ('GENERANDO', 'Generando'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+    ]
+    
+    reporte = models.ForeignKey(
+        ReporteGenerado,
+        on_delete=models.CASCADE,
+        related_name='partes',
+        verbose_name='Reporte'
+    )
+    indice = models.PositiveIntegerField(
+        verbose_name='Índice',
+        help_text='Posición de la parte dentro del reporte'
+    )
+    titulo = models.CharField(
+        max_length=100,
+        verbose_name='Título',
+        help_text='Nombre de la parte en el archivo final'
+    )
+    filtros = models.JSONField(
+        default=dict,
+        verbose_name='Filtros',
+        help_text='Condiciones que delimitan los bienes de la parte'
+    )
+    estado = models.CharField(
+        max_length=15,
+        choices=ESTADOS_PARTE,
+        default='PENDIENTE',
+        verbose_name='Estado'
+    )
+    total_registros = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Total de Registros'
+    )
+    archivo = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Archivo',
+        help_text='Ruta de la parte generada en el almacenamiento'
+    )
+    fecha_completado = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Completado'
+    )
+    mensaje_error = models.TextField(
+        blank=True,
+        verbose_name='Mensaje de Error'
+    )
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos',
+        help_text='Veces que se inició la generación de la parte'
+    )
+    
+    class Meta:
+        verbose_name = 'Parte de Reporte'
+        verbose_name_plural = 'Partes de Reportes'
+        ordering = ['reporte', 'indice']
+        constraints = [
+            models.UniqueConstraint(fields=['reporte', 'indice'], name='reportes_parte_unica'),
+        ]
+    
+    def __str__(self):
+        return f"{self.reporte_id} - {self.titulo}"
+    
+    def marcar_completado(self, total_registros, archivo):
+        """Marca la parte como completada"""
+        from django.utils import timezone
+        self.estado = 'COMPLETADO'
+        self.total_registros = total_registros
+        self.archivo = archivo
+        self.fecha_completado = timezone.now()
+        self.save(update_fields=['estado', 'total_registros', 'archivo', 'fecha_completado'])
+    
+    def marcar_error(self, mensaje_error):
+        """Marca la parte como error"""
+        from django.utils import timezone
+        self.estado = 'ERROR'
+        self.mensaje_error = mensaje_error
+        self.fecha_completado = timezone.now()
+        self.save(update_fields=['estado', 'mensaje_error', 'fecha_completado'])
+
+
+class ArtefactoReporte(models.Model):
+    """
+    Archivo de reporte identificado por su contenido lógico.
+    
+    La clave combina tipo, formato, parámetros normalizados y la versión
+    de los datos de origen: reportes con la misma clave producirían el
+    mismo archivo, por lo que comparten un único artefacto almacenado.
+    El artefacto se elimina cuando se libera su última referencia.
+    """
+    
+    # Modelos cuya versión de datos forma parte de la clave
+    MODELOS_ORIGEN = ['bienes.BienPatrimonial', 'catalogo.Catalogo', 'oficinas.Oficina']
+    
+    # Parámetros que describen la ejecución y no el contenido
+    PARAMETROS_EXCLUIDOS = {
+        'filtros', 'programado', 'fecha_programacion', 'masivo', 'indice', 'total', 'particion',
+    }
+    
+    clave = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Clave',
+        help_text='Hash del contenido lógico del reporte'
+    )
+    archivo = models.FileField(
+        upload_to='reportes/',
+        verbose_name='Archivo'
+    )
+    hash_archivo = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Hash del Archivo'
+    )
+    total_registros = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Total de Registros'
+    )
+    referencias = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Referencias',
+        help_text='Reportes que utilizan el archivo'
+    )
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    fecha_expiracion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de Expiración',
+        help_text='Expiración más lejana entre los reportes que lo utilizan'
+    )
+    
+    class Meta:
+        verbose_name = 'Artefacto de Reporte'
+        verbose_name_plural = 'Artefactos de Reportes'
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.clave[:12]} ({self.referencias} referencias)"
+    
     @classmethod
-    def limpiar_expirados(cls):
-        """Limpia reportes expirados"""
+    def calcular_clave(cls, reporte):
+        """
+        Calcula la clave de contenido de un reporte
+        
+        Args:
+            reporte: ReporteGenerado
+        
+        Returns:
+            str: SHA-256 hexadecimal
+        """
+        import hashlib
+        from apps.core.cache_utils import DataVersionCache
+        
+        configuracion = reporte.configuracion_filtro
+        if configuracion is not None and configuracion.deleted_at is None:
+            filtros = configuracion.to_dict()
+        else:
+            filtros = reporte.parametros.get('filtros', {})
+        
+        parametros = {
+            clave: valor for clave, valor in reporte.parametros.items()
+            if clave not in cls.PARAMETROS_EXCLUIDOS
+        }
+        contenido = {
+            'tipo': reporte.tipo_reporte,
+            'formato': reporte.formato,
+            'parametros': cls._normalizar(parametros),
+            'filtros': cls._normalizar(filtros),
+            'datos': DataVersionCache.get_versions(cls.MODELOS_ORIGEN),
+        }
+        serializado = json.dumps(contenido, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def _normalizar(cls, valor):
+        """
+        Normaliza parámetros para que valores equivalentes generen la misma clave:
+        se omiten los vacíos y las listas de valores simples se ordenan.
+        """
+        if isinstance(valor, dict):
+            normalizado = {}
+            for clave, item in valor.items():
+                item = cls._normalizar(item)
+                if item not in (None, '', [], {}, False):
+                    normalizado[str(clave)] = item
+            return normalizado
+        
+        if isinstance(valor, (list, tuple, set)):
+            items = [cls._normalizar(item) for item in valor]
+            if all(not isinstance(item, (dict, list)) for item in items):
+                # Los IDs pueden llegar como texto o como número
+                return sorted(str(item) for item in items)
+            return items
+        
+        return valor
+    
+    @classmethod
+    def obtener_vigente(cls, clave):
+        """
+        Obtiene el artefacto vigente para una clave
+        
+        Args:
+            clave: Clave de contenido
+        
+        Returns:
+            ArtefactoReporte o None si no existe, expiró o falta el archivo
+        """
         from django.utils import timezone
-        import os
         
-        reportes_expirados = cls.objects.filter(
-            fecha_expiracion__lt=timezone.now(),
-            estado='COMPLETADO'
+        artefacto = cls.objects.filter(
+            clave=clave,
+            referencias__gt=0,
+            fecha_expiracion__gt=timezone.now()
+        ).first()
+        if artefacto is None or not artefacto.archivo.storage.exists(artefacto.archivo.name):
+            return None
+        return artefacto
+    
+    @classmethod
+    def registrar(cls, reporte):
+        """
+        Registra el archivo recién generado de un reporte como artefacto.
+        Si otra tarea registró antes la misma clave, el reporte pasa a usar
+        ese archivo y se elimina la copia duplicada.
+        
+        Args:
+            reporte: ReporteGenerado completado con clave_contenido
+        
+        Returns:
+            ArtefactoReporte
+        """
+        artefacto, creado = cls.objects.get_or_create(
+            clave=reporte.clave_contenido,
+            defaults={
+                'archivo': reporte.archivo_generado.name,
+                'hash_archivo': reporte.hash_archivo,
+                'total_registros': reporte.total_registros,
+                'referencias': 1,
+                'fecha_expiracion': reporte.fecha_expiracion,
+            }
         )
+        if creado:
+            reporte.artefacto = artefacto
+            reporte.save(update_fields=['artefacto'])
+            return artefacto
+        
+        if not artefacto.archivo.storage.exists(artefacto.archivo.name):
+            # El archivo compartido se perdió: se reemplaza por el nuevo
+            cls.objects.filter(pk=artefacto.pk).update(
+                archivo=reporte.archivo_generado.name,
+                hash_archivo=reporte.hash_archivo
+            )
+            artefacto.refresh_from_db()
+            artefacto.vincular(reporte)
+            return artefacto
+        
+        from .almacenamiento import AlmacenReportes
+        
+        duplicado = reporte.archivo_generado.name
+        artefacto.vincular(reporte)
+        if duplicado != artefacto.archivo.name:
+            AlmacenReportes().eliminar([duplicado])
+        return artefacto
+    
+    def vincular(self, reporte):
+        """
+        Asocia el artefacto a un reporte y suma una referencia
+        
+        Args:
+            reporte: ReporteGenerado que reutiliza el archivo
+        """
+        from django.db import transaction
+        
+        with transaction.atomic():
+            artefacto = ArtefactoReporte.objects.select_for_update().get(pk=self.pk)
+            artefacto.referencias += 1
+            if reporte.fecha_expiracion and (
+                artefacto.fecha_expiracion is None or reporte.fecha_expiracion > artefacto.fecha_expiracion
+            ):
+                artefacto.fecha_expiracion = reporte.fecha_expiracion
+            artefacto.save(update_fields=['referencias', 'fecha_expiracion'])
+        
+        self.referencias = artefacto.referencias
+        self.fecha_expiracion = artefacto.fecha_expiracion
+        
+        reporte.artefacto = self
+        reporte.archivo_generado.name = self.archivo.name
+        reporte.hash_archivo = self.hash_archivo
+        if self.total_registros is not None:
+            reporte.total_registros = self.total_registros
+        reporte.save(update_fields=['artefacto', 'archivo_generado', 'hash_archivo', 'total_registros'])
+    
+    def liberar(self):
+        """
+        Descuenta una referencia; con la última se eliminan el archivo y el artefacto
+        
+        Returns:
+            bool: True si el artefacto fue eliminado
+        """
+        from django.db import transaction
+        from .almacenamiento import AlmacenReportes
+        
+        with transaction.atomic():
+            artefacto = ArtefactoReporte.objects.select_for_update().filter(pk=self.pk).first()
+            if artefacto is None:
+                return False
+            
+            artefacto.referencias = max(artefacto.referencias - 1, 0)
+            if artefacto.referencias:
+                artefacto.save(update_fields=['referencias'])
+                self.referencias = artefacto.referencias
+                return False
+            
+            nombre = artefacto.archivo.name
+            artefacto.delete()
+            # El archivo se elimina solo si la transacción se confirma
+            transaction.on_commit(lambda: AlmacenReportes(self.archivo.storage).eliminar([nombre]))
+        return True
+    
+    @classmethod
+    def descontar(cls, referencias):
+        """
+        Descuenta referencias de varios artefactos a la vez
+        
+        Los artefactos que se quedan sin referencias se eliminan.
+        
+        Args:
+            referencias: dict {artefacto_id: referencias a descontar}
+        
+        Returns:
+            set: Archivos de los artefactos eliminados
+        """
+        from django.db import transaction
+        from django.db.models import Case, F, IntegerField, Value, When
         
-        for reporte in reportes_expirados:
-            # Eliminar archivo físico
-            if reporte.archivo_generado:
-                try:
-                    os.remove(reporte.archivo_generado.path)
-                except (OSError, ValueError):
-                    pass
+        if not referencias:
+            return set()
+        
+        with transaction.atomic():
+            artefactos = list(
+                cls.objects.select_for_update().filter(pk__in=list(referencias)).values_list('pk', 'referencias', 'archivo')
+            )
+            liberados = [(pk, archivo) for pk, total, archivo in artefactos if total <= referencias[pk]]
+            restantes = [pk for pk, total, _ in artefactos if total > referencias[pk]]
             
-            # Marcar como expirado
-            reporte.estado = 'EXPIRADO'
-            reporte.archivo_generado = None
-            reporte.save()
+            if restantes:
+                cls.objects.filter(pk__in=restantes).update(referencias=F('referencias') - Case(
+                    *[When(pk=pk, then=Value(referencias[pk])) for pk in restantes],
+                    output_field=IntegerField()
+                ))
+            if liberados:
+                cls.objects.filter(pk__in=[pk for pk, _ in liberados]).delete()
+        
+        return {archivo for _, archivo in liberados}
+
+
+class InstantaneaInventario(models.Model):
+    """
+    Instantánea diaria del inventario.
+    
+    Cada fila resume los bienes de una combinación (fecha, oficina,
+    estado, grupo de catálogo) con su cantidad y valor. Las tendencias
+    se leen de esta tabla, por lo que su costo depende de los días y
+    grupos registrados y no del tamaño del inventario.
+    """
+    
+    # Filtros de reporte que pueden aplicarse sobre las instantáneas
+    FILTROS_DIMENSION = {
+        'oficinas': 'oficina_id__in',
+        'estados_bien': 'estado_bien__in',
+        'grupos_catalogo': 'grupo__in',
+    }
+    
+    ESTADOS_ATENCION = ['M', 'E', 'C']
+    
+    fecha = models.DateField(
+        verbose_name='Fecha',
+        help_text='Día al que corresponde la instantánea'
+    )
+    oficina = models.ForeignKey(
+        'oficinas.Oficina',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Oficina'
+    )
+    estado_bien = models.CharField(
+        max_length=1,
+        verbose_name='Estado del Bien'
+    )
+    grupo = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Grupo de Catálogo'
+    )
+    total_bienes = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Total de Bienes'
+    )
+    valor_total = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        verbose_name='Valor Total'
+    )
+    
+    class Meta:
+        verbose_name = 'Instantánea de Inventario'
+        verbose_name_plural = 'Instantáneas de Inventario'
+        ordering = ['fecha']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'oficina', 'estado_bien', 'grupo'],
+                name='reportes_instantanea_unica'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['fecha', 'estado_bien']),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.oficina_id} - {self.estado_bien} - {self.grupo}"
+    
+    @classmethod
+    def registrar(cls, fecha=None):
+        """
+        Registra la instantánea del día con una consulta agrupada.
+        Si ya existe una instantánea para la fecha se reemplaza.
+        
+        Args:
+            fecha: Fecha de la instantánea (por defecto hoy)
+        
+        Returns:
+            int: Número de filas registradas
+        """
+        from django.db import transaction
+        from django.db.models import Count, Sum
+        from django.utils import timezone
+        from apps.bienes.models import BienPatrimonial
+        
+        fecha = fecha or timezone.localdate()
+        grupos = BienPatrimonial.objects.order_by().values(
+            'oficina_id', 'estado_bien', 'catalogo__grupo'
+        ).annotate(
+            total=Count('id'),
+            valor=Sum('valor_adquisicion')
+        )
+        filas = [
+            cls(
+                fecha=fecha,
+                oficina_id=grupo['oficina_id'],
+                estado_bien=grupo['estado_bien'],
+                grupo=grupo['catalogo__grupo'] or '',
+                total_bienes=grupo['total'],
+                valor_total=grupo['valor'] or 0
+            )
+            for grupo in grupos
+        ]
+        
+        with transaction.atomic():
+            cls.objects.filter(fecha=fecha).delete()
+            cls.objects.bulk_create(filas, batch_size=1000)
+        return len(filas)
+    
+    @classmethod
+    def filtrar(cls, filtros=None):
+        """
+        Instantáneas restringidas por los filtros de dimensión de un reporte
+        
+        Args:
+            filtros: Dict con oficinas, estados_bien y/o grupos_catalogo
+        
+        Returns:
+            QuerySet de InstantaneaInventario
+        """
+        queryset = cls.objects.all()
+        for clave, lookup in cls.FILTROS_DIMENSION.items():
+            valores = (filtros or {}).get(clave)
+            if valores:
+                queryset = queryset.filter(**{lookup: valores})
+        return queryset
+    
+    @classmethod
+    def filtros_no_soportados(cls, filtros=None):
+        """
+        Filtros de un reporte que no pueden aplicarse sobre las instantáneas
+        
+        Las instantáneas solo conservan oficina, estado y grupo; con otros
+        filtros (o varios filtros combinados con OR) sus series no
+        corresponderían a los bienes del reporte.
+        
+        Args:
+            filtros: Parámetros de FiltroAvanzado del reporte
+        
+        Returns:
+            list: Nombres de los filtros no soportados, ordenados
+        """
+        activos = {
+            clave for clave, valor in (filtros or {}).items()
+            if clave != 'operador_principal' and valor not in (None, '', [], {})
+        }
+        no_soportados = activos - set(cls.FILTROS_DIMENSION)
+        if len(activos) > 1 and (filtros or {}).get('operador_principal') == 'OR':
+            no_soportados.add('operador_principal')
+        return sorted(no_soportados)
+    
+    @classmethod
+    def serie_mensual(cls, meses=12, filtros=None, dimension=None, hasta=None):
+        """
+        Serie mensual del inventario tomada de la última instantánea de cada mes
+        
+        Args:
+            meses: Número de meses hacia atrás
+            filtros: Filtros de dimensión (ver filtrar)
+            dimension: Campo de desglose opcional ('estado_bien', 'grupo' u 'oficina_id')
+            hasta: Fecha final (por defecto hoy)
+        
+        Returns:
+            Lista de dicts con año, mes, fecha, total y valor_total
+        """
+        from django.db.models import Max, Sum
+        from django.db.models.functions import TruncMonth
+        from django.utils import timezone
+        
+        hasta = hasta or timezone.localdate()
+        año, mes = hasta.year, hasta.month - (meses - 1)
+        while mes < 1:
+            año, mes = año - 1, mes + 12
+        desde = hasta.replace(year=año, month=mes, day=1)
+        
+        queryset = cls.filtrar(filtros).filter(fecha__gte=desde, fecha__lte=hasta)
+        ultimas = list(queryset.order_by().annotate(
+            periodo=TruncMonth('fecha')
+        ).values('periodo').annotate(ultima=Max('fecha')).values_list('ultima', flat=True))
+        if not ultimas:
+            return []
+        
+        campos = ['fecha'] + ([dimension] if dimension else [])
+        filas = queryset.filter(fecha__in=ultimas).order_by().values(*campos).annotate(
+            total=Sum('total_bienes'),
+            valor_total=Sum('valor_total')
+        ).order_by(*campos)
+        
+        return [
+            {'año': fila['fecha'].year, 'mes': fila['fecha'].month, **fila}
+            for fila in filas
+        ]
+    
+    @classmethod
+    def comparativa_mensual(cls, filtros=None, hasta=None):
+        """
+        KPIs del último mes frente al mes anterior
+        
+        Args:
+            filtros: Filtros de dimensión (ver filtrar)
+            hasta: Fecha final (por defecto hoy)
+        
+        Returns:
+            Dict con los KPIs actual y anterior y su variación, o None
+            si no hay instantáneas de dos meses
+        """
+        serie = cls.serie_mensual(meses=2, filtros=filtros, dimension='estado_bien', hasta=hasta)
+        periodos = {}
+        for fila in serie:
+            kpis = periodos.setdefault(fila['fecha'], {
+                'fecha': fila['fecha'], 'total_bienes': 0, 'valor_total': 0, 'bienes_requieren_atencion': 0
+            })
+            kpis['total_bienes'] += fila['total']
+            kpis['valor_total'] += fila['valor_total'] or 0
+            if fila['estado_bien'] in cls.ESTADOS_ATENCION:
+                kpis['bienes_requieren_atencion'] += fila['total']
+        
+        if len(periodos) < 2:
+            return None
+        
+        anterior, actual = (periodos[fecha] for fecha in sorted(periodos))
+        variacion = {}
+        for clave in ['total_bienes', 'valor_total', 'bienes_requieren_atencion']:
+            diferencia = actual[clave] - anterior[clave]
+            variacion[clave] = {
+                'diferencia': diferencia,
+                'porcentaje': round(float(diferencia) * 100 / float(anterior[clave]), 2) if anterior[clave] else None,
+            }
+        return {'actual': actual, 'anterior': anterior, 'variacion': variacion}
+
+
+class VistaPreviaExacta(models.Model):
+    """
+    Resultado exacto de una vista previa rápida de filtros.
+    
+    Se guarda en la base de datos para que lo compartan el worker que lo
+    calcula y los procesos web que lo consultan. La fila se crea al
+    encolar el cálculo, sin resultado: mientras está pendiente otras
+    vistas previas del mismo filtro no vuelven a encolarlo.
+    """
+    
+    clave = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Clave',
+        help_text='Filtro y versión de los datos de la vista previa'
+    )
+    resultado = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Resultado',
+        help_text='Total y distribución por estado; vacío mientras se calcula'
+    )
+    fecha = models.DateTimeField(
+        verbose_name='Fecha',
+        help_text='Inicio del cálculo o momento en que se guardó el resultado'
+    )
+    
+    class Meta:
+        verbose_name = 'Vista Previa Exacta'
+        verbose_name_plural = 'Vistas Previas Exactas'
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.clave} ({'listo' if self.resultado is not None else 'pendiente'})"
+    
+    @classmethod
+    def purgar_antiguas(cls, horas=24):
+        """
+        Elimina los resultados y cálculos pendientes antiguos
+        
+        Args:
+            horas: Antigüedad máxima
+        
+        Returns:
+            int: Filas eliminadas
+        """
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        eliminadas, _ = cls.objects.filter(fecha__lt=timezone.now() - timedelta(hours=horas)).delete()
+        return eliminadas
+
+
+class SolicitudImpresionMasiva(models.Model):
+    """
+    Impresión masiva de tickets Zebra solicitada por un usuario.
+    
+    Limita las impresiones por usuario en una ventana de tiempo. Se
+    guarda en la base de datos para que el límite se aplique igual en
+    todos los procesos web, incluidas las impresiones enviadas por
+    streaming, que no crean un ReporteGenerado.
+    """
+    
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='solicitudes_impresion_masiva',
+        verbose_name='Usuario'
+    )
+    fecha = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha'
+    )
+    
+    class Meta:
+        verbose_name = 'Solicitud de Impresión Masiva'
+        verbose_name_plural = 'Solicitudes de Impresión Masiva'
+        indexes = [
+            models.Index(fields=['usuario', 'fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario.username} - {self.fecha:%d/%m/%Y %H:%M}"
+    
+    @classmethod
+    def registrar(cls, usuario, limite, ventana):
+        """
+        Registra una solicitud si el usuario no superó el límite
+        
+        La solicitud se inserta antes de contar y solo se cuentan las
+        anteriores a ella, así dos procesos concurrentes no pueden superar
+        el límite entre ambos. Las solicitudes rechazadas no se conservan.
+        
+        Args:
+            usuario: Usuario que solicita la impresión
+            limite: Solicitudes permitidas en la ventana
+            ventana: Duración de la ventana en segundos
+        
+        Returns:
+            bool: False si el usuario superó el límite
+        """
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        solicitud = cls.objects.create(usuario=usuario)
+        solicitudes = cls.objects.filter(
+            usuario=usuario,
+            fecha__gt=timezone.now() - timedelta(seconds=ventana),
+            pk__lte=solicitud.pk
+        ).count()
+        if solicitudes > limite:
+            solicitud.delete()
+            return False
+        return True
+    
+    @classmethod
+    def purgar_antiguas(cls, horas=24):
+        """
+        Elimina las solicitudes que ya no cuentan para ningún límite
+        
+        Args:
+            horas: Antigüedad máxima
+        
+        Returns:
+            int: Filas eliminadas
+        """
+        from datetime import timedelta
+        from django.utils import timezone
         
-        return reportes_expirados.count()
\ No newline at end of file
+        eliminadas, _ = cls.objects.filter(fecha__lt=timezone.now() - timedelta(hours=horas)).delete()
+        return eliminadas
@@ -0,0 +1,30 @@
+"""
+Señales de la app de reportes
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .almacenamiento import AlmacenReportes
+from .models import ArtefactoReporte, ReporteGenerado
+
+
+@receiver(post_delete, sender=ReporteGenerado)
+def liberar_archivo_reporte_eliminado(sender, instance, **kwargs):
+    """
+    Libera el archivo de un reporte borrado sin liberar_archivo()
+    
+    Los borrados por queryset, desde el admin o al vaciar la papelera no
+    pasan por liberar_archivo(): aquí se descuenta la referencia del
+    artefacto y se eliminan los archivos que quedan sin uso. Un reporte
+    en la papelera (soft delete) conserva su referencia hasta purgarse.
+    """
+    nombres = set()
+    if instance.artefacto_id:
+        nombres = ArtefactoReporte.descontar({instance.artefacto_id: 1})
+    elif instance.archivo_generado:
+        nombres = {instance.archivo_generado.name}
+    
+    if nombres:
+        # El archivo se elimina solo si el borrado se confirma
+        transaction.on_commit(lambda: AlmacenReportes().eliminar(nombres))
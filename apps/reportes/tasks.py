@@ -1,17 +1,27 @@
 import os
+import shutil
 import tempfile
+import time
+import zipfile
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.core.files import File
+from django.core.files.storage import default_storage
 from django.utils import timezone
-from celery import shared_task
+from celery import chain, chord, group, shared_task
 from celery.utils.log import get_task_logger
 
 from apps.bienes.models import BienPatrimonial
-from .models import ReporteGenerado, ConfiguracionFiltro
-from .utils import FiltroAvanzado
-from .generadores import GeneradorReporteEstadistico, GeneradorReportePDF, GeneradorIndicadoresClave
-from .exportadores import ExportadorExcel, ExportadorCSV
+from .almacenamiento import AlmacenReportes
+from .models import (
+    ReporteGenerado, ConfiguracionFiltro, ParteReporte, ArtefactoReporte, InstantaneaInventario, VistaPreviaExacta,
+    SolicitudImpresionMasiva
+)
+from .utils import CambiosFiltro, FiltroAvanzado, ResultadoFiltroMaterializado, VistaPreviaMuestreada
+from .generadores import (
+    GeneradorReporteEstadistico, GeneradorReportePDF, GeneradorListadoPDF, GeneradorIndicadoresClave
+)
+from .exportadores import ExportadorExcel, ExportadorCSV, ExportadorParquet
 
 logger = get_task_logger(__name__)
 
@@ -29,23 +39,42 @@ def generar_reporte_async(self, reporte_id):
         reporte = ReporteGenerado.objects.get(id=reporte_id)
         logger.info(f"Iniciando generación de reporte {reporte_id}: {reporte.nombre}")
         
-        # Aplicar filtros si existen
-        queryset = BienPatrimonial.objects.all()
-        parametros_filtros = reporte.parametros.get('filtros', {})
+        # Reutilizar el archivo de un reporte con el mismo contenido
+        reporte.clave_contenido = ArtefactoReporte.calcular_clave(reporte)
+        artefacto = ArtefactoReporte.obtener_vigente(reporte.clave_contenido)
+        if artefacto is not None:
+            _reutilizar_artefacto(reporte, artefacto)
+            return
         
-        if parametros_filtros:
-            filtro = FiltroAvanzado(parametros=parametros_filtros)
-            queryset = filtro.aplicar_filtros()
+        queryset, total_registros = _obtener_queryset_reporte(reporte)
         
         # Actualizar total de registros
-        reporte.total_registros = queryset.count()
+        reporte.total_registros = total_registros
         reporte.save()
         
+        # Los inventarios grandes se generan en partes paralelas
+        from .export_manager import ExportManager
+        plan = ExportManager().planificar_exportacion(
+            reporte.tipo_reporte,
+            reporte.formato,
+            total_registros,
+            tamaño_parte=reporte.parametros.get('tamaño_parte'),
+            con_graficos=_incluye_graficos(reporte),
+            columnas=_columnas_reporte(reporte)
+        )
+        if plan['modo'] == 'PARTICIONADO':
+            _iniciar_reporte_particionado(reporte, queryset, plan)
+            return
+        
         # Generar el reporte según el tipo y formato
         archivo_generado = None
+        medir_memoria = _reiniciar_pico_memoria()
+        inicio = time.perf_counter()
         
         if reporte.tipo_reporte == 'INVENTARIO':
             archivo_generado = _generar_reporte_inventario(reporte, queryset)
+        elif reporte.tipo_reporte == 'POR_OFICINA':
+            archivo_generado = _generar_reporte_por_oficina(reporte, queryset)
         elif reporte.tipo_reporte == 'ESTADISTICO':
             archivo_generado = _generar_reporte_estadistico(reporte, queryset)
         elif reporte.tipo_reporte == 'EJECUTIVO':
@@ -56,31 +85,8 @@ def generar_reporte_async(self, reporte_id):
             archivo_generado = _generar_reporte_personalizado(reporte, queryset)
         
         if archivo_generado:
-            # Guardar archivo en el modelo
-            with open(archivo_generado, 'rb') as f:
-                reporte.archivo_generado.save(
-                    os.path.basename(archivo_generado),
-                    File(f),
-                    save=False
-                )
-            
-            # Establecer fecha de expiración (30 días)
-            reporte.fecha_expiracion = timezone.now() + timedelta(days=30)
-            
-            # Marcar como completado
-            reporte.marcar_completado()
-            
-            # Limpiar archivo temporal
-            try:
-                os.remove(archivo_generado)
-            except OSError:
-                pass
-            
-            logger.info(f"Reporte {reporte_id} generado exitosamente")
-            
-            # Enviar notificación al usuario (opcional)
-            _enviar_notificacion_reporte_listo(reporte)
-            
+            _registrar_metricas(reporte, time.perf_counter() - inicio, medir_memoria)
+            _completar_reporte(reporte, archivo_generado)
         else:
             raise Exception("No se pudo generar el archivo del reporte")
             
@@ -100,12 +106,469 @@ def generar_reporte_async(self, reporte_id):
         raise
 
 
+def _obtener_queryset_reporte(reporte, contar=True):
+    """
+    Obtiene los bienes de un reporte según su configuración o filtros
+    
+    Args:
+        reporte: ReporteGenerado
+        contar: Si se calcula el total de registros
+    
+    Returns:
+        tuple: (queryset, total_registros o None)
+    """
+    queryset = BienPatrimonial.objects.all()
+    parametros_filtros = reporte.parametros.get('filtros', {})
+    
+    delta = reporte.parametros.get('delta')
+    if delta and reporte.configuracion_filtro_id:
+        # Reporte incremental: solo los cambios entre las dos marcas de agua
+        queryset = CambiosFiltro(
+            reporte.configuracion_filtro,
+            desde=_leer_marca_agua(delta.get('desde')),
+            hasta=_leer_marca_agua(delta.get('hasta'))
+        ).obtener_queryset()
+        return queryset, queryset.count() if contar else None
+    
+    if reporte.configuracion_filtro_id and reporte.configuracion_filtro.deleted_at is None:
+        # Configuración guardada: reutilizar el resultado materializado
+        resultado = ResultadoFiltroMaterializado(reporte.configuracion_filtro)
+        return resultado.obtener_queryset(), resultado.contar() if contar else None
+    
+    if 'filtros_stickers' in reporte.parametros:
+        # Impresión masiva desde el configurador Zebra
+        from .zpl_utils import filtrar_bienes_stickers
+        queryset = filtrar_bienes_stickers(reporte.parametros['filtros_stickers'])
+    elif parametros_filtros:
+        filtro = FiltroAvanzado(parametros=parametros_filtros)
+        queryset = filtro.aplicar_filtros()
+    return queryset, queryset.count() if contar else None
+
+
+# Reportes cuyo archivo es una tabla con una fila por bien
+TIPOS_TABULARES = {'INVENTARIO', 'POR_OFICINA', 'PERSONALIZADO'}
+
+
+def _incluye_graficos(reporte):
+    """Indica si el reporte lleva gráficos"""
+    return reporte.tipo_reporte == 'ESTADISTICO' or bool(reporte.parametros.get('incluir_graficos'))
+
+
+def _columnas_reporte(reporte):
+    """
+    Columnas por registro de los reportes tabulares
+    
+    Returns:
+        int o None si el reporte no es una tabla de bienes
+    """
+    if reporte.tipo_reporte not in TIPOS_TABULARES:
+        return None
+    return len(ExportadorExcel(incluir_cambios='delta' in reporte.parametros).COLUMNAS_BIENES)
+
+
+def _reiniciar_pico_memoria():
+    """
+    Reinicia el pico de memoria residente del proceso (VmHWM)
+    
+    El worker atiende muchas tareas, así que su pico acumulado no
+    corresponde a un reporte; al reiniciarlo antes de generar, el pico
+    leído después es el de esta generación. Solo disponible en Linux.
+    
+    Returns:
+        bool: True si se pudo reiniciar
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as archivo:
+            archivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _leer_pico_memoria():
+    """
+    Pico de memoria residente del proceso desde el último reinicio
+    
+    Returns:
+        int: KB, o None si no está disponible
+    """
+    try:
+        with open('/proc/self/status') as archivo:
+            for linea in archivo:
+                if linea.startswith('VmHWM:'):
+                    return int(linea.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _registrar_metricas(reporte, duracion, medir_memoria):
+    """
+    Guarda en el reporte las métricas de su generación
+    
+    Alimentan el estimador de tiempos de exportación.
+    
+    Args:
+        reporte: ReporteGenerado
+        duracion: Segundos que tomó generar el archivo
+        medir_memoria: Si el pico de memoria se reinició antes de generar;
+            si no, se deja vacío en lugar de guardar el pico del worker
+    """
+    reporte.duracion_generacion = round(duracion, 3)
+    reporte.total_columnas = _columnas_reporte(reporte)
+    reporte.incluye_graficos = _incluye_graficos(reporte)
+    reporte.memoria_pico = _leer_pico_memoria() if medir_memoria else None
+
+
+def _completar_reporte(reporte, archivo_generado):
+    """Guarda el archivo generado en el reporte y lo marca como completado"""
+    # Guardar archivo en el almacén por contenido (comprimido si es texto)
+    almacen = AlmacenReportes()
+    nombre, hash_contenido = almacen.guardar(archivo_generado)
+    reporte.archivo_generado.name = nombre
+    reporte.hash_archivo = hash_contenido
+    
+    # Establecer fecha de expiración (30 días)
+    reporte.fecha_expiracion = timezone.now() + timedelta(days=30)
+    
+    # Marcar como completado
+    reporte.marcar_completado()
+    
+    # Con el reporte ya guardado el archivo está en uso y nadie lo elimina
+    almacen.confirmar(archivo_generado, nombre)
+    
+    # Limpiar archivo temporal
+    try:
+        os.remove(archivo_generado)
+    except OSError:
+        pass
+    
+    # Compartir el archivo con futuros reportes del mismo contenido
+    if reporte.clave_contenido:
+        ArtefactoReporte.registrar(reporte)
+    
+    logger.info(f"Reporte {reporte.id} generado exitosamente")
+    
+    # Enviar notificación al usuario (opcional)
+    _enviar_notificacion_reporte_listo(reporte)
+
+
+def _reutilizar_artefacto(reporte, artefacto):
+    """Completa el reporte enlazándolo a un archivo ya generado"""
+    reporte.fecha_expiracion = timezone.now() + timedelta(days=30)
+    artefacto.vincular(reporte)
+    reporte.marcar_completado()
+    
+    logger.info(f"Reporte {reporte.id} reutiliza el artefacto {artefacto.clave[:12]}")
+    
+    _enviar_notificacion_reporte_listo(reporte)
+
+
+def _iniciar_reporte_particionado(reporte, queryset, plan):
+    """
+    Divide el reporte en partes y lanza su generación en paralelo
+    
+    Cada parte se genera en una tarea independiente; un chord ensambla
+    el archivo final cuando todas terminan.
+    """
+    from .export_manager import ExportManager
+    
+    criterio = 'OFICINA' if reporte.parametros.get('agrupar_por') == 'oficina' else 'RANGO'
+    entrega = reporte.parametros.get('entrega', 'ZIP')
+    if reporte.formato != 'EXCEL':
+        entrega = 'ZIP'
+    
+    definiciones = ExportManager().particionar(queryset, plan['tamaño_parte'], criterio)
+    
+    reporte.partes.all().delete()
+    ParteReporte.objects.bulk_create([
+        ParteReporte(
+            reporte=reporte,
+            indice=definicion['indice'],
+            titulo=definicion['titulo'][:100],
+            filtros=definicion['filtros'],
+            total_registros=definicion['total']
+        )
+        for definicion in definiciones
+    ])
+    
+    reporte.parametros = {
+        **reporte.parametros,
+        'particion': {
+            'criterio': criterio,
+            'entrega': entrega,
+            'tamaño_parte': plan['tamaño_parte'],
+            'partes': len(definiciones),
+            'tiempo_estimado': plan['tiempo_estimado'],
+        }
+    }
+    reporte.save()
+    
+    # Si una tarea del chord termina con una excepción (o el worker muere)
+    # el ensamblado no se ejecuta: el errback marca el reporte como fallido
+    chord(
+        group(generar_parte_reporte.s(reporte.id, definicion['indice']) for definicion in definiciones),
+        ensamblar_reporte_particionado.s(reporte.id).on_error(
+            marcar_reporte_particionado_fallido.s(reporte.id)
+        )
+    ).apply_async()
+    
+    logger.info(f"Reporte {reporte.id} dividido en {len(definiciones)} partes ({criterio})")
+
+
+@shared_task
+def generar_parte_reporte(reporte_id, indice):
+    """
+    Genera una parte de un reporte particionado
+    
+    Los errores se registran en la parte y no se propagan, para que el
+    ensamblado pueda marcar el reporte completo como fallido.
+    
+    Args:
+        reporte_id: ID del ReporteGenerado
+        indice: Índice de la parte
+    """
+    parte = None
+    archivo_temp = None
+    try:
+        parte = ParteReporte.objects.select_related('reporte').get(reporte_id=reporte_id, indice=indice)
+        reporte = parte.reporte
+        ParteReporte.objects.filter(pk=parte.pk).update(estado='GENERANDO')
+        
+        queryset, _ = _obtener_queryset_reporte(reporte, contar=False)
+        queryset = queryset.filter(**parte.filtros).order_by('id')
+        
+        entrega = reporte.parametros.get('particion', {}).get('entrega', 'ZIP')
+        incluir_cambios = 'delta' in reporte.parametros
+        if reporte.formato == 'EXCEL':
+            exportador = ExportadorExcel(incluir_cambios)
+            extension = '.xlsx'
+        else:
+            exportador = ExportadorCSV(incluir_cambios)
+            extension = '.csv'
+        
+        archivo_temp = tempfile.NamedTemporaryFile(
+            suffix=extension,
+            delete=False,
+            prefix=f'reporte_{reporte_id}_parte_{indice}_'
+        )
+        archivo_temp.close()
+        
+        if reporte.formato == 'EXCEL':
+            # Las partes de un libro se ensamblan como hojas sin encabezado
+            exportador.exportar_bienes(
+                queryset,
+                archivo_temp.name,
+                incluir_estadisticas=False,
+                incluir_encabezado=entrega != 'LIBRO'
+            )
+        else:
+            exportador.exportar_bienes(queryset, archivo_temp.name)
+        
+        with open(archivo_temp.name, 'rb') as f:
+            ruta = default_storage.save(
+                f'reportes/partes/{reporte_id}/parte_{indice:03d}{extension}',
+                File(f)
+            )
+        
+        parte.marcar_completado(exportador.total_registros, ruta)
+        logger.info(f"Parte {indice} del reporte {reporte_id} generada: {exportador.total_registros} registros")
+        
+    except Exception as e:
+        logger.error(f"Error generando parte {indice} del reporte {reporte_id}: {str(e)}")
+        if parte is not None:
+            parte.marcar_error(str(e))
+        else:
+            ParteReporte.objects.filter(reporte_id=reporte_id, indice=indice).update(
+                estado='ERROR', mensaje_error=str(e), fecha_completado=timezone.now()
+            )
+        
+    finally:
+        if archivo_temp:
+            try:
+                os.remove(archivo_temp.name)
+            except OSError:
+                pass
+    
+    return {'indice': indice, 'estado': parte.estado if parte is not None else 'ERROR'}
+
+
+@shared_task
+def ensamblar_reporte_particionado(resultados, reporte_id):
+    """
+    Ensambla las partes de un reporte en un ZIP o en un libro con una
+    hoja por parte
+    
+    Args:
+        resultados: Resultados de las tareas de cada parte
+        reporte_id: ID del ReporteGenerado
+    """
+    reporte = ReporteGenerado.objects.get(id=reporte_id)
+    partes = list(reporte.partes.order_by('indice'))
+    
+    try:
+        fallidas = [parte for parte in partes if parte.estado != 'COMPLETADO']
+        if fallidas:
+            raise Exception(
+                f"{len(fallidas)} de {len(partes)} partes no se generaron: "
+                f"{fallidas[0].mensaje_error or fallidas[0].estado}"
+            )
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if reporte.parametros['particion']['entrega'] == 'LIBRO':
+            archivo_generado = _ensamblar_libro(partes, f'inventario_{timestamp}_')
+        else:
+            archivo_generado = _ensamblar_zip(partes, f'inventario_{timestamp}_')
+        
+        reporte.total_registros = sum(parte.total_registros for parte in partes)
+        _completar_reporte(reporte, archivo_generado)
+        
+    except Exception as e:
+        logger.error(f"Error ensamblando reporte {reporte_id}: {str(e)}")
+        reporte.marcar_error(str(e))
+        
+    finally:
+        for parte in partes:
+            if parte.archivo:
+                default_storage.delete(parte.archivo)
+    
+    return reporte.estado
+
+
+@shared_task
+def marcar_reporte_particionado_fallido(request, exc, traceback, reporte_id):
+    """
+    Errback del chord de un reporte particionado
+    
+    Args:
+        request: Contexto de la tarea que falló
+        exc: Excepción producida
+        traceback: Traza de la excepción
+        reporte_id: ID del ReporteGenerado
+    """
+    logger.error(f"Generación particionada del reporte {reporte_id} interrumpida: {exc}")
+    
+    reporte = ReporteGenerado.objects.filter(id=reporte_id, estado='GENERANDO').first()
+    if reporte is None:
+        return
+    reporte.marcar_error(f"La generación por partes se interrumpió: {exc}")
+    _eliminar_archivos_partes(reporte)
+
+
+def _eliminar_archivos_partes(reporte):
+    """
+    Elimina los archivos de las partes de un reporte interrumpido
+    
+    Además de los registrados en cada parte se borran los que quedaron en
+    reportes/partes/<id>/ sin registrarse, por ejemplo si el worker se
+    detuvo entre guardar el archivo y marcar la parte.
+    
+    Args:
+        reporte: ReporteGenerado particionado o masivo
+    """
+    archivos = set(reporte.partes.exclude(archivo='').values_list('archivo', flat=True))
+    directorio = f'reportes/partes/{reporte.id}'
+    try:
+        _, nombres = default_storage.listdir(directorio)
+        archivos.update(f'{directorio}/{nombre}' for nombre in nombres)
+    except (OSError, NotImplementedError):
+        pass
+    
+    for archivo in archivos:
+        default_storage.delete(archivo)
+
+
+def _ensamblar_zip(partes, prefijo):
+    """Copia las partes generadas en un archivo ZIP"""
+    archivo_zip = tempfile.NamedTemporaryFile(suffix='.zip', delete=False, prefix=prefijo)
+    archivo_zip.close()
+    
+    with zipfile.ZipFile(archivo_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for parte in partes:
+            extension = os.path.splitext(parte.archivo)[1]
+            with default_storage.open(parte.archivo, 'rb') as origen:
+                with zipf.open(f'{parte.indice:03d}_{_nombre_seguro(parte.titulo)}{extension}', 'w') as destino:
+                    shutil.copyfileobj(origen, destino)
+    
+    return archivo_zip.name
+
+
+def _ensamblar_libro(partes, prefijo):
+    """Escribe cada parte como una hoja de un único libro Excel"""
+    from openpyxl import load_workbook
+    from apps.core.excel_utils import ExcelStreamWriter
+    
+    escritor = ExcelStreamWriter()
+    encabezado = ExportadorExcel()._encabezado_institucional()
+    
+    for parte in partes:
+        if not parte.total_registros:
+            continue
+        
+        with default_storage.open(parte.archivo, 'rb') as origen:
+            libro_parte = load_workbook(origen, read_only=True)
+            filas = libro_parte.active.iter_rows(values_only=True)
+            columnas = next(filas)
+            
+            ws = escritor.create_sheet(_titulo_hoja(parte))
+            escritor.write_table(ws, columnas, filas, preamble=encabezado)
+            libro_parte.close()
+    
+    archivo_libro = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False, prefix=prefijo)
+    archivo_libro.close()
+    escritor.save(archivo_libro.name)
+    return archivo_libro.name
+
+
+def _nombre_seguro(texto):
+    """Convierte un texto en un nombre de archivo seguro"""
+    from django.utils.text import slugify
+    return slugify(texto) or 'parte'
+
+
+def _titulo_hoja(parte):
+    """Título de hoja Excel único y válido para una parte"""
+    titulo = ''.join(c for c in parte.titulo if c not in '[]:*?/\\')
+    return f"{parte.indice:02d} {titulo}"[:31]
+
+
+@shared_task
+def exportar_item_lote(config, indice, total, directorio, reporte_id=None):
+    """
+    Genera una exportación de un lote masivo
+    
+    Args:
+        config: Configuración serializable de la exportación
+        indice: Posición dentro del lote
+        total: Total de exportaciones del lote
+        directorio: Directorio de salida del lote
+        reporte_id: ID del reporte del lote (opcional)
+    """
+    from .export_manager import exportar_configuracion_serializada
+    return exportar_configuracion_serializada(config, indice, total, directorio, reporte_id)
+
+
+@shared_task
+def empaquetar_lote_exportacion(resultados, directorio, reporte_id):
+    """
+    Arma el ZIP de un lote masivo cuando terminan todas sus exportaciones
+    
+    Args:
+        resultados: Resultados de exportar_item_lote
+        directorio: Directorio del lote
+        reporte_id: ID del reporte del lote
+    """
+    from .export_manager import empaquetar_lote
+    return empaquetar_lote(resultados, directorio, reporte_id)
+
+
 def _generar_reporte_inventario(reporte, queryset):
     """Genera reporte de inventario básico"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    incluir_cambios = 'delta' in reporte.parametros
     
     if reporte.formato == 'EXCEL':
-        exportador = ExportadorExcel()
+        exportador = ExportadorExcel(incluir_cambios)
         archivo_temp = tempfile.NamedTemporaryFile(
             suffix='.xlsx', 
             delete=False,
@@ -117,7 +580,7 @@ def _generar_reporte_inventario(reporte, queryset):
         return archivo_temp.name
         
     elif reporte.formato == 'CSV':
-        exportador = ExportadorCSV()
+        exportador = ExportadorCSV(incluir_cambios)
         archivo_temp = tempfile.NamedTemporaryFile(
             suffix='.csv', 
             delete=False,
@@ -129,7 +592,7 @@ def _generar_reporte_inventario(reporte, queryset):
         return archivo_temp.name
         
     elif reporte.formato == 'PDF':
-        generador = GeneradorReportePDF(queryset, reporte.parametros)
+        generador = GeneradorListadoPDF(queryset, reporte.parametros)
         archivo_temp = tempfile.NamedTemporaryFile(
             suffix='.pdf', 
             delete=False,
@@ -139,10 +602,39 @@ def _generar_reporte_inventario(reporte, queryset):
         
         generador.generar_reporte_completo(archivo_temp.name)
         return archivo_temp.name
+        
+    elif reporte.formato == 'PARQUET':
+        exportador = ExportadorParquet(incluir_cambios)
+        archivo_temp = tempfile.NamedTemporaryFile(
+            suffix='.parquet', 
+            delete=False,
+            prefix=f'inventario_{timestamp}_'
+        )
+        archivo_temp.close()
+        
+        exportador.exportar_bienes(queryset, archivo_temp.name)
+        return archivo_temp.name
     
     return None
 
 
+def _generar_reporte_por_oficina(reporte, queryset):
+    """Genera el libro de inventario con una hoja por oficina"""
+    if reporte.formato != 'EXCEL':
+        return None
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    archivo_temp = tempfile.NamedTemporaryFile(
+        suffix='.xlsx',
+        delete=False,
+        prefix=f'inventario_oficinas_{timestamp}_'
+    )
+    archivo_temp.close()
+    
+    ExportadorExcel().exportar_por_oficina(queryset, archivo_temp.name)
+    return archivo_temp.name
+
+
 def _generar_reporte_estadistico(reporte, queryset):
     """Genera reporte estadístico con gráficos"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -209,8 +701,10 @@ def _generar_reporte_ejecutivo(reporte, queryset):
 def _generar_plantilla_stickers(reporte, queryset):
     """Genera plantilla ZPL para stickers"""
     from .exportadores import ExportadorZPL
+    from .zpl_utils import ConfiguracionSticker
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    config_datos = reporte.parametros.get('configuracion_stickers')
     
     exportador = ExportadorZPL()
     archivo_temp = tempfile.NamedTemporaryFile(
@@ -220,7 +714,12 @@ def _generar_plantilla_stickers(reporte, queryset):
     )
     archivo_temp.close()
     
-    exportador.generar_plantilla_stickers(queryset, archivo_temp.name)
+    exportador.generar_plantilla_stickers(
+        queryset,
+        archivo_temp.name,
+        ConfiguracionSticker(**config_datos) if config_datos else None,
+        reporte.parametros.get('orden_stickers', 'codigo')
+    )
     return archivo_temp.name
 
 
@@ -264,14 +763,26 @@ def _enviar_notificacion_reporte_listo(reporte):
         logger.warning(f"No se pudo enviar notificación para reporte {reporte.id}: {str(e)}")
 
 
+# Segundos que puede ocupar cada ejecución de la limpieza
+PRESUPUESTO_LIMPIEZA = 120
+
+
 @shared_task
 def limpiar_reportes_expirados():
     """
     Tarea programada para limpiar reportes expirados
+    
+    Expira los reportes por lotes y luego elimina los archivos del
+    almacén que quedaron sin uso, sin exceder PRESUPUESTO_LIMPIEZA; lo
+    pendiente se procesa en la siguiente ejecución.
     """
     try:
-        cantidad = ReporteGenerado.limpiar_expirados()
-        logger.info(f"Se limpiaron {cantidad} reportes expirados")
+        limite = time.monotonic() + PRESUPUESTO_LIMPIEZA
+        cantidad = ReporteGenerado.limpiar_expirados(limite=limite)
+        huerfanos = AlmacenReportes().barrer_huerfanos(limite)
+        VistaPreviaExacta.purgar_antiguas()
+        SolicitudImpresionMasiva.purgar_antiguas()
+        logger.info(f"Se limpiaron {cantidad} reportes expirados y {huerfanos} archivos sin uso")
         return cantidad
         
     except Exception as e:
@@ -280,15 +791,49 @@ def limpiar_reportes_expirados():
 
 
 @shared_task
-def generar_reporte_programado(configuracion_filtro_id, tipo_reporte, formato, usuario_id):
+def registrar_instantanea_inventario():
+    """
+    Tarea programada que registra la instantánea diaria del inventario
+    """
+    try:
+        filas = InstantaneaInventario.registrar()
+        logger.info(f"Instantánea de inventario registrada con {filas} grupos")
+        return filas
+        
+    except Exception as e:
+        logger.error(f"Error registrando instantánea de inventario: {str(e)}")
+        raise
+
+
+# Tipos y formatos que admiten el modo incremental de los reportes programados
+TIPOS_DELTA = {'INVENTARIO'}
+FORMATOS_DELTA = {'EXCEL', 'CSV', 'PARQUET'}
+
+
+@shared_task
+def generar_reporte_programado(configuracion_filtro_id, tipo_reporte, formato, usuario_id, incremental=False):
     """
     Tarea para generar reportes programados
     
+    En modo incremental cada ejecución registra como marca de agua la
+    secuencia del registro de cambios de bienes (RegistroCambioBien), que
+    sigue el orden de confirmación, y solo exporta los bienes creados,
+    modificados o dados de baja desde la marca de la última ejecución
+    completada (ver CambiosFiltro). Los dados de baja llevan la columna
+    fecha_baja. Sin marca anterior, o si es de una versión que usaba
+    fechas, se exportan todos los bienes. Si no hubo cambios, la
+    ejecución se omite sin crear un reporte.
+    
     Args:
         configuracion_filtro_id: ID de la configuración de filtros
         tipo_reporte: Tipo de reporte a generar
         formato: Formato del reporte
         usuario_id: ID del usuario
+        incremental: Si solo se exportan los cambios desde la última
+            ejecución
+        
+    Returns:
+        int: ID del reporte creado, o None si no hubo cambios
     """
     try:
         from django.contrib.auth.models import User
@@ -296,18 +841,42 @@ def generar_reporte_programado(configuracion_filtro_id, tipo_reporte, formato, u
         usuario = User.objects.get(id=usuario_id)
         configuracion = ConfiguracionFiltro.objects.get(id=configuracion_filtro_id)
         
+        parametros = {
+            'filtros': configuracion.to_dict(),
+            'programado': True,
+            'fecha_programacion': timezone.now().isoformat()
+        }
+        nombre = f"Reporte Programado - {configuracion.nombre}"
+        
+        if incremental:
+            if tipo_reporte not in TIPOS_DELTA or formato not in FORMATOS_DELTA:
+                raise ValueError(f"El modo incremental no está disponible para {tipo_reporte} en {formato}")
+            
+            desde = _ultima_marca_agua(configuracion, tipo_reporte, formato)
+            cambios = CambiosFiltro(configuracion, desde=desde)
+            resumen = cambios.resumen()
+            
+            if not resumen['total']:
+                logger.info(f"Reporte programado de {configuracion.nombre} omitido: sin cambios desde {desde}")
+                return None
+            
+            parametros['delta'] = {
+                'desde': cambios.desde,
+                'hasta': resumen['marca_agua'],
+                'nuevos': resumen['nuevos'],
+                'modificados': resumen['modificados'],
+                'eliminados': resumen['eliminados'],
+            }
+            nombre = f"Reporte Programado (cambios) - {configuracion.nombre}"
+        
         # Crear reporte programado
         reporte = ReporteGenerado.objects.create(
-            nombre=f"Reporte Programado - {configuracion.nombre}",
+            nombre=nombre,
             tipo_reporte=tipo_reporte,
             formato=formato,
             usuario=usuario,
             configuracion_filtro=configuracion,
-            parametros={
-                'filtros': configuracion.to_dict(),
-                'programado': True,
-                'fecha_programacion': timezone.now().isoformat()
-            }
+            parametros=parametros
         )
         
         # Generar el reporte
@@ -322,6 +891,32 @@ def generar_reporte_programado(configuracion_filtro_id, tipo_reporte, formato, u
         raise
 
 
+def _ultima_marca_agua(configuracion, tipo_reporte, formato):
+    """
+    Marca de agua del último reporte incremental completado de una
+    configuración, o None si nunca se generó
+    """
+    ultimo = ReporteGenerado.objects.filter(
+        configuracion_filtro=configuracion,
+        tipo_reporte=tipo_reporte,
+        formato=formato,
+        estado='COMPLETADO',
+        parametros__has_key='delta'
+    ).order_by('-fecha_inicio', '-id').values_list('parametros', flat=True).first()
+    
+    return _leer_marca_agua(ultimo['delta']['hasta']) if ultimo else None
+
+
+def _leer_marca_agua(valor):
+    """
+    Lee una marca de agua guardada (secuencia del registro de cambios)
+    
+    Las marcas de fecha de versiones anteriores no son comparables con la
+    secuencia: se descartan y la siguiente ejecución exporta todo.
+    """
+    return valor if isinstance(valor, int) else None
+
+
 @shared_task
 def actualizar_estadisticas_cache():
     """
@@ -343,6 +938,7 @@ def actualizar_estadisticas_cache():
         
         # Guardar KPIs en caché por 1 hora
         cache.set('kpis_generales', kpis, 3600)
+        cache.set('kpis_por_oficina', generador_kpis.calcular_kpis_por_oficina(), 3600)
         
         logger.info("Estadísticas y KPIs actualizados en caché")
         
@@ -358,48 +954,250 @@ def actualizar_estadisticas_cache():
 
 
 @shared_task
-def generar_reporte_masivo(filtros_list, tipo_reporte, formato, usuario_id):
+def calcular_vista_previa_exacta(parametros):
+    """
+    Calcula el total exacto de una vista previa de filtros
+    
+    El resultado se guarda en la base de datos para que la vista previa
+    reemplace la estimación por la muestra.
+    
+    Args:
+        parametros: Parámetros de FiltroAvanzado (serializables en JSON)
+    """
+    vista_previa = VistaPreviaMuestreada(parametros)
+    resultado = vista_previa.obtener_exacto() or vista_previa.calcular_exacto()
+    logger.debug(f"Vista previa exacta {vista_previa.clave}: {resultado['total']} bienes")
+    return resultado['total']
+
+
+# Reportes de una generación masiva que se generan a la vez
+CONCURRENCIA_MASIVO = getattr(settings, 'REPORTES_CONCURRENCIA_MASIVO', 4)
+# Reintentos por reporte y fracción de reportes que pueden reintentarse
+REINTENTOS_ITEM_MASIVO = 2
+PRESUPUESTO_REINTENTOS_MASIVO = 0.2
+
+
+@shared_task
+def generar_reporte_masivo(filtros_list, tipo_reporte, formato, usuario_id, nombre=None):
     """
     Tarea para generar múltiples reportes con diferentes filtros
     
+    Crea un reporte principal con una parte por configuración de filtros.
+    Las partes se reparten en CONCURRENCIA_MASIVO cadenas que se ejecutan
+    en paralelo en la cola de reportes, por lo que nunca hay más reportes
+    en curso que cadenas; un chord empaqueta los archivos en un ZIP
+    cuando todas terminan.
+    
     Args:
         filtros_list: Lista de configuraciones de filtros
         tipo_reporte: Tipo de reporte
         formato: Formato del reporte
         usuario_id: ID del usuario
+        nombre: Nombre del reporte principal (opcional)
+        
+    Returns:
+        dict: ID del reporte principal, total de reportes y concurrencia
     """
     try:
         from django.contrib.auth.models import User
         
         usuario = User.objects.get(id=usuario_id)
-        reportes_generados = []
-        
-        for i, filtros in enumerate(filtros_list):
-            # Crear reporte individual
-            reporte = ReporteGenerado.objects.create(
-                nombre=f"Reporte Masivo {i+1}",
-                tipo_reporte=tipo_reporte,
-                formato=formato,
-                usuario=usuario,
-                parametros={
-                    'filtros': filtros,
-                    'masivo': True,
-                    'indice': i+1,
-                    'total': len(filtros_list)
+        total = len(filtros_list)
+        if not total:
+            raise ValueError("No se indicaron filtros para la generación masiva")
+        
+        concurrencia = max(1, min(CONCURRENCIA_MASIVO, total))
+        reporte = ReporteGenerado.objects.create(
+            nombre=nombre or f"Reporte Masivo - {total} reportes",
+            tipo_reporte=tipo_reporte,
+            formato=formato,
+            usuario=usuario,
+            parametros={
+                'masivo': {
+                    'total': total,
+                    'concurrencia': concurrencia,
+                    'presupuesto_reintentos': max(1, int(total * PRESUPUESTO_REINTENTOS_MASIVO)),
                 }
+            }
+        )
+        
+        ParteReporte.objects.bulk_create([
+            ParteReporte(
+                reporte=reporte,
+                indice=indice,
+                titulo=f"Reporte {indice}",
+                filtros=filtros or {}
             )
-            
-            # Generar el reporte
-            generar_reporte_async.delay(reporte.id)
-            reportes_generados.append(reporte.id)
+            for indice, filtros in enumerate(filtros_list, start=1)
+        ])
+        
+        # Cada cadena genera sus reportes uno tras otro
+        cadenas = [
+            chain([generar_item_masivo.si(reporte.id, indice) for indice in range(inicio, total + 1, concurrencia)])
+            for inicio in range(1, concurrencia + 1)
+        ]
+        # Si una cadena termina con una excepción (o el worker muere) el
+        # empaquetado no se ejecuta: el errback marca el reporte como fallido
+        chord(
+            group(cadenas),
+            ensamblar_reporte_masivo.s(reporte.id).on_error(marcar_reporte_masivo_fallido.s(reporte.id))
+        ).apply_async()
         
-        logger.info(f"Generación masiva iniciada: {len(reportes_generados)} reportes para usuario {usuario.username}")
+        logger.info(
+            f"Generación masiva iniciada: {total} reportes en {concurrencia} cadenas "
+            f"para usuario {usuario.username} (reporte {reporte.id})"
+        )
         
         return {
-            'reportes_generados': reportes_generados,
-            'total': len(reportes_generados)
+            'reporte_id': reporte.id,
+            'total': total,
+            'concurrencia': concurrencia
         }
         
     except Exception as e:
         logger.error(f"Error en generación masiva: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+@shared_task(bind=True, max_retries=REINTENTOS_ITEM_MASIVO, default_retry_delay=30)
+def generar_item_masivo(self, reporte_id, indice):
+    """
+    Genera uno de los reportes de una generación masiva
+    
+    Los errores se reintentan mientras quede presupuesto de reintentos
+    en la generación; si no, se registran en la parte sin propagarse,
+    para que la cadena continúe con los siguientes reportes.
+    
+    Args:
+        reporte_id: ID del ReporteGenerado principal
+        indice: Índice de la parte
+    """
+    from django.db.models import F
+    from .export_manager import ExportManager
+    
+    parte = ParteReporte.objects.select_related('reporte').get(reporte_id=reporte_id, indice=indice)
+    reporte = parte.reporte
+    ParteReporte.objects.filter(pk=parte.pk).update(estado='GENERANDO', intentos=F('intentos') + 1)
+    
+    archivo_path = None
+    try:
+        queryset = FiltroAvanzado(parametros=parte.filtros).aplicar_filtros()
+        archivo_info = ExportManager().exportar(queryset, reporte.tipo_reporte, reporte.formato)
+        archivo_path = archivo_info['archivo_path']
+        
+        extension = os.path.splitext(archivo_path)[1]
+        with open(archivo_path, 'rb') as f:
+            ruta = default_storage.save(
+                f'reportes/partes/{reporte_id}/parte_{indice:03d}{extension}',
+                File(f)
+            )
+        
+        parte.marcar_completado(archivo_info['total_registros'], ruta)
+        
+    except Exception as e:
+        if self.request.retries < self.max_retries and _reintento_disponible(reporte):
+            logger.warning(f"Reintentando reporte {indice} de la generación {reporte_id}: {str(e)}")
+            ParteReporte.objects.filter(pk=parte.pk).update(estado='PENDIENTE')
+            raise self.retry(exc=e)
+        
+        logger.error(f"Error generando reporte {indice} de la generación {reporte_id}: {str(e)}")
+        parte.marcar_error(str(e))
+        
+    finally:
+        if archivo_path:
+            try:
+                os.remove(archivo_path)
+            except OSError:
+                pass
+    
+    return {'indice': indice, 'estado': parte.estado}
+
+
+def _reintento_disponible(reporte):
+    """Indica si la generación masiva aún tiene reintentos disponibles"""
+    from django.db.models import Count, Q, Sum
+    
+    uso = reporte.partes.aggregate(
+        total_intentos=Sum('intentos'),
+        iniciadas=Count('id', filter=Q(intentos__gt=0))
+    )
+    reintentos_usados = (uso['total_intentos'] or 0) - uso['iniciadas']
+    return reintentos_usados < reporte.parametros['masivo']['presupuesto_reintentos']
+
+
+@shared_task
+def ensamblar_reporte_masivo(resultados, reporte_id):
+    """
+    Empaqueta en un ZIP los reportes generados de una generación masiva
+    
+    Los reportes que fallaron se omiten del ZIP y se detallan en los
+    parámetros del reporte principal.
+    
+    Args:
+        resultados: Resultados de las cadenas de reportes
+        reporte_id: ID del ReporteGenerado principal
+    """
+    reporte = ReporteGenerado.objects.get(id=reporte_id)
+    partes = list(reporte.partes.order_by('indice'))
+    
+    try:
+        completadas = [parte for parte in partes if parte.estado == 'COMPLETADO']
+        fallidas = [parte for parte in partes if parte.estado != 'COMPLETADO']
+        
+        reporte.parametros = {
+            **reporte.parametros,
+            'masivo': {
+                **reporte.parametros['masivo'],
+                'completados': len(completadas),
+                'errores': [
+                    {'indice': parte.indice, 'titulo': parte.titulo, 'error': parte.mensaje_error or parte.estado}
+                    for parte in fallidas
+                ],
+            }
+        }
+        
+        if not completadas:
+            raise Exception(
+                f"Ningún reporte de la generación masiva se generó: "
+                f"{fallidas[0].mensaje_error or fallidas[0].estado}"
+            )
+        
+        if fallidas:
+            reporte.mensaje_error = f"{len(fallidas)} de {len(partes)} reportes no se generaron"
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        archivo_generado = _ensamblar_zip(completadas, f'masivo_{timestamp}_')
+        
+        reporte.total_registros = sum(parte.total_registros for parte in completadas)
+        _completar_reporte(reporte, archivo_generado)
+        
+    except Exception as e:
+        logger.error(f"Error ensamblando generación masiva {reporte_id}: {str(e)}")
+        reporte.marcar_error(str(e))
+        
+    finally:
+        for parte in partes:
+            if parte.archivo:
+                default_storage.delete(parte.archivo)
+    
+    return reporte.estado
+
+
+@shared_task
+def marcar_reporte_masivo_fallido(request, exc, traceback, reporte_id):
+    """
+    Errback del chord de una generación masiva
+    
+    Args:
+        request: Contexto de la tarea que falló
+        exc: Excepción producida
+        traceback: Traza de la excepción
+        reporte_id: ID del ReporteGenerado principal
+    """
+    logger.error(f"Generación masiva {reporte_id} interrumpida: {exc}")
+    
+    reporte = ReporteGenerado.objects.filter(id=reporte_id, estado='GENERANDO').first()
+    if reporte is None:
+        return
+    reporte.marcar_error(f"La generación masiva se interrumpió: {exc}")
+    _eliminar_archivos_partes(reporte)
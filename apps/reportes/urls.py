@@ -15,7 +15,9 @@ urlpatterns = [
     # Filtros avanzados
     path('filtros/', views.filtros_avanzados, name='filtros_avanzados'),
     path('filtros/vista-previa/', views.vista_previa_filtros, name='vista_previa_filtros'),
+    path('filtros/vista-previa/<str:clave>/exacto/', views.api_vista_previa_exacta, name='api_vista_previa_exacta'),
     path('filtros/exportar-excel/', views.exportar_filtros_excel, name='exportar_filtros_excel'),
+    path('filtros/exportar-csv/', views.exportar_filtros_csv, name='exportar_filtros_csv'),
     
     # Configuraciones de filtros
     path('configuraciones/', views.configuraciones_filtros, name='configuraciones_filtros'),
@@ -27,6 +29,7 @@ urlpatterns = [
     path('generar/', views.generar_reporte, name='generar_reporte'),
     path('mis-reportes/', views.mis_reportes, name='mis_reportes'),
     path('reportes/<int:pk>/descargar/', views.descargar_reporte, name='descargar_reporte'),
+    path('reportes/<int:pk>/progreso/', views.api_progreso_reporte, name='api_progreso_reporte'),
     path('reportes/<int:pk>/eliminar/', views.eliminar_reporte, name='eliminar_reporte'),
     
     # APIs AJAX
@@ -34,6 +37,7 @@ urlpatterns = [
     path('api/modelos/', views.api_modelos_autocomplete, name='api_modelos_autocomplete'),
     path('api/clases-por-grupo/', views.api_clases_por_grupo, name='api_clases_por_grupo'),
     path('api/estadisticas/', views.api_estadisticas_filtros, name='api_estadisticas_filtros'),
+    path('graficos/<str:nombre>/', views.grafico_estadistico, name='grafico_estadistico'),
     
     # Stickers ZPL
     path('stickers/configurar/', views.configurar_stickers, name='configurar_stickers'),
@@ -1,11 +1,21 @@
-from django.db.models import Q, Count, Sum, Avg
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q, Count, Sum, Avg, Min, Max
+from django.db.models.constants import LOOKUP_SEP
 from django.db.models.functions import Extract
 from django.utils import timezone
 from apps.bienes.models import BienPatrimonial
+from apps.core.cache_utils import DataVersionCache
 from apps.catalogo.models import Catalogo
 from apps.oficinas.models import Oficina
-from .models import ConfiguracionFiltro
+from .models import ConfiguracionFiltro, VistaPreviaExacta
+from array import array
+from datetime import timedelta
+import hashlib
+import json
 import logging
+import random
+import zlib
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +23,10 @@ logger = logging.getLogger(__name__)
 class FiltroAvanzado:
     """Clase para aplicar filtros avanzados a los bienes patrimoniales"""
     
+    # Caché de condiciones compiladas para configuraciones guardadas
+    PREFIX_COMPILADO = 'reportes_filtro_compilado'
+    TIMEOUT_COMPILADO = 3600  # 1 hora
+    
     def __init__(self, configuracion=None, parametros=None):
         """
         Inicializa el filtro avanzado
@@ -23,6 +37,14 @@ class FiltroAvanzado:
         """
         self.configuracion = configuracion
         self.parametros = parametros or {}
+        self._compilado = None
+        
+        # Solo una configuración guardada sin parámetros adicionales
+        # produce siempre la misma condición y puede reutilizarse
+        self._clave_compilado = None
+        if isinstance(configuracion, ConfiguracionFiltro) and configuracion.pk and not parametros:
+            version = configuracion.updated_at.timestamp() if configuracion.updated_at else 0
+            self._clave_compilado = f"{self.PREFIX_COMPILADO}:{configuracion.pk}:{version}"
         
         if isinstance(configuracion, ConfiguracionFiltro):
             self.parametros.update(configuracion.to_dict())
@@ -42,6 +64,44 @@ class FiltroAvanzado:
         if queryset is None:
             queryset = BienPatrimonial.objects.all()
         
+        filtro_final, requiere_distinct = self.compilar()
+        
+        if filtro_final is not None:
+            queryset = queryset.filter(filtro_final)
+        
+        # DISTINCT solo es necesario cuando algún join multiplica filas
+        if requiere_distinct:
+            queryset = queryset.distinct()
+        
+        return queryset
+    
+    def compilar(self):
+        """
+        Compila los parámetros en una única condición Q
+        
+        Para configuraciones guardadas el resultado se guarda en caché,
+        indexado por la fecha de modificación de la configuración.
+        
+        Returns:
+            Tupla (condición Q o None, requiere_distinct)
+        """
+        if self._compilado is not None:
+            return self._compilado
+        
+        compilado = None
+        if self._clave_compilado:
+            compilado = cache.get(self._clave_compilado)
+        
+        if compilado is None:
+            compilado = self._compilar_condiciones()
+            if self._clave_compilado:
+                cache.set(self._clave_compilado, compilado, self.TIMEOUT_COMPILADO)
+        
+        self._compilado = compilado
+        return compilado
+    
+    def _compilar_condiciones(self):
+        """Construye la condición combinada a partir de los filtros"""
         # Obtener operador principal
         operador = self.parametros.get('operador_principal', 'AND')
         
@@ -57,22 +117,56 @@ class FiltroAvanzado:
         condiciones.extend(self._filtros_valores())
         condiciones.extend(self._filtros_texto())
         
-        # Aplicar condiciones según el operador
-        if condiciones:
+        if not condiciones:
+            return None, False
+        
+        # Combinar condiciones según el operador
+        filtro_final = condiciones[0]
+        for condicion in condiciones[1:]:
             if operador == 'OR':
-                # Combinar con OR
-                filtro_final = condiciones[0]
-                for condicion in condiciones[1:]:
-                    filtro_final |= condicion
+                filtro_final |= condicion
             else:
-                # Combinar con AND (por defecto)
-                filtro_final = condiciones[0]
-                for condicion in condiciones[1:]:
-                    filtro_final &= condicion
-            
-            queryset = queryset.filter(filtro_final)
+                filtro_final &= condicion
+        
+        return filtro_final, self._requiere_distinct(filtro_final)
+    
+    @classmethod
+    def _requiere_distinct(cls, condicion, modelo=BienPatrimonial):
+        """
+        Determina si la condición recorre relaciones multivaluadas
         
-        return queryset.distinct()
+        Args:
+            condicion: Objeto Q compilado
+            modelo: Modelo sobre el que se evalúan los lookups
+            
+        Returns:
+            True si algún lookup atraviesa una relación uno-a-muchos
+            o muchos-a-muchos
+        """
+        for hijo in condicion.children:
+            if isinstance(hijo, Q):
+                if cls._requiere_distinct(hijo, modelo):
+                    return True
+            elif cls._ruta_multivaluada(hijo[0], modelo):
+                return True
+        return False
+    
+    @staticmethod
+    def _ruta_multivaluada(ruta, modelo):
+        """Indica si una ruta de lookup atraviesa una relación multivaluada"""
+        opciones = modelo._meta
+        for nombre in ruta.split(LOOKUP_SEP):
+            try:
+                campo = opciones.get_field(nombre)
+            except FieldDoesNotExist:
+                # Transformación o lookup final (icontains, date, etc.)
+                return False
+            if campo.many_to_many or campo.one_to_many:
+                return True
+            if not campo.is_relation:
+                return False
+            opciones = campo.related_model._meta
+        return False
     
     def _filtros_oficinas(self):
         """Aplica filtros por oficinas"""
@@ -125,24 +219,46 @@ class FiltroAvanzado:
         """Aplica filtros por marcas y modelos"""
         condiciones = []
         
-        # Filtros por marcas
-        marcas = self.parametros.get('marcas', [])
-        if marcas:
-            condicion_marcas = Q()
-            for marca in marcas:
-                condicion_marcas |= Q(marca__icontains=marca.strip())
+        condicion_marcas = self._condicion_terminos('marca', self.parametros.get('marcas', []))
+        if condicion_marcas is not None:
             condiciones.append(condicion_marcas)
         
-        # Filtros por modelos
-        modelos = self.parametros.get('modelos', [])
-        if modelos:
-            condicion_modelos = Q()
-            for modelo in modelos:
-                condicion_modelos |= Q(modelo__icontains=modelo.strip())
+        condicion_modelos = self._condicion_terminos('modelo', self.parametros.get('modelos', []))
+        if condicion_modelos is not None:
             condiciones.append(condicion_modelos)
         
         return condiciones
     
+    @staticmethod
+    def _condicion_terminos(campo, terminos):
+        """
+        Combina varios términos de búsqueda parcial en una sola condición
+        
+        Los términos se normalizan y se descartan los que contienen a otro
+        término (toda coincidencia de 'hp laser' ya coincide con 'hp'); los
+        restantes se unen con OR de icontains, que el motor puede resolver
+        como LIKE sin evaluar una expresión regular por fila.
+        
+        Args:
+            campo: Nombre del campo a filtrar
+            terminos: Lista de términos de búsqueda
+            
+        Returns:
+            Objeto Q o None si no hay términos válidos
+        """
+        terminos = sorted({t.strip().lower() for t in terminos if t and t.strip()}, key=len)
+        necesarios = []
+        for termino in terminos:
+            if not any(previo in termino for previo in necesarios):
+                necesarios.append(termino)
+        if not necesarios:
+            return None
+        
+        condicion = Q()
+        for termino in sorted(necesarios):
+            condicion |= Q(**{f'{campo}__icontains': termino})
+        return condicion
+    
     def _filtros_fechas(self):
         """Aplica filtros por fechas"""
         condiciones = []
@@ -207,195 +323,687 @@ class FiltroAvanzado:
         
         return condiciones
     
-    def obtener_estadisticas(self, queryset=None):
+    def obtener_estadisticas(self, queryset=None, agregados=None):
         """
         Obtiene estadísticas del queryset filtrado
         
         Args:
             queryset: QuerySet filtrado (opcional)
+            agregados: EstadisticasAgregadas ya calculadas para el queryset (opcional)
             
         Returns:
             Dict con estadísticas
         """
+        if agregados is None:
+            if queryset is None:
+                queryset = self.aplicar_filtros()
+            agregados = EstadisticasAgregadas(queryset)
+        
+        return agregados.estadisticas_filtro()
+
+
+class ResultadoFiltroMaterializado:
+    """
+    Resultado materializado de una configuración de filtro guardada.
+    
+    Los IDs de los bienes que cumplen la configuración se guardan en
+    caché como un arreglo ordenado y comprimido, junto con la versión
+    de datos de BienPatrimonial. Cualquier cambio en los bienes o en la
+    configuración invalida el resultado.
+    
+    Lo usan los reportes generados desde una configuración guardada
+    (programados o por configuración): el total sale del arreglo sin
+    consultar y los resultados de hasta LIMITE_ID_IN bienes se leen por
+    clave primaria. Los resultados más grandes vuelven a aplicar el
+    filtro compilado.
+    """
+    
+    PREFIX_RESULTADO = 'reportes_resultado_filtro'
+    TIMEOUT_RESULTADO = 3600  # 1 hora
+    
+    # Por encima de este tamaño no se usa una única cláusula IN
+    LIMITE_ID_IN = 5000
+    
+    def __init__(self, configuracion):
+        """
+        Args:
+            configuracion: Instancia guardada de ConfiguracionFiltro
+        """
+        self.configuracion = configuracion
+        self._ids = None
+    
+    def _clave_cache(self):
+        """Genera la clave de caché para la configuración y versión actuales"""
+        version_datos = DataVersionCache.get_version(BienPatrimonial)
+        version_config = self.configuracion.updated_at.timestamp() if self.configuracion.updated_at else 0
+        return f"{self.PREFIX_RESULTADO}:{self.configuracion.pk}:{version_config}:{version_datos}"
+    
+    @staticmethod
+    def _empaquetar(ids):
+        """Serializa una lista ordenada de IDs en bytes comprimidos"""
+        return zlib.compress(array('q', ids).tobytes())
+    
+    @staticmethod
+    def _desempaquetar(datos):
+        """Reconstruye la lista de IDs desde bytes comprimidos"""
+        ids = array('q')
+        ids.frombytes(zlib.decompress(datos))
+        return ids.tolist()
+    
+    def obtener_ids(self):
+        """
+        Obtiene los IDs ordenados de los bienes que cumplen la configuración
+        
+        Returns:
+            Lista ordenada de IDs
+        """
+        if self._ids is not None:
+            return self._ids
+        
+        clave = self._clave_cache()
+        datos = cache.get(clave)
+        
+        if datos is not None:
+            self._ids = self._desempaquetar(datos)
+        else:
+            queryset = FiltroAvanzado(self.configuracion).aplicar_filtros()
+            self._ids = list(queryset.order_by('id').values_list('id', flat=True))
+            cache.set(clave, self._empaquetar(self._ids), self.TIMEOUT_RESULTADO)
+            logger.debug(
+                f"Resultado materializado para configuración {self.configuracion.pk}: "
+                f"{len(self._ids)} bienes"
+            )
+        
+        return self._ids
+    
+    def contar(self):
+        """Número de bienes que cumplen la configuración"""
+        return len(self.obtener_ids())
+    
+    def obtener_queryset(self, queryset=None):
+        """
+        Obtiene un QuerySet equivalente al resultado materializado
+        
+        Los resultados pequeños se resuelven por clave primaria; los
+        grandes usan la condición compilada para evitar cláusulas IN
+        con demasiados parámetros.
+        
+        Args:
+            queryset: QuerySet base (opcional)
+            
+        Returns:
+            QuerySet de BienPatrimonial
+        """
         if queryset is None:
-            queryset = self.aplicar_filtros()
-        
-        estadisticas = {
-            'total_bienes': queryset.count(),
-            'por_estado': self._estadisticas_por_estado(queryset),
-            'por_oficina': self._estadisticas_por_oficina(queryset),
-            'por_grupo': self._estadisticas_por_grupo(queryset),
-            'por_clase': self._estadisticas_por_clase(queryset),
-            'valores': self._estadisticas_valores(queryset),
-            'fechas': self._estadisticas_fechas(queryset),
-        }
+            queryset = BienPatrimonial.objects.all()
         
-        return estadisticas
-    
-    def _estadisticas_por_estado(self, queryset):
-        """Estadísticas por estado del bien"""
-        return list(queryset.values('estado_bien').annotate(
-            total=Count('id'),
-            porcentaje=Count('id') * 100.0 / queryset.count() if queryset.count() > 0 else 0
-        ).order_by('estado_bien'))
-    
-    def _estadisticas_por_oficina(self, queryset):
-        """Estadísticas por oficina"""
-        return list(queryset.values(
-            'oficina__nombre', 'oficina__codigo'
-        ).annotate(
-            total=Count('id'),
-            porcentaje=Count('id') * 100.0 / queryset.count() if queryset.count() > 0 else 0
-        ).order_by('-total')[:10])  # Top 10 oficinas
-    
-    def _estadisticas_por_grupo(self, queryset):
-        """Estadísticas por grupo de catálogo"""
-        return list(queryset.values(
-            'catalogo__grupo'
-        ).annotate(
-            total=Count('id'),
-            porcentaje=Count('id') * 100.0 / queryset.count() if queryset.count() > 0 else 0
-        ).order_by('-total')[:10])  # Top 10 grupos
-    
-    def _estadisticas_por_clase(self, queryset):
-        """Estadísticas por clase de catálogo"""
-        return list(queryset.values(
-            'catalogo__clase'
-        ).annotate(
-            total=Count('id'),
-            porcentaje=Count('id') * 100.0 / queryset.count() if queryset.count() > 0 else 0
-        ).order_by('-total')[:10])  # Top 10 clases
-    
-    def _estadisticas_valores(self, queryset):
-        """Estadísticas de valores"""
-        valores_stats = queryset.aggregate(
-            total_valor=Sum('valor_adquisicion'),
-            valor_promedio=Avg('valor_adquisicion'),
-            bienes_con_valor=Count('id', filter=Q(valor_adquisicion__isnull=False))
+        ids = self.obtener_ids()
+        if len(ids) <= self.LIMITE_ID_IN:
+            return queryset.filter(id__in=ids)
+        
+        return FiltroAvanzado(self.configuracion).aplicar_filtros(queryset)
+
+
+class CambiosFiltro:
+    """
+    Bienes de una configuración de filtros que cambiaron entre dos marcas
+    de agua.
+    
+    La marca de agua es la secuencia del registro de cambios de bienes
+    (RegistroCambioBien), que sigue el orden de confirmación de las
+    transacciones: un cambio confirmado después de calcular una marca
+    recibe una secuencia mayor y aparece en la ejecución siguiente, aunque
+    su updated_at sea anterior. Un cambio es un bien de la configuración
+    con registros entre las dos marcas; los dados de baja (soft delete)
+    se incluyen como eliminados. Sin marca anterior, o si sus registros ya
+    se purgaron, el resultado son todos los bienes activos.
+    
+    Los bienes que una edición saca de la configuración (por ejemplo, un
+    traslado a otra oficina) no se informan: el registro no conserva los
+    valores anteriores, por lo que no puede saberse si antes cumplían los
+    filtros. Solo una ejecución completa refleja esas salidas.
+    """
+    
+    def __init__(self, configuracion, desde=None, hasta=None):
+        """
+        Args:
+            configuracion: Instancia guardada de ConfiguracionFiltro
+            desde: Marca de agua de la ejecución anterior (opcional)
+            hasta: Marca de agua de la ejecución actual (opcional, se
+                calcula con resumen())
+        """
+        self.configuracion = configuracion
+        self.desde = desde
+        self.hasta = hasta
+    
+    def _base(self):
+        """Bienes de la configuración, incluidos los dados de baja"""
+        return FiltroAvanzado(self.configuracion).aplicar_filtros(BienPatrimonial.all_objects.all())
+    
+    def _condicion_cambios(self):
+        """Condición de los bienes que cambiaron entre las dos marcas"""
+        from apps.mobile.models import RegistroCambioBien
+        
+        if self.desde is None:
+            # Todos los bienes activos, salvo los que cambiaron después de
+            # la marca actual: llegarán en la ejecución siguiente
+            if self.hasta is None:
+                return Q(deleted_at__isnull=True)
+            posteriores = RegistroCambioBien.objects.filter(
+                Q(secuencia__gt=self.hasta) | Q(secuencia__isnull=True)
+            )
+            return Q(deleted_at__isnull=True) & ~Q(pk__in=posteriores.values('bien_id'))
+        
+        registros = RegistroCambioBien.objects.filter(secuencia__gt=self.desde)
+        if self.hasta is not None:
+            registros = registros.filter(secuencia__lte=self.hasta)
+        return Q(pk__in=registros.values('bien_id'))
+    
+    def resumen(self):
+        """
+        Calcula la nueva marca de agua y cuenta los cambios en una consulta
+        
+        Returns:
+            dict: marca_agua, total, nuevos, modificados y eliminados
+        """
+        from apps.mobile.models import RegistroCambioBien, SecuenciaCambiosBien
+        
+        RegistroCambioBien.asignar_secuencias()
+        contador = SecuenciaCambiosBien.obtener()
+        self.hasta = contador.ultima
+        if self.desde is not None and self.desde < contador.purgado_hasta:
+            logger.info(f"Registros de cambios purgados desde la marca {self.desde}: se exporta todo")
+            self.desde = None
+        
+        if self.desde is not None and self.desde >= self.hasta:
+            # Ningún cambio confirmado desde la marca anterior
+            return {'marca_agua': self.hasta, 'total': 0, 'nuevos': 0, 'modificados': 0, 'eliminados': 0}
+        
+        eliminados = Q(pk__in=[])
+        nuevos = Q(deleted_at__isnull=True)
+        if self.desde is not None:
+            eliminados = Q(deleted_at__isnull=False)
+            # Los bienes creados después del registro de la marca anterior
+            fecha_marca = RegistroCambioBien.objects.filter(
+                secuencia__lte=self.desde
+            ).order_by('-secuencia').values_list('fecha', flat=True).first()
+            if fecha_marca:
+                nuevos &= Q(created_at__gt=fecha_marca)
+        
+        cambios = self._condicion_cambios()
+        datos = self._base().aggregate(
+            total=Count('id', filter=cambios),
+            nuevos=Count('id', filter=cambios & nuevos),
+            eliminados=Count('id', filter=cambios & eliminados),
         )
         
         return {
-            'total_valor': valores_stats['total_valor'] or 0,
-            'valor_promedio': valores_stats['valor_promedio'] or 0,
-            'bienes_con_valor': valores_stats['bienes_con_valor'],
-            'bienes_sin_valor': queryset.count() - valores_stats['bienes_con_valor']
+            'marca_agua': self.hasta,
+            'total': datos['total'],
+            'nuevos': datos['nuevos'],
+            'modificados': datos['total'] - datos['nuevos'] - datos['eliminados'],
+            'eliminados': datos['eliminados'],
         }
     
-    def _estadisticas_fechas(self, queryset):
-        """Estadísticas de fechas"""
-        fechas_stats = queryset.aggregate(
-            fecha_mas_antigua=queryset.order_by('created_at').first().created_at if queryset.exists() else None,
-            fecha_mas_reciente=queryset.order_by('-created_at').first().created_at if queryset.exists() else None
-        )
+    def obtener_queryset(self):
+        """
+        Obtiene los bienes que cambiaron entre las dos marcas de agua
         
-        # Estadísticas por año de registro (compatible con SQLite)
-        por_año = list(queryset.annotate(
-            año=Extract('created_at', 'year')
-        ).values('año').annotate(
-            total=Count('id')
-        ).order_by('-año')[:5])  # Últimos 5 años
+        Los cambios posteriores a la marca actual se excluyen: quedan
+        para la siguiente ejecución.
         
-        fechas_stats['por_año'] = por_año
-        return fechas_stats
+        Returns:
+            QuerySet de BienPatrimonial (incluye bienes dados de baja)
+        """
+        return self._base().filter(self._condicion_cambios())
 
 
-class GeneradorEstadisticas:
-    """Clase para generar estadísticas avanzadas"""
+class EstadisticasAgregadas:
+    """
+    Estadísticas de un conjunto de bienes calculadas en dos consultas.
     
-    @staticmethod
-    def generar_resumen_ejecutivo(queryset=None):
+    La primera consulta obtiene totales, valores, fechas y alertas con
+    agregación condicional; la segunda agrupa por (oficina, grupo, clase,
+    estado, año de registro) y los desgloses se consolidan en Python.
+    Una misma instancia alimenta las estadísticas de filtros, el resumen
+    ejecutivo, las alertas y las comparativas sin repetir consultas.
+    """
+    
+    # Caché de las estadísticas del inventario completo (dashboard)
+    PREFIX_INVENTARIO = 'reportes_estadisticas_inventario'
+    TIMEOUT_INVENTARIO = 3600  # 1 hora
+    
+    MODELOS_ORIGEN = [BienPatrimonial, Catalogo, Oficina]
+    
+    ESTADOS_ATENCION = ['M', 'E', 'C']
+    AÑOS_ANTIGUEDAD = 10
+    
+    def __init__(self, queryset=None):
         """
-        Genera un resumen ejecutivo con indicadores clave
+        Args:
+            queryset: QuerySet de bienes (por defecto todos los bienes)
+        """
+        self.queryset = queryset if queryset is not None else BienPatrimonial.objects.all()
+        self._totales = None
+        self._grupos = None
+    
+    @classmethod
+    def inventario_completo(cls):
+        """
+        Obtiene las estadísticas de todos los bienes, reutilizando el caché
+        mientras no cambie la versión de datos de bienes, catálogo u oficinas
+        
+        Returns:
+            EstadisticasAgregadas
+        """
+        versiones = ':'.join(str(version) for version in DataVersionCache.get_versions(cls.MODELOS_ORIGEN))
+        clave = f"{cls.PREFIX_INVENTARIO}:{versiones}"
+        
+        datos = cache.get(clave)
+        agregados = cls()
+        if datos is not None:
+            agregados._totales, agregados._grupos = datos
+        else:
+            cache.set(clave, (agregados.totales, agregados.grupos), cls.TIMEOUT_INVENTARIO)
+        return agregados
+    
+    @classmethod
+    def fecha_limite_antiguedad(cls, hoy):
+        """
+        Fecha de adquisición a partir de la cual un bien no es antiguo
         
         Args:
-            queryset: QuerySet de bienes (opcional)
-            
+            hoy: Fecha de referencia
+        
         Returns:
-            Dict con resumen ejecutivo
+            date: La misma fecha AÑOS_ANTIGUEDAD años antes; el 29 de
+                febrero pasa al 28 si ese año no es bisiesto
         """
-        if queryset is None:
-            queryset = BienPatrimonial.objects.all()
+        try:
+            return hoy.replace(year=hoy.year - cls.AÑOS_ANTIGUEDAD)
+        except ValueError:
+            return hoy.replace(year=hoy.year - cls.AÑOS_ANTIGUEDAD, day=28)
+    
+    @property
+    def totales(self):
+        """Totales, valores, fechas y alertas en una sola consulta"""
+        if self._totales is None:
+            fecha_limite = self.fecha_limite_antiguedad(timezone.now().date())
+            
+            conteos_estado = {
+                f'estado_{codigo}': Count('id', filter=Q(estado_bien=codigo))
+                for codigo, _ in BienPatrimonial.ESTADOS_BIEN
+            }
+            self._totales = self.queryset.order_by().aggregate(
+                total=Count('id'),
+                total_oficinas=Count('oficina', distinct=True),
+                total_valor=Sum('valor_adquisicion'),
+                valor_promedio=Avg('valor_adquisicion'),
+                con_valor=Count('id', filter=Q(valor_adquisicion__isnull=False)),
+                sin_fecha_adquisicion=Count('id', filter=Q(fecha_adquisicion__isnull=True)),
+                bienes_antiguos=Count('id', filter=Q(fecha_adquisicion__lt=fecha_limite)),
+                fecha_mas_antigua=Min('created_at'),
+                fecha_mas_reciente=Max('created_at'),
+                **conteos_estado
+            )
+        return self._totales
+    
+    @property
+    def grupos(self):
+        """Conteos agrupados por oficina, grupo, clase, estado y año"""
+        if self._grupos is None:
+            self._grupos = list(self.queryset.order_by().annotate(
+                año=Extract('created_at', 'year')
+            ).values(
+                'oficina__nombre', 'oficina__codigo', 'catalogo__grupo',
+                'catalogo__clase', 'estado_bien', 'año'
+            ).annotate(total=Count('id')))
+        return self._grupos
+    
+    @property
+    def total(self):
+        return self.totales['total']
+    
+    def contar_estado(self, estado):
+        """Número de bienes en un estado"""
+        return self.totales.get(f'estado_{estado}', 0)
+    
+    def _porcentaje(self, cantidad):
+        return cantidad * 100.0 / self.total if self.total else 0
+    
+    def consolidar(self, campos):
+        """
+        Suma los conteos agrupados por un subconjunto de campos
         
-        total_bienes = queryset.count()
+        Args:
+            campos: Lista de campos de agrupación
         
-        # Indicadores básicos
-        indicadores = {
-            'total_bienes': total_bienes,
-            'total_oficinas': queryset.values('oficina').distinct().count(),
-            'total_valor': queryset.aggregate(Sum('valor_adquisicion'))['valor_adquisicion__sum'] or 0,
-            'valor_promedio': queryset.aggregate(Avg('valor_adquisicion'))['valor_adquisicion__avg'] or 0,
+        Returns:
+            Lista de dicts {campo: valor, ..., 'total': n}
+        """
+        acumulado = {}
+        for fila in self.grupos:
+            clave = tuple(fila[campo] for campo in campos)
+            acumulado[clave] = acumulado.get(clave, 0) + fila['total']
+        return [
+            {**dict(zip(campos, clave)), 'total': total}
+            for clave, total in acumulado.items()
+        ]
+    
+    def ranking(self, campos, limite, porcentaje=True):
+        """Desglose ordenado de mayor a menor, limitado a los primeros"""
+        filas = sorted(
+            self.consolidar(campos),
+            key=lambda fila: (-fila['total'], [str(fila[campo]) for campo in campos])
+        )[:limite]
+        if porcentaje:
+            for fila in filas:
+                fila['porcentaje'] = self._porcentaje(fila['total'])
+        return filas
+    
+    def por_estado(self):
+        """Distribución por estado del bien"""
+        return [
+            {'estado_bien': codigo, 'total': self.contar_estado(codigo),
+             'porcentaje': self._porcentaje(self.contar_estado(codigo))}
+            for codigo, _ in sorted(BienPatrimonial.ESTADOS_BIEN)
+            if self.contar_estado(codigo)
+        ]
+    
+    def por_año(self, descendente=False, limite=None):
+        """Bienes registrados por año"""
+        filas = sorted(self.consolidar(['año']), key=lambda fila: fila['año'] or 0, reverse=descendente)
+        return filas[:limite] if limite else filas
+    
+    def estadisticas_filtro(self):
+        """Estadísticas en el formato de FiltroAvanzado.obtener_estadisticas"""
+        totales = self.totales
+        return {
+            'total_bienes': self.total,
+            'por_estado': self.por_estado(),
+            'por_oficina': self.ranking(['oficina__nombre', 'oficina__codigo'], 10),
+            'por_grupo': self.ranking(['catalogo__grupo'], 10),
+            'por_clase': self.ranking(['catalogo__clase'], 10),
+            'valores': {
+                'total_valor': totales['total_valor'] or 0,
+                'valor_promedio': totales['valor_promedio'] or 0,
+                'bienes_con_valor': totales['con_valor'],
+                'bienes_sin_valor': self.total - totales['con_valor'],
+            },
+            'fechas': {
+                'fecha_mas_antigua': totales['fecha_mas_antigua'],
+                'fecha_mas_reciente': totales['fecha_mas_reciente'],
+                'por_año': self.por_año(descendente=True, limite=5),
+            },
         }
+    
+    def resumen_ejecutivo(self):
+        """Resumen ejecutivo en el formato de GeneradorEstadisticas"""
+        totales = self.totales
+        atencion = sum(self.contar_estado(estado) for estado in self.ESTADOS_ATENCION)
+        return {
+            'total_bienes': self.total,
+            'total_oficinas': totales['total_oficinas'],
+            'total_valor': totales['total_valor'] or 0,
+            'valor_promedio': totales['valor_promedio'] or 0,
+            'distribucion_estados': {
+                fila['estado_bien']: {
+                    'total': fila['total'],
+                    'porcentaje': round(fila['porcentaje'], 2)
+                }
+                for fila in self.por_estado()
+            },
+            'bienes_requieren_atencion': atencion,
+            'porcentaje_atencion': round(self._porcentaje(atencion), 2),
+            'top_oficinas': self.ranking(['oficina__nombre', 'oficina__codigo'], 5, porcentaje=False),
+            'tendencias_registro': self.por_año(),
+        }
+    
+    def alertas_mantenimiento(self):
+        """Alertas de mantenimiento en el formato de GeneradorEstadisticas"""
+        totales = self.totales
+        return {
+            'bienes_malo_estado': self.contar_estado('M'),
+            'bienes_raee': self.contar_estado('E'),
+            'bienes_chatarra': self.contar_estado('C'),
+            'sin_valor_adquisicion': self.total - totales['con_valor'],
+            'sin_fecha_adquisicion': totales['sin_fecha_adquisicion'],
+            'bienes_antiguos': totales['bienes_antiguos'],
+        }
+    
+    def comparativas(self):
+        """Comparativas estado/oficina y grupo/estado"""
+        return {
+            'estado_oficina': sorted(
+                self.consolidar(['estado_bien', 'oficina__nombre']),
+                key=lambda fila: (str(fila['oficina__nombre']), fila['estado_bien'])
+            ),
+            'grupo_estado': sorted(
+                self.consolidar(['catalogo__grupo', 'estado_bien']),
+                key=lambda fila: (str(fila['catalogo__grupo']), fila['estado_bien'])
+            ),
+        }
+
+
+class VistaPreviaMuestreada:
+    """
+    Vista previa inmediata de los resultados de un filtro.
+    
+    Las primeras filas se obtienen con una consulta LIMIT. El total y la
+    distribución por estado se estiman sobre una muestra de ventanas
+    aleatorias de IDs (lecturas por rango de clave primaria) y se marcan
+    como aproximados; el cálculo exacto se hace aparte y se guarda en
+    VistaPreviaExacta, compartido entre el worker y los procesos web. Con
+    pocos bienes, o si el filtro devuelve menos filas que el límite, el
+    resultado es exacto desde el inicio.
+    """
+    
+    FILAS = 20
+    COLUMNAS = [
+        'id', 'codigo_patrimonial', 'catalogo__denominacion', 'estado_bien',
+        'oficina__nombre', 'marca', 'modelo',
+    ]
+    
+    # Bienes leídos en la muestra, repartidos en ventanas de IDs
+    TAMAÑO_MUESTRA = 5000
+    VENTANAS_MUESTRA = 10
+    
+    PREFIX_VISTA_PREVIA = 'reportes_vista_previa'
+    TIMEOUT_POBLACION = 3600  # 1 hora
+    TIMEOUT_EXACTO = 600  # 10 minutos
+    # Tiempo tras el cual un cálculo pendiente se da por perdido
+    TIMEOUT_CALCULO = 300  # 5 minutos
+    
+    def __init__(self, parametros):
+        """
+        Args:
+            parametros: Dict de parámetros de FiltroAvanzado
+        """
+        # Las fechas se guardan como texto ISO para poder enviarlas a Celery
+        self.parametros = json.loads(json.dumps(parametros or {}, default=str))
+        self.queryset = FiltroAvanzado(parametros=dict(self.parametros)).aplicar_filtros()
+        self.version_datos = DataVersionCache.get_version(BienPatrimonial)
+    
+    @property
+    def clave(self):
+        """Identificador del filtro para la versión actual de los datos"""
+        contenido = json.dumps(self.parametros, sort_keys=True)
+        huella = hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:32]
+        return f"{huella}:{self.version_datos}"
+    
+    def filas(self):
+        """Primeras FILAS bienes del filtro, ordenados por ID"""
+        return list(self.queryset.order_by('id').values(*self.COLUMNAS)[:self.FILAS])
+    
+    def _poblacion(self):
+        """Rango de IDs y total de bienes activos, en caché por versión de datos"""
+        clave = f"{self.PREFIX_VISTA_PREVIA}:poblacion:{self.version_datos}"
+        poblacion = cache.get(clave)
+        if poblacion is None:
+            poblacion = BienPatrimonial.objects.aggregate(minimo=Min('id'), maximo=Max('id'), total=Count('id'))
+            cache.set(clave, poblacion, self.TIMEOUT_POBLACION)
+        return poblacion
+    
+    def _ventanas(self, poblacion):
+        """
+        Condición con VENTANAS_MUESTRA rangos de IDs elegidos al azar
         
-        # Distribución por estado
-        estados = queryset.values('estado_bien').annotate(
-            total=Count('id'),
-            porcentaje=Count('id') * 100.0 / total_bienes if total_bienes > 0 else 0
-        )
+        La semilla es la clave del filtro, de modo que el mismo filtro
+        sobre los mismos datos produce la misma estimación.
+        """
+        ancho = max(1, self.TAMAÑO_MUESTRA // self.VENTANAS_MUESTRA)
+        ultimo_inicio = max(poblacion['minimo'], poblacion['maximo'] - ancho + 1)
+        azar = random.Random(self.clave)
+        condicion = Q()
+        for _ in range(self.VENTANAS_MUESTRA):
+            inicio = azar.randint(poblacion['minimo'], ultimo_inicio)
+            condicion |= Q(id__range=(inicio, inicio + ancho - 1))
+        return condicion
+    
+    @staticmethod
+    def _resultado(total, por_estado, aproximado):
+        estadisticas = [
+            {'estado_bien': codigo, 'total': por_estado[codigo]}
+            for codigo, _ in sorted(BienPatrimonial.ESTADOS_BIEN)
+            if por_estado.get(codigo)
+        ]
+        return {'total': total, 'estadisticas_estado': estadisticas, 'aproximado': aproximado}
+    
+    def estimar(self, filas=None):
+        """
+        Estima el total y la distribución por estado
         
-        indicadores['distribucion_estados'] = {
-            estado['estado_bien']: {
-                'total': estado['total'],
-                'porcentaje': round(estado['porcentaje'], 2)
-            }
-            for estado in estados
-        }
+        Args:
+            filas: Resultado de filas(), para no repetir la consulta
         
-        # Bienes que requieren atención
-        bienes_atencion = queryset.filter(estado_bien__in=['M', 'E', 'C']).count()
-        indicadores['bienes_requieren_atencion'] = bienes_atencion
-        indicadores['porcentaje_atencion'] = round(
-            (bienes_atencion * 100.0 / total_bienes) if total_bienes > 0 else 0, 2
+        Returns:
+            dict: total, estadisticas_estado y aproximado (False si el
+                resultado es exacto)
+        """
+        exacto = self.obtener_exacto()
+        if exacto is not None:
+            return exacto
+        
+        filas = self.filas() if filas is None else filas
+        if len(filas) < self.FILAS:
+            # La consulta LIMIT ya devolvió todos los bienes del filtro
+            por_estado = {}
+            for fila in filas:
+                por_estado[fila['estado_bien']] = por_estado.get(fila['estado_bien'], 0) + 1
+            return self._resultado(len(filas), por_estado, aproximado=False)
+        
+        poblacion = self._poblacion()
+        if poblacion['total'] <= self.TAMAÑO_MUESTRA:
+            return self.calcular_exacto()
+        
+        ventanas = self._ventanas(poblacion)
+        muestra = BienPatrimonial.objects.filter(ventanas).count()
+        conteos = (
+            self.queryset.filter(ventanas).order_by()
+            .values('estado_bien').annotate(total=Count('id', distinct=True))
         )
         
-        # Top 5 oficinas con más bienes
-        top_oficinas = list(queryset.values(
-            'oficina__nombre', 'oficina__codigo'
-        ).annotate(
-            total=Count('id')
-        ).order_by('-total')[:5])
+        factor = poblacion['total'] / muestra if muestra else 0
+        por_estado = {fila['estado_bien']: round(fila['total'] * factor) for fila in conteos}
+        # Al menos las filas ya mostradas
+        total = max(sum(por_estado.values()), len(filas))
+        return self._resultado(total, por_estado, aproximado=True)
+    
+    def obtener_exacto(self):
+        """Resultado exacto guardado, o None si aún no se calculó"""
+        return self.resultado_exacto(self.clave)
+    
+    def reservar_calculo(self):
+        """
+        Marca el cálculo exacto como en curso
         
-        indicadores['top_oficinas'] = top_oficinas
+        Returns:
+            bool: True si el cálculo debe encolarse; False si ya hay uno
+                pendiente o un resultado vigente
+        """
+        ahora = timezone.now()
+        _, creado = VistaPreviaExacta.objects.get_or_create(clave=self.clave, defaults={'fecha': ahora})
+        if creado:
+            return True
+        
+        # Se vuelve a encolar si el resultado venció o el cálculo no terminó
+        # a tiempo (por ejemplo, porque el worker se detuvo)
+        vencido = Q(resultado__isnull=False, fecha__lt=ahora - timedelta(seconds=self.TIMEOUT_EXACTO))
+        perdido = Q(resultado__isnull=True, fecha__lt=ahora - timedelta(seconds=self.TIMEOUT_CALCULO))
+        return bool(
+            VistaPreviaExacta.objects.filter(vencido | perdido, clave=self.clave).update(resultado=None, fecha=ahora)
+        )
+    
+    @classmethod
+    def resultado_exacto(cls, clave):
+        """
+        Resultado exacto guardado para una clave de vista previa
         
-        # Tendencias por año (compatible con SQLite)
-        tendencias = list(queryset.annotate(
-            año=Extract('created_at', 'year')
-        ).values('año').annotate(
-            total=Count('id')
-        ).order_by('año'))
+        Args:
+            clave: Valor de la propiedad clave
         
-        indicadores['tendencias_registro'] = tendencias
+        Returns:
+            dict con el formato de estimar(), o None si aún no se calculó
+        """
+        return VistaPreviaExacta.objects.filter(
+            clave=clave,
+            resultado__isnull=False,
+            fecha__gte=timezone.now() - timedelta(seconds=cls.TIMEOUT_EXACTO)
+        ).values_list('resultado', flat=True).first()
+    
+    def calcular_exacto(self):
+        """
+        Calcula el total y la distribución exactos y los guarda
         
-        return indicadores
+        Returns:
+            dict con el formato de estimar() y aproximado=False
+        """
+        agregados = EstadisticasAgregadas(self.queryset)
+        resultado = self._resultado(
+            agregados.total,
+            {fila['estado_bien']: fila['total'] for fila in agregados.por_estado()},
+            aproximado=False
+        )
+        VistaPreviaExacta.objects.update_or_create(
+            clave=self.clave, defaults={'resultado': resultado, 'fecha': timezone.now()}
+        )
+        return resultado
+
+
+class GeneradorEstadisticas:
+    """Clase para generar estadísticas avanzadas"""
+    
+    @staticmethod
+    def generar_resumen_ejecutivo(queryset=None, agregados=None):
+        """
+        Genera un resumen ejecutivo con indicadores clave
+        
+        Args:
+            queryset: QuerySet de bienes (opcional)
+            agregados: EstadisticasAgregadas ya calculadas (opcional)
+            
+        Returns:
+            Dict con resumen ejecutivo
+        """
+        if agregados is None:
+            agregados = EstadisticasAgregadas(queryset)
+        return agregados.resumen_ejecutivo()
     
     @staticmethod
-    def generar_alertas_mantenimiento(queryset=None):
+    def generar_alertas_mantenimiento(queryset=None, agregados=None):
         """
         Genera alertas de bienes que requieren mantenimiento
         
         Args:
             queryset: QuerySet de bienes (opcional)
+            agregados: EstadisticasAgregadas ya calculadas (opcional)
             
         Returns:
             Dict con alertas
         """
-        if queryset is None:
-            queryset = BienPatrimonial.objects.all()
-        
-        alertas = {
-            'bienes_malo_estado': queryset.filter(estado_bien='M').count(),
-            'bienes_raee': queryset.filter(estado_bien='E').count(),
-            'bienes_chatarra': queryset.filter(estado_bien='C').count(),
-            'sin_valor_adquisicion': queryset.filter(valor_adquisicion__isnull=True).count(),
-            'sin_fecha_adquisicion': queryset.filter(fecha_adquisicion__isnull=True).count(),
-        }
-        
-        # Bienes antiguos (más de 10 años)
-        fecha_limite = timezone.now().date().replace(year=timezone.now().year - 10)
-        alertas['bienes_antiguos'] = queryset.filter(
-            fecha_adquisicion__lt=fecha_limite
-        ).count()
-        
-        return alertas
+        if agregados is None:
+            agregados = EstadisticasAgregadas(queryset)
+        return agregados.alertas_mantenimiento()
 
 
 class ValidadorFiltros:
@@ -482,6 +1090,23 @@ def aplicar_filtros_desde_request(request, queryset=None):
     Returns:
         QuerySet filtrado
     """
+    filtro = FiltroAvanzado(parametros=parametros_filtro_desde_request(request))
+    return filtro.aplicar_filtros(queryset)
+
+
+def parametros_filtro_desde_request(request):
+    """
+    Extrae los parámetros de FiltroAvanzado de una request HTTP
+    
+    Los parámetros son serializables (las fechas se conservan en formato
+    ISO), por lo que pueden enviarse a tareas de Celery.
+    
+    Args:
+        request: HttpRequest con parámetros de filtro
+        
+    Returns:
+        dict: Parámetros de filtro
+    """
     parametros = {}
     
     # Extraer parámetros de la request
@@ -510,7 +1135,7 @@ def aplicar_filtros_desde_request(request, queryset=None):
         if valor:
             try:
                 from datetime import datetime
-                parametros[campo] = datetime.strptime(valor, '%Y-%m-%d').date()
+                parametros[campo] = datetime.strptime(valor, '%Y-%m-%d').date().isoformat()
             except ValueError:
                 logger.warning(f"Fecha inválida para {campo}: {valor}")
     
@@ -526,6 +1151,4 @@ def aplicar_filtros_desde_request(request, queryset=None):
     # Operador lógico
     parametros['operador_principal'] = request.GET.get('operador_principal', 'AND')
     
-    # Aplicar filtros
-    filtro = FiltroAvanzado(parametros=parametros)
-    return filtro.aplicar_filtros(queryset)
\ No newline at end of file
+    return parametros
\ No newline at end of file
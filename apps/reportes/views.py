@@ -1,7 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
 from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.views.decorators.http import require_http_methods
@@ -19,7 +19,7 @@ from .forms import (
     FiltroAvanzadoForm, ConfiguracionFiltroForm, 
     CargarConfiguracionForm, GenerarReporteForm
 )
-from .utils import FiltroAvanzado, GeneradorEstadisticas, aplicar_filtros_desde_request
+from .utils import FiltroAvanzado, GeneradorEstadisticas, EstadisticasAgregadas, aplicar_filtros_desde_request
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +28,9 @@ logger = logging.getLogger(__name__)
 def dashboard_reportes(request):
     """Vista principal del módulo de reportes"""
     
-    # Estadísticas generales
-    total_bienes = BienPatrimonial.objects.count()
+    # Estadísticas del inventario en dos consultas agregadas (en caché por versión de datos)
+    agregados = EstadisticasAgregadas.inventario_completo()
+    total_bienes = agregados.total
     total_oficinas = Oficina.objects.filter(estado=True).count()
     
     # Configuraciones del usuario
@@ -42,9 +43,8 @@ def dashboard_reportes(request):
     ).order_by('-fecha_inicio')[:10]
     
     # Estadísticas rápidas
-    generador = GeneradorEstadisticas()
-    resumen = generador.generar_resumen_ejecutivo()
-    alertas = generador.generar_alertas_mantenimiento()
+    resumen = GeneradorEstadisticas.generar_resumen_ejecutivo(agregados=agregados)
+    alertas = GeneradorEstadisticas.generar_alertas_mantenimiento(agregados=agregados)
     
     context = {
         'total_bienes': total_bienes,
@@ -254,15 +254,20 @@ def vista_previa_filtros(request):
                 elif value and key not in ['csrfmiddlewaretoken']:
                     parametros[key] = value
             
+            if parametros.pop('modo', None) == 'rapido':
+                return _vista_previa_rapida(parametros)
+            
             # Aplicar filtros
             filtro = FiltroAvanzado(parametros=parametros)
             queryset = filtro.aplicar_filtros()
             
-            # Obtener estadísticas básicas
-            total = queryset.count()
-            por_estado = list(queryset.values('estado_bien').annotate(
-                total=Count('id')
-            ).order_by('estado_bien'))
+            # Obtener estadísticas básicas (una sola consulta agregada)
+            agregados = EstadisticasAgregadas(queryset)
+            total = agregados.total
+            por_estado = [
+                {'estado_bien': fila['estado_bien'], 'total': fila['total']}
+                for fila in agregados.por_estado()
+            ]
             
             return JsonResponse({
                 'success': True,
@@ -281,6 +286,60 @@ def vista_previa_filtros(request):
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
 
+def _vista_previa_rapida(parametros):
+    """
+    Vista previa inmediata: primeras filas con LIMIT y totales estimados
+    
+    Si la estimación es aproximada, el cálculo exacto se encola y puede
+    consultarse en api_vista_previa_exacta con la clave devuelta.
+    """
+    from django.urls import reverse
+    from .utils import VistaPreviaMuestreada
+    
+    vista_previa = VistaPreviaMuestreada(parametros)
+    filas = vista_previa.filas()
+    resultado = vista_previa.estimar(filas)
+    total = resultado['total']
+    
+    datos = {
+        'success': True,
+        'modo': 'rapido',
+        'filas': filas,
+        'total_resultados': total,
+        'estadisticas_estado': resultado['estadisticas_estado'],
+        'aproximado': resultado['aproximado'],
+        'mensaje': f'Se encontraron {total} bienes que coinciden con los filtros',
+    }
+    
+    if resultado['aproximado']:
+        # Solo se encola si no hay un cálculo en curso para el mismo filtro
+        if vista_previa.reservar_calculo():
+            from .tasks import calcular_vista_previa_exacta
+            calcular_vista_previa_exacta.delay(vista_previa.parametros)
+        
+        datos['mensaje'] = f'Se encontraron aproximadamente {total} bienes que coinciden con los filtros'
+        datos['url_exacto'] = reverse('reportes:api_vista_previa_exacta', args=[vista_previa.clave])
+    
+    return JsonResponse(datos)
+
+
+@login_required
+def api_vista_previa_exacta(request, clave):
+    """API para consultar el total exacto de una vista previa rápida"""
+    from .utils import VistaPreviaMuestreada
+    
+    resultado = VistaPreviaMuestreada.resultado_exacto(clave)
+    if resultado is None:
+        return JsonResponse({'listo': False})
+    
+    return JsonResponse({
+        'listo': True,
+        'total_resultados': resultado['total'],
+        'estadisticas_estado': resultado['estadisticas_estado'],
+        'aproximado': False,
+    })
+
+
 @login_required
 def generar_reporte(request):
     """Vista para generar reportes con filtros aplicados"""
@@ -304,6 +363,7 @@ def generar_reporte(request):
                     'incluir_graficos': form.cleaned_data.get('incluir_graficos', False),
                     'incluir_historial': form.cleaned_data.get('incluir_historial', False),
                     'agrupar_por': form.cleaned_data.get('agrupar_por', ''),
+                    'entrega': form.cleaned_data.get('entrega') or 'ZIP',
                 }
             )
             
@@ -364,23 +424,27 @@ def descargar_reporte(request, pk):
         return redirect('reportes:mis_reportes')
     
     try:
-        response = HttpResponse(
-            reporte.archivo_generado.read(),
-            content_type='application/octet-stream'
-        )
-        
-        # Determinar nombre del archivo
-        extension = {
+        # Determinar nombre del archivo (los reportes particionados son ZIP)
+        from .almacenamiento import AlmacenReportes
+        extension = AlmacenReportes.extension(reporte.archivo_generado.name) or {
             'EXCEL': '.xlsx',
             'PDF': '.pdf',
             'CSV': '.csv',
-            'ZPL': '.zpl'
+            'ZPL': '.zpl',
+            'PARQUET': '.parquet'
         }.get(reporte.formato, '.txt')
         
         filename = f"{reporte.nombre}_{reporte.fecha_inicio.strftime('%Y%m%d_%H%M')}{extension}"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
-        return response
+        # El archivo se envía por bloques (o lo envía el proxy), con
+        # soporte de descargas parciales y revalidación por ETag
+        from apps.core.download_utils import FileDownload
+        return FileDownload.respond(
+            request,
+            reporte.archivo_generado,
+            filename,
+            reporte.obtener_hash_archivo()
+        )
         
     except Exception as e:
         logger.error(f"Error al descargar reporte {pk}: {str(e)}")
@@ -388,6 +452,36 @@ def descargar_reporte(request, pk):
         return redirect('reportes:mis_reportes')
 
 
+@login_required
+def api_progreso_reporte(request, pk):
+    """API para consultar el avance de un reporte, incluidas sus partes"""
+    
+    reporte = get_object_or_404(
+        ReporteGenerado,
+        pk=pk,
+        usuario=request.user
+    )
+    
+    datos = {
+        'estado': reporte.estado,
+        'total_registros': reporte.total_registros,
+        'puede_descargarse': bool(reporte.puede_descargarse()),
+        'mensaje_error': reporte.mensaje_error,
+    }
+    
+    if reporte.es_particionado or reporte.es_masivo:
+        if reporte.es_particionado:
+            datos['particion'] = reporte.parametros['particion']
+        else:
+            datos['masivo'] = reporte.parametros['masivo']
+        datos['progreso'] = reporte.obtener_progreso()
+        datos['partes'] = list(reporte.partes.values(
+            'indice', 'titulo', 'estado', 'total_registros'
+        ))
+    
+    return JsonResponse(datos)
+
+
 @login_required
 def eliminar_reporte(request, pk):
     """Vista para eliminar un reporte generado"""
@@ -401,12 +495,11 @@ def eliminar_reporte(request, pk):
     if request.method == 'POST':
         nombre = reporte.nombre
         
-        # Eliminar archivo físico si existe
-        if reporte.archivo_generado:
-            try:
-                reporte.archivo_generado.delete()
-            except Exception as e:
-                logger.warning(f"No se pudo eliminar archivo de reporte {pk}: {str(e)}")
+        # Liberar archivo (si es compartido solo se descuenta la referencia)
+        try:
+            reporte.liberar_archivo()
+        except Exception as e:
+            logger.warning(f"No se pudo eliminar archivo de reporte {pk}: {str(e)}")
         
         reporte.delete()
         
@@ -511,6 +604,46 @@ def api_estadisticas_filtros(request):
         })
 
 
+@login_required
+@require_http_methods(["GET"])
+def grafico_estadistico(request, nombre):
+    """
+    Imagen de un gráfico estadístico del inventario para los dashboards.
+    Se sirve desde la caché de gráficos, la misma que usan los reportes PDF,
+    y se revalida por ETag mientras los datos no cambien.
+    """
+    from django.utils.cache import get_conditional_response
+    from apps.core.chart_utils import ChartCache
+    from .generadores import GeneradorReporteEstadistico
+    
+    formato = request.GET.get('formato', 'png')
+    if formato not in ChartCache.FORMATS:
+        raise Http404('Formato de gráfico no soportado')
+    
+    generador = GeneradorReporteEstadistico(agregados=EstadisticasAgregadas.inventario_completo())
+    especificacion = next(
+        (spec for spec in generador.datos_graficos() if spec[0] == nombre), None
+    )
+    if especificacion is None:
+        raise Http404('Gráfico no encontrado')
+    
+    _, renderer, datos, opciones = especificacion
+    etag = f'"{ChartCache.key(renderer, datos, opciones, formato)}"'
+    
+    conditional = get_conditional_response(request, etag=etag)
+    if conditional is not None:
+        return conditional
+    
+    ruta = ChartCache().get(renderer, datos, opciones, formato)
+    if not ruta:
+        raise Http404('No hay datos para el gráfico')
+    
+    response = FileResponse(open(ruta, 'rb'), content_type=ChartCache.FORMATS[formato])
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
 @login_required
 def exportar_filtros_excel(request):
     """Vista para exportar resultados de filtros a Excel"""
@@ -519,19 +652,18 @@ def exportar_filtros_excel(request):
         # Aplicar filtros
         queryset = aplicar_filtros_desde_request(request)
         
-        # Generar Excel
-        from .exportadores import ExportadorExcel
-        exportador = ExportadorExcel()
-        archivo = exportador.exportar_bienes(queryset)
-        
         response = HttpResponse(
-            archivo,
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
         
         filename = f"inventario_filtrado_{timezone.now().strftime('%Y%m%d_%H%M')}.xlsx"
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
+        # Generar Excel directamente en la respuesta
+        from .exportadores import ExportadorExcel
+        exportador = ExportadorExcel()
+        exportador.exportar_bienes(queryset, response)
+        
         return response
         
     except Exception as e:
@@ -540,6 +672,18 @@ def exportar_filtros_excel(request):
         return redirect('reportes:filtros_avanzados')
 
 
+@login_required
+def exportar_filtros_csv(request):
+    """Vista para exportar resultados de filtros a CSV en streaming"""
+    
+    from .exportadores import ExportadorCSV
+    
+    queryset = aplicar_filtros_desde_request(request)
+    filename = f"inventario_filtrado_{timezone.now().strftime('%Y%m%d_%H%M')}.csv"
+    
+    return ExportadorCSV().respuesta_streaming(queryset, filename)
+
+
 @login_required
 def limpiar_reportes_expirados(request):
     """Vista para limpiar reportes expirados (solo administradores)"""
@@ -1047,8 +1191,17 @@ def exportacion_rapida(request):
 
 @login_required
 def exportacion_masiva(request):
-    """Vista para exportación masiva en múltiples formatos"""
+    """
+    Vista para exportación masiva en múltiples formatos
+    
+    Las exportaciones se generan en paralelo como un lote; la respuesta
+    entrega el ID del lote y del reporte que lo agrupa, cuyo avance se
+    consulta en api_progreso_reporte. Las solicitudes AJAX reciben estos
+    datos en JSON.
+    """
+    from django.urls import reverse
     from .export_manager import ExportManager, BatchExportManager
+    from .utils import parametros_filtro_desde_request
     
     if request.method == 'POST':
         try:
@@ -1063,19 +1216,19 @@ def exportacion_masiva(request):
                 messages.error(request, 'Debe seleccionar al menos un tipo de reporte y formato')
                 return redirect('reportes:exportacion_masiva')
             
-            # Aplicar filtros base
-            queryset_base = aplicar_filtros_desde_request(request)
+            # Los filtros viajan serializados a cada exportación del lote
+            filtros = parametros_filtro_desde_request(request)
+            queryset_base = FiltroAvanzado(parametros=dict(filtros)).aplicar_filtros()
+            export_manager = ExportManager()
             
-            # Crear configuraciones para cada combinación
+            # Crear configuraciones para cada combinación válida
             for tipo_reporte in tipos_reporte:
                 for formato in formatos:
-                    # Validar combinación
-                    export_manager = ExportManager()
                     es_valida, _ = export_manager.validar_exportacion(tipo_reporte, formato, queryset_base)
                     
                     if es_valida:
                         configuraciones.append({
-                            'queryset': queryset_base,
+                            'filtros': filtros,
                             'tipo_reporte': tipo_reporte,
                             'formato': formato,
                             'parametros': {
@@ -1089,72 +1242,23 @@ def exportacion_masiva(request):
                 messages.error(request, 'No hay combinaciones válidas para exportar')
                 return redirect('reportes:exportacion_masiva')
             
-            # Ejecutar exportación masiva
-            batch_manager = BatchExportManager()
-            resultados = batch_manager.exportar_por_lotes(configuraciones, request.user)
-            
-            # Crear reportes individuales
-            reportes_creados = []
-            archivos_exitosos = []
+            # Ejecutar exportación masiva en paralelo
+            lote = BatchExportManager().exportar_en_paralelo(configuraciones, request.user)
+            reporte = ReporteGenerado.objects.get(pk=lote['reporte_id'])
             
-            for resultado in resultados:
-                if resultado['estado'] == 'EXITOSO':
-                    reporte = ReporteGenerado.objects.create(
-                        nombre=f"Masivo {resultado['lote_indice']}/{resultado['lote_total']} - {resultado['tipo_reporte']}",
-                        tipo_reporte=resultado['tipo_reporte'],
-                        formato=resultado['formato'],
-                        usuario=request.user,
-                        total_registros=resultado['total_registros'],
-                        parametros=resultado['parametros']
-                    )
-                    
-                    # Guardar archivo
-                    with open(resultado['archivo_path'], 'rb') as f:
-                        reporte.archivo_generado.save(
-                            resultado['nombre_archivo'],
-                            File(f),
-                            save=False
-                        )
-                    
-                    reporte.marcar_completado()
-                    reportes_creados.append(reporte)
-                    archivos_exitosos.append(resultado['archivo_path'])
-            
-            # Crear ZIP con todos los archivos
-            if len(archivos_exitosos) > 1:
-                archivo_zip = batch_manager.crear_zip_exportaciones(archivos_exitosos)
-                
-                # Crear reporte para el ZIP
-                reporte_zip = ReporteGenerado.objects.create(
-                    nombre=f"Exportación Masiva - {len(archivos_exitosos)} archivos",
-                    tipo_reporte='PERSONALIZADO',
-                    formato='ZIP',
-                    usuario=request.user,
-                    total_registros=queryset_base.count(),
-                    parametros={'archivos_incluidos': len(archivos_exitosos)}
-                )
-                
-                with open(archivo_zip, 'rb') as f:
-                    reporte_zip.archivo_generado.save(
-                        f'exportacion_masiva_{timezone.now().strftime("%Y%m%d_%H%M")}.zip',
-                        File(f),
-                        save=False
-                    )
-                
-                reporte_zip.marcar_completado()
-                
-                # Limpiar archivo temporal
-                try:
-                    os.remove(archivo_zip)
-                except OSError:
-                    pass
-            
-            # Limpiar archivos temporales
-            batch_manager.export_manager.limpiar_archivos_temporales()
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({
+                    'success': True,
+                    **lote,
+                    'estado': reporte.estado,
+                    'progreso': reporte.obtener_progreso(),
+                    'url_progreso': reverse('reportes:api_progreso_reporte', args=[reporte.pk]),
+                })
             
             messages.success(
                 request,
-                f'Exportación masiva completada: {len(reportes_creados)} archivos generados'
+                f'Exportación masiva {lote["lote_id"][:8]} iniciada: {lote["total"]} archivos. '
+                f'Estará disponible en "Mis reportes" al completarse.'
             )
             
             return redirect('reportes:mis_reportes')
@@ -1212,7 +1316,7 @@ def api_validar_exportacion(request):
         es_valida, mensaje = export_manager.validar_exportacion(tipo_reporte, formato, queryset)
         
         tiempo_estimado = export_manager.estimar_tiempo_exportacion(
-            tipo_reporte, formato, queryset.count()
+            tipo_reporte, formato, queryset.count(), con_graficos=bool(data.get('incluir_graficos'))
         )
         
         return JsonResponse({
@@ -1398,6 +1502,11 @@ def _obtener_ventajas_formato(formato):
             'Optimizado para etiquetas y stickers',
             'Control preciso del diseño',
             'Impresión rápida y eficiente'
+        ],
+        'PARQUET': [
+            'Conserva los tipos de cada columna',
+            'Archivos comprimidos y pequeños',
+            'Carga inmediata en herramientas de BI y análisis'
         ]
     }
     return ventajas.get(formato, [])
@@ -1425,6 +1534,11 @@ def _obtener_desventajas_formato(formato):
             'Solo útil para impresoras Zebra',
             'Requiere conocimiento técnico',
             'No es legible por humanos'
+        ],
+        'PARQUET': [
+            'No se abre directamente en Excel',
+            'Requiere herramientas de análisis de datos',
+            'Solo disponible para el inventario general'
         ]
     }
     return desventajas.get(formato, [])
@@ -1456,6 +1570,11 @@ def _obtener_casos_uso_formato(formato):
             'Stickers de identificación',
             'Códigos de barras',
             'Etiquetas de activos'
+        ],
+        'PARQUET': [
+            'Análisis en herramientas de BI',
+            'Carga en bodegas de datos',
+            'Extracciones del inventario completo'
         ]
     }
     return casos_uso.get(formato, [])
@@ -1602,17 +1721,6 @@ def exportacion_rapida(request):
     return render(request, 'reportes/exportacion_rapida.html', context)
 
 
-@login_required
-def exportacion_masiva(request):
-    """Vista para exportación masiva"""
-    
-    context = {
-        'titulo': 'Exportación Masiva',
-    }
-    
-    return render(request, 'reportes/exportacion_masiva.html', context)
-
-
 @login_required
 def historial_exportaciones(request):
     """Vista para historial de exportaciones"""
@@ -1665,7 +1773,7 @@ def api_formatos_por_tipo(request):
     tipo = request.GET.get('tipo', '')
     
     formatos = {
-        'inventario': ['EXCEL', 'PDF', 'CSV'],
+        'inventario': ['EXCEL', 'PDF', 'CSV', 'PARQUET'],
         'stickers': ['ZPL'],
         'reportes': ['EXCEL', 'PDF'],
         'auditoria': ['PDF', 'EXCEL']
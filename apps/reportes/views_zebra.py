@@ -5,16 +5,23 @@ Vistas específicas para configuración e impresión en impresoras Zebra
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
 from datetime import datetime
 import json
 
 from apps.bienes.models import BienPatrimonial
-from .zpl_utils import ConfiguracionSticker, GeneradorZPL, ValidadorZPL
+from .models import ReporteGenerado, SolicitudImpresionMasiva
+from .zpl_utils import (
+    ConfiguracionSticker, GeneradorZPL, PlantillaZPL, ValidadorZPL, filtrar_bienes_stickers
+)
+
+
+# Impresiones masivas por usuario en cada ventana
+LIMITE_SOLICITUDES_MASIVAS = 10
+VENTANA_SOLICITUDES_MASIVAS = 600  # 10 minutos
 
 
 class ConfiguradorZebraView(LoginRequiredMixin, TemplateView):
@@ -161,41 +168,49 @@ def generar_preview_zebra(request):
         })
 
 
+def _registrar_solicitud_masiva(usuario):
+    """
+    Cuenta una impresión masiva del usuario en la ventana actual
+    
+    Args:
+        usuario: Usuario que solicita la impresión
+    
+    Returns:
+        bool: False si el usuario superó LIMITE_SOLICITUDES_MASIVAS
+    """
+    return SolicitudImpresionMasiva.registrar(usuario, LIMITE_SOLICITUDES_MASIVAS, VENTANA_SOLICITUDES_MASIVAS)
+
+
 @login_required
 @require_http_methods(["POST"])
 def generar_tickets_masivos_zebra(request):
-    """Genera tickets masivos para impresora Zebra"""
+    """
+    Genera tickets masivos para impresora Zebra
+    
+    No hay límite de bienes: el código ZPL se envía por bloques mientras
+    se genera, o se genera en segundo plano como un reporte de stickers.
+    Cada usuario puede hacer LIMITE_SOLICITUDES_MASIVAS impresiones por
+    ventana de VENTANA_SOLICITUDES_MASIVAS segundos.
+    """
     try:
         # Obtener parámetros
         impresora = request.POST.get('impresora', 'ZD220')
         dpi = int(request.POST.get('dpi', 203))
         tamaño = request.POST.get('tamaño', 'etiqueta_mediana_203')
+        orden = request.POST.get('orden', 'codigo')
+        entrega = request.POST.get('entrega', 'descarga')
         
-        # Filtros para bienes
-        filtros = {}
-        if request.POST.get('oficina_id'):
-            filtros['oficina_id'] = request.POST.get('oficina_id')
-        if request.POST.get('estado_bien'):
-            filtros['estado_bien'] = request.POST.get('estado_bien')
-        if request.POST.get('catalogo_id'):
-            filtros['catalogo_id'] = request.POST.get('catalogo_id')
-        
-        # Búsqueda por texto
-        busqueda = request.POST.get('busqueda', '').strip()
-        queryset = BienPatrimonial.objects.filter(**filtros)
-        
-        if busqueda:
-            queryset = queryset.filter(
-                Q(codigo_patrimonial__icontains=busqueda) |
-                Q(catalogo__denominacion__icontains=busqueda) |
-                Q(marca__icontains=busqueda) |
-                Q(modelo__icontains=busqueda) |
-                Q(serie__icontains=busqueda)
-            )
+        if orden not in PlantillaZPL.ORDENES:
+            messages.error(request, f'Orden de tickets no soportado: {orden}')
+            return redirect('reportes:configurador_zebra')
         
-        # Limitar cantidad para evitar archivos muy grandes
-        limite = int(request.POST.get('limite', 100))
-        queryset = queryset[:limite]
+        # Filtros para bienes
+        filtros = {
+            campo: request.POST.get(campo, '').strip()
+            for campo in ('oficina_id', 'estado_bien', 'catalogo_id', 'busqueda')
+            if request.POST.get(campo, '').strip()
+        }
+        queryset = filtrar_bienes_stickers(filtros)
         
         if not queryset.exists():
             messages.error(request, 'No se encontraron bienes con los filtros especificados')
@@ -233,16 +248,45 @@ def generar_tickets_masivos_zebra(request):
             messages.error(request, f'Configuración inválida: {", ".join(errores)}')
             return redirect('reportes:configurador_zebra')
         
-        # Generar código ZPL masivo
-        generador = GeneradorZPL(config)
-        codigo_zpl = generador.generar_stickers_masivos(queryset)
+        if not _registrar_solicitud_masiva(request.user):
+            messages.error(
+                request,
+                f'Superó el máximo de {LIMITE_SOLICITUDES_MASIVAS} impresiones masivas cada '
+                f'{VENTANA_SOLICITUDES_MASIVAS // 60} minutos. Intente nuevamente más tarde.'
+            )
+            return redirect('reportes:configurador_zebra')
         
-        # Crear respuesta HTTP con archivo ZPL
-        response = HttpResponse(codigo_zpl, content_type='text/plain')
-        filename = f'tickets_zebra_{impresora}_{queryset.count()}_bienes.zpl'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if entrega == 'segundo_plano':
+            reporte = ReporteGenerado.objects.create(
+                nombre=f'Tickets Zebra {impresora}',
+                tipo_reporte='STICKERS',
+                formato='ZPL',
+                usuario=request.user,
+                parametros={
+                    'filtros_stickers': filtros,
+                    'configuracion_stickers': config.a_dict(),
+                    'orden_stickers': orden,
+                }
+            )
+            
+            from .tasks import generar_reporte_async
+            generar_reporte_async.delay(reporte.id)
+            
+            messages.success(
+                request,
+                f'Tickets para {impresora} programados para generación. '
+                'Recibirá una notificación cuando estén listos.'
+            )
+            return redirect('reportes:mis_reportes')
         
-        messages.success(request, f'Generados {queryset.count()} tickets para {impresora}')
+        # Enviar el código ZPL por bloques a medida que se genera
+        generador = GeneradorZPL(config)
+        response = StreamingHttpResponse(
+            generador.generar_por_lotes(queryset, orden),
+            content_type='text/plain; charset=utf-8'
+        )
+        filename = f'tickets_zebra_{impresora}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zpl'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
         
     except Exception as e:
@@ -2,9 +2,14 @@
 Utilidades específicas para generación de plantillas ZPL (Zebra Programming Language)
 """
 
+import io
 import math
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from django.conf import settings
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from apps.bienes.models import BienPatrimonial
 import logging
 
@@ -171,6 +176,34 @@ class ConfiguracionSticker:
         self.incluir_fecha = kwargs.get('incluir_fecha', True)
         self.incluir_url = kwargs.get('incluir_url', False)
     
+    def huella(self):
+        """
+        Valores que determinan el sticker generado
+        
+        Returns:
+            tuple: Huella hashable; cambia con cualquier atributo
+        """
+        return tuple(sorted(
+            (clave, tuple(valor) if isinstance(valor, list) else valor)
+            for clave, valor in vars(self).items()
+        ))
+    
+    def a_dict(self):
+        """
+        Parámetros que reconstruyen la configuración
+        
+        Permiten guardarla en los parámetros (JSON) de un reporte:
+        ConfiguracionSticker(**config.a_dict()) produce los mismos stickers.
+        
+        Returns:
+            dict: Argumentos de ConfiguracionSticker
+        """
+        datos = {
+            clave: valor for clave, valor in vars(self).items()
+            if clave != 'impresora_recomendada'
+        }
+        return {'tamaño': 'personalizado', **datos}
+    
     def validar(self):
         """Valida la configuración"""
         errores = []
@@ -379,6 +412,369 @@ class ConfiguracionSticker:
             }
 
 
+class PlantillaZPL:
+    """
+    Sticker ZPL compilado a partir de una ConfiguracionSticker.
+    
+    La configuración se valida y los comandos fijos, fuentes y posiciones
+    se calculan una sola vez. Como cada campo presente desplaza a los
+    siguientes, para cada combinación de campos presentes se compila (en
+    su primer uso) una cadena de formato con las posiciones resueltas:
+    generar un sticker solo requiere escapar los valores del bien y
+    sustituirlos en ella.
+    """
+    
+    # Columnas de BienPatrimonial.values() que utiliza un sticker
+    CAMPOS_VALORES = [
+        'codigo_patrimonial', 'qr_code', 'catalogo__denominacion', 'oficina__codigo',
+        'oficina__nombre', 'estado_bien', 'marca', 'modelo', 'serie', 'placa',
+    ]
+    
+    # Campos del sticker en el orden en que se imprimen
+    ORDEN_CAMPOS = ['codigo_patrimonial', 'denominacion', 'oficina', 'estado', 'marca_modelo', 'serie', 'placa']
+    
+    ESTADOS = dict(BienPatrimonial.ESTADOS_BIEN)
+    
+    # Texto de cada campo a partir de una fila de values() (None si no se imprime)
+    TEXTOS_CAMPO = {
+        'codigo_patrimonial': lambda fila: fila['codigo_patrimonial'],
+        'denominacion': lambda fila: fila['catalogo__denominacion'],
+        'oficina': lambda fila: (
+            None if fila['oficina__codigo'] is None
+            else f"{fila['oficina__codigo']} - {fila['oficina__nombre']}"
+        ),
+        'estado': lambda fila: PlantillaZPL.ESTADOS.get(fila['estado_bien'], ''),
+        'marca_modelo': lambda fila: (
+            f"{fila['marca'] or ''} {fila['modelo'] or ''}".strip()
+            if fila['marca'] or fila['modelo'] else None
+        ),
+        'serie': lambda fila: f"S/N: {fila['serie']}" if fila['serie'] else None,
+        'placa': lambda fila: fila['placa'] or None,
+    }
+    
+    # Los valores se escriben con ^FH: los caracteres de control van en hexadecimal
+    ESCAPES = str.maketrans({'_': '_5F', '^': '_5E', '~': '_7E'})
+    
+    TAMAÑO_LOTE = 2000
+    
+    # Claves de paginación de cada orden; la última es única
+    ORDENES = {
+        'codigo': ('codigo_patrimonial',),
+        'ubicacion': ('orden_ubicacion', 'orden_oficina', 'codigo_patrimonial'),
+    }
+    ANOTACIONES_ORDEN = {
+        'orden_ubicacion': Coalesce('oficina__ubicacion', Value('')),
+        'orden_oficina': Coalesce('oficina__codigo', Value('')),
+    }
+    
+    # Plantillas compiladas por huella de configuración
+    MAXIMO_PLANTILLAS = 32
+    _compiladas = OrderedDict()
+    _bloqueo = threading.Lock()
+    
+    def __init__(self, config):
+        """
+        Compila la configuración
+        
+        Args:
+            config: ConfiguracionSticker
+        
+        Raises:
+            ValueError: Si la configuración no es válida
+        """
+        errores = config.validar()
+        if errores:
+            raise ValueError(f"Configuración inválida: {', '.join(errores)}")
+        
+        # Inicio de etiqueta, origen en 0,0 y velocidad de impresión
+        self.encabezado = ['^XA', '^LH0,0', '^PR4']
+        if config.incluir_borde:
+            self.encabezado.extend(self._comandos_borde(config))
+        
+        self.qr = self._comandos_qr(config) if config.incluir_qr else None
+        
+        area = config.calcular_area_texto()
+        self.x_texto = area['x']
+        self.y_texto = area['y']
+        self.campos = self._compilar_campos(config, area['ancho'])
+        
+        self.pie = []
+        if config.incluir_fecha:
+            # Esquina inferior derecha
+            x_fecha = config.ancho - config.margen - 80
+            y_fecha = config.alto - config.margen - config.altura_pequeña
+            self.pie.extend([
+                f"^FO{x_fecha},{y_fecha}",
+                f"^{config.fuente_pequeña}{config.tamaño_texto},{config.altura_pequeña},{config.altura_pequeña}",
+                "^FD{fecha}^FS",
+            ])
+        if config.incluir_linea_separadora:
+            self.pie.extend([
+                f"^FO{config.margen},{config.alto - 40}",
+                f"^GB{config.ancho - 2*config.margen},1,1^FS",
+            ])
+        self.pie.append('^XZ')
+        
+        self._variantes = {}
+    
+    @classmethod
+    def obtener(cls, config):
+        """
+        Obtiene la plantilla compilada de una configuración
+        
+        Las plantillas se guardan por la huella de la configuración, por
+        lo que cualquier cambio en ella produce una plantilla nueva.
+        
+        Args:
+            config: ConfiguracionSticker
+        
+        Returns:
+            PlantillaZPL
+        """
+        huella = config.huella()
+        with cls._bloqueo:
+            plantilla = cls._compiladas.get(huella)
+            if plantilla is not None:
+                cls._compiladas.move_to_end(huella)
+                return plantilla
+        
+        plantilla = cls(config)
+        with cls._bloqueo:
+            cls._compiladas[huella] = plantilla
+            while len(cls._compiladas) > cls.MAXIMO_PLANTILLAS:
+                cls._compiladas.popitem(last=False)
+        return plantilla
+    
+    @staticmethod
+    def _comandos_borde(config):
+        """Bordes superior, inferior, izquierdo y derecho"""
+        grosor = config.grosor_borde
+        return [
+            "^FO0,0",
+            f"^GB{config.ancho},{grosor},{grosor}^FS",
+            f"^FO0,{config.alto - grosor}",
+            f"^GB{config.ancho},{grosor},{grosor}^FS",
+            "^FO0,0",
+            f"^GB{grosor},{config.alto},{grosor}^FS",
+            f"^FO{config.ancho - grosor},0",
+            f"^GB{grosor},{config.alto},{grosor}^FS",
+        ]
+    
+    @staticmethod
+    def _comandos_qr(config):
+        """Código QR con el valor como campo {qr}"""
+        if config.posicion_qr == 'derecha':
+            x_qr = config.ancho - config.margen - config.tamaño_qr
+            y_qr = config.margen
+        elif config.posicion_qr == 'abajo':
+            x_qr = config.margen
+            y_qr = config.alto - config.margen - config.tamaño_qr
+        else:  # izquierda, arriba
+            x_qr = config.margen
+            y_qr = config.margen
+        
+        factor_qr = max(2, config.tamaño_qr // 50)
+        return [f"^FO{x_qr},{y_qr}", f"^BQN,2,{factor_qr}", "^FH^FDQA,{qr}^FS"]
+    
+    @staticmethod
+    def _maximo_caracteres(ancho_disponible, altura_fuente):
+        """Caracteres que caben en el ancho (cada uno ocupa ~60% de la altura de la fuente)"""
+        return int(ancho_disponible * 0.6 / altura_fuente)
+    
+    def _compilar_campos(self, config, ancho_disponible):
+        """
+        Compila los campos incluidos en la configuración
+        
+        Returns:
+            list: Tuplas (campo, comando de fuente, etiqueta, avance
+                vertical, máximo de caracteres o None)
+        """
+        fuente_titulo = f"^{config.fuente_titulo}{config.tamaño_titulo},{config.altura_titulo},{config.altura_titulo}"
+        fuente_texto = f"^{config.fuente_texto}{config.tamaño_texto},{config.altura_texto},{config.altura_texto}"
+        fuente_pequeña = f"^{config.fuente_pequeña}{config.tamaño_texto},{config.altura_pequeña},{config.altura_pequeña}"
+        maximo_texto = self._maximo_caracteres(ancho_disponible, config.altura_texto)
+        maximo_pequeño = self._maximo_caracteres(ancho_disponible, config.altura_pequeña)
+        
+        definiciones = {
+            'codigo_patrimonial': (fuente_titulo, '', config.altura_titulo + 5, None),
+            'denominacion': (fuente_texto, '', config.altura_texto + 3, maximo_texto),
+            'oficina': (fuente_texto, 'Oficina: ', config.altura_texto + 3, maximo_texto),
+            'estado': (fuente_texto, 'Estado: ', config.altura_texto + 3, None),
+            'marca_modelo': (fuente_pequeña, '', config.altura_pequeña + 2, maximo_pequeño),
+            'serie': (fuente_pequeña, '', config.altura_pequeña + 2, maximo_pequeño),
+            'placa': (fuente_pequeña, 'Placa: ', config.altura_pequeña + 2, None),
+        }
+        return [
+            (campo, *definiciones[campo])
+            for campo in self.ORDEN_CAMPOS
+            if campo in config.campos_incluir
+        ]
+    
+    def _compilar_variante(self, presentes):
+        """
+        Compila la cadena de formato de una combinación de campos presentes
+        
+        Args:
+            presentes: Tupla (QR presente, campo presente...) en el orden
+                de self.campos
+        
+        Returns:
+            str: Cadena de formato con {0}, {1}... para los campos
+                presentes, {qr} y {fecha}
+        """
+        comandos = list(self.encabezado)
+        if presentes[0]:
+            comandos.extend(self.qr)
+        
+        y_actual = self.y_texto
+        indice = 0
+        for (_, fuente, etiqueta, avance, _), presente in zip(self.campos, presentes[1:]):
+            if not presente:
+                continue
+            comandos.append(f"^FO{self.x_texto},{y_actual}")
+            comandos.append(fuente)
+            comandos.append(f"^FH^FD{etiqueta}{{{indice}}}^FS")
+            y_actual += avance
+            indice += 1
+        
+        comandos.extend(self.pie)
+        formato = '\n'.join(comandos)
+        self._variantes[presentes] = formato
+        return formato
+    
+    def renderizar(self, fila, fecha=None):
+        """
+        Genera el sticker de un bien
+        
+        Args:
+            fila: dict con las columnas de CAMPOS_VALORES
+            fecha: Fecha impresa (texto); por defecto la fecha actual
+        
+        Returns:
+            str: Código ZPL del sticker
+        """
+        presentes = [bool(self.qr) and bool(fila['qr_code'])]
+        textos = []
+        for campo, _, _, _, maximo in self.campos:
+            texto = self.TEXTOS_CAMPO[campo](fila)
+            presentes.append(texto is not None)
+            if texto is None:
+                continue
+            if maximo is not None and len(texto) > maximo:
+                texto = texto[:maximo-3] + "..."
+            textos.append(texto.translate(self.ESCAPES))
+        
+        presentes = tuple(presentes)
+        formato = self._variantes.get(presentes) or self._compilar_variante(presentes)
+        return formato.format(
+            *textos,
+            qr=(fila['qr_code'] or '').translate(self.ESCAPES),
+            fecha=fecha or datetime.now().strftime('%d/%m/%Y')
+        )
+    
+    def escribir(self, filas, archivo, fecha=None):
+        """
+        Escribe los stickers de varios bienes
+        
+        Args:
+            filas: Iterable de dicts con las columnas de CAMPOS_VALORES
+            archivo: Archivo de texto abierto para escritura
+            fecha: Fecha impresa (texto); por defecto la fecha actual
+        
+        Returns:
+            int: Stickers escritos
+        """
+        fecha = fecha or datetime.now().strftime('%d/%m/%Y')
+        total = 0
+        for fila in filas:
+            if total:
+                archivo.write('\n\n')
+            archivo.write(self.renderizar(fila, fecha))
+            total += 1
+        return total
+    
+    @classmethod
+    def filas(cls, bienes):
+        """
+        Filas de values() de los bienes
+        
+        Args:
+            bienes: QuerySet (se recorre por lotes sin instanciar modelos)
+                o iterable de instancias de BienPatrimonial
+        
+        Returns:
+            Iterable de dicts con las columnas de CAMPOS_VALORES
+        """
+        if hasattr(bienes, 'values'):
+            return bienes.values(*cls.CAMPOS_VALORES).iterator(chunk_size=cls.TAMAÑO_LOTE)
+        return (cls.valores_bien(bien) for bien in bienes)
+    
+    @classmethod
+    def paginas(cls, queryset, orden='codigo', tamaño_pagina=None):
+        """
+        Filas de values() de los bienes en páginas por clave (keyset)
+        
+        Cada página es una consulta independiente que continúa después
+        de la última fila de la anterior, de modo que recorrer todo el
+        inventario no mantiene un cursor abierto ni se degrada con OFFSET.
+        
+        Args:
+            queryset: QuerySet de bienes (sin recortar)
+            orden: Clave de ORDENES ('codigo' o 'ubicacion')
+            tamaño_pagina: Filas por página (por defecto TAMAÑO_LOTE)
+        
+        Yields:
+            list: dicts con las columnas de CAMPOS_VALORES
+        
+        Raises:
+            ValueError: Si el orden no existe
+        """
+        if orden not in cls.ORDENES:
+            raise ValueError(f"Orden de stickers no soportado: {orden}")
+        
+        claves = cls.ORDENES[orden]
+        tamaño_pagina = tamaño_pagina or cls.TAMAÑO_LOTE
+        anotaciones = {clave: cls.ANOTACIONES_ORDEN[clave] for clave in claves if clave in cls.ANOTACIONES_ORDEN}
+        base = queryset.annotate(**anotaciones).order_by(*claves).values(*cls.CAMPOS_VALORES, *anotaciones)
+        
+        ultima = None
+        while True:
+            pagina = base if ultima is None else base.filter(cls._posteriores(claves, ultima))
+            filas = list(pagina[:tamaño_pagina])
+            if filas:
+                yield filas
+            if len(filas) < tamaño_pagina:
+                return
+            ultima = filas[-1]
+    
+    @staticmethod
+    def _posteriores(claves, fila):
+        """Condición de las filas que siguen a una fila en el orden de las claves"""
+        condicion = Q()
+        for i, clave in enumerate(claves):
+            iguales = {anterior: fila[anterior] for anterior in claves[:i]}
+            condicion |= Q(**iguales, **{f'{clave}__gt': fila[clave]})
+        return condicion
+    
+    @staticmethod
+    def valores_bien(bien):
+        """Columnas de CAMPOS_VALORES de una instancia de BienPatrimonial"""
+        catalogo = bien.catalogo if bien.catalogo_id else None
+        oficina = bien.oficina if bien.oficina_id else None
+        return {
+            'codigo_patrimonial': bien.codigo_patrimonial,
+            'qr_code': bien.qr_code,
+            'catalogo__denominacion': catalogo.denominacion if catalogo else None,
+            'oficina__codigo': oficina.codigo if oficina else None,
+            'oficina__nombre': oficina.nombre if oficina else None,
+            'estado_bien': bien.estado_bien,
+            'marca': bien.marca,
+            'modelo': bien.modelo,
+            'serie': bien.serie,
+            'placa': bien.placa,
+        }
+
+
 class GeneradorZPL:
     """Generador avanzado de código ZPL"""
     
@@ -390,7 +786,7 @@ class GeneradorZPL:
             configuracion: Instancia de ConfiguracionSticker
         """
         self.config = configuracion or ConfiguracionSticker()
-        self.comandos_zpl = []
+        self.total_stickers = 0
     
     def generar_sticker_bien(self, bien):
         """
@@ -402,226 +798,61 @@ class GeneradorZPL:
         Returns:
             str: Código ZPL completo
         """
-        self.comandos_zpl = []
-        
-        # Validar configuración
-        errores = self.config.validar()
-        if errores:
-            raise ValueError(f"Configuración inválida: {', '.join(errores)}")
-        
-        # Inicio de etiqueta
-        self._agregar_comando("^XA")
-        self._agregar_comando("^LH0,0")  # Origen en 0,0
-        
-        # Configurar densidad de impresión
-        self._agregar_comando("^PR4")  # Velocidad de impresión
-        
-        # Borde del sticker (opcional)
-        if self.config.incluir_borde:
-            self._agregar_borde()
-        
-        # Código QR
-        if self.config.incluir_qr and bien.qr_code:
-            self._agregar_qr(bien.qr_code)
-        
-        # Contenido del sticker
-        self._agregar_contenido_bien(bien)
+        return PlantillaZPL.obtener(self.config).renderizar(PlantillaZPL.valores_bien(bien))
+    
+    def generar_por_lotes(self, queryset, orden='codigo'):
+        """
+        Genera el código ZPL de múltiples bienes por bloques
         
-        # Elementos adicionales
-        if self.config.incluir_fecha:
-            self._agregar_fecha()
+        Cada bloque contiene los stickers de una página de bienes, listo
+        para enviarse en un StreamingHttpResponse o escribirse en un
+        archivo sin reunir todo el código en memoria. total_stickers se
+        actualiza a medida que se consumen los bloques.
         
-        if self.config.incluir_linea_separadora:
-            self._agregar_linea_separadora()
+        Args:
+            queryset: QuerySet de bienes (o lista de instancias)
+            orden: Orden de los stickers ('codigo' o 'ubicacion'); solo
+                se aplica a un QuerySet
         
-        # Fin de etiqueta
-        self._agregar_comando("^XZ")
+        Yields:
+            str: Código ZPL de un bloque de stickers
+        """
+        plantilla = PlantillaZPL.obtener(self.config)
+        fecha = datetime.now().strftime('%d/%m/%Y')
         
-        return '\n'.join(self.comandos_zpl)
+        if hasattr(queryset, 'values'):
+            paginas = PlantillaZPL.paginas(queryset, orden)
+        else:
+            paginas = [PlantillaZPL.filas(queryset)]
+        
+        self.total_stickers = 0
+        for filas in paginas:
+            bloque = io.StringIO()
+            if self.total_stickers:
+                bloque.write('\n\n')
+            self.total_stickers += plantilla.escribir(filas, bloque, fecha)
+            yield bloque.getvalue()
     
-    def generar_stickers_masivos(self, queryset, archivo_salida=None):
+    def generar_stickers_masivos(self, queryset, archivo_salida=None, orden='codigo'):
         """
         Genera código ZPL para múltiples bienes
         
         Args:
-            queryset: QuerySet de bienes
+            queryset: QuerySet de bienes (o lista de instancias)
             archivo_salida: Archivo de salida (opcional)
+            orden: Orden de los stickers ('codigo' o 'ubicacion')
             
         Returns:
             str: Código ZPL completo o ruta del archivo
         """
-        todos_los_comandos = []
-        
-        for bien in queryset:
-            codigo_bien = self.generar_sticker_bien(bien)
-            todos_los_comandos.append(codigo_bien)
-        
-        codigo_completo = '\n\n'.join(todos_los_comandos)
+        bloques = self.generar_por_lotes(queryset, orden)
         
         if archivo_salida:
             with open(archivo_salida, 'w', encoding='utf-8') as f:
-                f.write(codigo_completo)
+                f.writelines(bloques)
             return archivo_salida
         
-        return codigo_completo
-    
-    def _agregar_comando(self, comando):
-        """Agrega un comando ZPL"""
-        self.comandos_zpl.append(comando)
-    
-    def _agregar_borde(self):
-        """Agrega borde al sticker"""
-        # Borde superior
-        self._agregar_comando(f"^FO0,0")
-        self._agregar_comando(f"^GB{self.config.ancho},{self.config.grosor_borde},{self.config.grosor_borde}^FS")
-        
-        # Borde inferior
-        self._agregar_comando(f"^FO0,{self.config.alto - self.config.grosor_borde}")
-        self._agregar_comando(f"^GB{self.config.ancho},{self.config.grosor_borde},{self.config.grosor_borde}^FS")
-        
-        # Borde izquierdo
-        self._agregar_comando(f"^FO0,0")
-        self._agregar_comando(f"^GB{self.config.grosor_borde},{self.config.alto},{self.config.grosor_borde}^FS")
-        
-        # Borde derecho
-        self._agregar_comando(f"^FO{self.config.ancho - self.config.grosor_borde},0")
-        self._agregar_comando(f"^GB{self.config.grosor_borde},{self.config.alto},{self.config.grosor_borde}^FS")
-    
-    def _agregar_qr(self, qr_code):
-        """Agrega código QR"""
-        # Calcular posición del QR
-        if self.config.posicion_qr == 'izquierda':
-            x_qr = self.config.margen
-            y_qr = self.config.margen
-        elif self.config.posicion_qr == 'derecha':
-            x_qr = self.config.ancho - self.config.margen - self.config.tamaño_qr
-            y_qr = self.config.margen
-        elif self.config.posicion_qr == 'arriba':
-            x_qr = self.config.margen
-            y_qr = self.config.margen
-        else:  # abajo
-            x_qr = self.config.margen
-            y_qr = self.config.alto - self.config.margen - self.config.tamaño_qr
-        
-        # Generar QR
-        self._agregar_comando(f"^FO{x_qr},{y_qr}")
-        
-        # Calcular factor de escala para el QR
-        factor_qr = max(2, self.config.tamaño_qr // 50)
-        
-        self._agregar_comando(f"^BQN,2,{factor_qr}")
-        self._agregar_comando(f"^FDQA,{qr_code}^FS")
-    
-    def _agregar_contenido_bien(self, bien):
-        """Agrega el contenido principal del bien"""
-        area_texto = self.config.calcular_area_texto()
-        
-        x_texto = area_texto['x']
-        y_actual = area_texto['y']
-        ancho_disponible = area_texto['ancho']
-        
-        # Código patrimonial (título principal)
-        if 'codigo_patrimonial' in self.config.campos_incluir:
-            self._agregar_comando(f"^FO{x_texto},{y_actual}")
-            self._agregar_comando(f"^{self.config.fuente_titulo}{self.config.tamaño_titulo},{self.config.altura_titulo},{self.config.altura_titulo}")
-            self._agregar_comando(f"^FD{bien.codigo_patrimonial}^FS")
-            y_actual += self.config.altura_titulo + 5
-        
-        # Denominación
-        if 'denominacion' in self.config.campos_incluir and bien.catalogo:
-            denominacion = self._truncar_texto(bien.catalogo.denominacion, ancho_disponible, self.config.altura_texto)
-            self._agregar_comando(f"^FO{x_texto},{y_actual}")
-            self._agregar_comando(f"^{self.config.fuente_texto}{self.config.tamaño_texto},{self.config.altura_texto},{self.config.altura_texto}")
-            self._agregar_comando(f"^FD{denominacion}^FS")
-            y_actual += self.config.altura_texto + 3
-        
-        # Oficina
-        if 'oficina' in self.config.campos_incluir and bien.oficina:
-            oficina_texto = f"{bien.oficina.codigo} - {bien.oficina.nombre}"
-            oficina_texto = self._truncar_texto(oficina_texto, ancho_disponible, self.config.altura_texto)
-            self._agregar_comando(f"^FO{x_texto},{y_actual}")
-            self._agregar_comando(f"^{self.config.fuente_texto}{self.config.tamaño_texto},{self.config.altura_texto},{self.config.altura_texto}")
-            self._agregar_comando(f"^FDOficina: {oficina_texto}^FS")
-            y_actual += self.config.altura_texto + 3
-        
-        # Estado
-        if 'estado' in self.config.campos_incluir:
-            estado_texto = f"Estado: {bien.get_estado_bien_display()}"
-            self._agregar_comando(f"^FO{x_texto},{y_actual}")
-            self._agregar_comando(f"^{self.config.fuente_texto}{self.config.tamaño_texto},{self.config.altura_texto},{self.config.altura_texto}")
-            self._agregar_comando(f"^FD{estado_texto}^FS")
-            y_actual += self.config.altura_texto + 3
-        
-        # Marca y modelo
-        if 'marca_modelo' in self.config.campos_incluir and (bien.marca or bien.modelo):
-            marca_modelo = f"{bien.marca or ''} {bien.modelo or ''}".strip()
-            marca_modelo = self._truncar_texto(marca_modelo, ancho_disponible, self.config.altura_pequeña)
-            self._agregar_comando(f"^FO{x_texto},{y_actual}")
-            self._agregar_comando(f"^{self.config.fuente_pequeña}{self.config.tamaño_texto},{self.config.altura_pequeña},{self.config.altura_pequeña}")
-            self._agregar_comando(f"^FD{marca_modelo}^FS")
-            y_actual += self.config.altura_pequeña + 2
-        
-        # Serie
-        if 'serie' in self.config.campos_incluir and bien.serie:
-            serie_texto = f"S/N: {bien.serie}"
-            serie_texto = self._truncar_texto(serie_texto, ancho_disponible, self.config.altura_pequeña)
-            self._agregar_comando(f"^FO{x_texto},{y_actual}")
-            self._agregar_comando(f"^{self.config.fuente_pequeña}{self.config.tamaño_texto},{self.config.altura_pequeña},{self.config.altura_pequeña}")
-            self._agregar_comando(f"^FD{serie_texto}^FS")
-            y_actual += self.config.altura_pequeña + 2
-        
-        # Placa (para vehículos)
-        if 'placa' in self.config.campos_incluir and bien.placa:
-            placa_texto = f"Placa: {bien.placa}"
-            self._agregar_comando(f"^FO{x_texto},{y_actual}")
-            self._agregar_comando(f"^{self.config.fuente_pequeña}{self.config.tamaño_texto},{self.config.altura_pequeña},{self.config.altura_pequeña}")
-            self._agregar_comando(f"^FD{placa_texto}^FS")
-            y_actual += self.config.altura_pequeña + 2
-    
-    def _agregar_fecha(self):
-        """Agrega fecha de generación"""
-        fecha_texto = datetime.now().strftime('%d/%m/%Y')
-        
-        # Posicionar en la esquina inferior derecha
-        x_fecha = self.config.ancho - self.config.margen - 80
-        y_fecha = self.config.alto - self.config.margen - self.config.altura_pequeña
-        
-        self._agregar_comando(f"^FO{x_fecha},{y_fecha}")
-        self._agregar_comando(f"^{self.config.fuente_pequeña}{self.config.tamaño_texto},{self.config.altura_pequeña},{self.config.altura_pequeña}")
-        self._agregar_comando(f"^FD{fecha_texto}^FS")
-    
-    def _agregar_linea_separadora(self):
-        """Agrega línea separadora"""
-        y_linea = self.config.alto - 40
-        x_inicio = self.config.margen
-        ancho_linea = self.config.ancho - 2*self.config.margen
-        
-        self._agregar_comando(f"^FO{x_inicio},{y_linea}")
-        self._agregar_comando(f"^GB{ancho_linea},1,1^FS")
-    
-    def _truncar_texto(self, texto, ancho_disponible, altura_fuente):
-        """
-        Trunca texto para que quepa en el ancho disponible
-        
-        Args:
-            texto: Texto a truncar
-            ancho_disponible: Ancho disponible en dots
-            altura_fuente: Altura de la fuente
-            
-        Returns:
-            str: Texto truncado
-        """
-        if not texto:
-            return ""
-        
-        # Estimación aproximada: cada carácter ocupa ~60% de la altura de la fuente
-        caracteres_por_dot = 0.6 / altura_fuente
-        max_caracteres = int(ancho_disponible * caracteres_por_dot)
-        
-        if len(texto) <= max_caracteres:
-            return texto
-        
-        return texto[:max_caracteres-3] + "..."
+        return ''.join(bloques)
 
 
 class ValidadorZPL:
@@ -734,4 +965,33 @@ def generar_plantilla_configuracion():
         'altura_texto': 20,
         'altura_pequeña': 15,
         'margen': 20,
-    }
\ No newline at end of file
+    }
+
+def filtrar_bienes_stickers(filtros):
+    """
+    Bienes para una impresión masiva de stickers
+    
+    Args:
+        filtros: dict con oficina_id, estado_bien, catalogo_id y busqueda
+            (todos opcionales)
+    
+    Returns:
+        QuerySet: Bienes que cumplen los filtros
+    """
+    campos = {
+        campo: filtros[campo]
+        for campo in ('oficina_id', 'estado_bien', 'catalogo_id')
+        if filtros.get(campo)
+    }
+    queryset = BienPatrimonial.objects.filter(**campos)
+    
+    busqueda = (filtros.get('busqueda') or '').strip()
+    if busqueda:
+        queryset = queryset.filter(
+            Q(codigo_patrimonial__icontains=busqueda) |
+            Q(catalogo__denominacion__icontains=busqueda) |
+            Q(marca__icontains=busqueda) |
+            Q(modelo__icontains=busqueda) |
+            Q(serie__icontains=busqueda)
+        )
+    return queryset
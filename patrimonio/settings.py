@@ -147,6 +147,11 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Descarga de archivos generados: '' (la aplicación envía el archivo),
+# 'NGINX' (X-Accel-Redirect) o 'APACHE' (X-Sendfile)
+DESCARGAS_SERVIDOR_PROXY = config('DESCARGAS_SERVIDOR_PROXY', default='')
+DESCARGAS_PREFIJO_INTERNO = config('DESCARGAS_PREFIJO_INTERNO', default='/protected-media/')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -207,6 +212,11 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.reportes.tasks.actualizar_estadisticas_cache',
         'schedule': crontab(minute=0),  # Cada hora en punto
     },
+    # Registrar instantánea diaria del inventario a las 11:50 PM
+    'registrar-instantanea-inventario': {
+        'task': 'apps.reportes.tasks.registrar_instantanea_inventario',
+        'schedule': crontab(hour=23, minute=50),
+    },
     # Limpiar archivos temporales cada 6 horas
     'limpiar-archivos-temporales': {
         'task': 'apps.core.tasks.limpiar_archivos_temporales',
@@ -237,6 +247,11 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.notificaciones.tasks.limpiar_notificaciones_expiradas',
         'schedule': crontab(hour=1, minute=0),
     },
+    # Purgar el feed de cambios de bienes cada domingo a las 4:00 AM
+    'purgar-registro-cambios-bienes': {
+        'task': 'apps.mobile.tasks.purgar_registro_cambios',
+        'schedule': crontab(hour=4, minute=0, day_of_week=0),
+    },
     # Reenviar notificaciones fallidas cada 2 horas
     'reenviar-notificaciones-fallidas': {
         'task': 'apps.notificaciones.tasks.reenviar_notificaciones_fallidas',
@@ -262,6 +277,13 @@ CELERY_BEAT_SCHEDULE = {
 # Configuración adicional de Celery
 CELERY_TASK_ROUTES = {
     'apps.reportes.tasks.generar_reporte_async': {'queue': 'reportes'},
+    'apps.reportes.tasks.generar_parte_reporte': {'queue': 'reportes'},
+    'apps.reportes.tasks.ensamblar_reporte_particionado': {'queue': 'reportes'},
+    'apps.reportes.tasks.exportar_item_lote': {'queue': 'reportes'},
+    'apps.reportes.tasks.empaquetar_lote_exportacion': {'queue': 'reportes'},
+    'apps.reportes.tasks.generar_reporte_masivo': {'queue': 'reportes'},
+    'apps.reportes.tasks.generar_item_masivo': {'queue': 'reportes'},
+    'apps.reportes.tasks.ensamblar_reporte_masivo': {'queue': 'reportes'},
     'apps.core.tasks.importacion_masiva_excel': {'queue': 'importaciones'},
     'apps.mobile.tasks.procesar_sincronizacion_async': {'queue': 'mobile'},
     'apps.core.tasks.cleanup_recycle_bin_task': {'queue': 'maintenance'},
@@ -98,6 +98,14 @@ CELERY_BEAT_SCHEDULE = {
             'expires': 3600,
         }
     },
+    # Registrar instantánea diaria del inventario a las 11:50 PM
+    'registrar-instantanea-inventario': {
+        'task': 'apps.reportes.tasks.registrar_instantanea_inventario',
+        'schedule': crontab(hour=23, minute=50),
+        'options': {
+            'expires': 3600,
+        }
+    },
     # Limpiar archivos temporales cada 6 horas
     'limpiar-archivos-temporales': {
         'task': 'apps.core.tasks.limpiar_archivos_temporales',
@@ -146,11 +154,26 @@ CELERY_BEAT_SCHEDULE = {
             'expires': 3600,
         }
     },
+    # Purgar el feed de cambios de bienes cada domingo a las 4:00 AM
+    'purgar-registro-cambios-bienes': {
+        'task': 'apps.mobile.tasks.purgar_registro_cambios',
+        'schedule': crontab(hour=4, minute=0, day_of_week=0),
+        'options': {
+            'expires': 3600,
+        }
+    },
 }
 
 # Configuración adicional de Celery
 CELERY_TASK_ROUTES = {
     'apps.reportes.tasks.generar_reporte_async': {'queue': 'reportes'},
+    'apps.reportes.tasks.generar_parte_reporte': {'queue': 'reportes'},
+    'apps.reportes.tasks.ensamblar_reporte_particionado': {'queue': 'reportes'},
+    'apps.reportes.tasks.exportar_item_lote': {'queue': 'reportes'},
+    'apps.reportes.tasks.empaquetar_lote_exportacion': {'queue': 'reportes'},
+    'apps.reportes.tasks.generar_reporte_masivo': {'queue': 'reportes'},
+    'apps.reportes.tasks.generar_item_masivo': {'queue': 'reportes'},
+    'apps.reportes.tasks.ensamblar_reporte_masivo': {'queue': 'reportes'},
     'apps.core.tasks.importacion_masiva_excel': {'queue': 'importaciones'},
     'apps.mobile.tasks.procesar_sincronizacion_async': {'queue': 'mobile'},
     'apps.core.tasks.cleanup_recycle_bin_task': {'queue': 'maintenance'},
@@ -174,6 +197,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Descarga de archivos generados delegada a nginx (X-Accel-Redirect)
+DESCARGAS_SERVIDOR_PROXY = os.environ.get('DESCARGAS_SERVIDOR_PROXY', 'NGINX')
+DESCARGAS_PREFIJO_INTERNO = os.environ.get('DESCARGAS_PREFIJO_INTERNO', '/protected-media/')
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
@@ -0,0 +1,97 @@
+"""
+Tests para el GET condicional y el modo delta de catálogo y oficinas.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+
+
+class DatosReferenciaConditionalTest(APITestCase):
+    """Pruebas de ETag, Last-Modified y modo delta"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='referencia', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+
+        self.oficina = Oficina.objects.create(codigo='OF-REF-001', nombre='Dirección', responsable='Director')
+        self.otra_oficina = Oficina.objects.create(codigo='OF-REF-002', nombre='Logística', responsable='Jefe')
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220004',
+            denominacion='SILLA GIRATORIA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+
+    def test_etag_y_304(self):
+        """Una segunda consulta con If-None-Match devuelve 304"""
+        response = self.client.get('/api/catalogo/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get('/api/catalogo/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_cambia_con_los_datos(self):
+        """Modificar la tabla invalida el ETag"""
+        etag = self.client.get('/api/oficinas/')['ETag']
+
+        self.oficina.nombre = 'Dirección Regional'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oficina.save()
+
+        response = self.client.get('/api/oficinas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depende_de_la_consulta(self):
+        """Cada combinación de parámetros tiene su propio ETag"""
+        etag = self.client.get('/api/oficinas/')['ETag']
+        response = self.client.get('/api/oficinas/', {'search': 'Log'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_modo_delta(self):
+        """?since= devuelve solo los cambios y las bajas posteriores"""
+        cursor = (timezone.now() + timedelta(seconds=1)).isoformat()
+        sin_cambios = self.client.get('/api/oficinas/', {'since': cursor})
+        self.assertEqual(sin_cambios.data['actualizados'], [])
+        self.assertEqual(sin_cambios.data['eliminados'], [])
+
+        desde = timezone.now() - timedelta(seconds=1)
+        Oficina.all_objects.filter(pk__in=[self.oficina.pk, self.otra_oficina.pk]).update(
+            updated_at=desde - timedelta(days=1), created_at=desde - timedelta(days=1)
+        )
+        self.oficina.nombre = 'Dirección Regional'
+        self.oficina.save()
+        self.otra_oficina.soft_delete()
+
+        response = self.client.get('/api/oficinas/', {'since': desde.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o['id'] for o in response.data['actualizados']], [self.oficina.pk])
+        self.assertEqual(response.data['eliminados'], [self.otra_oficina.pk])
+        self.assertIn('cursor', response.data)
+
+    def test_delta_filtrado_no_reporta_bajas_falsas(self):
+        """Los registros excluidos solo por ?search= no se informan como eliminados"""
+        desde = timezone.now() - timedelta(seconds=1)
+        self.oficina.nombre = 'Dirección Regional'
+        self.oficina.save()
+
+        response = self.client.get('/api/oficinas/', {'since': desde.isoformat(), 'search': 'Log'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([o['id'] for o in response.data['actualizados']], [self.otra_oficina.pk])
+        self.assertEqual(response.data['eliminados'], [])
+
+    def test_cursor_invalido(self):
+        """Un cursor que no es fecha devuelve 400"""
+        response = self.client.get('/api/catalogo/', {'since': 'ayer'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,147 @@
+"""
+Tests para el feed incremental de bienes con lápidas.
+"""
+import gzip
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.mobile.models import RegistroCambioBien
+from apps.oficinas.models import Oficina
+
+
+class FeedCambiosBienesTest(APITestCase):
+    """Pruebas del endpoint /api/sync/bienes/"""
+
+    url = '/api/sync/bienes/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='feed', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+
+        self.oficina = Oficina.objects.create(codigo='OF-FEED-001', nombre='Oficina Feed', responsable='Jefe')
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220005',
+            denominacion='PROYECTOR MULTIMEDIA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+
+    def crear_bien(self, codigo):
+        return BienPatrimonial.objects.create(
+            codigo_patrimonial=codigo,
+            catalogo=self.catalogo,
+            oficina=self.oficina,
+            estado_bien='B'
+        )
+
+    def test_sin_cursor_pide_reinicio(self):
+        """Sin cursor se devuelve el cursor actual y reinicio"""
+        self.crear_bien('FEED-001')
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.data['reinicio'])
+        self.assertEqual(response.data['cursor'], RegistroCambioBien.cursor_actual())
+
+    def test_cambios_desde_cursor(self):
+        """Solo se entregan los bienes modificados después del cursor"""
+        self.crear_bien('FEED-001')
+        cursor = self.client.get(self.url).data['cursor']
+
+        nuevo = self.crear_bien('FEED-002')
+        nuevo.marca = 'Epson'
+        nuevo.save()
+
+        response = self.client.get(self.url, {'cursor': cursor})
+        self.assertFalse(response.data['reinicio'])
+        self.assertEqual([b['id'] for b in response.data['actualizados']], [nuevo.id])
+        self.assertEqual(response.data['actualizados'][0]['marca'], 'Epson')
+        self.assertEqual(response.data['actualizados'][0]['oficina_id'], self.oficina.id)
+        self.assertEqual(response.data['eliminados'], [])
+
+        siguiente = self.client.get(self.url, {'cursor': response.data['cursor']})
+        self.assertEqual(siguiente.data['actualizados'], [])
+
+    def test_lapidas_para_eliminaciones(self):
+        """Las bajas lógicas y los borrados físicos generan lápidas"""
+        bien_baja = self.crear_bien('FEED-001')
+        bien_borrado = self.crear_bien('FEED-002')
+        cursor = RegistroCambioBien.cursor_actual()
+        esperados = sorted([bien_baja.id, bien_borrado.id])
+
+        bien_baja.soft_delete()
+        bien_borrado.hard_delete()
+
+        response = self.client.get(self.url, {'cursor': cursor})
+        self.assertEqual(response.data['actualizados'], [])
+        self.assertEqual(response.data['eliminados'], esperados)
+
+    def test_lotes_con_limite(self):
+        """El feed se entrega por lotes encadenados"""
+        for i in range(5):
+            self.crear_bien(f'FEED-{i:03d}')
+
+        response = self.client.get(self.url, {'cursor': 0, 'limite': 3})
+        self.assertTrue(response.data['hay_mas'])
+        self.assertEqual(len(response.data['actualizados']), 3)
+
+        response = self.client.get(self.url, {'cursor': response.data['cursor'], 'limite': 3})
+        self.assertFalse(response.data['hay_mas'])
+        self.assertEqual(len(response.data['actualizados']), 2)
+
+    def test_cursor_purgado_pide_reinicio(self):
+        """Un cursor anterior a la marca de purga obliga a reiniciar"""
+        for i in range(3):
+            self.crear_bien(f'FEED-{i:03d}')
+        cursor = RegistroCambioBien.cursor_actual()
+        self.crear_bien('FEED-003')
+        RegistroCambioBien.objects.filter(secuencia__lte=cursor).update(fecha=timezone.now() - timedelta(days=100))
+
+        self.assertEqual(RegistroCambioBien.purgar_antiguos(90), 3)
+        self.assertTrue(self.client.get(self.url, {'cursor': cursor - 1}).data['reinicio'])
+        response = self.client.get(self.url, {'cursor': cursor})
+        self.assertFalse(response.data['reinicio'])
+        self.assertEqual(len(response.data['actualizados']), 1)
+
+    def test_huecos_no_piden_reinicio(self):
+        """Registros eliminados sin purga (huecos en la numeración) no obligan a reiniciar"""
+        for i in range(3):
+            self.crear_bien(f'FEED-{i:03d}')
+        cursor = RegistroCambioBien.cursor_actual()
+        RegistroCambioBien.objects.order_by('secuencia').first().delete()
+
+        response = self.client.get(self.url, {'cursor': 0})
+        self.assertFalse(response.data['reinicio'])
+        self.assertEqual(response.data['cursor'], cursor)
+        self.assertEqual(len(response.data['actualizados']), 2)
+
+    def test_confirmacion_tardia_no_se_pierde(self):
+        """Un registro con ID menor confirmado después del cursor se entrega igual"""
+        self.crear_bien('FEED-001')
+        tardio = self.crear_bien('FEED-002')
+        RegistroCambioBien.objects.filter(bien_id=tardio.id).delete()
+        cursor = self.client.get(self.url, {'cursor': 0}).data['cursor']
+
+        # La transacción lenta insertó antes (ID menor) pero confirma ahora
+        primer_id = RegistroCambioBien.objects.order_by('id').values_list('id', flat=True).first()
+        RegistroCambioBien.objects.create(id=primer_id - 1, bien_id=tardio.id, operacion='ACTUALIZADO')
+
+        response = self.client.get(self.url, {'cursor': cursor})
+        self.assertFalse(response.data['reinicio'])
+        self.assertEqual([b['id'] for b in response.data['actualizados']], [tardio.id])
+        self.assertGreater(response.data['cursor'], cursor)
+
+    def test_respuesta_comprimida(self):
+        """Con Accept-Encoding: gzip la respuesta se comprime"""
+        self.crear_bien('FEED-001')
+        response = self.client.get(self.url, {'cursor': 0}, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        datos = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(datos['actualizados']), 1)
@@ -0,0 +1,78 @@
+"""
+Tests para la serialización rápida del listado de bienes de la API.
+Verifica la equivalencia con el serializer DRF y los campos dispersos.
+"""
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.mobile.serializers import (
+    BienPatrimonialListSerializer, BienPatrimonialListValuesSerializer
+)
+from apps.oficinas.models import Oficina
+
+
+class BienPatrimonialListValuesTest(APITestCase):
+    """Pruebas del listado de bienes basado en values()"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='lista_api', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+
+        self.oficina = Oficina.objects.create(
+            codigo='OF-API-001',
+            nombre='Oficina API',
+            responsable='Responsable API'
+        )
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220003',
+            denominacion='ESCRITORIO DE MELAMINA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i, estado in enumerate(['N', 'B', 'M'], start=1):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'API-{i:03d}',
+                catalogo=self.catalogo,
+                oficina=self.oficina,
+                estado_bien=estado,
+                marca='Marca',
+                serie=f'S{i}'
+            )
+
+    def test_salida_equivalente_al_serializer(self):
+        """La salida coincide con BienPatrimonialListSerializer"""
+        response = self.client.get('/api/bienes/')
+        self.assertEqual(response.status_code, 200)
+
+        queryset = BienPatrimonial.objects.select_related('catalogo', 'oficina').order_by('-created_at')
+        esperado = BienPatrimonialListSerializer(queryset, many=True).data
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'], [dict(item) for item in esperado])
+
+    def test_campos_dispersos(self):
+        """?fields= limita los campos devueltos"""
+        response = self.client.get('/api/bienes/', {'fields': 'codigo_patrimonial,estado_display,inexistente'})
+
+        resultado = response.data['results'][0]
+        self.assertEqual(set(resultado), {'codigo_patrimonial', 'estado_display'})
+        self.assertIn(resultado['estado_display'], {'Nuevo', 'Bueno', 'Malo'})
+
+    def test_filtros_y_busqueda(self):
+        """Los filtros del ViewSet siguen aplicándose"""
+        response = self.client.get('/api/bienes/', {'estado_bien': 'M', 'fields': 'codigo_patrimonial'})
+        self.assertEqual(response.data['results'], [{'codigo_patrimonial': 'API-003'}])
+
+        response = self.client.get('/api/bienes/', {'search': 'S2', 'fields': 'codigo_patrimonial'})
+        self.assertEqual(response.data['results'], [{'codigo_patrimonial': 'API-002'}])
+
+    def test_columnas_consultadas(self):
+        """Solo se consultan las columnas necesarias"""
+        serializador = BienPatrimonialListValuesSerializer(['estado_bien', 'estado_display'])
+        self.assertEqual(serializador.columnas(), ['estado_bien'])
+        self.assertEqual(
+            BienPatrimonialListValuesSerializer('').campos,
+            list(BienPatrimonialListValuesSerializer.CAMPOS)
+        )
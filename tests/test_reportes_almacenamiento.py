@@ -0,0 +1,169 @@
+"""
+Tests para el almacén de reportes por contenido y la limpieza por lotes.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.reportes.almacenamiento import AlmacenReportes
+from apps.reportes.models import ArtefactoReporte, ReporteGenerado
+
+
+class AlmacenReportesTest(TestCase):
+    """Pruebas de los nombres por contenido, la compresión y la limpieza"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root, DESCARGAS_SERVIDOR_PROXY='')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache.clear()
+
+        self.user = User.objects.create_user(username='almacen', password='test123')
+        self.almacen = AlmacenReportes()
+        self.temporales = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temporales, ignore_errors=True)
+
+    def archivo_local(self, nombre, contenido):
+        ruta = os.path.join(self.temporales, nombre)
+        with open(ruta, 'wb') as archivo:
+            archivo.write(contenido)
+        return ruta
+
+    def crear_reporte(self, nombre, contenido, expirado=False):
+        """Reporte completado con su archivo en el almacén"""
+        reporte = ReporteGenerado.objects.create(
+            nombre='Inventario', tipo_reporte='INVENTARIO', formato='CSV', usuario=self.user
+        )
+        reporte.archivo_generado.name, reporte.hash_archivo = self.almacen.guardar(
+            self.archivo_local(nombre, contenido)
+        )
+        reporte.fecha_expiracion = timezone.now() + timedelta(days=-1 if expirado else 30)
+        reporte.marcar_completado()
+        return reporte
+
+    def ruta(self, nombre):
+        return os.path.join(self.media_root, nombre)
+
+    def test_nombre_por_contenido_y_compresion(self):
+        """Los textos grandes se comprimen y el mismo contenido se guarda una vez"""
+        contenido = b'codigo;denominacion\n' + b'PAT-0001;ESCRITORIO DE MADERA\n' * 5000
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+
+        nombre, calculado = self.almacen.guardar(self.archivo_local('inventario.csv', contenido))
+        self.assertEqual(calculado, hash_contenido)
+        self.assertEqual(nombre, f'reportes/contenido/{hash_contenido[:2]}/{hash_contenido}.csv.gz')
+        self.assertLess(os.path.getsize(self.ruta(nombre)), len(contenido) // 10)
+        with gzip.open(self.ruta(nombre)) as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+        self.assertEqual(self.almacen.guardar(self.archivo_local('copia.csv', contenido))[0], nombre)
+        self.assertEqual(os.listdir(os.path.dirname(self.ruta(nombre))), [os.path.basename(nombre)])
+
+        # Los textos pequeños y los formatos binarios se guardan tal cual
+        pequeño, _ = self.almacen.guardar(self.archivo_local('corto.csv', b'codigo\nPAT-1\n'))
+        libro, _ = self.almacen.guardar(self.archivo_local('libro.xlsx', contenido))
+        self.assertTrue(pequeño.endswith('.csv'))
+        self.assertTrue(libro.endswith('.xlsx'))
+        self.assertEqual(AlmacenReportes.extension(nombre), '.csv')
+
+    def test_descarga_de_archivo_comprimido(self):
+        """El archivo se envía con gzip si el cliente lo acepta y descomprimido si no"""
+        contenido = b'codigo;estado\n' + b'PAT-0001;BUENO\n' * 10000
+        reporte = self.crear_reporte('inventario.csv', contenido)
+        self.assertTrue(reporte.archivo_generado.name.endswith('.gz'))
+        self.assertEqual(reporte.calcular_hash_archivo(), hashlib.sha256(contenido).hexdigest())
+
+        self.client.force_login(self.user)
+        url = f'/reportes/reportes/{reporte.pk}/descargar/'
+
+        respuesta = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(respuesta['ETag'], f'"{reporte.hash_archivo}-gzip"')
+        self.assertIn('.csv"', respuesta['Content-Disposition'])
+        self.assertEqual(gzip.decompress(b''.join(respuesta.streaming_content)), contenido)
+
+        respuesta = self.client.get(url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('Content-Encoding', respuesta)
+        self.assertEqual(respuesta['ETag'], f'"{reporte.hash_archivo}"')
+        self.assertEqual(b''.join(respuesta.streaming_content), contenido)
+
+    def test_limpieza_por_lotes(self):
+        """Los expirados se procesan por lotes y solo se borran archivos sin uso"""
+        vigente = self.crear_reporte('vigente.csv', b'vigente')
+        expirados = [self.crear_reporte(f'expirado{i}.csv', f'expirado {i}'.encode(), expirado=True) for i in range(3)]
+        # Un expirado con el mismo contenido que el vigente
+        compartido = self.crear_reporte('copia.csv', b'vigente', expirado=True)
+
+        # Un artefacto con dos reportes expirados y otro con uno vigente más
+        liberado = ArtefactoReporte.objects.create(clave='a' * 64, archivo=expirados[0].archivo_generado.name, referencias=2)
+        conservado = ArtefactoReporte.objects.create(clave='b' * 64, archivo=expirados[1].archivo_generado.name, referencias=2)
+        ReporteGenerado.objects.filter(pk__in=[expirados[0].pk, expirados[2].pk]).update(
+            artefacto=liberado, archivo_generado=liberado.archivo.name
+        )
+        ReporteGenerado.objects.filter(pk=expirados[1].pk).update(artefacto=conservado)
+        eliminado = self.ruta(expirados[2].archivo_generado.name)
+
+        self.assertEqual(ReporteGenerado.limpiar_expirados(limite=time.monotonic() - 1), 0)
+        self.assertEqual(ReporteGenerado.limpiar_expirados(tamaño_lote=2), 4)
+
+        self.assertFalse(ReporteGenerado.objects.filter(estado='COMPLETADO').exclude(pk=vigente.pk).exists())
+        self.assertFalse(ArtefactoReporte.objects.filter(pk=liberado.pk).exists())
+        self.assertEqual(ArtefactoReporte.objects.get(pk=conservado.pk).referencias, 1)
+        self.assertFalse(os.path.exists(self.ruta(liberado.archivo.name)))
+        self.assertTrue(os.path.exists(self.ruta(conservado.archivo.name)))
+        self.assertTrue(os.path.exists(self.ruta(vigente.archivo_generado.name)))
+        self.assertEqual(compartido.archivo_generado.name, vigente.archivo_generado.name)
+        # El archivo propio del tercer expirado quedó sin uso al enlazarlo al artefacto
+        self.assertTrue(os.path.exists(eliminado))
+
+        # El barrido elimina los archivos huérfanos antiguos
+        antiguo = time.time() - 2 * AlmacenReportes.ANTIGUEDAD_MINIMA_HUERFANO
+        os.utime(eliminado, (antiguo, antiguo))
+        os.utime(self.ruta(vigente.archivo_generado.name), (antiguo, antiguo))
+        self.assertEqual(self.almacen.barrer_huerfanos(time.monotonic() + 60), 1)
+        self.assertFalse(os.path.exists(eliminado))
+        self.assertTrue(os.path.exists(self.ruta(vigente.archivo_generado.name)))
+        self.assertTrue(os.path.exists(self.ruta(conservado.archivo.name)))
+        self.assertIsNotNone(cache.get(AlmacenReportes.PREFIX_CURSOR))
+
+    def test_contenido_repetido_renueva_el_archivo(self):
+        """Un archivo reutilizado no se considera huérfano antiguo"""
+        nombre, _ = self.almacen.guardar(self.archivo_local('inventario.csv', b'contenido repetido'))
+        antiguo = time.time() - 2 * AlmacenReportes.ANTIGUEDAD_MINIMA_HUERFANO
+        os.utime(self.ruta(nombre), (antiguo, antiguo))
+
+        self.assertEqual(self.almacen.guardar(self.archivo_local('copia.csv', b'contenido repetido'))[0], nombre)
+        self.assertGreater(os.path.getmtime(self.ruta(nombre)), antiguo)
+        self.assertEqual(self.almacen.barrer_huerfanos(time.monotonic() + 60), 0)
+        self.assertTrue(os.path.exists(self.ruta(nombre)))
+
+    def test_archivo_eliminado_antes_de_registrarse(self):
+        """Si el archivo se borra antes de guardar el reporte se vuelve a escribir"""
+        contenido = b'codigo;estado\n' + b'PAT-0001;BUENO\n' * 10000
+        ruta_local = self.archivo_local('inventario.csv', contenido)
+        nombre, _ = self.almacen.guardar(ruta_local)
+
+        # Un barrido o eliminar() concurrente lo borra por no estar en uso
+        self.assertEqual(self.almacen.eliminar([nombre]), 1)
+        reporte = ReporteGenerado.objects.create(
+            nombre='Inventario', tipo_reporte='INVENTARIO', formato='CSV', usuario=self.user
+        )
+        reporte.archivo_generado.name = nombre
+        reporte.marcar_completado()
+
+        self.almacen.confirmar(ruta_local, nombre)
+        with gzip.open(self.ruta(nombre)) as archivo:
+            self.assertEqual(archivo.read(), contenido)
+        self.assertEqual(self.almacen.eliminar([nombre]), 0)
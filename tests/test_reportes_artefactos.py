@@ -0,0 +1,173 @@
+"""
+Tests para la reutilización de reportes por clave de contenido.
+"""
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.models import ArtefactoReporte, ReporteGenerado
+from apps.reportes.tasks import generar_reporte_async
+
+
+class ArtefactoReporteTest(TestCase):
+    """Pruebas de la clave de contenido y el conteo de referencias"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.usuarios = [
+            User.objects.create_user(username=f'artefacto{i}', password='test123') for i in range(2)
+        ]
+        self.oficina = Oficina.objects.create(codigo='OF-ART-001', nombre='Oficina Artefactos', responsable='Jefe')
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220010',
+            denominacion='ARMARIO METALICO',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(3):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'ART-{i:03d}',
+                catalogo=self.catalogo,
+                oficina=self.oficina,
+                estado_bien='B'
+            )
+
+    def crear_reporte(self, usuario=None, formato='CSV', **parametros):
+        return ReporteGenerado.objects.create(
+            nombre='Inventario',
+            tipo_reporte='INVENTARIO',
+            formato=formato,
+            usuario=usuario or self.usuarios[0],
+            parametros=parametros
+        )
+
+    def generar(self, reporte):
+        generar_reporte_async(reporte.id)
+        reporte.refresh_from_db()
+        return reporte
+
+    def archivos_generados(self):
+        return [
+            archivo
+            for _, _, archivos in os.walk(os.path.join(self.media_root, 'reportes'))
+            for archivo in archivos
+        ]
+
+    def test_clave_normaliza_parametros(self):
+        """Parámetros equivalentes producen la misma clave"""
+        a = self.crear_reporte(filtros={'oficinas': [2, 1], 'estados_bien': ['B'], 'marcas': []})
+        b = self.crear_reporte(filtros={'estados_bien': ['B'], 'oficinas': ['1', '2']}, programado=True)
+
+        self.assertEqual(ArtefactoReporte.calcular_clave(a), ArtefactoReporte.calcular_clave(b))
+        self.assertNotEqual(
+            ArtefactoReporte.calcular_clave(a),
+            ArtefactoReporte.calcular_clave(self.crear_reporte(formato='EXCEL', filtros=a.parametros['filtros']))
+        )
+
+    def test_clave_cambia_con_los_datos(self):
+        """Modificar los bienes invalida la clave"""
+        reporte = self.crear_reporte()
+        clave = ArtefactoReporte.calcular_clave(reporte)
+
+        # La versión de datos cambia al confirmarse la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            BienPatrimonial.objects.first().save()
+
+        self.assertNotEqual(ArtefactoReporte.calcular_clave(reporte), clave)
+
+    def test_reporte_identico_reutiliza_archivo(self):
+        """Un segundo reporte igual se enlaza al archivo existente"""
+        primero = self.generar(self.crear_reporte())
+        segundo = self.generar(self.crear_reporte(usuario=self.usuarios[1]))
+
+        self.assertEqual(segundo.estado, 'COMPLETADO')
+        self.assertEqual(segundo.archivo_generado.name, primero.archivo_generado.name)
+        self.assertEqual(segundo.hash_archivo, primero.hash_archivo)
+        self.assertEqual(segundo.total_registros, 3)
+        self.assertEqual(segundo.artefacto_id, primero.artefacto_id)
+        self.assertEqual(primero.artefacto.referencias, 2)
+        self.assertEqual(len(self.archivos_generados()), 1)
+
+    def test_datos_modificados_regeneran(self):
+        """Tras modificar los datos se genera un archivo nuevo"""
+        primero = self.generar(self.crear_reporte())
+        bien = BienPatrimonial.objects.first()
+        bien.marca = 'ACME'
+        with self.captureOnCommitCallbacks(execute=True):
+            bien.save()
+        segundo = self.generar(self.crear_reporte())
+
+        self.assertNotEqual(segundo.artefacto_id, primero.artefacto_id)
+        self.assertEqual(len(self.archivos_generados()), 2)
+
+    def test_registro_concurrente_elimina_duplicado(self):
+        """Si dos tareas generan el mismo contenido se conserva un solo archivo"""
+        primero = self.generar(self.crear_reporte())
+        segundo = self.crear_reporte()
+        segundo.clave_contenido = primero.clave_contenido
+        segundo.archivo_generado.save('duplicado.csv', primero.archivo_generado.open('rb'), save=False)
+        segundo.marcar_completado()
+
+        ArtefactoReporte.registrar(segundo)
+
+        self.assertEqual(segundo.archivo_generado.name, primero.archivo_generado.name)
+        self.assertEqual(self.archivos_generados(), [os.path.basename(primero.archivo_generado.name)])
+
+    def test_archivo_se_elimina_con_la_ultima_referencia(self):
+        """La limpieza de expirados solo borra el archivo sin referencias"""
+        primero = self.generar(self.crear_reporte())
+        segundo = self.generar(self.crear_reporte(usuario=self.usuarios[1]))
+        artefacto = primero.artefacto
+
+        ReporteGenerado.objects.filter(pk=primero.pk).update(fecha_expiracion=timezone.now() - timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ReporteGenerado.limpiar_expirados(), 1)
+
+        artefacto.refresh_from_db()
+        self.assertEqual(artefacto.referencias, 1)
+        self.assertEqual(len(self.archivos_generados()), 1)
+
+        self.client.force_login(self.usuarios[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/reportes/reportes/{segundo.pk}/eliminar/')
+
+        self.assertFalse(ArtefactoReporte.objects.filter(pk=artefacto.pk).exists())
+        self.assertEqual(self.archivos_generados(), [])
+
+    def test_borrado_directo_descuenta_referencias(self):
+        """Los borrados que no pasan por liberar_archivo también liberan el archivo"""
+        primero = self.generar(self.crear_reporte())
+        segundo = self.generar(self.crear_reporte(usuario=self.usuarios[1]))
+        artefacto = primero.artefacto
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ReporteGenerado.objects.filter(pk=primero.pk).delete()
+
+        artefacto.refresh_from_db()
+        self.assertEqual(artefacto.referencias, 1)
+        self.assertEqual(len(self.archivos_generados()), 1)
+
+        # Un reporte en la papelera conserva su referencia hasta purgarse
+        segundo.delete()
+        artefacto.refresh_from_db()
+        self.assertEqual(artefacto.referencias, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.hard_delete()
+
+        self.assertFalse(ArtefactoReporte.objects.filter(pk=artefacto.pk).exists())
+        self.assertEqual(self.archivos_generados(), [])
@@ -0,0 +1,104 @@
+"""
+Tests para la descarga de reportes con FileResponse, Range y ETag.
+"""
+import hashlib
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.http import FileResponse
+from django.test import TestCase, override_settings
+
+from apps.core.download_utils import FileDownload
+from apps.reportes.models import ReporteGenerado
+
+
+class DescargaReporteTest(TestCase):
+    """Pruebas de la vista descargar_reporte"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root, DESCARGAS_SERVIDOR_PROXY='')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.user = User.objects.create_user(username='descargas', password='test123')
+        self.contenido = bytes(range(256)) * 1000
+        self.reporte = ReporteGenerado.objects.create(
+            nombre='Inventario Almacén',
+            tipo_reporte='INVENTARIO',
+            formato='CSV',
+            usuario=self.user
+        )
+        self.reporte.archivo_generado.save('inventario.csv', ContentFile(self.contenido), save=False)
+        self.reporte.marcar_completado()
+
+        self.url = f'/reportes/reportes/{self.reporte.pk}/descargar/'
+        self.etag = f'"{hashlib.sha256(self.contenido).hexdigest()}"'
+        self.client.force_login(self.user)
+
+    def test_hash_calculado_al_completar(self):
+        """El hash del contenido se guarda al completar el reporte"""
+        self.assertEqual(self.reporte.hash_archivo, hashlib.sha256(self.contenido).hexdigest())
+
+    def test_descarga_completa_por_bloques(self):
+        """La descarga completa usa FileResponse con ETag y Accept-Ranges"""
+        respuesta = self.client.get(self.url)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIsInstance(respuesta, FileResponse)
+        self.assertEqual(respuesta['ETag'], self.etag)
+        self.assertEqual(respuesta['Accept-Ranges'], 'bytes')
+        self.assertEqual(respuesta['Content-Length'], str(len(self.contenido)))
+        self.assertIn("filename*=utf-8''Inventario%20Almac%C3%A9n_", respuesta['Content-Disposition'])
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido)
+
+    def test_revalidacion_con_etag(self):
+        """Una descarga repetida con If-None-Match responde 304"""
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta['ETag'], self.etag)
+
+    def test_descarga_parcial(self):
+        """Una petición Range devuelve solo el intervalo solicitado"""
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=1000-1999')
+
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(respuesta['Content-Range'], f'bytes 1000-1999/{len(self.contenido)}')
+        self.assertEqual(respuesta['Content-Length'], '1000')
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido[1000:2000])
+
+    def test_sufijo_e_if_range(self):
+        """Se atienden sufijos y se ignora Range si If-Range no coincide"""
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=-10', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido[-10:])
+
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_rango_no_satisfacible(self):
+        """Un rango fuera del archivo responde 416"""
+        respuesta = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.contenido)}-')
+        self.assertEqual(respuesta.status_code, 416)
+        self.assertEqual(respuesta['Content-Range'], f'bytes */{len(self.contenido)}')
+
+    @override_settings(DESCARGAS_SERVIDOR_PROXY='NGINX', DESCARGAS_PREFIJO_INTERNO='/protected-media/')
+    def test_entrega_delegada_a_nginx(self):
+        """Con NGINX la respuesta solo indica la ruta interna"""
+        respuesta = self.client.get(self.url)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['X-Accel-Redirect'], f'/protected-media/{self.reporte.archivo_generado.name}')
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual(respuesta['ETag'], self.etag)
+
+    def test_interpretacion_de_rangos(self):
+        """Las cabeceras Range se interpretan según RFC 9110"""
+        self.assertEqual(FileDownload.parse_range('bytes=5-', 10), (5, 9))
+        self.assertEqual(FileDownload.parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(FileDownload.parse_range('bytes=-0', 10), 'INVALID')
+        self.assertIsNone(FileDownload.parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(FileDownload.parse_range('items=0-1', 10))
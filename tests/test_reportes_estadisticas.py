@@ -0,0 +1,144 @@
+"""
+Tests para las estadísticas agregadas de bienes.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.generadores import GeneradorReporteEstadistico
+from apps.reportes.utils import EstadisticasAgregadas, FiltroAvanzado
+
+
+class EstadisticasAgregadasTest(TestCase):
+    """Pruebas del cálculo de estadísticas en consultas agrupadas"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='estadisticas', password='test123')
+        self.oficinas = [
+            Oficina.objects.create(codigo=f'OF-EST-{i}', nombre=nombre, responsable='Jefe')
+            for i, nombre in enumerate(['Almacén', 'Logística'])
+        ]
+        catalogos = [
+            Catalogo.objects.create(
+                codigo=codigo,
+                denominacion=denominacion,
+                grupo=grupo,
+                clase='22 EQUIPO',
+                resolucion='011-2019/SBN'
+            )
+            for codigo, denominacion, grupo in [
+                ('04220011', 'MESA DE MADERA', '04 AGRICOLA Y PESQUERO'),
+                ('74080500', 'COMPUTADORA', '74 MAQUINARIA'),
+            ]
+        ]
+        datos = [
+            ('B', 0, 0, Decimal('100.00'), date(2020, 1, 1)),
+            ('B', 0, 1, Decimal('300.00'), None),
+            ('M', 0, 1, None, date(2005, 1, 1)),
+            ('E', 1, 1, Decimal('50.00'), None),
+            ('R', 1, 0, None, None),
+        ]
+        for i, (estado, oficina, catalogo, valor, fecha) in enumerate(datos):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'EST-{i:03d}',
+                catalogo=catalogos[catalogo],
+                oficina=self.oficinas[oficina],
+                estado_bien=estado,
+                valor_adquisicion=valor,
+                fecha_adquisicion=fecha
+            )
+
+    def test_estadisticas_de_filtro_en_dos_consultas(self):
+        """Todos los desgloses de filtros se obtienen en dos consultas"""
+        queryset = BienPatrimonial.objects.all()
+        with self.assertNumQueries(2):
+            estadisticas = FiltroAvanzado().obtener_estadisticas(queryset)
+
+        self.assertEqual(estadisticas['total_bienes'], 5)
+        self.assertEqual(
+            [(fila['estado_bien'], fila['total']) for fila in estadisticas['por_estado']],
+            [('B', 2), ('E', 1), ('M', 1), ('R', 1)]
+        )
+        self.assertEqual(estadisticas['por_estado'][0]['porcentaje'], 40.0)
+        self.assertEqual(
+            [(fila['oficina__nombre'], fila['total']) for fila in estadisticas['por_oficina']],
+            [('Almacén', 3), ('Logística', 2)]
+        )
+        self.assertEqual(
+            [(fila['catalogo__grupo'], fila['total']) for fila in estadisticas['por_grupo']],
+            [('74 MAQUINARIA', 3), ('04 AGRICOLA Y PESQUERO', 2)]
+        )
+        self.assertEqual(estadisticas['valores']['total_valor'], Decimal('450.00'))
+        self.assertEqual(estadisticas['valores']['bienes_sin_valor'], 2)
+        self.assertEqual(sum(fila['total'] for fila in estadisticas['fechas']['por_año']), 5)
+
+    def test_resumen_y_alertas_reutilizan_consultas(self):
+        """El resumen, las alertas y las comparativas comparten las consultas"""
+        agregados = EstadisticasAgregadas(BienPatrimonial.objects.filter(oficina=self.oficinas[0]))
+        with self.assertNumQueries(2):
+            resumen = agregados.resumen_ejecutivo()
+            alertas = agregados.alertas_mantenimiento()
+            comparativas = agregados.comparativas()
+
+        self.assertEqual(resumen['total_bienes'], 3)
+        self.assertEqual(resumen['total_oficinas'], 1)
+        self.assertEqual(resumen['bienes_requieren_atencion'], 1)
+        self.assertEqual(resumen['porcentaje_atencion'], 33.33)
+        self.assertEqual(resumen['distribucion_estados']['B'], {'total': 2, 'porcentaje': 66.67})
+        self.assertEqual(alertas, {
+            'bienes_malo_estado': 1,
+            'bienes_raee': 0,
+            'bienes_chatarra': 0,
+            'sin_valor_adquisicion': 1,
+            'sin_fecha_adquisicion': 1,
+            'bienes_antiguos': 1,
+        })
+        self.assertEqual(
+            [(fila['estado_bien'], fila['total']) for fila in comparativas['estado_oficina']],
+            [('B', 2), ('M', 1)]
+        )
+
+    def test_antiguedad_el_29_de_febrero(self):
+        """El límite de antigüedad se calcula también en años bisiestos"""
+        self.assertEqual(EstadisticasAgregadas.fecha_limite_antiguedad(date(2024, 2, 29)), date(2014, 2, 28))
+        self.assertEqual(EstadisticasAgregadas.fecha_limite_antiguedad(date(2030, 2, 28)), date(2020, 2, 28))
+        self.assertEqual(EstadisticasAgregadas.fecha_limite_antiguedad(date(2028, 2, 29)), date(2018, 2, 28))
+
+        bisiesto = timezone.make_aware(datetime(2024, 2, 29, 12))
+        with mock.patch('apps.reportes.utils.timezone.now', return_value=bisiesto):
+            self.assertEqual(EstadisticasAgregadas().alertas_mantenimiento()['bienes_antiguos'], 1)
+
+    def test_inventario_completo_en_cache(self):
+        """Las estadísticas del inventario se reutilizan hasta que cambian los datos"""
+        EstadisticasAgregadas.inventario_completo().resumen_ejecutivo()
+
+        # Solo se leen las versiones de datos
+        with self.assertNumQueries(1):
+            self.assertEqual(EstadisticasAgregadas.inventario_completo().resumen_ejecutivo()['total_bienes'], 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BienPatrimonial.objects.filter(codigo_patrimonial='EST-004').first().delete()
+        self.assertEqual(EstadisticasAgregadas.inventario_completo().total, 4)
+
+    def test_reporte_estadistico_con_numero_fijo_de_consultas(self):
+        """El reporte estadístico no repite consultas por dimensión"""
+        generador = GeneradorReporteEstadistico(BienPatrimonial.objects.all())
+        with self.assertNumQueries(4):
+            estadisticas = generador.generar_estadisticas()
+
+        self.assertEqual(estadisticas['alertas']['bienes_raee'], 1)
+        self.assertEqual(
+            [(fila['catalogo__grupo'], fila['estado_bien'], fila['total'])
+             for fila in estadisticas['comparativas']['grupo_estado']],
+            [('04 AGRICOLA Y PESQUERO', 'B', 1), ('04 AGRICOLA Y PESQUERO', 'R', 1),
+             ('74 MAQUINARIA', 'B', 1), ('74 MAQUINARIA', 'E', 1), ('74 MAQUINARIA', 'M', 1)]
+        )
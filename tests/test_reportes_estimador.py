@@ -0,0 +1,156 @@
+"""
+Tests para el estimador de tiempos de exportación aprendido del historial.
+"""
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.export_manager import EstimadorExportacion, ExportManager
+from apps.reportes.exportadores import ExportadorBase
+from apps.reportes.models import ReporteGenerado
+from apps.reportes.tasks import generar_reporte_async
+
+
+class EstimadorExportacionTest(TestCase):
+    """Pruebas del ajuste por formato y del respaldo en constantes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='estimador', password='test123')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.manager = ExportManager()
+
+    def crear_historial(self, formato, ejecuciones, fijo=2.0, por_celda=0.0001, graficos=0.0):
+        """Crea reportes completados cuya duración sigue un modelo conocido"""
+        for i, (registros, con_graficos) in enumerate(ejecuciones):
+            ReporteGenerado.objects.create(
+                nombre=f'Historial {i}',
+                tipo_reporte='INVENTARIO',
+                formato=formato,
+                usuario=self.user,
+                estado='COMPLETADO',
+                fecha_completado=timezone.now(),
+                total_registros=registros,
+                total_columnas=10,
+                incluye_graficos=con_graficos,
+                duracion_generacion=fijo + por_celda * registros * 10 + (graficos if con_graficos else 0)
+            )
+
+    def test_sin_historial_usa_constantes(self):
+        """Sin ejecuciones suficientes se usa el rendimiento configurado"""
+        self.crear_historial('CSV', [(1000, False)] * (EstimadorExportacion.MINIMO_MUESTRAS - 1))
+
+        plan = self.manager.planificar_exportacion('INVENTARIO', 'CSV', 100000)
+        self.assertEqual(plan['fuente'], 'CONSTANTES')
+        self.assertEqual(plan['tiempo_estimado'], 100000 // ExportManager.RENDIMIENTO_FORMATO['CSV'])
+        self.assertIsNone(EstimadorExportacion().modelo('CSV'))
+
+    def test_ajuste_por_formato(self):
+        """El modelo recupera el costo fijo, por celda y de los gráficos"""
+        ejecuciones = [(1000 * (i + 1), i % 3 == 0) for i in range(12)]
+        self.crear_historial('PDF', ejecuciones, fijo=2.0, por_celda=0.0001, graficos=5.0)
+
+        modelo = EstimadorExportacion().modelo('PDF')
+        self.assertEqual(modelo['muestras'], 12)
+        self.assertAlmostEqual(modelo['fijo'], 2.0, places=6)
+        self.assertAlmostEqual(modelo['por_celda'], 0.0001, places=9)
+        self.assertAlmostEqual(modelo['graficos'], 5.0, places=6)
+
+        plan = self.manager.planificar_exportacion('INVENTARIO', 'PDF', 20000, columnas=10)
+        self.assertEqual(plan['fuente'], 'HISTORIAL')
+        self.assertEqual(plan['tiempo_estimado'], 22)
+        self.assertEqual(
+            self.manager.estimar_tiempo_exportacion('INVENTARIO', 'PDF', 20000, con_graficos=True, columnas=10), 27
+        )
+
+        # Cada formato tiene su propio historial
+        self.assertEqual(self.manager.planificar_exportacion('INVENTARIO', 'CSV', 20000)['fuente'], 'CONSTANTES')
+
+    def test_ajuste_sin_sentido_se_descarta(self):
+        """Si las duraciones no crecen con los registros no se usa el modelo"""
+        ejecuciones = [(1000 * (i + 1), False) for i in range(10)]
+        self.crear_historial('EXCEL', ejecuciones, fijo=3.0, por_celda=0)
+
+        self.assertIsNone(EstimadorExportacion().modelo('EXCEL'))
+        self.assertEqual(self.manager.planificar_exportacion('INVENTARIO', 'EXCEL', 5000)['fuente'], 'CONSTANTES')
+
+
+class MetricasGeneracionTest(TestCase):
+    """Pruebas de las métricas guardadas al generar un reporte"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = User.objects.create_user(username='metricas', password='test123')
+        oficina = Oficina.objects.create(codigo='OF-MET-1', nombre='Logística', responsable='Jefe')
+        catalogo = Catalogo.objects.create(
+            codigo='04220021',
+            denominacion='ARCHIVADOR',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(3):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'MET-{i:03d}',
+                catalogo=catalogo,
+                oficina=oficina,
+                estado_bien='B'
+            )
+
+    def test_metricas_de_la_ejecucion(self):
+        """La duración, columnas y memoria quedan registradas en el reporte"""
+        reporte = ReporteGenerado.objects.create(
+            nombre='Inventario', tipo_reporte='INVENTARIO', formato='CSV', usuario=self.user
+        )
+        generar_reporte_async.apply(args=(reporte.id,))
+
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertGreater(reporte.duracion_generacion, 0)
+        self.assertEqual(reporte.total_columnas, len(ExportadorBase.COLUMNAS_BIENES))
+        self.assertFalse(reporte.incluye_graficos)
+        self.assertGreater(reporte.memoria_pico, 0)
+
+    def test_memoria_medida_por_ejecucion(self):
+        """El pico de memoria es el de la generación, no el acumulado del worker"""
+        bloque = bytearray(256 * 1024 * 1024)
+        bloque[::4096] = b'\x01' * len(bloque[::4096])
+        del bloque
+
+        reporte = ReporteGenerado.objects.create(
+            nombre='Inventario', tipo_reporte='INVENTARIO', formato='CSV', usuario=self.user
+        )
+        generar_reporte_async.apply(args=(reporte.id,))
+
+        reporte.refresh_from_db()
+        self.assertLess(reporte.memoria_pico, 256 * 1024)
+
+    def test_sin_reinicio_del_pico_no_guarda_memoria(self):
+        """Si el pico no se puede reiniciar no se guarda el del worker"""
+        reporte = ReporteGenerado.objects.create(
+            nombre='Inventario', tipo_reporte='INVENTARIO', formato='CSV', usuario=self.user
+        )
+        with mock.patch('apps.reportes.tasks._reiniciar_pico_memoria', return_value=False):
+            generar_reporte_async.apply(args=(reporte.id,))
+
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertIsNone(reporte.memoria_pico)
@@ -0,0 +1,90 @@
+"""
+Tests para la exportación CSV en streaming.
+"""
+import csv
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.exportadores import ExportadorCSV
+
+
+class ExportadorCSVStreamingTest(TestCase):
+    """Pruebas del exportador CSV incremental"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='csv', password='test123')
+        self.oficina = Oficina.objects.create(codigo='OF-CSV-001', nombre='Oficina CSV', responsable='Jefe CSV')
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220006',
+            denominacion='ARCHIVADOR DE METAL',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(3):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'CSV-{i:03d}',
+                catalogo=self.catalogo,
+                oficina=self.oficina,
+                estado_bien='R',
+                marca='Metálica, S.A.',
+                valor_adquisicion=Decimal('150.50') if i else None
+            )
+
+    def leer_filas(self, contenido):
+        return list(csv.reader(io.StringIO(contenido)))
+
+    def test_archivo_incremental(self):
+        """El archivo contiene encabezado, columnas y una fila por bien"""
+        exportador = ExportadorCSV()
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = exportador.exportar_bienes(
+                BienPatrimonial.objects.order_by('codigo_patrimonial'),
+                os.path.join(directorio, 'inventario.csv')
+            )
+            with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+                filas = self.leer_filas(archivo.read())
+
+        self.assertEqual(filas[0], ["DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO"])
+        self.assertEqual(filas[4], exportador.claves_bienes)
+        datos = [dict(zip(filas[4], fila)) for fila in filas[5:]]
+        self.assertEqual(len(datos), 3)
+        self.assertEqual(datos[0]['estado_bien'], 'Regular')
+        self.assertEqual(datos[0]['marca'], 'Metálica, S.A.')
+        self.assertEqual(datos[0]['denominacion'], 'ARCHIVADOR DE METAL')
+        self.assertEqual(datos[0]['responsable'], 'Jefe CSV')
+        self.assertEqual(datos[0]['valor_adquisicion'], '0')
+        self.assertEqual(datos[1]['valor_adquisicion'], '150.50')
+        self.assertEqual(exportador.total_registros, 3)
+
+    def test_sin_resultados(self):
+        """Sin bienes se escribe el mensaje correspondiente"""
+        contenido = ''.join(ExportadorCSV().generar_contenido(BienPatrimonial.objects.none()))
+        filas = self.leer_filas(contenido.lstrip('\ufeff'))
+        self.assertEqual(filas[-1], [ExportadorCSV.MENSAJE_SIN_DATOS])
+
+    def test_streaming_es_perezoso(self):
+        """La primera parte se entrega antes de consultar los bienes"""
+        contenido = ExportadorCSV().generar_contenido(BienPatrimonial.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(next(contenido), '\ufeff')
+            next(contenido)
+
+    def test_vista_streaming(self):
+        """La vista de exportación responde con StreamingHttpResponse"""
+        self.client.force_login(self.user)
+        response = self.client.get('/reportes/filtros/exportar-csv/', {'estados_bien': 'R'})
+
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        contenido = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(len(self.leer_filas(contenido.lstrip('\ufeff'))), 8)
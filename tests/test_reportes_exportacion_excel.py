@@ -0,0 +1,106 @@
+"""
+Tests para la exportación Excel en modo write_only.
+"""
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from apps.bienes.models import BienPatrimonial
+from apps.bienes.utils import BienPatrimonialExporter
+from apps.catalogo.models import Catalogo
+from apps.core.excel_utils import ExcelStreamWriter
+from apps.oficinas.models import Oficina
+from apps.reportes.exportadores import ExportadorExcel
+
+
+class ExportadorExcelStreamingTest(TestCase):
+    """Pruebas de los exportadores Excel incrementales"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='excel', password='test123')
+        self.oficina = Oficina.objects.create(codigo='OF-XLS-001', nombre='Oficina Excel', responsable='Jefe Excel')
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220007',
+            denominacion='ESCRITORIO DE MADERA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(3):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'XLS-{i:03d}',
+                catalogo=self.catalogo,
+                oficina=self.oficina,
+                estado_bien='B' if i else 'M',
+                marca='Muebles Puno',
+                valor_adquisicion=Decimal('320.00')
+            )
+        self.queryset = BienPatrimonial.objects.order_by('codigo_patrimonial')
+
+    def test_inventario_con_encabezado_y_estadisticas(self):
+        """El libro incluye encabezado institucional, datos y hojas de resumen"""
+        salida = io.BytesIO()
+        exportador = ExportadorExcel()
+        exportador.exportar_bienes(self.queryset, salida)
+
+        libro = load_workbook(io.BytesIO(salida.getvalue()))
+        self.assertEqual(libro.sheetnames, ['Inventario', 'Estadísticas', 'Gráficos'])
+        self.assertEqual(exportador.total_registros, 3)
+
+        hoja = libro['Inventario']
+        self.assertEqual(hoja['A1'].value, 'DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO')
+        self.assertIn('A1:W1', [str(rango) for rango in hoja.merged_cells.ranges])
+        self.assertEqual([celda.value for celda in hoja[5]], exportador.claves_bienes)
+        self.assertEqual(hoja.freeze_panes, 'A6')
+        self.assertEqual(hoja.max_row, 8)
+
+        datos = dict(zip(exportador.claves_bienes, [celda.value for celda in hoja[6]]))
+        self.assertEqual(datos['codigo_patrimonial'], 'XLS-000')
+        self.assertEqual(datos['estado_bien'], 'Malo')
+        self.assertEqual(hoja[7][0].fill.start_color.rgb, '00F2F2F2')
+
+        estadisticas = libro['Estadísticas']
+        self.assertEqual(estadisticas['A1'].value, 'ESTADÍSTICAS DEL INVENTARIO')
+        self.assertEqual(len(libro['Gráficos']._charts), 1)
+
+    def test_queryset_vacio(self):
+        """Sin bienes se genera un libro con el mensaje informativo"""
+        salida = io.BytesIO()
+        ExportadorExcel().exportar_bienes(BienPatrimonial.objects.none(), salida)
+
+        libro = load_workbook(io.BytesIO(salida.getvalue()))
+        self.assertEqual(libro['Inventario']['A1'].value, 'No se encontraron bienes con los filtros aplicados')
+
+    def test_anchos_estimados(self):
+        """El ancho de columna se estima desde la muestra con límites"""
+        anchos = ExcelStreamWriter.estimate_widths(['A', 'CODIGO'], [('x' * 100, None)])
+        self.assertEqual(anchos, [ExcelStreamWriter.MAX_WIDTH, 8])
+
+    def test_exportador_de_bienes(self):
+        """El exportador de bienes escribe una fila por bien con su estado"""
+        exportador = BienPatrimonialExporter()
+        exportador.exportar_bienes(self.queryset)
+        respuesta = exportador.generar_respuesta_http('inventario.xlsx')
+
+        libro = load_workbook(io.BytesIO(respuesta.content))
+        hoja = libro['Inventario Patrimonial']
+        self.assertEqual(hoja['A1'].value, 'CODIGO PATRIMONIAL')
+        self.assertEqual(hoja['P1'].value, 'URL QR')
+        self.assertEqual(hoja.max_row, 4)
+        self.assertEqual(hoja['A2'].value, 'XLS-000')
+        self.assertEqual(hoja['D2'].value, 'Malo')
+        self.assertEqual(hoja['N3'].value, 'Oficina Excel')
+        self.assertTrue(hoja['P2'].value)
+
+    def test_vista_exportar_filtros_excel(self):
+        """La vista devuelve el contenido del libro en la respuesta"""
+        self.client.force_login(self.user)
+        respuesta = self.client.get(reverse('reportes:exportar_filtros_excel'))
+
+        self.assertEqual(respuesta.status_code, 200)
+        libro = load_workbook(io.BytesIO(respuesta.content))
+        self.assertEqual(libro['Inventario'].max_row, 8)
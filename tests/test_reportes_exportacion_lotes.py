@@ -0,0 +1,231 @@
+"""
+Tests para las exportaciones masivas en paralelo y el ZIP por bloques.
+"""
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from celery import current_app
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.core.zip_utils import ZipStreamWriter
+from apps.oficinas.models import Oficina
+from apps.reportes import export_manager
+from apps.reportes.export_manager import BatchExportManager
+from apps.reportes.models import ReporteGenerado
+
+
+class ZipStreamWriterTest(TestCase):
+    """Pruebas del escritor de ZIP por bloques"""
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.entradas = []
+        for i, tamaño in enumerate([10, ZipStreamWriter.CHUNK_SIZE * 3 + 7]):
+            ruta = os.path.join(self.directorio, f'archivo_{i}.bin')
+            with open(ruta, 'wb') as archivo:
+                archivo.write(os.urandom(tamaño))
+            self.entradas.append((ruta, f'archivo_{i}.bin'))
+
+    def verificar(self, contenido):
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo_zip:
+            self.assertIsNone(archivo_zip.testzip())
+            for ruta, nombre in self.entradas:
+                with open(ruta, 'rb') as original:
+                    self.assertEqual(archivo_zip.read(nombre), original.read())
+
+    def test_iterador_de_bytes(self):
+        """El ZIP se produce en varios bloques válidos"""
+        bloques = list(ZipStreamWriter().iter_bytes(self.entradas))
+        self.assertGreater(len(bloques), 2)
+        self.verificar(b''.join(bloques))
+
+    def test_escritura_en_archivo(self):
+        """El ZIP escrito en disco contiene todas las entradas"""
+        destino = os.path.join(self.directorio, 'salida.zip')
+        self.assertEqual(ZipStreamWriter().write_to(destino, self.entradas), 2)
+        with open(destino, 'rb') as archivo:
+            self.verificar(archivo.read())
+
+
+class BatchExportManagerParaleloTest(TestCase):
+    """Pruebas del lote de exportaciones en paralelo"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        eager = current_app.conf.task_always_eager
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', eager)
+
+        self.user = User.objects.create_user(username='lotes', password='test123')
+        oficina = Oficina.objects.create(codigo='OF-LOT-001', nombre='Oficina Lotes', responsable='Jefe')
+        catalogo = Catalogo.objects.create(
+            codigo='04220009',
+            denominacion='ESTANTE METALICO',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(3):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'LOT-{i:03d}',
+                catalogo=catalogo,
+                oficina=oficina,
+                estado_bien='B' if i else 'R'
+            )
+
+        self.configuraciones = [
+            {'tipo_reporte': 'INVENTARIO', 'formato': 'CSV', 'filtros': {}},
+            {'tipo_reporte': 'INVENTARIO', 'formato': 'EXCEL', 'filtros': {'estados_bien': ['B']}},
+        ]
+
+    def test_lote_local_en_modo_eager(self):
+        """En modo eager el lote se genera localmente y se entrega en un ZIP"""
+        current_app.conf.task_always_eager = True
+        with mock.patch.object(BatchExportManager, 'PROCESOS_LOCALES', 1):
+            resultado = BatchExportManager().exportar_en_paralelo(self.configuraciones, self.user)
+
+        self.assertEqual(resultado['modo'], 'LOCAL')
+        reporte = ReporteGenerado.objects.get(pk=resultado['reporte_id'])
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertEqual(reporte.total_registros, 5)
+
+        diagnostico = reporte.parametros['lote']
+        self.assertEqual([item['estado'] for item in diagnostico], ['EXITOSO', 'EXITOSO'])
+        self.assertTrue(all(item['duracion_segundos'] >= 0 for item in diagnostico))
+        self.assertEqual([item['total_registros'] for item in diagnostico], [3, 2])
+
+        with zipfile.ZipFile(reporte.archivo_generado.path) as archivo_zip:
+            nombres = archivo_zip.namelist()
+        self.assertEqual(len(nombres), 2)
+        self.assertTrue(nombres[0].startswith('01_inventario_') and nombres[0].endswith('.csv'))
+        self.assertTrue(nombres[1].startswith('02_inventario_') and nombres[1].endswith('.xlsx'))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'reportes', 'lotes', resultado['lote_id'])))
+
+        self.assertEqual(reporte.parametros['masivo'], {'lote_id': resultado['lote_id'], 'total': 2})
+        self.assertEqual(reporte.obtener_progreso()['porcentaje'], 100)
+        self.assertEqual(list(reporte.partes.values_list('estado', flat=True)), ['COMPLETADO', 'COMPLETADO'])
+
+    def test_pool_local_de_procesos(self):
+        """Con varios procesos las exportaciones se reparten en el pool"""
+        pools = []
+
+        class PoolEnLinea:
+            """Ejecuta el pool en el proceso actual"""
+            def __init__(self, max_workers, initializer):
+                pools.append(max_workers)
+                self.initializer = initializer
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def map(self, funcion, *iterables):
+                return map(funcion, *iterables)
+
+        current_app.conf.task_always_eager = True
+        with mock.patch.object(export_manager, 'ProcessPoolExecutor', PoolEnLinea), \
+                mock.patch.object(connections, 'close_all'):
+            resultado = BatchExportManager().exportar_en_paralelo(self.configuraciones, self.user)
+
+            self.assertEqual(pools, [2])
+            self.assertEqual(
+                ReporteGenerado.objects.get(pk=resultado['reporte_id']).obtener_progreso()['completadas'], 2
+            )
+
+            # Dentro de un worker prefork de Celery (proceso daemon) no hay pool
+            with mock.patch('multiprocessing.current_process', return_value=mock.Mock(daemon=True)):
+                resultado = BatchExportManager().exportar_en_paralelo(self.configuraciones, self.user)
+
+        self.assertEqual(pools, [2])
+        reporte = ReporteGenerado.objects.get(pk=resultado['reporte_id'])
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertEqual(reporte.parametros['archivos_incluidos'], 2)
+
+    def test_lote_con_error_registra_diagnostico(self):
+        """Una exportación inválida queda registrada sin detener el lote"""
+        current_app.conf.task_always_eager = True
+        configuraciones = self.configuraciones[:1] + [{'tipo_reporte': 'STICKERS', 'formato': 'PDF'}]
+        with mock.patch.object(BatchExportManager, 'PROCESOS_LOCALES', 1):
+            resultado = BatchExportManager().exportar_en_paralelo(configuraciones, self.user)
+
+        reporte = ReporteGenerado.objects.get(pk=resultado['reporte_id'])
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertEqual(reporte.parametros['archivos_incluidos'], 1)
+        self.assertEqual(reporte.parametros['lote'][1]['estado'], 'ERROR')
+        self.assertIn('no soportado', reporte.parametros['lote'][1]['error'])
+        self.assertEqual(reporte.obtener_progreso()['errores'], 1)
+
+    def test_lote_como_chord_de_celery(self):
+        """Con workers de Celery el lote se distribuye como un chord"""
+        current_app.conf.task_always_eager = False
+        with mock.patch('celery.chord') as chord:
+            resultado = BatchExportManager().exportar_en_paralelo(self.configuraciones, self.user)
+
+        self.assertEqual(resultado['modo'], 'CELERY')
+        cabecera, cuerpo = chord.call_args.args
+        self.assertEqual(len(cabecera.tasks), 2)
+        self.assertEqual(cabecera.tasks[1].args[1:3], (2, 2))
+        self.assertEqual(cabecera.tasks[1].args[4], resultado['reporte_id'])
+        self.assertEqual(cuerpo.args[1:], (resultado['reporte_id'],))
+        chord.return_value.apply_async.assert_called_once()
+
+        reporte = ReporteGenerado.objects.get(pk=resultado['reporte_id'])
+        self.assertEqual(reporte.nombre, 'Exportación Masiva - 2 archivos')
+        self.assertEqual(reporte.estado, 'GENERANDO')
+        self.assertEqual(reporte.obtener_progreso()['pendientes'], 2)
+
+    def test_vista_inicia_lote(self):
+        """La vista de exportación masiva lanza el lote y entrega su avance"""
+        current_app.conf.task_always_eager = False
+        self.client.force_login(self.user)
+        url = reverse('reportes:exportacion_masiva') + '?estados_bien=B'
+        datos = {'tipos_reporte': ['INVENTARIO'], 'formatos': ['CSV', 'EXCEL']}
+        with mock.patch('celery.chord') as chord:
+            respuesta = self.client.post(url, datos, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        datos_lote = respuesta.json()
+        self.assertEqual(datos_lote['modo'], 'CELERY')
+        self.assertEqual(datos_lote['total'], 2)
+        self.assertEqual(datos_lote['estado'], 'GENERANDO')
+        self.assertEqual(datos_lote['progreso']['pendientes'], 2)
+        self.assertEqual(
+            datos_lote['url_progreso'],
+            reverse('reportes:api_progreso_reporte', args=[datos_lote['reporte_id']])
+        )
+        cabecera, _ = chord.call_args.args
+        self.assertEqual(cabecera.tasks[0].args[0]['filtros']['estados_bien'], ['B'])
+
+        with mock.patch('celery.chord'):
+            respuesta = self.client.post(url, datos)
+        self.assertRedirects(respuesta, reverse('reportes:mis_reportes'), fetch_redirect_response=False)
+
+    def test_exportacion_secuencial_con_tiempos(self):
+        """El lote secuencial registra la duración de cada exportación"""
+        manager = BatchExportManager()
+        resultados = manager.exportar_por_lotes([
+            {'queryset': BienPatrimonial.objects.all(), 'tipo_reporte': 'INVENTARIO', 'formato': 'CSV'}
+        ])
+        self.addCleanup(manager.export_manager.limpiar_archivos_temporales)
+
+        self.assertEqual(resultados[0]['estado'], 'EXITOSO')
+        self.assertIn('duracion_segundos', resultados[0])
+
+        respuesta = manager.respuesta_zip_streaming([resultados[0]['archivo_path']], 'lote.zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(respuesta.streaming_content))) as archivo_zip:
+            self.assertEqual(len(archivo_zip.namelist()), 1)
@@ -0,0 +1,114 @@
+"""
+Tests para la exportación columnar en Parquet.
+"""
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.test import TestCase
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.export_manager import ExportManager
+from apps.reportes.exportadores import ExportadorParquet
+from apps.reportes.forms import GenerarReporteForm
+
+
+@skipUnless(ExportadorParquet.disponible(), 'pyarrow no está instalado')
+class ExportadorParquetTest(TestCase):
+    """Pruebas del archivo Parquet tipado y comprimido"""
+
+    @classmethod
+    def setUpTestData(cls):
+        oficinas = [
+            Oficina.objects.create(codigo=f'OF-PQ-{i}', nombre=f'Oficina {i}', responsable='Jefe')
+            for i in range(2)
+        ]
+        catalogo = Catalogo.objects.create(
+            codigo='04220019',
+            denominacion='CAMIONETA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(7):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'PQ-{i:03d}',
+                catalogo=catalogo,
+                oficina=oficinas[i % 2],
+                estado_bien='B' if i % 3 else 'M',
+                fecha_adquisicion=date(2020, 1, i + 1),
+                valor_adquisicion=Decimal('1500.25') if i else None
+            )
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.archivo = os.path.join(self.directorio, 'inventario.parquet')
+
+    def test_columnas_tipadas_y_diccionario(self):
+        """Las columnas conservan su tipo y las repetidas son diccionarios"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        exportador = ExportadorParquet()
+        exportador.exportar_bienes(BienPatrimonial.objects.order_by('codigo_patrimonial'), self.archivo)
+
+        tabla = pq.read_table(self.archivo)
+        self.assertEqual(exportador.total_registros, 7)
+        self.assertEqual(tabla.column_names, exportador.claves_bienes)
+        self.assertEqual(tabla.schema.field('fecha_adquisicion').type, pa.date32())
+        self.assertEqual(tabla.schema.field('valor_adquisicion').type, pa.decimal128(12, 2))
+        self.assertTrue(pa.types.is_timestamp(tabla.schema.field('fecha_registro').type))
+        for clave in ('estado_bien', 'oficina_codigo', 'denominacion'):
+            self.assertTrue(pa.types.is_dictionary(tabla.schema.field(clave).type))
+
+        filas = tabla.to_pylist()
+        self.assertEqual(filas[0]['estado_bien'], 'Malo')
+        self.assertIsNone(filas[0]['valor_adquisicion'])
+        self.assertEqual(filas[1]['valor_adquisicion'], Decimal('1500.25'))
+        self.assertEqual(filas[2]['fecha_adquisicion'], date(2020, 1, 3))
+        self.assertEqual(pq.ParquetFile(self.archivo).metadata.row_group(0).column(0).compression, 'ZSTD')
+
+    def test_grupos_de_filas_y_archivo_vacio(self):
+        """Cada lote es un grupo de filas y un inventario vacío es válido"""
+        import pyarrow.parquet as pq
+
+        with mock.patch.object(ExportadorParquet, 'FILAS_POR_GRUPO', 3):
+            ExportadorParquet(incluir_cambios=True).exportar_bienes(BienPatrimonial.objects.all(), self.archivo)
+        archivo = pq.ParquetFile(self.archivo)
+        self.assertEqual(archivo.metadata.num_row_groups, 3)
+        self.assertIn('fecha_baja', archivo.schema_arrow.names)
+
+        ExportadorParquet().exportar_bienes(BienPatrimonial.objects.none(), self.archivo)
+        self.assertEqual(pq.read_table(self.archivo).num_rows, 0)
+
+    def test_formato_en_gestor_y_formulario(self):
+        """El inventario se exporta en Parquet desde el gestor de exportaciones"""
+        import pyarrow.parquet as pq
+
+        manager = ExportManager(directorio=self.directorio)
+        archivo_info = manager.exportar(BienPatrimonial.objects.all(), 'INVENTARIO', 'PARQUET')
+        self.assertTrue(archivo_info['nombre_archivo'].endswith('.parquet'))
+        self.assertEqual(pq.read_table(archivo_info['archivo_path']).num_rows, 7)
+        self.assertIn('PARQUET', manager.obtener_formatos_disponibles('INVENTARIO'))
+
+        form = GenerarReporteForm(data={'nombre': 'BI', 'tipo_reporte': 'ESTADISTICO', 'formato': 'PARQUET'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('formato', form.errors)
+
+
+class ParquetNoInstaladoTest(TestCase):
+    """Sin pyarrow el formato no se ofrece ni se exporta"""
+
+    def test_formato_no_disponible(self):
+        manager = ExportManager()
+        with mock.patch.object(ExportadorParquet, 'disponible', return_value=False):
+            self.assertNotIn('PARQUET', manager.obtener_formatos_disponibles('INVENTARIO'))
+            self.assertFalse(manager.validar_exportacion('INVENTARIO', 'PARQUET')[0])
+            with self.assertRaises(ValueError):
+                manager.exportar(BienPatrimonial.objects.none(), 'INVENTARIO', 'PARQUET')
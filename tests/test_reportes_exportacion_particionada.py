@@ -0,0 +1,217 @@
+"""
+Tests para la exportación particionada de inventarios grandes.
+"""
+import csv
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from openpyxl import load_workbook
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.export_manager import ExportManager
+from apps.reportes.models import ReporteGenerado
+from apps.reportes.tasks import (
+    ensamblar_reporte_particionado, generar_parte_reporte, generar_reporte_async,
+    marcar_reporte_particionado_fallido
+)
+
+
+class PlanExportacionTest(TestCase):
+    """Pruebas del plan de exportación basado en rendimiento"""
+
+    def setUp(self):
+        self.manager = ExportManager()
+
+    def test_exportacion_pequena_directa(self):
+        """Un inventario pequeño se genera en una sola tarea"""
+        plan = self.manager.planificar_exportacion('INVENTARIO', 'EXCEL', 5000)
+        self.assertEqual(plan['modo'], 'DIRECTO')
+        self.assertEqual(plan['partes'], 1)
+
+    def test_exportacion_grande_particionada(self):
+        """Un inventario grande se divide en partes de tamaño acotado"""
+        plan = self.manager.planificar_exportacion('INVENTARIO', 'CSV', 2000000)
+        self.assertEqual(plan['modo'], 'PARTICIONADO')
+        self.assertEqual(plan['tamaño_parte'], 240000)
+        self.assertEqual(plan['partes'], 9)
+        self.assertLess(
+            plan['tiempo_estimado'],
+            self.manager.planificar_exportacion('ESTADISTICO', 'CSV', 2000000)['tiempo_estimado']
+        )
+
+    def test_formato_no_particionable(self):
+        """PDF no admite partes y se estima como exportación directa"""
+        plan = self.manager.planificar_exportacion('INVENTARIO', 'PDF', 200000)
+        self.assertEqual(plan['modo'], 'DIRECTO')
+        self.assertGreater(plan['tiempo_estimado'], ExportManager.TIEMPO_MAXIMO_NO_PARTICIONADO)
+
+    def test_tamano_de_parte_explicito(self):
+        """El tamaño de parte configurado fuerza el modo particionado"""
+        plan = self.manager.planificar_exportacion('INVENTARIO', 'EXCEL', 10, tamaño_parte=4)
+        self.assertEqual((plan['modo'], plan['partes']), ('PARTICIONADO', 3))
+
+
+class ExportacionParticionadaTest(TestCase):
+    """Pruebas de la generación y ensamblado de partes"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.user = User.objects.create_user(username='particion', password='test123')
+        self.oficinas = [
+            Oficina.objects.create(codigo=f'OF-PAR-{i}', nombre=nombre, responsable='Jefe')
+            for i, nombre in enumerate(['Almacén', 'Logística'])
+        ]
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220008',
+            denominacion='SILLA GIRATORIA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(7):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'PAR-{i:03d}',
+                catalogo=self.catalogo,
+                oficina=self.oficinas[i % 2],
+                estado_bien='B'
+            )
+
+    def test_particion_por_rango(self):
+        """Los rangos de ID cubren todos los bienes sin solaparse"""
+        queryset = BienPatrimonial.objects.all()
+        partes = ExportManager().particionar(queryset, 3)
+
+        self.assertEqual([parte['total'] for parte in partes], [3, 3, 1])
+        ids = [list(queryset.filter(**parte['filtros']).values_list('id', flat=True)) for parte in partes]
+        self.assertEqual(sorted(sum(ids, [])), sorted(queryset.values_list('id', flat=True)))
+
+    def test_particion_por_oficina(self):
+        """Cada oficina genera sus propias partes"""
+        partes = ExportManager().particionar(BienPatrimonial.objects.all(), 3, criterio='OFICINA')
+
+        self.assertEqual(
+            [(parte['titulo'], parte['total']) for parte in partes],
+            [('Almacén (1)', 3), ('Almacén (2)', 1), ('Logística', 3)]
+        )
+        self.assertEqual([parte['indice'] for parte in partes], [1, 2, 3])
+
+    def crear_reporte(self, formato, **parametros):
+        return ReporteGenerado.objects.create(
+            nombre='Inventario completo',
+            tipo_reporte='INVENTARIO',
+            formato=formato,
+            usuario=self.user,
+            parametros={'tamaño_parte': 3, **parametros}
+        )
+
+    def ejecutar(self, reporte):
+        """Ejecuta la generación con las partes en línea"""
+        def ejecutar_chord(cabecera, cuerpo):
+            resultados = [tarea.apply().get() for tarea in cabecera.tasks]
+            return mock.Mock(apply_async=lambda: cuerpo.apply(args=(resultados,)))
+
+        with mock.patch('apps.reportes.tasks.chord', side_effect=ejecutar_chord):
+            generar_reporte_async(reporte.id)
+        reporte.refresh_from_db()
+        return reporte
+
+    def test_reporte_csv_en_zip(self):
+        """Las partes CSV se entregan en un único ZIP"""
+        reporte = self.ejecutar(self.crear_reporte('CSV'))
+
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertEqual(reporte.total_registros, 7)
+        self.assertTrue(reporte.archivo_generado.name.endswith('.zip'))
+        self.assertEqual(reporte.obtener_progreso()['porcentaje'], 100)
+
+        with zipfile.ZipFile(reporte.archivo_generado.path) as archivo:
+            nombres = archivo.namelist()
+            self.assertEqual(nombres, ['001_parte-1.csv', '002_parte-2.csv', '003_parte-3.csv'])
+            codigos = []
+            for nombre in nombres:
+                filas = list(csv.reader(io.StringIO(archivo.read(nombre).decode('utf-8-sig'))))
+                codigos += [fila[0] for fila in filas[5:]]
+        self.assertEqual(codigos, [f'PAR-{i:03d}' for i in range(7)])
+
+    def test_reporte_excel_en_libro(self):
+        """Las partes Excel pueden entregarse como hojas de un libro"""
+        reporte = self.ejecutar(self.crear_reporte('EXCEL', entrega='LIBRO', agrupar_por='oficina'))
+
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        libro = load_workbook(reporte.archivo_generado.path)
+        self.assertEqual(libro.sheetnames, ['01 Almacén (1)', '02 Almacén (2)', '03 Logística'])
+        hoja = libro['03 Logística']
+        self.assertEqual(hoja['A1'].value, 'DIRECCIÓN REGIONAL DE TRANSPORTES Y COMUNICACIONES - PUNO')
+        self.assertEqual(hoja['A5'].value, 'codigo_patrimonial')
+        self.assertEqual([fila[0].value for fila in hoja.iter_rows(min_row=6)], ['PAR-001', 'PAR-003', 'PAR-005'])
+
+    def test_parte_fallida_marca_error(self):
+        """Si una parte falla el reporte queda en error"""
+        reporte = self.crear_reporte('CSV')
+        with mock.patch('apps.reportes.tasks.chord'):
+            generar_reporte_async(reporte.id)
+
+        resultados = [generar_parte_reporte(reporte.id, 1)]
+        with mock.patch('apps.reportes.tasks.ExportadorCSV.exportar_bienes', side_effect=OSError('disco lleno')):
+            resultados.append(generar_parte_reporte(reporte.id, 2))
+        ensamblar_reporte_particionado(resultados, reporte.id)
+
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'ERROR')
+        self.assertIn('disco lleno', reporte.mensaje_error)
+        self.assertEqual(reporte.obtener_progreso()['errores'], 1)
+
+    def test_consulta_fallida_no_aborta_el_chord(self):
+        """Un fallo al leer la parte se registra en ella en lugar de propagarse"""
+        reporte = self.crear_reporte('CSV')
+        with mock.patch('apps.reportes.tasks.chord'):
+            generar_reporte_async(reporte.id)
+
+        with mock.patch('apps.reportes.tasks._obtener_queryset_reporte', side_effect=RuntimeError('sin conexión')):
+            resultado = generar_parte_reporte(reporte.id, 1)
+
+        self.assertEqual(resultado, {'indice': 1, 'estado': 'ERROR'})
+        parte = reporte.partes.get(indice=1)
+        self.assertEqual(parte.estado, 'ERROR')
+        self.assertIn('sin conexión', parte.mensaje_error)
+
+    def test_errback_del_chord(self):
+        """Si el chord se interrumpe el reporte no queda generándose indefinidamente"""
+        reporte = self.crear_reporte('CSV')
+        with mock.patch('apps.reportes.tasks.chord') as chord:
+            generar_reporte_async(reporte.id)
+        cuerpo = chord.call_args[0][1]
+        self.assertEqual(cuerpo.options['link_error'][0]['task'], marcar_reporte_particionado_fallido.name)
+
+        marcar_reporte_particionado_fallido(None, RuntimeError('worker perdido'), None, reporte.id)
+
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'ERROR')
+        self.assertIn('worker perdido', reporte.mensaje_error)
+
+    def test_api_progreso(self):
+        """La API informa el avance por parte"""
+        reporte = self.crear_reporte('CSV')
+        with mock.patch('apps.reportes.tasks.chord'):
+            generar_reporte_async(reporte.id)
+        generar_parte_reporte(reporte.id, 1)
+
+        self.client.force_login(self.user)
+        datos = self.client.get(f'/reportes/reportes/{reporte.id}/progreso/').json()
+
+        self.assertEqual(datos['estado'], 'GENERANDO')
+        self.assertEqual(datos['progreso']['completadas'], 1)
+        self.assertEqual(datos['progreso']['partes'], 3)
+        self.assertEqual(datos['partes'][0]['estado'], 'COMPLETADO')
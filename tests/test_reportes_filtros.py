@@ -0,0 +1,124 @@
+"""
+Tests para el compilador de filtros avanzados de reportes.
+Verifica el uso condicional de DISTINCT, la unificación de términos
+de marca/modelo y la caché de condiciones compiladas.
+"""
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Q
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.models import ConfiguracionFiltro
+from apps.reportes.utils import FiltroAvanzado
+
+
+class FiltroAvanzadoCompiladorTestCase(TestCase):
+    """Tests para la compilación de filtros avanzados"""
+
+    def setUp(self):
+        """Configurar datos de prueba"""
+        cache.clear()
+
+        self.user = User.objects.create_user(username='filtros', password='test123')
+        self.oficina = Oficina.objects.create(
+            codigo='OF-FIL-001',
+            nombre='Oficina Filtros',
+            responsable='Responsable Filtros'
+        )
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220001',
+            denominacion='COMPUTADORA PERSONAL',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for codigo, marca, modelo in [
+            ('FIL-001', 'HP', 'ProDesk 400'),
+            ('FIL-002', 'Dell', 'OptiPlex 7090'),
+            ('FIL-003', 'Lenovo', 'ThinkCentre M70'),
+            ('FIL-004', 'A+B (Genérica)', 'X.1'),
+        ]:
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=codigo,
+                catalogo=self.catalogo,
+                oficina=self.oficina,
+                estado_bien='B',
+                marca=marca,
+                modelo=modelo
+            )
+
+    def test_sin_distinct_para_relaciones_directas(self):
+        """Los filtros sobre claves foráneas no agregan DISTINCT"""
+        filtro = FiltroAvanzado(parametros={
+            'oficinas': [self.oficina.id],
+            'denominacion': 'computadora',
+        })
+        queryset = filtro.aplicar_filtros()
+
+        self.assertFalse(queryset.query.distinct)
+        self.assertEqual(queryset.count(), 4)
+
+    def test_distinct_para_relaciones_multivaluadas(self):
+        """Un lookup por relación inversa sí requiere DISTINCT"""
+        self.assertTrue(FiltroAvanzado._requiere_distinct(
+            Q(movimientobien__motivo__icontains='x')
+        ))
+        self.assertFalse(FiltroAvanzado._requiere_distinct(
+            Q(catalogo__grupo__in=['04']) | Q(created_at__date__gte='2024-01-01')
+        ))
+
+    def test_marcas_en_una_sola_condicion(self):
+        """Varios términos de marca se combinan con OR de icontains sin repetir términos"""
+        condicion = FiltroAvanzado._condicion_terminos('marca', ['hp', ' dell ', '', 'HP Laser', 'Dell'])
+
+        self.assertEqual(condicion.connector, 'OR')
+        self.assertEqual(condicion.children, [('marca__icontains', 'dell'), ('marca__icontains', 'hp')])
+
+        filtro = FiltroAvanzado(parametros={'marcas': ['hp', 'dell']})
+        codigos = set(filtro.aplicar_filtros().values_list('codigo_patrimonial', flat=True))
+        self.assertEqual(codigos, {'FIL-001', 'FIL-002'})
+
+    def test_terminos_con_caracteres_especiales(self):
+        """Los caracteres especiales se buscan de forma literal"""
+        filtro = FiltroAvanzado(parametros={'marcas': ['a+b (gen', 'lenovo'], 'modelos': ['x.1', 'm70']})
+        codigos = set(filtro.aplicar_filtros().values_list('codigo_patrimonial', flat=True))
+        self.assertEqual(codigos, {'FIL-003', 'FIL-004'})
+
+    def test_termino_unico_usa_icontains(self):
+        """Un único término mantiene la búsqueda icontains"""
+        condicion = FiltroAvanzado._condicion_terminos('modelo', ['optiplex'])
+        self.assertEqual(condicion.children[0], ('modelo__icontains', 'optiplex'))
+
+    def test_cache_de_configuracion_guardada(self):
+        """La condición compilada de una configuración se reutiliza"""
+        configuracion = ConfiguracionFiltro.objects.create(
+            nombre='Marcas',
+            usuario=self.user,
+            marcas=['hp', 'lenovo']
+        )
+
+        primero = FiltroAvanzado(configuracion)
+        self.assertEqual(primero.aplicar_filtros().count(), 2)
+        self.assertIsNotNone(cache.get(primero._clave_compilado))
+
+        # Al modificar la configuración cambia la clave de caché
+        configuracion.marcas = ['dell']
+        configuracion.save()
+        segundo = FiltroAvanzado(configuracion)
+        self.assertNotEqual(primero._clave_compilado, segundo._clave_compilado)
+        self.assertEqual(segundo.aplicar_filtros().count(), 1)
+
+    def test_parametros_adicionales_no_usan_cache(self):
+        """Con parámetros adicionales la condición no se guarda en caché"""
+        configuracion = ConfiguracionFiltro.objects.create(
+            nombre='Estados',
+            usuario=self.user,
+            estados_bien=['B']
+        )
+        filtro = FiltroAvanzado(configuracion, parametros={'marcas': ['hp']})
+
+        self.assertIsNone(filtro._clave_compilado)
+        self.assertEqual(filtro.aplicar_filtros().count(), 4)
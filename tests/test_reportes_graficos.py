@@ -0,0 +1,169 @@
+"""
+Tests para la caché de gráficos estadísticos.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.core.chart_utils import ChartCache
+from apps.oficinas.models import Oficina
+from apps.reportes.generadores import GeneradorReporteEstadistico, GeneradorReportePDF
+
+PNG_FIRMA = b'\x89PNG\r\n\x1a\n'
+
+
+def _graficos_en_proceso_daemon(directorio, graficos, cola):
+    """Obtiene gráficos como lo haría una tarea en un worker prefork de Celery"""
+    try:
+        rutas = ChartCache(directory=directorio, max_workers=2).get_many(graficos)
+        cola.put(('ok', rutas))
+    except BaseException as e:
+        cola.put(('error', repr(e)))
+
+
+class ChartCacheTest(TestCase):
+    """Pruebas de la caché en disco y del renderizado en paralelo"""
+
+    def setUp(self):
+        cache.clear()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.directorio)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username='graficos', password='test123')
+        oficina = Oficina.objects.create(codigo='OF-GRA-1', nombre='Almacén', responsable='Jefe')
+        catalogo = Catalogo.objects.create(
+            codigo='04220014',
+            denominacion='SILLA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i, estado in enumerate(['B', 'B', 'M']):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'GRA-{i:03d}',
+                catalogo=catalogo,
+                oficina=oficina,
+                estado_bien=estado
+            )
+
+    def test_clave_estable(self):
+        """La clave depende de los datos, las opciones y el formato"""
+        renderer = 'apps.reportes.graficos.graficar_estados'
+        clave = ChartCache.key(renderer, [['B', 2]], {'dpi': 72})
+        self.assertEqual(clave, ChartCache.key(renderer, [['B', 2]], {'dpi': 72}))
+        self.assertNotEqual(clave, ChartCache.key(renderer, [['B', 3]], {'dpi': 72}))
+        self.assertNotEqual(clave, ChartCache.key(renderer, [['B', 2]], {'dpi': 100}))
+        self.assertNotEqual(clave, ChartCache.key(renderer, [['B', 2]], {'dpi': 72}, 'svg'))
+
+    def test_reutiliza_imagenes_sin_cambios(self):
+        """Con los mismos datos no se vuelve a renderizar"""
+        generador = GeneradorReporteEstadistico(BienPatrimonial.objects.all())
+        graficos = generador.generar_todos_los_graficos()
+
+        self.assertEqual(set(graficos), {'estados', 'oficinas', 'tendencias', 'grupos'})
+        for ruta in graficos.values():
+            with open(ruta, 'rb') as imagen:
+                self.assertEqual(imagen.read(8), PNG_FIRMA)
+
+        with patch('apps.core.chart_utils._render_chart') as render:
+            repetidos = GeneradorReporteEstadistico(BienPatrimonial.objects.all()).generar_todos_los_graficos()
+        render.assert_not_called()
+        self.assertEqual(repetidos, graficos)
+
+        # Si cambian los datos solo se renderizan los gráficos afectados
+        BienPatrimonial.objects.filter(codigo_patrimonial='GRA-002').update(estado_bien='R')
+        nuevos = GeneradorReporteEstadistico(BienPatrimonial.objects.all()).generar_todos_los_graficos()
+        self.assertNotEqual(nuevos['estados'], graficos['estados'])
+        self.assertEqual(nuevos['oficinas'], graficos['oficinas'])
+
+    def test_reporte_pdf_conserva_graficos_en_cache(self):
+        """El PDF usa las imágenes de la caché y no las elimina al terminar"""
+        archivo = os.path.join(self.directorio, 'estadistico.pdf')
+        GeneradorReportePDF(BienPatrimonial.objects.all()).generar_reporte_completo(archivo)
+
+        with open(archivo, 'rb') as pdf:
+            self.assertEqual(pdf.read(5), b'%PDF-')
+        graficos = GeneradorReporteEstadistico(BienPatrimonial.objects.all()).datos_graficos()
+        for _, renderer, datos, opciones in graficos[:2]:
+            servicio = ChartCache()
+            self.assertTrue(os.path.exists(servicio.path_for(servicio.key(renderer, datos, opciones))))
+
+    def test_renderizado_en_paralelo(self):
+        """Los gráficos que faltan se renderizan en un pool de procesos"""
+        graficos = ChartCache(max_workers=2).get_many([
+            ('estados', 'apps.reportes.graficos.graficar_estados', [['B', 2], ['M', 1]], {'dpi': 50}),
+            ('grupos', 'apps.reportes.graficos.graficar_grupos', [['04 AGRICOLA', 3]], {'dpi': 50}),
+            ('vacio', 'apps.reportes.graficos.graficar_oficinas', [], {'dpi': 50}),
+        ])
+
+        self.assertIsNone(graficos['vacio'])
+        for nombre in ('estados', 'grupos'):
+            with open(graficos[nombre], 'rb') as imagen:
+                self.assertEqual(imagen.read(8), PNG_FIRMA)
+
+    def test_renderizado_en_proceso_daemon(self):
+        """En un proceso daemon, que no puede tener hijos, se renderiza en serie"""
+        graficos = [
+            ('estados', 'apps.reportes.graficos.graficar_estados', [['B', 2], ['M', 1]], {'dpi': 50}),
+            ('grupos', 'apps.reportes.graficos.graficar_grupos', [['04 AGRICOLA', 3]], {'dpi': 50}),
+        ]
+        contexto = multiprocessing.get_context('fork')
+        cola = contexto.Queue()
+        proceso = contexto.Process(
+            target=_graficos_en_proceso_daemon, args=(self.directorio, graficos, cola), daemon=True
+        )
+        proceso.start()
+        estado, rutas = cola.get(timeout=60)
+        proceso.join(timeout=10)
+
+        self.assertEqual(estado, 'ok', rutas)
+        for nombre in ('estados', 'grupos'):
+            with open(rutas[nombre], 'rb') as imagen:
+                self.assertEqual(imagen.read(8), PNG_FIRMA)
+
+    def test_formato_svg_y_purga(self):
+        """Se generan imágenes SVG y la purga elimina las que no se usan"""
+        servicio = ChartCache()
+        ruta = servicio.get('apps.reportes.graficos.graficar_estados', [['N', 1]], fmt='svg')
+        with open(ruta, 'rb') as imagen:
+            self.assertIn(b'<svg', imagen.read())
+
+        self.assertEqual(servicio.purge(timedelta(days=7)), 0)
+        antiguo = time.time() - 8 * 24 * 3600
+        os.utime(ruta, (antiguo, antiguo))
+        self.assertEqual(servicio.purge(timedelta(days=7)), 1)
+        self.assertFalse(os.path.exists(ruta))
+
+        with self.assertRaises(ValueError):
+            servicio.get('apps.reportes.graficos.graficar_estados', [['N', 1]], fmt='gif')
+
+    def test_vista_de_dashboard_con_etag(self):
+        """El dashboard sirve la imagen en caché y responde 304 si no cambió"""
+        self.client.login(username='graficos', password='test123')
+        url = reverse('reportes:grafico_estadistico', args=['estados'])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(response.streaming_content)[:8], PNG_FIRMA)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(
+            self.client.get(reverse('reportes:grafico_estadistico', args=['otro'])).status_code, 404
+        )
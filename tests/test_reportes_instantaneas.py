@@ -0,0 +1,140 @@
+"""
+Tests para las instantáneas diarias del inventario.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.generadores import GeneradorReporteEstadistico
+from apps.reportes.models import InstantaneaInventario
+from apps.reportes.tasks import registrar_instantanea_inventario
+
+
+class InstantaneaInventarioTest(TestCase):
+    """Pruebas del registro y la lectura de instantáneas"""
+
+    def setUp(self):
+        self.oficinas = [
+            Oficina.objects.create(codigo=f'OF-INS-{i}', nombre=f'Oficina {i}', responsable='Jefe')
+            for i in range(2)
+        ]
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220013',
+            denominacion='ARCHIVADOR',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i, (oficina, estado, valor) in enumerate([(0, 'B', '100'), (0, 'B', '50'), (0, 'M', None), (1, 'B', '10')]):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'INS-{i:03d}',
+                catalogo=self.catalogo,
+                oficina=self.oficinas[oficina],
+                estado_bien=estado,
+                valor_adquisicion=Decimal(valor) if valor else None
+            )
+
+    def test_registro_agrupado(self):
+        """La instantánea resume los bienes por oficina, estado y grupo"""
+        filas = InstantaneaInventario.registrar(date(2026, 1, 31))
+
+        self.assertEqual(filas, 3)
+        fila = InstantaneaInventario.objects.get(oficina=self.oficinas[0], estado_bien='B')
+        self.assertEqual((fila.total_bienes, fila.valor_total), (2, Decimal('150.00')))
+        self.assertEqual(fila.grupo, '04 AGRICOLA Y PESQUERO')
+
+        # Registrar de nuevo la misma fecha reemplaza las filas
+        InstantaneaInventario.registrar(date(2026, 1, 31))
+        self.assertEqual(InstantaneaInventario.objects.count(), 3)
+
+    def test_serie_mensual_y_comparativa(self):
+        """La serie usa la última instantánea de cada mes"""
+        InstantaneaInventario.registrar(date(2026, 1, 15))
+        BienPatrimonial.objects.filter(codigo_patrimonial='INS-003').update(estado_bien='M')
+        InstantaneaInventario.registrar(date(2026, 1, 31))
+        BienPatrimonial.objects.create(
+            codigo_patrimonial='INS-004',
+            catalogo=self.catalogo,
+            oficina=self.oficinas[1],
+            estado_bien='N',
+            valor_adquisicion=Decimal('40')
+        )
+        InstantaneaInventario.registrar(date(2026, 2, 10))
+
+        # Cambios posteriores en los bienes no afectan las tendencias
+        BienPatrimonial.objects.all().delete()
+
+        with self.assertNumQueries(2):
+            serie = InstantaneaInventario.serie_mensual(meses=3, hasta=date(2026, 2, 28))
+        self.assertEqual(
+            [(fila['año'], fila['mes'], fila['fecha'].day, fila['total']) for fila in serie],
+            [(2026, 1, 31, 4), (2026, 2, 10, 5)]
+        )
+
+        por_estado = InstantaneaInventario.serie_mensual(
+            meses=1, dimension='estado_bien', hasta=date(2026, 2, 28)
+        )
+        self.assertEqual({fila['estado_bien']: fila['total'] for fila in por_estado}, {'B': 2, 'M': 2, 'N': 1})
+
+        comparativa = InstantaneaInventario.comparativa_mensual(hasta=date(2026, 2, 28))
+        self.assertEqual(comparativa['actual']['total_bienes'], 5)
+        self.assertEqual(comparativa['variacion']['total_bienes'], {'diferencia': 1, 'porcentaje': 25.0})
+        self.assertEqual(comparativa['variacion']['bienes_requieren_atencion']['diferencia'], 0)
+        self.assertEqual(comparativa['actual']['valor_total'], Decimal('200.00'))
+
+    def test_filtros_de_dimension(self):
+        """Los filtros de oficina, estado y grupo se aplican a las instantáneas"""
+        InstantaneaInventario.registrar(date(2026, 3, 1))
+        serie = InstantaneaInventario.serie_mensual(
+            meses=1,
+            filtros={'oficinas': [self.oficinas[0].id], 'estados_bien': ['B']},
+            hasta=date(2026, 3, 31)
+        )
+        self.assertEqual([fila['total'] for fila in serie], [2])
+        self.assertIsNone(InstantaneaInventario.comparativa_mensual(hasta=date(2026, 3, 31)))
+
+    def test_filtros_no_soportados(self):
+        """Los filtros que las instantáneas no conservan se señalan"""
+        self.assertEqual(
+            InstantaneaInventario.filtros_no_soportados({'oficinas': [1], 'estados_bien': ['B'], 'marca': ''}),
+            []
+        )
+        self.assertEqual(
+            InstantaneaInventario.filtros_no_soportados({'oficinas': [1], 'marca': 'HP', 'valor_minimo': 10}),
+            ['marca', 'valor_minimo']
+        )
+        self.assertEqual(
+            InstantaneaInventario.filtros_no_soportados(
+                {'oficinas': [1], 'estados_bien': ['B'], 'operador_principal': 'OR'}
+            ),
+            ['operador_principal']
+        )
+
+    def test_tendencias_omitidas_con_filtros_no_soportados(self):
+        """El reporte estadístico no muestra una serie mensual que no corresponde a sus filtros"""
+        InstantaneaInventario.registrar()
+        generador = GeneradorReporteEstadistico(
+            BienPatrimonial.objects.filter(marca__icontains='HP'),
+            parametros={'filtros': {'oficinas': [self.oficinas[0].id], 'marca': 'HP'}}
+        )
+        tendencias = generador.generar_estadisticas()['tendencias']
+
+        self.assertEqual(tendencias['por_mes'], [])
+        self.assertIsNone(tendencias['variacion_mensual'])
+        self.assertEqual(tendencias['filtros_no_soportados'], ['marca'])
+
+        generador = GeneradorReporteEstadistico(
+            parametros={'filtros': {'oficinas': [self.oficinas[0].id]}}
+        )
+        tendencias = generador.generar_estadisticas()['tendencias']
+        self.assertEqual([fila['total'] for fila in tendencias['por_mes']], [3])
+        self.assertNotIn('filtros_no_soportados', tendencias)
+
+    def test_tarea_programada(self):
+        """La tarea registra la instantánea del día"""
+        self.assertEqual(registrar_instantanea_inventario(), 3)
+        self.assertEqual(InstantaneaInventario.objects.values('fecha').distinct().count(), 1)
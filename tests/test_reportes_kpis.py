@@ -0,0 +1,127 @@
+"""
+Tests para el cálculo de KPIs con expresiones de agregación.
+"""
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, Count, Sum
+from django.test import TestCase
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.exportadores import ExportadorExcel
+from apps.reportes.generadores import GeneradorIndicadoresClave
+
+
+def kpis_referencia(queryset):
+    """Cálculo anterior de los KPIs: una consulta por indicador y antigüedad en Python"""
+    total = queryset.count()
+    con_fecha = [bien.fecha_adquisicion for bien in queryset if bien.fecha_adquisicion]
+    hoy = timezone.now().date()
+    operativos = queryset.filter(estado_bien__in=['N', 'B', 'R']).count()
+    atencion = queryset.filter(estado_bien__in=['M', 'E', 'C']).count()
+    completitud = round((
+        queryset.filter(valor_adquisicion__isnull=False).count()
+        + queryset.filter(fecha_adquisicion__isnull=False).count()
+        + queryset.exclude(serie='').count()
+    ) / (total * 3) * 100, 2)
+    return {
+        'total_bienes': total,
+        'bienes_operativos': operativos,
+        'bienes_requieren_atencion': atencion,
+        'valor_total_inventario': queryset.aggregate(total=Sum('valor_adquisicion'))['total'] or 0,
+        'valor_promedio_bien': queryset.aggregate(promedio=Avg('valor_adquisicion'))['promedio'] or 0,
+        'distribucion_estados': {
+            fila['estado_bien']: fila['total']
+            for fila in queryset.values('estado_bien').annotate(total=Count('id')).order_by('estado_bien')
+        },
+        'completitud_datos': completitud,
+        'antiguedad_promedio': round(
+            sum((hoy - fecha).days for fecha in con_fecha) / len(con_fecha) / 365.25, 1
+        ) if con_fecha else 0,
+        'porcentaje_operativos': round(operativos / total * 100, 2),
+        'porcentaje_atencion': round(atencion / total * 100, 2),
+        'porcentaje_completitud': completitud,
+    }
+
+
+class GeneradorIndicadoresClaveTest(TestCase):
+    """Pruebas de los KPIs sobre un inventario sintético"""
+
+    @classmethod
+    def setUpTestData(cls):
+        aleatorio = random.Random(38)
+        cls.oficinas = [
+            Oficina.objects.create(codigo=f'OF-KPI-{i}', nombre=f'Oficina {i}', responsable='Jefe')
+            for i in range(4)
+        ]
+        catalogo = Catalogo.objects.create(
+            codigo='04220012',
+            denominacion='ESCRITORIO',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        estados = [codigo for codigo, _ in BienPatrimonial.ESTADOS_BIEN]
+        for i in range(60):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'KPI-{i:03d}',
+                catalogo=catalogo,
+                oficina=cls.oficinas[i % 3],
+                estado_bien=aleatorio.choice(estados),
+                serie=aleatorio.choice(['', f'S{i}']),
+                valor_adquisicion=aleatorio.choice([None, Decimal(aleatorio.randint(10, 9999)) / 100]),
+                fecha_adquisicion=aleatorio.choice(
+                    [None, date(2024, 6, 30) - timedelta(days=aleatorio.randint(0, 8000))]
+                )
+            )
+
+    def comparar(self, kpis, referencia):
+        for clave, valor in referencia.items():
+            if clave == 'valor_promedio_bien':
+                self.assertAlmostEqual(float(kpis[clave]), float(valor), places=2, msg=clave)
+            else:
+                self.assertEqual(kpis[clave], valor, msg=clave)
+
+    def test_kpis_coinciden_con_calculo_anterior(self):
+        """Los KPIs agregados coinciden con el cálculo por indicador"""
+        queryset = BienPatrimonial.objects.all()
+        with self.assertNumQueries(2):
+            kpis = GeneradorIndicadoresClave(queryset).calcular_kpis()
+
+        self.comparar(kpis, kpis_referencia(queryset))
+        self.assertEqual(kpis['cobertura_oficinas'], 3)
+        self.assertEqual(sum(fila['total'] for fila in kpis['tendencia_registro']), 60)
+
+    def test_kpis_por_oficina_en_una_consulta(self):
+        """Los KPIs por oficina se calculan en una única consulta agrupada"""
+        generador = GeneradorIndicadoresClave(BienPatrimonial.objects.all())
+        with self.assertNumQueries(1):
+            por_oficina = generador.calcular_kpis_por_oficina()
+
+        self.assertEqual([fila['oficina_codigo'] for fila in por_oficina], ['OF-KPI-0', 'OF-KPI-1', 'OF-KPI-2'])
+        for fila in por_oficina:
+            self.comparar(fila, kpis_referencia(BienPatrimonial.objects.filter(oficina_id=fila['oficina_id'])))
+
+    def test_sin_bienes(self):
+        """Un ámbito vacío devuelve KPIs en cero"""
+        kpis = GeneradorIndicadoresClave(BienPatrimonial.objects.filter(oficina=self.oficinas[3])).calcular_kpis()
+        self.assertEqual(kpis['total_bienes'], 0)
+        self.assertEqual(kpis['tendencia_registro'], [])
+
+    def test_hoja_de_kpis_por_oficina(self):
+        """El Excel ejecutivo incluye una hoja con los KPIs de cada oficina"""
+        por_oficina = GeneradorIndicadoresClave(BienPatrimonial.objects.all()).calcular_kpis_por_oficina()
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'ejecutivo.xlsx')
+            ExportadorExcel().exportar_estadisticas({'kpis_por_oficina': por_oficina}, archivo)
+            hoja = load_workbook(archivo)['KPIs por Oficina']
+
+        self.assertEqual(hoja['B4'].value, 'Oficina 0')
+        self.assertEqual(hoja['C4'].value, por_oficina[0]['total_bienes'])
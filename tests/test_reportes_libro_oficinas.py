@@ -0,0 +1,145 @@
+"""
+Tests para el libro de inventario con una hoja por oficina.
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from openpyxl import load_workbook
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.export_manager import ExportManager
+from apps.reportes.exportadores import ExportadorExcel
+from apps.reportes.forms import GenerarReporteForm
+
+
+class LibroPorOficinaTest(TestCase):
+    """Pruebas del libro con una hoja por oficina"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficinas = [
+            Oficina.objects.create(codigo=codigo, nombre=nombre, responsable=f'Jefe {codigo}')
+            for codigo, nombre in [
+                ('OF-LIB-1', 'Logística'),
+                ('OF-LIB-2', 'Almacén'),
+                ('OF-LIB-3', 'Dirección: Área [Técnica] de Infraestructura Vial'),
+                ('OF-LIB-4', 'Sin Bienes'),
+            ]
+        ]
+        catalogo = Catalogo.objects.create(
+            codigo='04220016',
+            denominacion='MESA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        distribucion = [(0, 'B', '10'), (0, 'M', '5'), (1, 'N', '7'), (1, 'B', None), (1, 'C', '3'), (2, 'R', '1')]
+        for i, (oficina, estado, valor) in enumerate(distribucion):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'LIB-{i:03d}',
+                catalogo=catalogo,
+                oficina=cls.oficinas[oficina],
+                estado_bien=estado,
+                valor_adquisicion=Decimal(valor) if valor else None
+            )
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.archivo = os.path.join(self.directorio, 'oficinas.xlsx')
+
+    def leer_libro(self):
+        libro = load_workbook(self.archivo, read_only=True)
+        hojas = {ws.title: list(ws.iter_rows(values_only=True)) for ws in libro.worksheets}
+        libro.close()
+        return libro.sheetnames, hojas
+
+    def codigos(self, filas):
+        """Códigos patrimoniales de las filas de datos de una hoja"""
+        return [fila[0] for fila in filas if fila and str(fila[0]).startswith('LIB-')]
+
+    def test_hojas_y_resumen(self):
+        """El libro tiene un resumen y una hoja por oficina con bienes"""
+        exportador = ExportadorExcel()
+        with self.assertNumQueries(2):
+            exportador.exportar_por_oficina(BienPatrimonial.objects.all(), self.archivo)
+
+        nombres, hojas = self.leer_libro()
+        self.assertEqual(nombres, [
+            'Resumen', 'OF-LIB-2 Almacén', 'OF-LIB-3 Dirección Área Técnica', 'OF-LIB-1 Logística'
+        ])
+        self.assertEqual(exportador.total_registros, 6)
+        self.assertEqual(self.codigos(hojas['OF-LIB-2 Almacén']), ['LIB-002', 'LIB-003', 'LIB-004'])
+
+        resumen = {fila[0]: fila for fila in hojas['Resumen'] if fila and fila[0]}
+        self.assertEqual(resumen['OF-LIB-2'][3:7], (3, 2, 1, 10))
+        self.assertEqual(resumen['TOTAL'][3:7], (6, 4, 2, 26))
+        self.assertNotIn('OF-LIB-4', resumen)
+
+    def test_grupos_paralelos_en_orden(self):
+        """Las filas armadas por grupos de oficinas se escriben en orden"""
+        with mock.patch.multiple(ExportadorExcel, MINIMO_BIENES_PARALELO=0, PROCESOS_HOJAS=2), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor', FakePool):
+            ExportadorExcel().exportar_por_oficina(BienPatrimonial.objects.all(), self.archivo)
+
+        nombres, hojas = self.leer_libro()
+        self.assertEqual(len(nombres), 4)
+        self.assertEqual(self.codigos(hojas['OF-LIB-1 Logística']), ['LIB-000', 'LIB-001'])
+        self.assertEqual(self.codigos(hojas['OF-LIB-3 Dirección Área Técnica']), ['LIB-005'])
+
+    def test_proceso_daemon_usa_un_recorrido(self):
+        """Dentro de un proceso daemon las hojas se arman sin pool de procesos"""
+        with mock.patch.multiple(ExportadorExcel, MINIMO_BIENES_PARALELO=0, PROCESOS_HOJAS=2), \
+                mock.patch('multiprocessing.current_process', return_value=mock.Mock(daemon=True)), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor') as pool:
+            ExportadorExcel().exportar_por_oficina(BienPatrimonial.objects.all(), self.archivo)
+
+        pool.assert_not_called()
+        nombres, hojas = self.leer_libro()
+        self.assertEqual(len(nombres), 4)
+        self.assertEqual(self.codigos(hojas['OF-LIB-1 Logística']), ['LIB-000', 'LIB-001'])
+
+    def test_reparto_equilibrado(self):
+        """Los grupos de oficinas consecutivas tienen cantidades similares"""
+        oficinas = [{'total': total} for total in [5, 1, 1, 1, 4, 4]]
+        grupos = ExportadorExcel._repartir_oficinas(oficinas, 2)
+        self.assertEqual([[o['total'] for o in grupo] for grupo in grupos], [[5, 1, 1, 1], [4, 4]])
+        self.assertEqual(len(ExportadorExcel._repartir_oficinas(oficinas, 1)), 1)
+
+    def test_tipo_de_reporte(self):
+        """El tipo POR_OFICINA se exporta solo en Excel"""
+        archivo_info = ExportManager(directorio=self.directorio).exportar(
+            BienPatrimonial.objects.all(), 'POR_OFICINA', 'EXCEL'
+        )
+        self.assertEqual(load_workbook(archivo_info['archivo_path'], read_only=True).sheetnames[0], 'Resumen')
+
+        with self.assertRaises(ValueError):
+            ExportManager(directorio=self.directorio).exportar(BienPatrimonial.objects.all(), 'POR_OFICINA', 'PDF')
+
+        form = GenerarReporteForm(data={'nombre': 'Auditoría', 'tipo_reporte': 'POR_OFICINA', 'formato': 'CSV'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('formato', form.errors)
+
+
+class FakePool:
+    """Pool que ejecuta las tareas en el proceso actual"""
+
+    def __init__(self, max_workers=None, initializer=None):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, funcion, *args):
+        futuro = mock.Mock()
+        futuro.result.return_value = funcion(*args)
+        return futuro
@@ -0,0 +1,109 @@
+"""
+Tests para el listado de inventario en PDF por páginas.
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from pypdf import PdfReader
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes import generadores
+from apps.reportes.export_manager import ExportManager
+from apps.reportes.generadores import GeneradorListadoPDF
+
+
+class GeneradorListadoPDFTest(TestCase):
+    """Pruebas del listado PDF generado por bloques de filas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        oficina = Oficina.objects.create(codigo='OF-PDF-1', nombre='Almacén Central', responsable='Jefe')
+        catalogo = Catalogo.objects.create(
+            codigo='04220015',
+            denominacion='ESTANTE METALICO DE ALTURA REGULABLE CON DIVISIONES INTERNAS',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        # Se crean en orden inverso para comprobar el orden por código
+        for i in reversed(range(25)):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'PDF-{i:03d}',
+                catalogo=catalogo,
+                oficina=oficina,
+                estado_bien='B',
+                marca='ACME',
+                valor_adquisicion=Decimal('1234.5')
+            )
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.archivo = os.path.join(self.directorio, 'listado.pdf')
+
+    def paginas(self):
+        return [pagina.extract_text() for pagina in PdfReader(self.archivo).pages]
+
+    def test_paginas_de_tamaño_fijo(self):
+        """Cada página lleva como máximo FILAS_POR_PAGINA bienes"""
+        with mock.patch.object(GeneradorListadoPDF, 'FILAS_POR_PAGINA', 10):
+            GeneradorListadoPDF(BienPatrimonial.objects.all()).generar_reporte_completo(self.archivo)
+
+        paginas = self.paginas()
+        self.assertEqual(len(paginas), 3)
+        self.assertIn('Página 3 de 3', paginas[2])
+        self.assertIn('PDF-000', paginas[0])
+        self.assertIn('PDF-010', paginas[1])
+        self.assertIn('1,234.50', paginas[0])
+        self.assertIn('Total de bienes: 25', paginas[0])
+
+    def test_partes_unidas_en_orden(self):
+        """Los rangos de páginas generados por separado se unen en orden"""
+        with mock.patch.multiple(GeneradorListadoPDF, FILAS_POR_PAGINA=5, PAGINAS_POR_PARTE=2, PROCESOS=1):
+            with mock.patch.object(generadores, 'generar_parte_listado_pdf',
+                                   wraps=generadores.generar_parte_listado_pdf) as parte:
+                GeneradorListadoPDF(BienPatrimonial.objects.all()).generar_reporte_completo(self.archivo)
+
+        self.assertEqual(parte.call_count, 3)
+        paginas = self.paginas()
+        self.assertEqual(len(paginas), 5)
+        for numero, texto in enumerate(paginas, start=1):
+            self.assertIn(f'Página {numero} de 5', texto)
+            self.assertIn(f'PDF-{(numero - 1) * 5:03d}', texto)
+
+    def test_sin_pypdf_genera_en_un_proceso(self):
+        """Sin la librería para unir partes el listado se genera completo"""
+        with mock.patch.multiple(GeneradorListadoPDF, FILAS_POR_PAGINA=5, PAGINAS_POR_PARTE=2), \
+                mock.patch.object(GeneradorListadoPDF, '_union_disponible', return_value=False):
+            GeneradorListadoPDF(BienPatrimonial.objects.all()).generar_reporte_completo(self.archivo)
+
+        self.assertEqual(len(self.paginas()), 5)
+
+    def test_en_proceso_daemon_genera_en_un_proceso(self):
+        """Dentro de un worker prefork de Celery (daemon) no se crean procesos"""
+        with mock.patch.multiple(GeneradorListadoPDF, FILAS_POR_PAGINA=5, PAGINAS_POR_PARTE=2), \
+                mock.patch('multiprocessing.current_process', return_value=mock.Mock(daemon=True)), \
+                mock.patch.object(generadores, 'generar_parte_listado_pdf') as parte:
+            GeneradorListadoPDF(BienPatrimonial.objects.all()).generar_reporte_completo(self.archivo)
+
+        parte.assert_not_called()
+        paginas = self.paginas()
+        self.assertEqual(len(paginas), 5)
+        self.assertIn('Página 5 de 5', paginas[4])
+
+    def test_listado_vacio_y_exportacion_de_inventario(self):
+        """Un listado vacío tiene una página y el inventario PDF usa el listado"""
+        GeneradorListadoPDF(BienPatrimonial.objects.none()).generar_reporte_completo(self.archivo)
+        self.assertEqual(len(self.paginas()), 1)
+
+        archivo_info = ExportManager(directorio=self.directorio).exportar(
+            BienPatrimonial.objects.all(), 'INVENTARIO', 'PDF'
+        )
+        texto = PdfReader(archivo_info['archivo_path']).pages[0].extract_text()
+        self.assertIn('LISTADO DE INVENTARIO PATRIMONIAL', texto)
@@ -0,0 +1,171 @@
+"""
+Tests para la generación masiva de reportes con chords de Celery.
+"""
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.export_manager import ExportManager
+from apps.reportes.models import ParteReporte, ReporteGenerado
+from apps.reportes.tasks import (
+    ensamblar_reporte_masivo, generar_item_masivo, generar_reporte_masivo, marcar_reporte_masivo_fallido
+)
+
+
+class GeneracionMasivaTest(TestCase):
+    """Pruebas del reparto, los reintentos y el empaquetado de reportes masivos"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.user = User.objects.create_user(username='masivo', password='test123')
+        self.oficinas = [
+            Oficina.objects.create(codigo=f'OF-MAS-{i}', nombre=f'Oficina {i}', responsable='Jefe')
+            for i in range(3)
+        ]
+        catalogo = Catalogo.objects.create(
+            codigo='04220017',
+            denominacion='ARMARIO',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(6):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'MAS-{i:03d}',
+                catalogo=catalogo,
+                oficina=self.oficinas[i % 3],
+                estado_bien='B'
+            )
+        self.filtros = [{'oficinas': [oficina.id]} for oficina in self.oficinas] + [{}, {'estados_bien': ['M']}]
+
+    def iniciar(self, filtros=None):
+        """Inicia la generación masiva y devuelve el chord sin ejecutarlo"""
+        with mock.patch('apps.reportes.tasks.chord') as chord:
+            resultado = generar_reporte_masivo(filtros or self.filtros, 'INVENTARIO', 'CSV', self.user.id)
+        cabecera, cuerpo = chord.call_args.args
+        return ReporteGenerado.objects.get(pk=resultado['reporte_id']), cabecera, cuerpo
+
+    def ejecutar(self, cabecera, cuerpo):
+        resultados = [cadena.apply().get() for cadena in cabecera.tasks]
+        cuerpo.apply(args=(resultados,))
+
+    @mock.patch('apps.reportes.tasks.CONCURRENCIA_MASIVO', 2)
+    def test_reparto_en_cadenas(self):
+        """Los reportes se reparten en tantas cadenas como la concurrencia"""
+        reporte, cabecera, cuerpo = self.iniciar()
+
+        self.assertEqual(reporte.partes.count(), 5)
+        self.assertEqual(reporte.parametros['masivo']['concurrencia'], 2)
+        indices = [[tarea.args[1] for tarea in cadena.tasks] for cadena in cabecera.tasks]
+        self.assertEqual(indices, [[1, 3, 5], [2, 4]])
+        self.assertTrue(all(tarea.immutable for cadena in cabecera.tasks for tarea in cadena.tasks))
+        self.assertEqual(cuerpo.args, (reporte.id,))
+
+    def test_zip_con_todos_los_reportes(self):
+        """El reporte principal empaqueta los reportes generados"""
+        reporte, cabecera, cuerpo = self.iniciar()
+        self.ejecutar(cabecera, cuerpo)
+
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertEqual(reporte.total_registros, 12)
+        self.assertEqual(reporte.parametros['masivo']['errores'], [])
+        with zipfile.ZipFile(reporte.archivo_generado.path) as archivo:
+            self.assertEqual(len(archivo.namelist()), 5)
+            self.assertEqual(archivo.namelist()[0], '001_reporte-1.csv')
+        self.assertFalse(ParteReporte.objects.filter(reporte=reporte).exclude(estado='COMPLETADO').exists())
+
+    def test_reintento_dentro_del_presupuesto(self):
+        """Un error transitorio se reintenta mientras quede presupuesto"""
+        reporte, _, _ = self.iniciar()
+        exportar = ExportManager.exportar
+        llamadas = []
+
+        def fallar_una_vez(manager, *args, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 1:
+                raise OSError('conexión perdida')
+            return exportar(manager, *args, **kwargs)
+
+        with mock.patch.object(ExportManager, 'exportar', fallar_una_vez):
+            generar_item_masivo.apply(args=(reporte.id, 1))
+
+        parte = reporte.partes.get(indice=1)
+        self.assertEqual((parte.estado, parte.intentos), ('COMPLETADO', 2))
+
+    def test_errores_sin_presupuesto(self):
+        """Agotado el presupuesto los errores se registran y el resto se empaqueta"""
+        reporte, cabecera, cuerpo = self.iniciar()
+        reporte.parametros['masivo']['presupuesto_reintentos'] = 0
+        reporte.save()
+
+        with mock.patch('apps.reportes.tasks.FiltroAvanzado.aplicar_filtros', side_effect=[
+            BienPatrimonial.objects.all(), ValueError('filtro inválido'),
+            BienPatrimonial.objects.all(), BienPatrimonial.objects.all(), BienPatrimonial.objects.all(),
+        ]):
+            self.ejecutar(cabecera, cuerpo)
+
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertEqual(reporte.mensaje_error, '1 de 5 reportes no se generaron')
+        self.assertEqual(len(reporte.parametros['masivo']['errores']), 1)
+        self.assertIn('filtro inválido', reporte.parametros['masivo']['errores'][0]['error'])
+        with zipfile.ZipFile(reporte.archivo_generado.path) as archivo:
+            self.assertEqual(len(archivo.namelist()), 4)
+
+    def test_todos_fallidos_y_progreso(self):
+        """La API informa el avance y el reporte falla si no se generó ninguno"""
+        reporte, _, _ = self.iniciar(self.filtros[:2])
+        generar_item_masivo(reporte.id, 1)
+        ParteReporte.objects.filter(reporte=reporte, indice=2).update(estado='GENERANDO')
+
+        self.client.force_login(self.user)
+        datos = self.client.get(f'/reportes/reportes/{reporte.id}/progreso/').json()
+        self.assertEqual(datos['masivo']['total'], 2)
+        self.assertEqual(
+            (datos['progreso']['completadas'], datos['progreso']['en_curso'], datos['progreso']['pendientes']),
+            (1, 1, 0)
+        )
+
+        ParteReporte.objects.filter(reporte=reporte).update(estado='ERROR', archivo='')
+        ensamblar_reporte_masivo([], reporte.id)
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'ERROR')
+
+    @mock.patch('apps.reportes.tasks.CONCURRENCIA_MASIVO', 2)
+    def test_error_no_controlado_marca_el_reporte(self):
+        """Si una cadena falla fuera del try el errback del chord marca el reporte"""
+        reporte, cabecera, cuerpo = self.iniciar()
+        self.assertEqual(cuerpo.options['link_error'][0]['task'], marcar_reporte_masivo_fallido.name)
+
+        # La parte 2 ya no existe: la tarea falla antes de su try
+        ParteReporte.objects.filter(reporte=reporte, indice=2).delete()
+        cabecera.tasks[0].apply().get()
+        with self.assertRaises(ParteReporte.DoesNotExist) as error:
+            cabecera.tasks[1].apply()
+
+        # Archivo guardado por una tarea que se detuvo antes de registrarlo
+        directorio = os.path.join(self.media_root, 'reportes', 'partes', str(reporte.id))
+        with open(os.path.join(directorio, 'parte_004.csv'), 'w') as archivo:
+            archivo.write('codigo\n')
+
+        # Celery no ejecuta el cuerpo del chord sino el errback
+        marcar_reporte_masivo_fallido(None, error.exception, None, reporte.id)
+
+        reporte.refresh_from_db()
+        self.assertEqual(reporte.estado, 'ERROR')
+        self.assertIn('se interrumpió', reporte.mensaje_error)
+        self.assertEqual(os.listdir(directorio), [])
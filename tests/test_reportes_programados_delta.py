@@ -0,0 +1,171 @@
+"""
+Tests para el modo incremental de los reportes programados.
+"""
+import csv
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.mobile.models import RegistroCambioBien, SecuenciaCambiosBien
+from apps.oficinas.models import Oficina
+from apps.reportes.models import ConfiguracionFiltro, ReporteGenerado
+from apps.reportes.tasks import generar_reporte_async, generar_reporte_programado
+from apps.reportes.utils import CambiosFiltro
+
+
+class ReporteProgramadoIncrementalTest(TestCase):
+    """Pruebas de las marcas de agua y los reportes de cambios"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.user = User.objects.create_user(username='programado', password='test123')
+        self.oficina = Oficina.objects.create(codigo='OF-DEL-1', nombre='Logística', responsable='Jefe')
+        otra = Oficina.objects.create(codigo='OF-DEL-2', nombre='Almacén', responsable='Jefe')
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220018',
+            denominacion='ESCRITORIO',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        self.bienes = [self.crear_bien(f'DEL-{i:03d}') for i in range(4)]
+        self.crear_bien('DEL-OTRA', oficina=otra)
+
+        self.configuracion = ConfiguracionFiltro.objects.create(
+            nombre='Logística nocturno',
+            usuario=self.user,
+            oficinas=[self.oficina.id]
+        )
+
+    def crear_bien(self, codigo, oficina=None):
+        return BienPatrimonial.objects.create(
+            codigo_patrimonial=codigo,
+            catalogo=self.catalogo,
+            oficina=oficina or self.oficina,
+            estado_bien='B'
+        )
+
+    def ejecutar(self, formato='CSV'):
+        """Ejecuta la tarea programada generando el reporte en el momento"""
+        with mock.patch.object(generar_reporte_async, 'delay', side_effect=lambda pk: generar_reporte_async.apply(args=(pk,))):
+            reporte_id = generar_reporte_programado(
+                self.configuracion.id, 'INVENTARIO', formato, self.user.id, incremental=True
+            )
+        return ReporteGenerado.objects.get(pk=reporte_id) if reporte_id else None
+
+    def leer_csv(self, reporte):
+        with open(reporte.archivo_generado.path, encoding='utf-8-sig') as archivo:
+            filas = list(csv.reader(archivo))
+        encabezado = filas[4]
+        return [dict(zip(encabezado, fila)) for fila in filas[5:]]
+
+    def test_primera_ejecucion_y_omision_sin_cambios(self):
+        """La primera ejecución exporta todo y sin cambios no se genera nada"""
+        reporte = self.ejecutar()
+
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertIsNone(reporte.parametros['delta']['desde'])
+        self.assertEqual(reporte.parametros['delta']['nuevos'], 4)
+        filas = self.leer_csv(reporte)
+        self.assertEqual(sorted(fila['codigo_patrimonial'] for fila in filas), [b.codigo_patrimonial for b in self.bienes])
+        self.assertIn('fecha_baja', filas[0])
+
+        # Usuario, configuración, última marca, registros sin numerar y contador
+        with self.assertNumQueries(5):
+            self.assertIsNone(self.ejecutar())
+        self.assertEqual(ReporteGenerado.objects.count(), 1)
+
+    def test_solo_cambios_desde_la_marca(self):
+        """Se exportan los bienes creados, modificados y dados de baja"""
+        primero = self.ejecutar()
+
+        self.bienes[0].marca = 'ACME'
+        self.bienes[0].save()
+        self.bienes[1].soft_delete(user=self.user, reason='Baja')
+        self.crear_bien('DEL-NUEVO')
+        self.crear_bien('DEL-OTRO-NUEVO', oficina=Oficina.objects.get(codigo='OF-DEL-2'))
+
+        reporte = self.ejecutar()
+        delta = reporte.parametros['delta']
+        self.assertEqual(delta['desde'], primero.parametros['delta']['hasta'])
+        self.assertEqual((delta['nuevos'], delta['modificados'], delta['eliminados']), (1, 1, 1))
+
+        filas = {fila['codigo_patrimonial']: fila for fila in self.leer_csv(reporte)}
+        self.assertEqual(set(filas), {'DEL-000', 'DEL-001', 'DEL-NUEVO'})
+        self.assertEqual(filas['DEL-000']['marca'], 'ACME')
+        self.assertTrue(filas['DEL-001']['fecha_baja'])
+        self.assertFalse(filas['DEL-NUEVO']['fecha_baja'])
+        self.assertEqual(reporte.total_registros, 3)
+
+    def test_marca_de_ejecucion_fallida_no_avanza(self):
+        """Una ejecución con error no mueve la marca de agua"""
+        self.ejecutar()
+        self.crear_bien('DEL-NUEVO')
+        fallido = self.ejecutar()
+        fallido.marcar_error('Sin espacio en disco')
+
+        reporte = self.ejecutar(formato='CSV')
+        self.assertEqual(reporte.parametros['delta']['desde'], fallido.parametros['delta']['desde'])
+
+        # Cada formato tiene su propia marca de agua
+        self.assertIsNone(self.ejecutar(formato='EXCEL').parametros['delta']['desde'])
+
+    def test_cambios_posteriores_a_la_marca(self):
+        """Los cambios después de la marca actual quedan para la siguiente"""
+        cambios = CambiosFiltro(self.configuracion)
+        self.assertEqual(cambios.resumen()['total'], 4)
+
+        self.crear_bien('DEL-TARDE')
+        self.assertEqual(cambios.obtener_queryset().count(), 4)
+
+        siguiente = CambiosFiltro(self.configuracion, desde=cambios.hasta)
+        self.assertEqual(siguiente.resumen()['nuevos'], 1)
+        self.assertEqual(list(siguiente.obtener_queryset().values_list('codigo_patrimonial', flat=True)), ['DEL-TARDE'])
+
+    def test_confirmacion_tardia_no_se_pierde(self):
+        """Un cambio confirmado después de la marca llega aunque su fecha sea anterior"""
+        primero = self.ejecutar()
+
+        # Transacción lenta: updated_at anterior a la marca, confirmada después
+        BienPatrimonial.objects.filter(pk=self.bienes[2].pk).update(
+            marca='TARDE', updated_at=primero.fecha_inicio - timedelta(minutes=5)
+        )
+        RegistroCambioBien.registrar(self.bienes[2].pk)
+
+        reporte = self.ejecutar()
+        self.assertEqual(reporte.parametros['delta']['desde'], primero.parametros['delta']['hasta'])
+        self.assertEqual(reporte.parametros['delta']['modificados'], 1)
+        self.assertEqual([fila['marca'] for fila in self.leer_csv(reporte)], ['TARDE'])
+
+    def test_marca_purgada_o_antigua_exporta_todo(self):
+        """Sin los registros desde la marca anterior se vuelve a exportar todo"""
+        primero = self.ejecutar()
+        self.bienes[0].save()
+        SecuenciaCambiosBien.objects.filter(pk=1).update(purgado_hasta=primero.parametros['delta']['hasta'] + 1)
+
+        reporte = self.ejecutar()
+        self.assertIsNone(reporte.parametros['delta']['desde'])
+        self.assertEqual(reporte.total_registros, 4)
+
+        # Las marcas de fecha de versiones anteriores también se descartan
+        ReporteGenerado.objects.filter(pk=reporte.pk).update(
+            parametros={**reporte.parametros, 'delta': {**reporte.parametros['delta'], 'hasta': '2026-01-01T00:00:00'}}
+        )
+        self.assertIsNone(self.ejecutar().parametros['delta']['desde'])
+
+    def test_tipos_no_admitidos(self):
+        """El modo incremental solo se ofrece para inventarios tabulares"""
+        with self.assertRaises(ValueError):
+            generar_reporte_programado(self.configuracion.id, 'ESTADISTICO', 'PDF', self.user.id, incremental=True)
+        self.assertFalse(ReporteGenerado.objects.exists())
@@ -0,0 +1,169 @@
+"""
+Tests para los resultados materializados de configuraciones de filtro.
+Verifica la caché de IDs, la versión de datos y la invalidación.
+"""
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.core.cache_utils import DataVersionCache
+from apps.core.models import VersionDatos
+from apps.oficinas.models import Oficina
+from apps.reportes.models import ConfiguracionFiltro
+from apps.reportes.utils import ResultadoFiltroMaterializado
+
+
+class DataVersionCacheTestCase(TestCase):
+    """Tests para el contador de versión de datos"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_estable_sin_cambios(self):
+        """La versión no cambia si no hay modificaciones"""
+        version = DataVersionCache.get_version(BienPatrimonial)
+        self.assertEqual(version, DataVersionCache.get_version('bienes.BienPatrimonial'))
+
+    def test_bump_incrementa_version(self):
+        """Incrementar la versión produce un valor distinto"""
+        version = DataVersionCache.get_version(BienPatrimonial)
+        with self.captureOnCommitCallbacks(execute=True):
+            DataVersionCache.bump_version(BienPatrimonial)
+        self.assertGreater(DataVersionCache.get_version(BienPatrimonial), version)
+
+    def test_version_compartida_sin_cache(self):
+        """La versión no depende del caché del proceso (web y workers la comparten)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            DataVersionCache.bump_version(BienPatrimonial)
+        version = DataVersionCache.get_version(BienPatrimonial)
+        modificado = DataVersionCache.get_last_modified(BienPatrimonial)
+
+        # Otro proceso tiene su propio caché local vacío
+        cache.clear()
+        self.assertEqual(DataVersionCache.get_version(BienPatrimonial), version)
+        self.assertEqual(DataVersionCache.get_last_modified(BienPatrimonial), modificado)
+        self.assertEqual(VersionDatos.objects.get(modelo='bienes.bienpatrimonial').version, version)
+
+
+class DataVersionCacheTransaccionTestCase(TransactionTestCase):
+    """Tests del incremento de versión al confirmar las transacciones"""
+
+    def setUp(self):
+        cache.clear()
+        oficina = Oficina.objects.create(codigo='OF-VER-001', nombre='Oficina Versiones', responsable='Responsable')
+        catalogo = Catalogo.objects.create(
+            codigo='04220003',
+            denominacion='ESCANER',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        self.crear_bien = lambda codigo: BienPatrimonial.objects.create(
+            codigo_patrimonial=codigo, catalogo=catalogo, oficina=oficina, estado_bien='B'
+        )
+
+    def test_transacciones_no_bloquean_la_version(self):
+        """Guardar bienes en una transacción no toca la fila de la versión hasta confirmarla"""
+        version = DataVersionCache.get_version(BienPatrimonial)
+
+        for lote in range(2):
+            with CaptureQueriesContext(connection) as consultas:
+                with transaction.atomic():
+                    for i in range(3):
+                        self.crear_bien(f'VER-{lote}-{i}')
+                    dentro = len(consultas.captured_queries)
+            tabla = VersionDatos._meta.db_table
+            self.assertFalse([c for c in consultas.captured_queries[:dentro] if tabla in c['sql']])
+            # Un único incremento al confirmar cada transacción
+            self.assertEqual(len([c for c in consultas.captured_queries[dentro:] if tabla in c['sql']]), 1)
+
+        self.assertEqual(DataVersionCache.get_version(BienPatrimonial), version + 2)
+
+    def test_transaccion_revertida_no_cambia_la_version(self):
+        """Si la transacción se revierte la versión se mantiene"""
+        version = DataVersionCache.get_version(BienPatrimonial)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.crear_bien('VER-REV')
+                raise RuntimeError('rollback')
+        self.assertEqual(DataVersionCache.get_version(BienPatrimonial), version)
+
+        self.crear_bien('VER-OK')
+        self.assertEqual(DataVersionCache.get_version(BienPatrimonial), version + 1)
+
+
+class ResultadoFiltroMaterializadoTestCase(TestCase):
+    """Tests para el resultado materializado de filtros guardados"""
+
+    def setUp(self):
+        """Configurar datos de prueba"""
+        cache.clear()
+
+        self.user = User.objects.create_user(username='materializado', password='test123')
+        self.oficina = Oficina.objects.create(
+            codigo='OF-MAT-001',
+            nombre='Oficina Materializada',
+            responsable='Responsable'
+        )
+        self.catalogo = Catalogo.objects.create(
+            codigo='04220002',
+            denominacion='IMPRESORA LASER',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        self.bienes = [
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'MAT-{i:03d}',
+                catalogo=self.catalogo,
+                oficina=self.oficina,
+                estado_bien='B' if i % 2 else 'R'
+            )
+            for i in range(1, 8)
+        ]
+        self.configuracion = ConfiguracionFiltro.objects.create(
+            nombre='Buenos',
+            usuario=self.user,
+            estados_bien=['B']
+        )
+
+    def test_ids_ordenados(self):
+        """Los IDs materializados están ordenados y son correctos"""
+        resultado = ResultadoFiltroMaterializado(self.configuracion)
+        esperados = sorted(b.id for b in self.bienes if b.estado_bien == 'B')
+
+        self.assertEqual(resultado.obtener_ids(), esperados)
+        self.assertEqual(resultado.contar(), 4)
+
+    def test_reutiliza_resultado_en_cache(self):
+        """Un segundo uso se resuelve sin consultar los bienes"""
+        ResultadoFiltroMaterializado(self.configuracion).obtener_ids()
+
+        # Solo se lee la versión de datos
+        with self.assertNumQueries(1):
+            ids = ResultadoFiltroMaterializado(self.configuracion).obtener_ids()
+        self.assertEqual(len(ids), 4)
+
+    def test_invalidacion_al_modificar_bienes(self):
+        """Guardar un bien invalida el resultado materializado"""
+        self.assertEqual(ResultadoFiltroMaterializado(self.configuracion).contar(), 4)
+
+        bien = self.bienes[1]
+        bien.estado_bien = 'B'
+        with self.captureOnCommitCallbacks(execute=True):
+            bien.save()
+
+        self.assertEqual(ResultadoFiltroMaterializado(self.configuracion).contar(), 5)
+
+    def test_queryset_equivalente(self):
+        """El queryset materializado devuelve los mismos bienes"""
+        resultado = ResultadoFiltroMaterializado(self.configuracion)
+        self.assertEqual(
+            set(resultado.obtener_queryset().values_list('id', flat=True)),
+            set(resultado.obtener_ids())
+        )
@@ -0,0 +1,161 @@
+"""
+Tests para la generación masiva de tickets Zebra por bloques.
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes import views_zebra
+from apps.reportes.models import ReporteGenerado, SolicitudImpresionMasiva
+from apps.reportes.tasks import generar_reporte_async
+from apps.reportes.zpl_utils import ConfiguracionSticker, GeneradorZPL, PlantillaZPL, ValidadorZPL
+
+
+class TicketsMasivosStreamingTest(TestCase):
+    """Pruebas de la paginación por clave, la entrega por bloques y el límite de solicitudes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='zebra', password='test123')
+        catalogo = Catalogo.objects.create(
+            codigo='04220023',
+            denominacion='MONITOR',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        # Las oficinas se crean en un orden distinto al de su ubicación
+        oficinas = [
+            Oficina.objects.create(codigo='OF-ZB-1', nombre='Sótano', responsable='Jefe', ubicacion='Piso 3'),
+            Oficina.objects.create(codigo='OF-ZB-2', nombre='Archivo', responsable='Jefe', ubicacion='Piso 1'),
+            Oficina.objects.create(codigo='OF-ZB-3', nombre='Mesa de partes', responsable='Jefe', ubicacion=''),
+        ]
+        for i in range(130):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'ZB-{i:04d}',
+                catalogo=catalogo,
+                oficina=oficinas[i % 3],
+                estado_bien='B'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.user)
+        self.url = reverse('reportes:generar_tickets_masivos_zebra')
+
+    def datos(self, **extra):
+        datos = {
+            'impresora': 'ZD220',
+            'dpi': '203',
+            'tamaño': 'etiqueta_mediana_203',
+            'incluir_qr': 'true',
+            'incluir_fecha': 'true',
+            'incluir_borde': 'true',
+            'campos_incluir[]': ['codigo_patrimonial', 'denominacion', 'oficina'],
+        }
+        datos.update(extra)
+        return datos
+
+    def orden_esperado(self, orden):
+        bienes = BienPatrimonial.objects.select_related('oficina')
+        if orden == 'ubicacion':
+            clave = lambda bien: (bien.oficina.ubicacion, bien.oficina.codigo, bien.codigo_patrimonial)
+        else:
+            clave = lambda bien: bien.codigo_patrimonial
+        return [bien.codigo_patrimonial for bien in sorted(bienes, key=clave)]
+
+    def test_descarga_por_bloques_sin_limite(self):
+        """Todos los bienes se envían en un bloque por página de la consulta"""
+        with mock.patch.object(PlantillaZPL, 'TAMAÑO_LOTE', 50):
+            respuesta = self.client.post(self.url, self.datos())
+            self.assertTrue(respuesta.streaming)
+            self.assertIn('attachment;', respuesta['Content-Disposition'])
+
+            with self.assertNumQueries(3):
+                bloques = list(respuesta.streaming_content)
+
+        codigo = b''.join(bloques).decode('utf-8')
+        self.assertEqual(len(bloques), 3)
+        self.assertEqual(codigo.count('^XA'), 130)
+        self.assertTrue(all(sticker.startswith('^XA') for sticker in codigo.split('\n\n')))
+        self.assertTrue(ValidadorZPL.validar_codigo(codigo)[0])
+
+        impresos = [linea[len('^FH^FD'):-len('^FS')] for linea in codigo.splitlines() if linea.startswith('^FH^FDZB-')]
+        self.assertEqual(impresos, self.orden_esperado('codigo'))
+
+    def test_orden_por_ubicacion(self):
+        """Las páginas continúan la clave compuesta aunque haya empates de ubicación"""
+        paginas = list(PlantillaZPL.paginas(BienPatrimonial.objects.all(), 'ubicacion', tamaño_pagina=7))
+
+        self.assertEqual(len(paginas), 19)
+        codigos = [fila['codigo_patrimonial'] for pagina in paginas for fila in pagina]
+        self.assertEqual(codigos, self.orden_esperado('ubicacion'))
+
+        with self.assertRaises(ValueError):
+            next(PlantillaZPL.paginas(BienPatrimonial.objects.all(), 'denominacion'))
+
+    def test_limite_de_solicitudes(self):
+        """Superado el límite por ventana la impresión se rechaza sin generar nada"""
+        with mock.patch.object(views_zebra, 'LIMITE_SOLICITUDES_MASIVAS', 2):
+            for _ in range(2):
+                self.assertTrue(self.client.post(self.url, self.datos()).streaming)
+
+            respuesta = self.client.post(self.url, self.datos())
+            self.assertRedirects(respuesta, reverse('reportes:configurador_zebra'), fetch_redirect_response=False)
+            self.assertIn('Superó el máximo', str(list(get_messages(respuesta.wsgi_request))[0]))
+
+            # El límite se guarda en la base de datos, no en la caché del proceso
+            cache.clear()
+            self.assertFalse(self.client.post(self.url, self.datos()).streaming)
+            self.assertEqual(SolicitudImpresionMasiva.objects.filter(usuario=self.user).count(), 2)
+
+            # Pasada la ventana se puede volver a imprimir
+            SolicitudImpresionMasiva.objects.update(
+                fecha=timezone.now() - timedelta(seconds=views_zebra.VENTANA_SOLICITUDES_MASIVAS + 1)
+            )
+            self.assertTrue(self.client.post(self.url, self.datos()).streaming)
+
+            # Cada usuario tiene su propia ventana
+            otro = User.objects.create_user(username='zebra2', password='test123')
+            self.client.force_login(otro)
+            self.assertTrue(self.client.post(self.url, self.datos()).streaming)
+
+    def test_generacion_en_segundo_plano(self):
+        """El reporte guarda filtros, configuración y orden y produce los mismos tickets"""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+
+        datos = self.datos(entrega='segundo_plano', orden='ubicacion', oficina_id='', busqueda='ZB-00')
+        with mock.patch('apps.reportes.tasks.generar_reporte_async.delay') as delay:
+            respuesta = self.client.post(self.url, datos)
+
+        self.assertRedirects(respuesta, reverse('reportes:mis_reportes'), fetch_redirect_response=False)
+        reporte = ReporteGenerado.objects.get(tipo_reporte='STICKERS', usuario=self.user)
+        delay.assert_called_once_with(reporte.id)
+        self.assertEqual(reporte.parametros['filtros_stickers'], {'busqueda': 'ZB-00'})
+        self.assertEqual(reporte.parametros['orden_stickers'], 'ubicacion')
+
+        with override_settings(MEDIA_ROOT=media_root):
+            generar_reporte_async.apply(args=(reporte.id,))
+            reporte.refresh_from_db()
+            with reporte.archivo_generado.open('rb') as archivo:
+                codigo = archivo.read().decode('utf-8')
+
+        self.assertEqual(reporte.estado, 'COMPLETADO')
+        self.assertEqual(reporte.total_registros, 100)
+
+        config = ConfiguracionSticker(**reporte.parametros['configuracion_stickers'])
+        queryset = BienPatrimonial.objects.filter(codigo_patrimonial__icontains='ZB-00')
+        self.assertEqual(codigo, ''.join(GeneradorZPL(config).generar_por_lotes(queryset, 'ubicacion')))
@@ -0,0 +1,115 @@
+"""
+Tests para las plantillas ZPL compiladas por configuración de sticker.
+"""
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.exportadores import ExportadorZPL
+from apps.reportes.zpl_utils import ConfiguracionSticker, GeneradorZPL, PlantillaZPL, ValidadorZPL
+
+
+class PlantillaZPLTest(TestCase):
+    """Pruebas de la compilación, la caché y la generación por lotes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oficina = Oficina.objects.create(codigo='OF-ZPL-1', nombre='Almacén', responsable='Jefe')
+        catalogo = Catalogo.objects.create(
+            codigo='04220022',
+            denominacion='IMPRESORA TERMICA',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        cls.bienes = [
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'ZPL-{i:03d}',
+                catalogo=catalogo,
+                oficina=cls.oficina,
+                estado_bien='B',
+                marca='ZEBRA' if i % 2 else '',
+                serie=f'SN_{i}^X' if i % 2 else ''
+            )
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        PlantillaZPL._compiladas.clear()
+
+    def test_sticker_con_campos_escapados(self):
+        """Los valores se sustituyen escapados y las posiciones siguen a los campos presentes"""
+        config = ConfiguracionSticker(tamaño='extra_grande')
+        completo = GeneradorZPL(config).generar_sticker_bien(self.bienes[1])
+        sin_marca = GeneradorZPL(config).generar_sticker_bien(self.bienes[0])
+
+        self.assertTrue(ValidadorZPL.validar_codigo(completo)[0])
+        self.assertIn(f'^FH^FDQA,{self.bienes[1].qr_code}^FS', completo)
+        self.assertIn('^FH^FDZPL-001^FS', completo)
+        self.assertIn('^FH^FDEstado: Bueno^FS', completo)
+        self.assertIn('^FH^FDS/N: SN_5F1_5EX^FS', completo)
+        self.assertNotIn('S/N', sin_marca)
+
+        # Sin marca ni serie la etiqueta termina antes
+        area = config.calcular_area_texto()
+        y_marca = area['y'] + (config.altura_titulo + 5) + 3 * (config.altura_texto + 3)
+        self.assertIn(f'^FO{area["x"]},{y_marca}', completo)
+        self.assertNotIn(f'^FO{area["x"]},{y_marca}\n', sin_marca)
+
+    def test_compilacion_unica_por_configuracion(self):
+        """La configuración se valida una vez y un cambio invalida la plantilla"""
+        config = ConfiguracionSticker()
+        with mock.patch.object(ConfiguracionSticker, 'validar', autospec=True, return_value=[]) as validar:
+            generador = GeneradorZPL(config)
+            for bien in self.bienes:
+                generador.generar_sticker_bien(bien)
+            self.assertEqual(validar.call_count, 1)
+
+            plantilla = PlantillaZPL.obtener(config)
+            self.assertIs(PlantillaZPL.obtener(ConfiguracionSticker()), plantilla)
+
+            config.incluir_borde = False
+            self.assertIsNot(PlantillaZPL.obtener(config), plantilla)
+            self.assertEqual(validar.call_count, 2)
+
+        with self.assertRaises(ValueError):
+            PlantillaZPL.obtener(ConfiguracionSticker(margen=1))
+
+    def test_lote_desde_values(self):
+        """Un lote se genera con una sola consulta y coincide con el sticker individual"""
+        generador = GeneradorZPL()
+        queryset = BienPatrimonial.objects.filter(oficina=self.oficina).order_by('codigo_patrimonial')
+
+        with self.assertNumQueries(1):
+            codigo = generador.generar_stickers_masivos(queryset)
+
+        stickers = codigo.split('\n\n')
+        self.assertEqual(generador.total_stickers, 6)
+        self.assertEqual(codigo.count('^XA'), 6)
+        self.assertEqual(codigo.count('^XZ'), 6)
+        bien = BienPatrimonial.objects.get(codigo_patrimonial='ZPL-003')
+        self.assertEqual(stickers[3], generador.generar_sticker_bien(bien))
+
+    def test_exportador_usa_la_plantilla(self):
+        """El exportador de reportes genera etiquetas balanceadas con la configuración dada"""
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        archivo = os.path.join(directorio, 'stickers.zpl')
+
+        exportador = ExportadorZPL()
+        exportador.generar_plantilla_stickers(
+            BienPatrimonial.objects.all(), archivo, ConfiguracionSticker(incluir_borde=False, incluir_fecha=False)
+        )
+
+        with open(archivo, encoding='utf-8') as zpl:
+            codigo = zpl.read()
+        self.assertEqual(exportador.total_registros, 6)
+        self.assertTrue(ValidadorZPL.validar_codigo(codigo)[0])
+        self.assertEqual(codigo.count('^XA'), 6)
+        self.assertNotIn('^GB400,2,2^FS', codigo)
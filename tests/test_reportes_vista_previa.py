@@ -0,0 +1,110 @@
+"""
+Tests para la vista previa rápida de filtros.
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.bienes.models import BienPatrimonial
+from apps.catalogo.models import Catalogo
+from apps.oficinas.models import Oficina
+from apps.reportes.tasks import calcular_vista_previa_exacta
+from apps.reportes.utils import VistaPreviaMuestreada
+
+
+class VistaPreviaMuestreadaTest(TestCase):
+    """Pruebas de las filas con LIMIT, la estimación y el refinamiento"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='previa', password='test123')
+        cls.oficina = Oficina.objects.create(codigo='OF-PRE-1', nombre='Almacén', responsable='Jefe')
+        catalogo = Catalogo.objects.create(
+            codigo='04220020',
+            denominacion='VENTILADOR',
+            grupo='04 AGRICOLA Y PESQUERO',
+            clase='22 EQUIPO',
+            resolucion='011-2019/SBN'
+        )
+        for i in range(80):
+            BienPatrimonial.objects.create(
+                codigo_patrimonial=f'PRE-{i:03d}',
+                catalogo=catalogo,
+                oficina=cls.oficina,
+                estado_bien='B' if i % 4 else 'M'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('reportes:vista_previa_filtros')
+
+    def test_pocos_resultados_son_exactos(self):
+        """Si el filtro devuelve menos filas que el límite no se estima nada"""
+        with mock.patch.object(calcular_vista_previa_exacta, 'delay') as delay:
+            datos = self.client.post(self.url, {'modo': 'rapido', 'codigo_patrimonial': 'PRE-00'}).json()
+
+        delay.assert_not_called()
+        self.assertFalse(datos['aproximado'])
+        self.assertEqual(datos['total_resultados'], 10)
+        self.assertEqual(len(datos['filas']), 10)
+        self.assertEqual(datos['filas'][0]['codigo_patrimonial'], 'PRE-000')
+        self.assertEqual(datos['estadisticas_estado'], [{'estado_bien': 'B', 'total': 7}, {'estado_bien': 'M', 'total': 3}])
+
+    @mock.patch.multiple(VistaPreviaMuestreada, FILAS=5, TAMAÑO_MUESTRA=20, VENTANAS_MUESTRA=4)
+    def test_estimacion_y_refinamiento(self):
+        """Los totales se estiman por muestra y luego se reemplazan por los exactos"""
+        with mock.patch.object(calcular_vista_previa_exacta, 'delay') as delay:
+            datos = self.client.post(self.url, {'modo': 'rapido', 'oficinas': [self.oficina.id]}).json()
+
+        self.assertTrue(datos['aproximado'])
+        self.assertIn('aproximadamente', datos['mensaje'])
+        self.assertEqual(len(datos['filas']), 5)
+        self.assertGreaterEqual(datos['total_resultados'], 5)
+        parametros = delay.call_args.args[0]
+        self.assertEqual(parametros, {'oficinas': [str(self.oficina.id)]})
+
+        self.assertEqual(self.client.get(datos['url_exacto']).json(), {'listo': False})
+
+        # Mientras el cálculo está pendiente no se vuelve a encolar
+        with mock.patch.object(calcular_vista_previa_exacta, 'delay') as delay:
+            self.client.post(self.url, {'modo': 'rapido', 'oficinas': [self.oficina.id]})
+        delay.assert_not_called()
+
+        self.assertEqual(calcular_vista_previa_exacta(parametros), 80)
+
+        # El resultado no depende de la caché del proceso que lo calculó
+        cache.clear()
+        exacto = self.client.get(datos['url_exacto']).json()
+        self.assertTrue(exacto['listo'])
+        self.assertEqual(exacto['total_resultados'], 80)
+        self.assertEqual(exacto['estadisticas_estado'], [{'estado_bien': 'B', 'total': 60}, {'estado_bien': 'M', 'total': 20}])
+
+        # Con el resultado guardado la vista previa ya es exacta
+        datos = self.client.post(self.url, {'modo': 'rapido', 'oficinas': [self.oficina.id]}).json()
+        self.assertFalse(datos['aproximado'])
+        self.assertEqual(datos['total_resultados'], 80)
+        self.assertNotIn('url_exacto', datos)
+
+    @mock.patch.multiple(VistaPreviaMuestreada, FILAS=5, TAMAÑO_MUESTRA=20, VENTANAS_MUESTRA=4)
+    def test_estimacion_por_ventanas_de_ids(self):
+        """La estimación escala la muestra al total y es estable para el mismo filtro"""
+        vista_previa = VistaPreviaMuestreada({'estados_bien': ['M']})
+        # Resultado exacto guardado, filas con LIMIT, rango de IDs, tamaño de
+        # la muestra y conteo por estado
+        with self.assertNumQueries(5):
+            estimacion = vista_previa.estimar()
+
+        self.assertTrue(estimacion['aproximado'])
+        self.assertEqual([fila['estado_bien'] for fila in estimacion['estadisticas_estado']], ['M'])
+        self.assertLessEqual(estimacion['total'], 80)
+        self.assertEqual(VistaPreviaMuestreada({'estados_bien': ['M']}).estimar(), estimacion)
+
+    def test_modo_completo_sin_cambios(self):
+        """Sin modo rápido la vista previa calcula los totales exactos"""
+        datos = self.client.post(self.url, {'estados_bien': 'M'}).json()
+        self.assertEqual(datos['total_resultados'], 20)
+        self.assertNotIn('aproximado', datos)